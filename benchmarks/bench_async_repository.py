@@ -0,0 +1,102 @@
+"""
+Compare querying a local index for many packages with `list_candidates_batch`,
+whose session runs the queries on its own event loop, and on the event loop of
+the caller with `list_candidates_batch_async`.
+
+Usage: python -m benchmarks.bench_async_repository [n_packages]
+"""
+
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import threading
+
+from benchmarks.utils import bench
+from benchmarks.utils import make_filenames
+from benchmarks.utils import make_html_index
+from mockpip.async_repository import AsyncIndexSession
+from mockpip.async_repository import list_candidates_batch_async
+from mockpip.repository import IndexSession
+from mockpip.repository import list_candidates_batch
+
+# The index is served from another process: an in-process server would compete
+# with the clients for the GIL.
+SERVER_SNIPPET = """
+import json, sys
+from tests.index_server import LocalIndexServer
+with LocalIndexServer(json.loads(sys.stdin.readline())) as server:
+    print(server.url, flush=True)
+    sys.stdin.read()
+"""
+
+
+def main(n_packages: int = 200) -> None:
+    # One log record per query would dominate the timings.
+    logging.getLogger("mockpip").setLevel(logging.WARNING)
+
+    package_names = [f"example{idx}" for idx in range(n_packages)]
+    pages = {
+        f"/simple/{name}/": make_html_index(make_filenames(50, package_name=name))
+        for name in package_names
+    }
+
+    with subprocess.Popen(  # noqa: S603
+        [sys.executable, "-c", SERVER_SNIPPET],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    ) as server:
+        server.stdin.write(f"{json.dumps(pages)}\n")
+        server.stdin.flush()
+        index_url = f"{server.stdout.readline().strip()}/simple"
+
+        def synchronous(max_workers: int):
+            with IndexSession(pool_size=max_workers) as session:
+                results = list_candidates_batch(
+                    package_names,
+                    index_url=index_url,
+                    session=session,
+                    max_workers=max_workers,
+                )
+            assert all(result.candidates for result in results)
+
+        def event_loop(max_concurrency: int):
+            async def _run():
+                async with AsyncIndexSession(
+                    max_concurrency=max_concurrency, pool_size=max_concurrency
+                ) as session:
+                    return await list_candidates_batch_async(
+                        package_names, index_url=index_url, session=session
+                    )
+
+            results = asyncio.run(_run())
+            assert all(result.candidates for result in results)
+
+        print(f"{n_packages} packages, local index")  # noqa: T201
+        results = []
+        for concurrency in (8, 32):
+            threads_before = threading.active_count()
+            results.append(
+                bench(
+                    f"sync: max_workers={concurrency}",
+                    lambda concurrency=concurrency: synchronous(concurrency),
+                )
+            )
+            results.append(
+                bench(
+                    f"asyncio: max_concurrency={concurrency}",
+                    lambda concurrency=concurrency: event_loop(concurrency),
+                )
+            )
+            assert threading.active_count() == threads_before
+
+        server.stdin.close()
+
+    for result in results:
+        print(result)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,57 @@
+"""
+Compare eager `Version` parsing + full sorting with the lazy top-down selection
+of the newest release.
+
+Usage: python -m benchmarks.bench_candidate_selection [n_releases]
+"""
+
+import sys
+
+from benchmarks.bench_index_parser import legacy_parse_versions_from_index
+from benchmarks.utils import PLATFORMS
+from benchmarks.utils import bench
+from benchmarks.utils import make_filenames
+from benchmarks.utils import make_html_index
+from mockpip.repository import iter_release_groups
+from mockpip.repository import parse_versions_from_stream
+from mockpip.repository import sort_candidates
+
+
+def main(n_releases: int = 5_000) -> None:
+    html_content = make_html_index(make_filenames(n_releases * (len(PLATFORMS) + 1)))
+    candidates = parse_versions_from_stream([html_content], sort=False)
+
+    print(f"Index page: {n_releases} releases, {len(candidates)} files")  # noqa: T201
+
+    def legacy():
+        return legacy_parse_versions_from_index(html_content)[0]
+
+    def lazy_full_sort():
+        return sort_candidates(parse_versions_from_stream([html_content], sort=False))[
+            0
+        ]
+
+    def lazy_top_down():
+        return next(
+            iter_release_groups(parse_versions_from_stream([html_content], sort=False))
+        )[0]
+
+    assert legacy() == lazy_full_sort() == lazy_top_down()
+
+    results = [
+        bench("parse + select: eager Version, full sort", legacy),
+        bench("parse + select: lazy Version, full sort", lazy_full_sort),
+        bench("parse + select: lazy Version, top-down", lazy_top_down),
+        bench("select only: full sort", lambda: sort_candidates(candidates)[0]),
+        bench(
+            "select only: top-down",
+            lambda: next(iter_release_groups(candidates))[0],
+        ),
+    ]
+
+    for result in results:
+        print(result)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
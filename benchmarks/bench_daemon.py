@@ -0,0 +1,96 @@
+"""
+Compare the latency of `mockpip install --dry-run` run in a fresh process with
+the same call served by `mockpip serve`, against a local index.
+
+The client round trip isolates the latency of the daemon from the interpreter
+start-up of the `mockpip` entry point.
+
+Usage: python -m benchmarks.bench_daemon [n_packages]
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.utils import PLATFORMS
+from benchmarks.utils import bench
+from benchmarks.utils import make_filenames
+from benchmarks.utils import make_html_index
+from mockpip.daemon import forward_to_daemon
+from mockpip.daemon import ping_daemon
+from mockpip.daemon import stop_daemon
+from tests.index_server import LocalIndexServer
+
+CLI_SNIPPET = "import sys; from mockpip.commands.main import main; sys.exit(main())"
+
+
+def main(n_packages: int = 5) -> None:
+    package_names = [f"example{idx}" for idx in range(n_packages)]
+    pages = {
+        f"/simple/{name}/": make_html_index(
+            make_filenames(50 * (len(PLATFORMS) + 1), package_name=name)
+        )
+        for name in package_names
+    }
+
+    with tempfile.TemporaryDirectory() as tmpdir, LocalIndexServer(pages) as server:
+        socket_path = Path(tmpdir) / "daemon.sock"
+        os.environ["XDG_CACHE_HOME"] = tmpdir
+        os.environ["MOCKPIP_DAEMON_SOCKET"] = str(socket_path)
+
+        args = [
+            *package_names,
+            "--dry-run",
+            "--no_variants",
+            f"--index-url={server.url}/simple",
+        ]
+        cli = [sys.executable, "-c", CLI_SNIPPET, "install", *args]
+
+        def run_without_daemon():
+            subprocess.run(  # noqa: S603
+                cli,
+                env={**os.environ, "MOCKPIP_NO_DAEMON": "1"},
+                capture_output=True,
+                check=True,
+            )
+
+        run_without_daemon()  # warm the index cache
+
+        daemon = subprocess.Popen(  # noqa: S603
+            [sys.executable, "-c", CLI_SNIPPET, "serve"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            while not ping_daemon(socket_path):
+                time.sleep(0.05)
+
+            def run_with_daemon():
+                subprocess.run(cli, capture_output=True, check=True)  # noqa: S603
+
+            def round_trip():
+                retcode = forward_to_daemon(
+                    "install", args, stdout=io.StringIO(), stderr=io.StringIO()
+                )
+                assert retcode == 0
+
+            print(f"{n_packages} packages, warm index cache")  # noqa: T201
+            results = [
+                bench("CLI: in-process", run_without_daemon),
+                bench("CLI: forwarded to the daemon", run_with_daemon),
+                bench("client round trip to the daemon", round_trip),
+            ]
+        finally:
+            stop_daemon(socket_path)
+            daemon.wait(timeout=10)
+
+    for result in results:
+        print(result)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
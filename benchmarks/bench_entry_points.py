@@ -0,0 +1,81 @@
+"""
+Compare discovering entry points by scanning the distribution metadata, as
+`importlib.metadata.entry_points` does, with reading them from the registry
+cached by `get_entry_points`, in a synthetic environment.
+
+Usage: python -m benchmarks.bench_entry_points [n_distributions]
+"""
+
+import sys
+import tempfile
+from importlib.metadata import distributions
+from pathlib import Path
+
+from benchmarks.utils import bench
+from mockpip.cache import EntryPointCache
+from mockpip.entry_points import get_entry_points
+from mockpip.entry_points import get_environment_fingerprint
+
+GROUP = "variantlib.plugins"
+
+
+def make_environment(site_packages: Path, n_dists: int) -> None:
+    """
+    Create `n_dists` distributions in `site_packages`, each declaring a console
+    script and every 100th one a variant plugin.
+    """
+    for idx in range(n_dists):
+        dist_info = site_packages / f"dist_{idx}-1.0.{idx}.dist-info"
+        dist_info.mkdir()
+        (dist_info / "METADATA").write_text(
+            f"Metadata-Version: 2.1\nName: dist-{idx}\nVersion: 1.0.{idx}\n"
+        )
+
+        entry_points = f"[console_scripts]\ndist-{idx} = dist_{idx}.cli:main\n"
+        if idx % 100 == 0:
+            entry_points += f"\n[{GROUP}]\nplugin_{idx} = dist_{idx}.plugin:Plugin\n"
+        (dist_info / "entry_points.txt").write_text(entry_points)
+
+
+def main(n_dists: int = 1_000) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        site_packages = Path(tmpdir) / "site-packages"
+        site_packages.mkdir()
+        make_environment(site_packages, n_dists)
+        paths = [str(site_packages)]
+
+        cache = EntryPointCache(Path(tmpdir) / "cache")
+
+        def scan_metadata():
+            return [
+                entry_point
+                for dist in distributions(path=paths)
+                for entry_point in dist.entry_points
+                if entry_point.group == GROUP
+            ]
+
+        def cold_registry():
+            return get_entry_points(GROUP, paths=paths)
+
+        def cached_registry():
+            return get_entry_points(GROUP, cache=cache, paths=paths)
+
+        assert len(cached_registry()) == len(scan_metadata()) == len(cold_registry())
+
+        print(f"Environment: {n_dists} distributions")  # noqa: T201
+        results = [
+            bench("importlib.metadata scan", scan_metadata),
+            bench("registry: no cache", cold_registry),
+            bench(
+                "registry: fingerprint only",
+                lambda: get_environment_fingerprint(paths),
+            ),
+            bench("registry: cached", cached_registry),
+        ]
+
+    for result in results:
+        print(result)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
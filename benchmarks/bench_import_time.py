@@ -0,0 +1,104 @@
+"""
+Measure the import time of the mockpip entry points with `python -X importtime`
+and report the heavy dependencies each of them drags in at import.
+
+Every measure runs in a fresh interpreter, so `sys.modules` caching does not hide
+regressions: a module-level import of pip internals, `requests` or `variantlib`
+on the startup path shows up in both the timings and the `heavy imports` column.
+
+Usage: python -m benchmarks.bench_import_time [repeat]
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = [
+    "mockpip",
+    "mockpip.commands.main",
+    "mockpip.commands.install",
+    "mockpip.commands.variants",
+    "mockpip.repository",
+    "mockpip.variant_hash",
+    "mockpip.variant_selection",
+]
+
+# Only needed once a command actually does its work.
+HEAVY_MODULES = ["pip._internal", "requests", "variantlib"]
+
+
+def measure_import(module: str) -> tuple[float, set[str]]:
+    """
+    Returns:
+        tuple[float, set[str]]: The cumulative import time of `module` in seconds
+            and the heavy modules imported along with it.
+    """
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    cumulative_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line.split("|"))
+        if name == module:
+            cumulative_us = int(cumulative)
+        imported.add(name)
+
+    heavy = {
+        heavy_module
+        for heavy_module in HEAVY_MODULES
+        if any(
+            name == heavy_module or name.startswith(f"{heavy_module}.")
+            for name in imported
+        )
+    }
+    return cumulative_us / 1e6, heavy
+
+
+def measure_version_command() -> float:
+    start_t = time.perf_counter()
+    subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "-c",
+            "from mockpip.commands.main import main; main()",
+            "--version",
+        ],
+        capture_output=True,
+        check=True,
+    )
+    return time.perf_counter() - start_t
+
+
+def main(repeat: int = 5) -> None:
+    print(f"Import time over {repeat} fresh interpreters")  # noqa: T201
+
+    for module in MODULES:
+        timings = []
+        for _ in range(repeat):
+            elapsed, heavy = measure_import(module)
+            timings.append(elapsed)
+
+        print(  # noqa: T201
+            f"{module:<45} best: {min(timings) * 1e3:9.2f} ms | "
+            f"median: {statistics.median(timings) * 1e3:9.2f} ms | "
+            f"heavy imports: {', '.join(sorted(heavy)) or '-'}"
+        )
+
+    timings = [measure_version_command() for _ in range(repeat)]
+    print(  # noqa: T201
+        f"{'`mockpip --version` (wall clock)':<45} "
+        f"best: {min(timings) * 1e3:9.2f} ms | "
+        f"median: {statistics.median(timings) * 1e3:9.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
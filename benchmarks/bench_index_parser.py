@@ -0,0 +1,81 @@
+"""
+Compare the streaming index parser with the former regex-over-document parser.
+
+Usage: python -m benchmarks.bench_index_parser [n_links]
+"""
+
+import re
+import sys
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+from packaging.version import Version
+
+from benchmarks.utils import bench
+from benchmarks.utils import iter_chunks
+from benchmarks.utils import make_filenames
+from benchmarks.utils import make_html_index
+from mockpip.repository import CHUNK_SIZE
+from mockpip.repository import PackageCandidate
+from mockpip.repository import parse_versions_from_stream
+
+
+def legacy_parse_versions_from_index(html_content: str) -> list[PackageCandidate]:
+    # Implementation of `parse_versions_from_index` before the streaming parser.
+    pattern = (
+        r"(?P<filename>([a-zA-Z0-9_\-]+)-(?P<version>\d+\.\d+\.\d+)([^\s]*?)"
+        r"\.(?P<extension>tar\.gz|whl))"
+    )
+
+    parsed_versions = []
+    for href in re.findall(r'href=["\'](.*?)["\']', html_content):
+        parsed_url = urlparse(href)
+        filename_match = re.search(pattern, parsed_url.path)
+        if not filename_match:
+            continue
+        filehash = parse_qs(parsed_url.fragment).get("sha256", [None])[0]
+        if filehash is not None:
+            filehash = filehash if re.match(r"^[a-fA-F0-9]{64}$", filehash) else None
+        parsed_versions.append(
+            PackageCandidate(
+                filename=filename_match.group("filename"),
+                version=Version(filename_match.group("version")),
+                extension=filename_match.group("extension"),
+                filehash=filehash,
+            )
+        )
+
+    filetype_order = {"tar.gz": 0, "whl": 1}
+    return sorted(
+        parsed_versions,
+        key=lambda item: (item.version, filetype_order[item.extension]),
+        reverse=True,
+    )
+
+
+def main(n_links: int = 100_000) -> None:
+    content = make_html_index(make_filenames(n_links)).encode("utf-8")
+    print(f"Index page: {n_links} links, {len(content) / 1024**2:.1f} MiB")  # noqa: T201
+
+    assert legacy_parse_versions_from_index(
+        content.decode("utf-8")
+    ) == parse_versions_from_stream(iter_chunks(content, CHUNK_SIZE))
+
+    results = [
+        bench(
+            "legacy: full document + regex",
+            # The legacy parser needed the whole decoded `response.text`
+            lambda: legacy_parse_versions_from_index(content.decode("utf-8")),
+        ),
+        bench(
+            f"streaming: {CHUNK_SIZE // 1024} KiB chunks",
+            lambda: parse_versions_from_stream(iter_chunks(content, CHUNK_SIZE)),
+        ),
+    ]
+
+    for result in results:
+        print(result)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,106 @@
+"""
+Compare reading `variantlib.provider_priority` with pip's `Configuration`, with
+the lightweight reader and from the cached value, in-process and in fresh
+interpreters (where importing pip internals is part of the cost).
+
+Usage: python -m benchmarks.bench_pip_config [repeat]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.utils import bench
+from mockpip.cache import PipConfigCache
+from mockpip.variant_hash import PIP_CONFIG_PROVIDER_PRIORITY_KEY
+from mockpip.variant_hash import get_pip_config_files
+from mockpip.variant_hash import read_pip_config_value
+from mockpip.variant_hash import read_provider_priority_from_pip_config
+
+PIP_CONFIGURATION_SNIPPET = """
+from pip._internal.configuration import Configuration
+config = Configuration(isolated=False)
+config.load()
+config.get_value("{key}")
+"""
+
+CACHED_READER_SNIPPET = """
+from mockpip.cache import PipConfigCache
+from mockpip.variant_hash import read_provider_priority_from_pip_config
+read_provider_priority_from_pip_config(PipConfigCache("{cache_dir}"))
+"""
+
+
+def pip_configuration() -> str:
+    from pip._internal.configuration import Configuration
+
+    config = Configuration(isolated=False)
+    config.load()
+    return config.get_value(PIP_CONFIG_PROVIDER_PRIORITY_KEY)
+
+
+def time_fresh_interpreter(code: str, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start_t = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)  # noqa: S603
+        timings.append(time.perf_counter() - start_t)
+    return timings
+
+
+def main(repeat: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_file = Path(tmpdir) / "pip.conf"
+        config_file.write_text(
+            "[global]\nindex-url = https://pypi.org/simple\n\n"
+            '[variantlib]\nprovider_priority = ["nvidia", "x86_64", "arm"]\n'
+        )
+        os.environ["PIP_CONFIG_FILE"] = str(config_file)
+
+        cache_dir = Path(tmpdir) / "cache"
+        config_cache = PipConfigCache(cache_dir)
+        read_provider_priority_from_pip_config(config_cache)  # warm the cache
+
+        assert pip_configuration() == read_pip_config_value(
+            get_pip_config_files(), PIP_CONFIG_PROVIDER_PRIORITY_KEY
+        )
+
+        results = [
+            bench("in-process: pip Configuration.load()", pip_configuration),
+            bench(
+                "in-process: lightweight reader",
+                read_provider_priority_from_pip_config,
+            ),
+            bench(
+                "in-process: cached",
+                lambda: read_provider_priority_from_pip_config(
+                    PipConfigCache(cache_dir)
+                ),
+            ),
+        ]
+        for result in results:
+            print(result)  # noqa: T201
+
+        for name, code in [
+            (
+                "fresh interpreter: pip Configuration.load()",
+                PIP_CONFIGURATION_SNIPPET.format(key=PIP_CONFIG_PROVIDER_PRIORITY_KEY),
+            ),
+            (
+                "fresh interpreter: cached",
+                CACHED_READER_SNIPPET.format(cache_dir=cache_dir),
+            ),
+        ]:
+            timings = time_fresh_interpreter(code, repeat)
+            print(  # noqa: T201
+                f"{name:<45} best: {min(timings) * 1e3:9.2f} ms | "
+                f"median: {statistics.median(timings) * 1e3:9.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,75 @@
+"""
+Compare the PEP 691 JSON and the HTML parse paths on the same package listing.
+
+Usage: python -m benchmarks.bench_simple_api [n_files]
+"""
+
+import json
+import sys
+
+from benchmarks.utils import bench
+from benchmarks.utils import iter_chunks
+from benchmarks.utils import make_filenames
+from benchmarks.utils import make_html_index
+from benchmarks.utils import sha256_of
+from mockpip.repository import CHUNK_SIZE
+from mockpip.repository import SIMPLE_JSON_CONTENT_TYPE
+from mockpip.repository import parse_versions_from_stream
+
+BASE_URL = "https://files.example.com/simple/example/"
+
+
+def make_json_index(filenames: list[str]) -> str:
+    return json.dumps(
+        {
+            "meta": {"api-version": "1.1"},
+            "name": "example",
+            "files": [
+                {
+                    "filename": filename,
+                    "url": f"https://files.example.com/packages/{filename}",
+                    "hashes": {"sha256": sha256_of(filename)},
+                    "core-metadata": False,
+                }
+                for filename in filenames
+            ],
+        }
+    )
+
+
+def main(n_files: int = 100_000) -> None:
+    filenames = make_filenames(n_files)
+    html_content = make_html_index(filenames).encode("utf-8")
+    json_content = make_json_index(filenames).encode("utf-8")
+
+    print(  # noqa: T201
+        f"Package listing: {n_files} files | "
+        f"HTML: {len(html_content) / 1024**2:.1f} MiB | "
+        f"JSON: {len(json_content) / 1024**2:.1f} MiB"
+    )
+
+    def parse_html():
+        return parse_versions_from_stream(
+            iter_chunks(html_content, CHUNK_SIZE),
+            content_type="text/html",
+            base_url=BASE_URL,
+        )
+
+    def parse_json():
+        return parse_versions_from_stream(
+            iter_chunks(json_content, CHUNK_SIZE),
+            content_type=SIMPLE_JSON_CONTENT_TYPE,
+            base_url=BASE_URL,
+        )
+
+    assert parse_html() == parse_json()
+
+    for result in [
+        bench("HTML (text/html)", parse_html),
+        bench("PEP 691 JSON", parse_json),
+    ]:
+        print(result)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,73 @@
+"""
+Compare filtering the candidates by version specifier after sorting them with
+filtering them while they are streamed out of the index page parser.
+
+Usage: python -m benchmarks.bench_specifier_filtering [n_releases]
+"""
+
+import sys
+
+from packaging.specifiers import SpecifierSet
+
+from benchmarks.utils import PLATFORMS
+from benchmarks.utils import bench
+from benchmarks.utils import make_filenames
+from benchmarks.utils import make_html_index
+from mockpip.repository import iter_release_groups
+from mockpip.repository import parse_versions_from_stream
+from mockpip.repository import sort_candidates
+
+SPECIFIERS = [">=40.0.0", "<1.0.0", "==12.3.*"]
+
+
+def main(n_releases: int = 5_000) -> None:
+    html_content = make_html_index(make_filenames(n_releases * (len(PLATFORMS) + 1)))
+
+    print(f"Index page: {n_releases} releases")  # noqa: T201
+
+    results = []
+    for raw_specifier in SPECIFIERS:
+        specifier = SpecifierSet(raw_specifier)
+
+        def filter_after_sort(specifier=specifier):
+            candidates = sort_candidates(
+                parse_versions_from_stream([html_content], sort=False)
+            )
+            return [
+                candidate
+                for candidate in candidates
+                if specifier.contains(candidate.version)
+            ]
+
+        def filter_while_streaming(specifier=specifier):
+            return sort_candidates(
+                parse_versions_from_stream(
+                    [html_content], sort=False, specifier=specifier
+                )
+            )
+
+        def filter_while_streaming_top_down(specifier=specifier):
+            return next(
+                iter_release_groups(
+                    parse_versions_from_stream(
+                        [html_content], sort=False, specifier=specifier
+                    )
+                ),
+                None,
+            )
+
+        assert filter_after_sort() == filter_while_streaming()
+
+        label = f"`{raw_specifier}` ({len(filter_while_streaming())} files kept)"
+        results.extend([
+            bench(f"{label}: after sort", filter_after_sort),
+            bench(f"{label}: streaming", filter_while_streaming),
+            bench(f"{label}: streaming, top-down", filter_while_streaming_top_down),
+        ])
+
+    for result in results:
+        print(result)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,90 @@
+"""
+Measure the logging overhead of the variant enumeration loop of `install`: the
+legacy eager f-string debug record per variant, the lazy per-variant records
+written directly or through `queued_logging`, the summary record and no record.
+
+The records are written to `/dev/null` with the `mockpip` formatter.
+
+Usage: python -m benchmarks.bench_variant_logging [n_variants]
+"""
+
+import logging
+import os
+import sys
+from pathlib import Path
+
+from benchmarks.utils import bench
+from mockpip.commands import install
+from mockpip.commands.install import select_candidate
+from mockpip.logger import _LoggerAPI
+from mockpip.logger import queued_logging
+from mockpip.repository import PackageCandidate
+
+
+class _VariantOrder:
+    def __init__(self, hashes: list[str]) -> None:
+        self.hashes = hashes
+
+    def describe(self, vid: int) -> None:
+        return None
+
+
+def legacy_enumerate(candidates: dict, variant_order: _VariantOrder) -> object:
+    for vid, vhash in enumerate(variant_order.hashes):
+        selected_pkg = candidates.get(vhash)
+        if selected_pkg is not None:
+            return selected_pkg
+
+        install.logger.debug(f"[Variant: {vid:04d}] `{vhash}`: NOT FOUND ...")
+    return None
+
+
+def main(n_variants: int = 20_000) -> None:
+    # Only the last variant supported by the system is published.
+    variant_order = _VariantOrder([f"{idx:08x}" for idx in range(n_variants)])
+    best = PackageCandidate(
+        f"example-1.0.0~{variant_order.hashes[-1]}-py3-none-any.whl",
+        "1.0.0",
+        "whl",
+        None,
+    )
+    os.environ.pop("PIP_FORCE_INSTALL_VARIANT_HASH", None)
+
+    devnull = Path(os.devnull).open("w")  # noqa: SIM115
+    _LoggerAPI.setup_logger(handlers=[logging.StreamHandler(devnull)])
+    install.log_best_variant = lambda *_: None
+
+    def select(variant_log: str, verbose: bool) -> None:
+        install.logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+        assert (
+            select_candidate(
+                [best], get_variants=lambda: variant_order, variant_log=variant_log
+            )
+            is best
+        )
+
+    def select_queued() -> None:
+        with queued_logging():
+            select("each", verbose=True)
+
+    def legacy() -> None:
+        install.logger.setLevel(logging.DEBUG)
+        legacy_enumerate({variant_order.hashes[-1]: best}, variant_order)
+
+    print(f"{n_variants} variants tried")  # noqa: T201
+    results = [
+        bench("legacy: eager f-string per variant", legacy),
+        bench("each: lazy record per variant", lambda: select("each", verbose=True)),
+        bench("each: lazy record per variant, queued", select_queued),
+        bench("each: not verbose", lambda: select("each", verbose=False)),
+        bench("summary", lambda: select("summary", verbose=False)),
+        bench("off", lambda: select("off", verbose=False)),
+    ]
+    devnull.close()
+
+    for result in results:
+        print(result)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,168 @@
+"""
+Compare selecting the best variant of a release by enumerating every variant
+supported by the system with ranking the few variants the release publishes.
+
+Ranking requires the core metadata of every published variant: their fetch from
+a local index answering after `latency_ms` is measured as well, with the number
+of requests sent, serially, concurrently and from a warm cache.
+
+Usage: python -m benchmarks.bench_variant_selection [max_providers] [latency_ms]
+"""
+
+import functools
+import logging
+import sys
+import tempfile
+
+from variantlib.config import KeyConfig
+from variantlib.config import ProviderConfig
+from variantlib.meta import VariantDescription
+from variantlib.meta import VariantMeta
+
+from benchmarks.utils import bench
+from benchmarks.utils import sha256_of
+from mockpip.cache import IndexCache
+from mockpip.repository import IndexSession
+from mockpip.repository import PackageCandidate
+from mockpip.repository import fetch_core_metadata
+from mockpip.variant_hash import get_variant_descriptions
+from mockpip.variant_selection import VariantRanker
+from mockpip.variant_selection import get_published_variants
+from tests.index_server import LocalIndexServer
+from tests.index_server import make_metadata
+
+N_KEYS = 2
+N_VALUES = 3
+
+
+def make_provider_cfgs(n_providers: int) -> list[ProviderConfig]:
+    return [
+        ProviderConfig(
+            provider=f"provider_{pid}",
+            configs=[
+                KeyConfig(
+                    key=f"key_{kid}", values=[f"value_{vid}" for vid in range(N_VALUES)]
+                )
+                for kid in range(N_KEYS)
+            ],
+        )
+        for pid in range(n_providers)
+    ]
+
+
+def make_published_variants(n_providers: int) -> dict[str, VariantDescription]:
+    # A package typically publishes a handful of variants using a few properties,
+    # which come late in the enumeration (variants with more properties first).
+    vdescs = [
+        VariantDescription(
+            data=[
+                VariantMeta(
+                    provider=f"provider_{n_providers - 1}",
+                    key="key_0",
+                    value=f"value_{vid}",
+                )
+            ]
+        )
+        for vid in range(N_VALUES)
+    ]
+    vdescs.append(
+        VariantDescription(
+            data=[VariantMeta(provider="unknown_provider", key="key", value="value")]
+        )
+    )
+    return {vdesc.hexdigest: vdesc for vdesc in vdescs}
+
+
+def bench_metadata_fetches(n_providers: int, latency: float) -> None:
+    # A release publishing every variant of one provider, a few dozen of them.
+    provider_cfgs = make_provider_cfgs(n_providers)
+    filenames = {
+        vdesc.hexdigest: f"example-1.0.0~{vdesc.hexdigest}-py3-none-any.whl"
+        for vdesc in get_variant_descriptions(provider_cfgs[-1:])
+    }
+    pages = {
+        f"/packages/{filenames[vdesc.hexdigest]}.metadata": make_metadata(
+            variant=vdesc
+        )
+        for vdesc in get_variant_descriptions(provider_cfgs[-1:])
+    }
+
+    with (
+        LocalIndexServer(pages) as server,
+        IndexSession() as session,
+        tempfile.TemporaryDirectory() as cache_dir,
+    ):
+        server.latency = latency
+        candidates = {
+            vhash: PackageCandidate(
+                filename,
+                "1.0.0",
+                "whl",
+                sha256_of(filename),
+                url=f"{server.url}/packages/{filename}",
+                core_metadata=True,
+            )
+            for vhash, filename in filenames.items()
+        }
+
+        def rank(max_workers: int, cache: IndexCache | None = None):
+            published = get_published_variants(
+                candidates,
+                functools.partial(fetch_core_metadata, cache=cache, session=session),
+                max_workers=max_workers,
+            )
+            return VariantRanker(provider_cfgs).select(published)
+
+        warm_cache = IndexCache(cache_dir)
+        rank(max_workers=8, cache=warm_cache)
+
+        print(  # noqa: T201
+            f"{len(candidates)} variants published, {latency * 1e3:.0f} ms latency"
+        )
+        for name, fn in [
+            ("serial fetches", functools.partial(rank, max_workers=1)),
+            ("concurrent fetches", functools.partial(rank, max_workers=8)),
+            ("warm cache", functools.partial(rank, max_workers=8, cache=warm_cache)),
+        ]:
+            sent = len(server.requests)
+            result = bench(name, fn, repeat=3)
+            # `bench` runs `fn` once more to measure its memory.
+            requests = (len(server.requests) - sent) // 4
+            print(f"{result} | {requests} request(s) per run")  # noqa: T201
+
+
+def main(max_providers: int = 4, latency_ms: float = 20) -> None:
+    results = []
+    for n_providers in range(1, max_providers + 1):
+        provider_cfgs = make_provider_cfgs(n_providers)
+        published = make_published_variants(n_providers)
+
+        def enumerate_variants(provider_cfgs=provider_cfgs, published=published):
+            for vdesc in get_variant_descriptions(provider_cfgs):
+                if vdesc.hexdigest in published:
+                    return vdesc.hexdigest
+            return None
+
+        def rank_published(provider_cfgs=provider_cfgs, published=published):
+            best = VariantRanker(provider_cfgs).select(published)
+            return best[0] if best is not None else None
+
+        assert enumerate_variants() == rank_published()
+
+        n_variants = (N_VALUES + 1) ** (n_providers * N_KEYS) - 1
+        label = f"{n_providers} provider(s), {n_variants} variants"
+        results.extend([
+            bench(f"{label}: enumerate", enumerate_variants, repeat=3),
+            bench(f"{label}: rank published", rank_published, repeat=3),
+        ])
+
+    for result in results:
+        print(result)  # noqa: T201
+
+    # Only the warnings of the failed fetches, if any.
+    logging.getLogger("mockpip").setLevel(logging.WARNING)
+    bench_metadata_fetches(max_providers, latency_ms / 1e3)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]), *map(float, sys.argv[2:3]))
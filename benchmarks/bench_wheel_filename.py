@@ -0,0 +1,87 @@
+"""
+Compare the throughput of the wheel filename parser recompiling its regex on
+every call with the precompiled and memoized parser.
+
+Usage: python -m benchmarks.bench_wheel_filename [n_filenames]
+"""
+
+import re
+import sys
+
+from benchmarks.utils import PLATFORMS
+from benchmarks.utils import bench
+from mockpip.variant_hash import get_variant_hash_from_wheel
+from mockpip.variant_hash import parse_wheel_filename
+from mockpip.variant_hash import parse_wheel_filenames
+
+
+def legacy_get_variant_hash_from_wheel(filename: str):
+    """`get_variant_hash_from_wheel` before the parser was precompiled."""
+    wheel_file_re = re.compile(
+        r"""^(?P<namever>(?P<name>[^\s-]+?)-(?P<ver>[^\s-]*?))
+        ((-(?P<build>\d[^-]*?))?(~(?P<variant_hash>[0-9a-f]{8}))?
+        -(?P<pyver>[^\s-]+?)-(?P<abi>[^\s-]+?)-(?P<plat>[^\s-]+?)
+        \.whl|\.dist-info)$""",
+        re.VERBOSE,
+    )
+
+    wheel_info = wheel_file_re.match(filename)
+
+    if not wheel_info:
+        raise ValueError(f"{filename} is not a valid wheel filename.")
+
+    return wheel_info.group("variant_hash")
+
+
+def make_wheel_filenames(n_filenames: int) -> list[str]:
+    filenames = []
+    idx = 0
+    while len(filenames) < n_filenames:
+        version = f"{idx // 100}.{(idx // 10) % 10}.{idx % 10}"
+        filenames.extend(
+            f"example-{version}~{vid:08x}-cp312-cp312-{platform}.whl"
+            for vid in range(5)
+            for platform in PLATFORMS
+        )
+        idx += 1
+    return filenames[:n_filenames]
+
+
+def main(n_filenames: int = 100_000) -> None:
+    filenames = make_wheel_filenames(n_filenames)
+
+    def legacy():
+        return [legacy_get_variant_hash_from_wheel(filename) for filename in filenames]
+
+    def precompiled_cold():
+        parse_wheel_filename.cache_clear()
+        return [get_variant_hash_from_wheel(filename) for filename in filenames]
+
+    def precompiled_bulk_cold():
+        parse_wheel_filename.cache_clear()
+        return parse_wheel_filenames(filenames)
+
+    # Typical `install` pattern: the same index page is visited several times.
+    page = filenames[:1_000]
+    parse_wheel_filenames(page)
+
+    def precompiled_bulk_warm():
+        return parse_wheel_filenames(page * (n_filenames // len(page)))
+
+    assert legacy() == precompiled_cold()
+
+    results = [
+        bench("recompiled regex", legacy),
+        bench("precompiled, cold cache", precompiled_cold),
+        bench("precompiled bulk, cold cache", precompiled_bulk_cold),
+        bench("precompiled bulk, warm cache", precompiled_bulk_warm),
+    ]
+
+    for result in results:
+        print(  # noqa: T201
+            f"{result} | {n_filenames / result.best / 1e3:8.1f} k filenames/s"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
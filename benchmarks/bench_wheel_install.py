@@ -0,0 +1,82 @@
+"""
+Compare installing a large wheel with `install_wheel`, serially and on a thread
+pool, against `ZipFile.extractall` followed by a second pass hashing the
+extracted files for the RECORD.
+
+Usage: python -m benchmarks.bench_wheel_install [large_files_mib]
+
+Set `TMPDIR` to a tmpfs (e.g. `/dev/shm`) to leave the disk out of the timings.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+from benchmarks.utils import bench
+from mockpip.installer import install_wheel
+from tests.index_server import make_wheel
+
+
+def extract_and_hash(wheel_path: Path, target: Path) -> None:
+    with zipfile.ZipFile(wheel_path) as wheel:
+        wheel.extractall(target)
+
+    for path in target.rglob("*"):
+        if path.is_file():
+            with path.open("rb") as f:
+                hashlib.file_digest(f, "sha256")
+
+
+def main(large_files_mib: int = 256) -> None:
+    # A few large native libraries and many small modules, like a GPU wheel.
+    files = {
+        f"example/lib/libexample{idx}.so": os.urandom(2**20)
+        * (large_files_mib // 8)
+        for idx in range(8)
+    }
+    files.update({
+        f"example/module{idx}.py": b"def f():\n    return 42\n" * 200
+        for idx in range(2000)
+    })
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        wheel_path = Path(tmpdir) / "example-1.0.0-py3-none-any.whl"
+        wheel_path.write_bytes(make_wheel(files=files))
+        del files
+        target = Path(tmpdir) / "target"
+
+        def run(fn) -> None:
+            shutil.rmtree(target, ignore_errors=True)
+            fn()
+
+        print(  # noqa: T201
+            f"{wheel_path.stat().st_size / 2**20:.0f} MiB wheel, 2008 files"
+        )
+        results = [
+            bench(
+                "extractall + hash pass",
+                lambda: run(lambda: extract_and_hash(wheel_path, target)),
+            )
+        ]
+        results.extend(
+            bench(
+                f"install_wheel: max_workers={max_workers}",
+                lambda max_workers=max_workers: run(
+                    lambda: install_wheel(
+                        wheel_path, target=target, max_workers=max_workers
+                    )
+                ),
+            )
+            for max_workers in (1, 4, 8)
+        )
+
+    for result in results:
+        print(result)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
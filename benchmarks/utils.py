@@ -0,0 +1,87 @@
+import hashlib
+import statistics
+import time
+import tracemalloc
+import typing
+from collections.abc import Callable
+
+PLATFORMS = [
+    "manylinux_2_17_x86_64",
+    "manylinux_2_17_aarch64",
+    "macosx_11_0_arm64",
+    "win_amd64",
+]
+
+
+class BenchResult(typing.NamedTuple):
+    name: str
+    best: float  # seconds
+    median: float  # seconds
+    peak_memory: int  # bytes
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<45} best: {self.best * 1e3:9.2f} ms | "
+            f"median: {self.median * 1e3:9.2f} ms | "
+            f"peak mem: {self.peak_memory / 1024**2:8.2f} MiB"
+        )
+
+
+def bench(name: str, fn: Callable[[], typing.Any], repeat: int = 5) -> BenchResult:
+    """
+    Time `fn` `repeat` times, then measure its peak memory in a separate run.
+    """
+    timings = []
+    for _ in range(repeat):
+        start_t = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start_t)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return BenchResult(
+        name=name,
+        best=min(timings),
+        median=statistics.median(timings),
+        peak_memory=peak_memory,
+    )
+
+
+def make_filenames(n_files: int, package_name: str = "example") -> list[str]:
+    """
+    Generate `n_files` distinct wheel and sdist filenames of `package_name`.
+    """
+    filenames = []
+    idx = 0
+    while len(filenames) < n_files:
+        version = f"{idx // 100}.{(idx // 10) % 10}.{idx % 10}"
+        filenames.append(f"{package_name}-{version}.tar.gz")
+        filenames.extend(
+            f"{package_name}-{version}-cp312-cp312-{platform}.whl"
+            for platform in PLATFORMS
+        )
+        idx += 1
+    return filenames[:n_files]
+
+
+def sha256_of(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def make_html_index(filenames: list[str]) -> str:
+    links = "\n".join(
+        f'    <a href="https://files.example.com/packages/{filename}'
+        f'#sha256={sha256_of(filename)}">{filename}</a><br/>'
+        for filename in filenames
+    )
+    return f"<!DOCTYPE html>\n<html>\n  <body>\n{links}\n  </body>\n</html>\n"
+
+
+def iter_chunks(content: bytes, chunk_size: int) -> typing.Iterator[bytes]:
+    for idx in range(0, len(content), chunk_size):
+        yield content[idx : idx + chunk_size]
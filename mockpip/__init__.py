@@ -1,8 +1,22 @@
 #!/usr/bin/env python
 
-import importlib.metadata
+import functools
+
+
+@functools.cache
+def _get_version() -> str:
+    # `importlib.metadata` scans `sys.path` for the distribution: only pay for it
+    # when the version is actually needed (`--version`, log records).
+    import importlib.metadata
+
+    return importlib.metadata.version("mockpip")
+
+
+def __getattr__(name: str):
+    if name == "__version__":
+        return _get_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__version__ = importlib.metadata.version("mockpip")
 
 # Initialize the logger
-from mockpip import logger  # noqa: F401
+from mockpip import logger  # noqa: E402, F401
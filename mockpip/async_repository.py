@@ -0,0 +1,797 @@
+import asyncio
+import base64
+import contextlib
+import logging
+import os
+import ssl
+import time
+import typing
+import zlib
+from collections.abc import AsyncGenerator
+from collections.abc import Iterator
+from collections.abc import Mapping
+from pathlib import Path
+from urllib.parse import unquote
+from urllib.parse import urljoin
+from urllib.parse import urlsplit
+
+import mockpip
+from mockpip.cache import IndexCache
+from mockpip.repository import CHUNK_SIZE
+from mockpip.repository import DEFAULT_BACKOFF_FACTOR
+from mockpip.repository import DEFAULT_CONNECT_TIMEOUT
+from mockpip.repository import DEFAULT_INDEX_STRATEGY
+from mockpip.repository import DEFAULT_MAX_RETRIES
+from mockpip.repository import DEFAULT_POOL_SIZE
+from mockpip.repository import DEFAULT_READ_TIMEOUT
+from mockpip.repository import INDEX_STRATEGIES
+from mockpip.repository import RETRY_STATUS_CODES
+from mockpip.repository import ConnectionStats
+from mockpip.repository import IndexQuery
+from mockpip.repository import IndexQueryResult
+from mockpip.repository import IndexResponse
+from mockpip.repository import IndexStats
+from mockpip.repository import NetworkSettings
+from mockpip.repository import PackageCandidate
+from mockpip.repository import merge_candidates
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 64  # requests in flight per session
+MAX_REDIRECTS = 5
+MAX_HEADERS = 100
+REDIRECT_STATUS_CODES = (301, 302, 303, 307, 308)
+
+ConnectionKey = tuple[str, str, int, str | None]  # (scheme, host, port, proxy URL)
+
+
+class ProtocolError(ConnectionError):
+    """The server closed the connection or sent a malformed response."""
+
+
+class Headers(Mapping[str, str]):
+    """
+    Case-insensitive, read-only mapping of the headers of a response.
+
+    Repeated headers are joined with `, `.
+    """
+
+    __slots__ = ["_headers"]
+
+    def __init__(self, headers: typing.Iterable[tuple[str, str]] = ()) -> None:
+        self._headers = {}
+        for name, value in headers:
+            key = name.lower()
+            if key in self._headers:
+                previous_name, previous_value = self._headers[key]
+                self._headers[key] = (previous_name, f"{previous_value}, {value}")
+            else:
+                self._headers[key] = (name, value)
+
+    def __getitem__(self, name: str) -> str:
+        return self._headers[name.lower()][1]
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name, _ in self._headers.values())
+
+    def __len__(self) -> int:
+        return len(self._headers)
+
+    def __repr__(self) -> str:
+        return f"Headers({dict(self.items())!r})"
+
+
+class _Connection:
+    __slots__ = ["key", "reader", "writer"]
+
+    def __init__(
+        self,
+        key: ConnectionKey,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class AsyncResponse:
+    """
+    Response of `AsyncIndexSession.get`, whose body is streamed from the
+    connection by `iter_chunks()`.
+    """
+
+    __slots__ = [
+        "_complete",
+        "_conn",
+        "_keep_alive",
+        "_session",
+        "headers",
+        "status_code",
+        "url",
+    ]
+
+    def __init__(
+        self,
+        session: "AsyncIndexSession",
+        conn: _Connection,
+        url: str,
+        status_code: int,
+        headers: Headers,
+        keep_alive: bool,
+    ) -> None:
+        self._session = session
+        self._conn = conn
+        self._keep_alive = keep_alive
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+
+        # Responses without body are complete as soon as the headers are read.
+        self._complete = (
+            status_code in (204, 304)
+            or 100 <= status_code < 200  # noqa: PLR2004
+            or headers.get("Content-Length", "").strip() == "0"
+        )
+
+    async def _read(self, n: int, exactly: bool = False) -> bytes:
+        try:
+            async with asyncio.timeout(self._session.read_timeout):
+                if exactly:
+                    return await self._conn.reader.readexactly(n)
+                return await self._conn.reader.read(n)
+        except asyncio.IncompleteReadError as e:
+            raise ProtocolError("Connection closed while reading the body") from e
+
+    async def _readline(self) -> bytes:
+        try:
+            async with asyncio.timeout(self._session.read_timeout):
+                line = await self._conn.reader.readline()
+        except ValueError as e:
+            raise ProtocolError(f"Invalid chunked body: {e}") from e
+        if not line.endswith(b"\n"):
+            raise ProtocolError("Connection closed while reading the body")
+        return line
+
+    async def _iter_raw_chunks(self, chunk_size: int) -> AsyncGenerator[bytes]:
+        if self._complete:
+            return
+
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            while True:
+                size_line = await self._readline()
+                try:
+                    size = int(size_line.split(b";", 1)[0].strip(), 16)
+                except ValueError as e:
+                    raise ProtocolError(f"Invalid chunk size: {size_line!r}") from e
+
+                if size == 0:
+                    while (await self._readline()).strip():
+                        pass  # trailers
+                    break
+
+                while size > 0:
+                    data = await self._read(min(size, chunk_size), exactly=True)
+                    size -= len(data)
+                    yield data
+                await self._read(2, exactly=True)  # CRLF
+
+        elif (content_length := self.headers.get("Content-Length")) is not None:
+            try:
+                remaining = int(content_length)
+            except ValueError as e:
+                raise ProtocolError(f"Invalid Content-Length: {content_length}") from e
+
+            while remaining > 0:
+                data = await self._read(min(remaining, chunk_size))
+                if not data:
+                    raise ProtocolError("Connection closed while reading the body")
+                remaining -= len(data)
+                yield data
+
+        else:
+            # Delimited by the end of the connection.
+            self._keep_alive = False
+            while data := await self._read(chunk_size):
+                yield data
+
+        self._complete = True
+
+    async def iter_chunks(self, chunk_size: int = CHUNK_SIZE) -> AsyncGenerator[bytes]:
+        """
+        Stream the body, decoded if it was compressed (`gzip` or `deflate`).
+
+        Args:
+            chunk_size (int): Maximum number of bytes read at once.
+
+        Yields:
+            bytes: The chunks of the body.
+        """
+        decoder = None
+        if self.headers.get("Content-Encoding", "").lower() in ("gzip", "deflate"):
+            # Accepts both the gzip and the zlib containers.
+            decoder = zlib.decompressobj(zlib.MAX_WBITS | 32)
+
+        async for chunk in self._iter_raw_chunks(chunk_size):
+            if decoder is not None:
+                chunk = decoder.decompress(chunk)  # noqa: PLW2901
+            if chunk:
+                yield chunk
+
+        if decoder is not None and (tail := decoder.flush()):
+            yield tail
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    def release(self) -> None:
+        """
+        Hand the connection back to the pool if the body was fully read, close
+        it otherwise.
+        """
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+
+        if self._complete and self._keep_alive:
+            self._session._release(conn)  # noqa: SLF001
+        else:
+            conn.close()
+
+
+async def _read_response_head(
+    reader: asyncio.StreamReader,
+) -> tuple[str, int, Headers]:
+    status_line = await reader.readline()
+    if not status_line.endswith(b"\n"):
+        raise ProtocolError("Connection closed by the server")
+
+    try:
+        http_version, status, *_ = status_line.decode("latin-1").split()
+        status_code = int(status)
+    except ValueError as e:
+        raise ProtocolError(f"Invalid status line: {status_line!r}") from e
+
+    header_lines = []
+    while (line := await reader.readline()).strip():
+        if len(header_lines) >= MAX_HEADERS:
+            raise ProtocolError("Too many headers")
+        name, sep, value = line.decode("latin-1").partition(":")
+        if sep:
+            header_lines.append((name.strip(), value.strip()))
+
+    return http_version, status_code, Headers(header_lines)
+
+
+def _create_ssl_context(ca_bundle: str | None) -> ssl.SSLContext:
+    if ca_bundle is None:
+        return ssl.create_default_context()
+    if Path(ca_bundle).is_dir():
+        return ssl.create_default_context(capath=ca_bundle)
+    return ssl.create_default_context(cafile=ca_bundle)
+
+
+def _proxy_headers(proxy: str) -> dict[str, str]:
+    # The credentials of the proxy URL, if any.
+    parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    if parts.username is None:
+        return {}
+
+    credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+    token = base64.b64encode(credentials.encode("latin-1")).decode("ascii")
+    return {"Proxy-Authorization": f"Basic {token}"}
+
+
+async def _open_proxy_connection(
+    proxy: str,
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    if parts.scheme != "http" or not parts.hostname:
+        raise ProtocolError(f"Unsupported proxy: `{proxy}`")
+
+    return await asyncio.open_connection(
+        parts.hostname, parts.port or 80, limit=CHUNK_SIZE
+    )
+
+
+async def _open_tunnel(
+    proxy: str,
+    host: str,
+    port: int,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    request = "".join([
+        f"CONNECT {host}:{port} HTTP/1.1\r\n",
+        f"Host: {host}:{port}\r\n",
+        *(f"{name}: {value}\r\n" for name, value in _proxy_headers(proxy).items()),
+        "\r\n",
+    ]).encode("latin-1")
+    writer.write(request)
+    await writer.drain()
+
+    _, status_code, _ = await _read_response_head(reader)
+    if status_code != 200:  # noqa: PLR2004
+        raise ProtocolError(
+            f"Proxy `{proxy}` refused to connect to `{host}:{port}` "
+            f"(HTTP {status_code})"
+        )
+
+
+class AsyncIndexSession:
+    """
+    HTTP/1.1 client pooling keep-alive connections, built on asyncio streams so
+    that many index queries share one event loop instead of one thread each.
+    `IndexSession` runs one on a private event loop for the synchronous API.
+
+    At most `max_concurrency` requests are in flight at once, the others wait
+    for a slot. Transient failures (connection errors, timeouts and
+    `RETRY_STATUS_CODES`) are retried with exponential backoff and redirects
+    are followed. `http://` proxies are supported, through a `CONNECT` tunnel
+    for the HTTPS URLs.
+
+    A session must only be used from the event loop it was first used on.
+
+    Args:
+        max_concurrency (int): Maximum number of requests in flight.
+        pool_size (int): Maximum number of idle connections kept alive per host.
+        max_retries (int): Maximum number of retries per request.
+        backoff_factor (float): Backoff factor between retries in seconds.
+        connect_timeout (float): Timeout to establish a connection in seconds.
+        read_timeout (float): Timeout between two bytes received in seconds.
+        ssl_context (ssl.SSLContext | None): TLS settings of the HTTPS
+            connections. Defaults to the CA bundle of `network`, or the
+            system's trusted certificates.
+        network (NetworkSettings | None): The proxies and CA bundle to use.
+            Defaults to those of `os.environ`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        ssl_context: ssl.SSLContext | None = None,
+        network: NetworkSettings | None = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.ssl_context = ssl_context
+        self.network = (
+            network if network is not None else NetworkSettings.from_environ(os.environ)
+        )
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._idle: dict[ConnectionKey, list[_Connection]] = {}
+        self._background: set[asyncio.Task] = set()
+        self._num_requests = 0
+        self._num_connections = 0
+
+    @contextlib.asynccontextmanager
+    async def get(
+        self, url: str, headers: Mapping[str, str] | None = None
+    ) -> AsyncGenerator[AsyncResponse]:
+        """
+        Send a `GET` request, the body of the response is read from within the
+        context.
+
+        Args:
+            url (str): The URL to fetch.
+            headers (Mapping[str, str] | None): Additional request headers.
+
+        Yields:
+            AsyncResponse: The response, after retries and redirects.
+
+        Raises:
+            OSError: On connection errors, timeouts (`TimeoutError`) and
+                malformed responses (`ProtocolError`), once retries exhausted.
+        """
+        async with self._semaphore:
+            response = await self._send_with_retries(url, headers or {})
+            try:
+                yield response
+            finally:
+                response.release()
+
+    async def _send_with_retries(
+        self, url: str, headers: Mapping[str, str]
+    ) -> AsyncResponse:
+        retries = 0
+        redirects = 0
+
+        while True:
+            try:
+                response = await self._send(url, headers)
+
+            except OSError as e:  # including `TimeoutError`
+                if retries >= self.max_retries:
+                    raise
+                retries += 1
+                logger.debug(f"Retrying `{url}` ({retries}/{self.max_retries}): {e}")
+                await asyncio.sleep(self.backoff_factor * 2 ** (retries - 1))
+                continue
+
+            if (
+                response.status_code in RETRY_STATUS_CODES
+                and retries < self.max_retries
+            ):
+                response.release()
+                retries += 1
+                logger.debug(
+                    f"Retrying `{url}` ({retries}/{self.max_retries}): "
+                    f"HTTP {response.status_code}"
+                )
+                await asyncio.sleep(self.backoff_factor * 2 ** (retries - 1))
+                continue
+
+            if (
+                response.status_code in REDIRECT_STATUS_CODES
+                and (location := response.headers.get("Location")) is not None
+                and redirects < MAX_REDIRECTS
+            ):
+                response.release()
+                redirects += 1
+                url = urljoin(url, location)
+                continue
+
+            return response
+
+    async def _send(self, url: str, headers: Mapping[str, str]) -> AsyncResponse:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ProtocolError(f"Unsupported URL: `{url}`")
+
+        proxies = self.network.get_proxies(url)
+        proxy = proxies.get(parts.scheme) or proxies.get("all")
+        key = (
+            parts.scheme,
+            parts.hostname,
+            parts.port or (443 if parts.scheme == "https" else 80),
+            proxy,
+        )
+
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        if proxy is not None and parts.scheme == "http":
+            # Forwarded by the proxy, HTTPS URLs are tunneled instead.
+            target = f"http://{parts.netloc.rpartition('@')[2]}{target}"
+            headers = {**_proxy_headers(proxy), **headers}
+
+        request = "".join([
+            f"GET {target} HTTP/1.1\r\n",
+            f"Host: {parts.netloc.rpartition('@')[2]}\r\n",
+            f"User-Agent: mockpip/{mockpip.__version__}\r\n",
+            "Accept-Encoding: gzip, deflate\r\n",
+            "Connection: keep-alive\r\n",
+            *(f"{name}: {value}\r\n" for name, value in headers.items()),
+            "\r\n",
+        ]).encode("latin-1")
+
+        idle = self._idle.get(key)
+        while idle:
+            conn = idle.pop()
+            try:
+                return await self._exchange(conn, url, request)
+            except ConnectionError:
+                # The server closed the idle connection meanwhile.
+                conn.close()
+
+        conn = await self._connect(key)
+        return await self._exchange(conn, url, request)
+
+    async def _connect(self, key: ConnectionKey) -> _Connection:
+        scheme, host, port, proxy = key
+        ssl_context = None
+        if scheme == "https":
+            if self.ssl_context is None:
+                self.ssl_context = _create_ssl_context(self.network.ca_bundle)
+            ssl_context = self.ssl_context
+
+        async with asyncio.timeout(self.connect_timeout):
+            if proxy is None:
+                reader, writer = await asyncio.open_connection(
+                    host, port, ssl=ssl_context, limit=CHUNK_SIZE
+                )
+            else:
+                reader, writer = await _open_proxy_connection(proxy)
+                try:
+                    if ssl_context is not None:
+                        await _open_tunnel(proxy, host, port, reader, writer)
+                        await writer.start_tls(ssl_context, server_hostname=host)
+                except BaseException:
+                    writer.close()
+                    raise
+
+        self._num_connections += 1
+        return _Connection(key, reader, writer)
+
+    async def _exchange(
+        self, conn: _Connection, url: str, request: bytes
+    ) -> AsyncResponse:
+        try:
+            async with asyncio.timeout(self.read_timeout):
+                conn.writer.write(request)
+                await conn.writer.drain()
+                self._num_requests += 1
+                http_version, status_code, headers = await _read_response_head(
+                    conn.reader
+                )
+
+        except ValueError as e:  # e.g. a header line over the buffer limit
+            conn.close()
+            raise ProtocolError(f"Invalid response: {e}") from e
+
+        except BaseException:  # including the cancellation of the request
+            conn.close()
+            raise
+
+        connection = headers.get("Connection", "").lower()
+        keep_alive = (
+            connection != "close"
+            if http_version == "HTTP/1.1"
+            else connection == "keep-alive"
+        )
+
+        return AsyncResponse(self, conn, url, status_code, headers, keep_alive)
+
+    def _release(self, conn: _Connection) -> None:
+        idle = self._idle.setdefault(conn.key, [])
+        if len(idle) < self.pool_size and not conn.writer.is_closing():
+            idle.append(conn)
+        else:
+            conn.close()
+
+    def stats(self) -> ConnectionStats:
+        """
+        Returns:
+            ConnectionStats: The number of requests sent and connections opened
+                by the session.
+        """
+        return ConnectionStats(
+            requests=self._num_requests, connections=self._num_connections
+        )
+
+    def _detach(self, tasks: typing.Iterable[asyncio.Task]) -> None:
+        # Let the pending `tasks` complete in the background, until `aclose`.
+        for task in tasks:
+            if not task.done():
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+
+    async def aclose(self) -> None:
+        background = list(self._background)
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+
+        idle = [conn for conns in self._idle.values() for conn in conns]
+        self._idle.clear()
+        for conn in idle:
+            conn.close()
+        for conn in idle:
+            with contextlib.suppress(OSError):
+                await conn.writer.wait_closed()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+
+async def query_index_async(
+    package_name: str,
+    index_url: str,
+    session: AsyncIndexSession,
+    cache: IndexCache | None = None,
+) -> IndexResponse:
+    """
+    Query one package index for available versions, see `list_candidates_async`.
+    The page is parsed as it is received, see `IndexQuery`.
+
+    Returns:
+        IndexResponse: The candidates in index order, along with the time spent
+            and the error if the index could not be queried.
+    """
+    start_t = time.perf_counter()
+
+    query = IndexQuery(package_name, index_url=index_url, cache=cache)
+
+    if query.result is None:
+        try:
+            async with session.get(
+                query.package_url, headers=query.request_headers()
+            ) as response:
+                reader = query.handle_response(response.status_code, response.headers)
+                if reader is not None:
+                    with reader:
+                        async for chunk in response.iter_chunks(CHUNK_SIZE):
+                            reader.feed(chunk)
+                        query.result = reader.close()
+
+        except TimeoutError:
+            logger.error(f"Timeout while accessing: `{query.package_url}` ...")  # noqa: TRY400
+            query.fail("timeout")
+
+        except OSError as e:
+            logger.error(f"Error connecting to {query.package_url}: {e}")  # noqa: TRY400
+            query.fail(str(e))
+
+    return IndexResponse(
+        index_url=index_url,
+        candidates=query.result,
+        elapsed=time.perf_counter() - start_t,
+        error=query.error,
+    )
+
+
+async def list_candidates_async(
+    package_name: str,
+    index_url: str,
+    cache: IndexCache | None = None,
+    session: AsyncIndexSession | None = None,
+    extra_index_urls: typing.Iterable[str] = (),
+    index_strategy: str = DEFAULT_INDEX_STRATEGY,
+    stats: IndexStats | None = None,
+) -> list[PackageCandidate]:
+    """
+    Query package indexes for available versions on the running event loop,
+    see `list_candidates` for the `index_strategy`. In `race` mode, the queries
+    of the slower indexes complete in the background until the session is
+    closed.
+
+    Args:
+        package_name (str): The name of the package to query, optionally with a
+            PEP 508 version specifier (e.g., 'requests>=2.0.0').
+        index_url (str): The URL of the package index.
+        cache (IndexCache | None): Optional on-disk cache of index pages.
+        session (AsyncIndexSession | None): HTTP session to use. Defaults to a
+            session opened for this call.
+        extra_index_urls (Iterable[str]): Other package indexes, by priority.
+        index_strategy (str): One of `INDEX_STRATEGIES`.
+        stats (IndexStats | None): Receives the latency and errors of each index.
+
+    Returns:
+        list[PackageCandidate]: The candidates in index order.
+    """
+    if index_strategy not in INDEX_STRATEGIES:
+        raise ValueError(f"Unknown index strategy: `{index_strategy}`")
+
+    if session is None:
+        async with AsyncIndexSession() as session:  # noqa: PLR1704
+            return await list_candidates_async(
+                package_name,
+                index_url=index_url,
+                cache=cache,
+                session=session,
+                extra_index_urls=extra_index_urls,
+                index_strategy=index_strategy,
+                stats=stats,
+            )
+
+    index_urls = [index_url, *extra_index_urls]
+
+    async def _query(url: str) -> IndexResponse:
+        response = await query_index_async(
+            package_name, index_url=url, session=session, cache=cache
+        )
+        if stats is not None:
+            stats.record(response)
+        return response
+
+    if len(index_urls) == 1:
+        return (await _query(index_url)).candidates
+
+    tasks = [asyncio.create_task(_query(url)) for url in index_urls]
+    try:
+        if index_strategy == "merge":
+            return merge_candidates(await asyncio.gather(*tasks))
+
+        for next_response in asyncio.as_completed(tasks):
+            response = await next_response
+            if response.error is None and response.candidates:
+                logger.info(
+                    f"Using `{response.index_url}`, first to answer for "
+                    f"`{package_name}`"
+                )
+                if stats is not None:
+                    stats.record_win(response.index_url)
+                return response.candidates
+
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    finally:
+        # The slower queries of the `race` mode feed the cache and `stats`.
+        session._detach(tasks)  # noqa: SLF001
+
+    return []
+
+
+async def list_candidates_batch_async(
+    package_names: list[str],
+    index_url: str,
+    cache: IndexCache | None = None,
+    session: AsyncIndexSession | None = None,
+    extra_index_urls: typing.Iterable[str] = (),
+    index_strategy: str = DEFAULT_INDEX_STRATEGY,
+    stats: IndexStats | None = None,
+    max_concurrency: int | None = None,
+) -> list[IndexQueryResult]:
+    """
+    Query a package index for several packages concurrently on the running
+    event loop, up to `session.max_concurrency` requests at once.
+
+    Cancelling the call cancels all the pending queries.
+
+    Args:
+        package_names (list[str]): The names of the packages to query.
+        index_url (str): The URL of the package index.
+        cache (IndexCache | None): Optional on-disk cache of index pages.
+        session (AsyncIndexSession | None): HTTP session shared by all the
+            queries. Defaults to a session opened for this call.
+        extra_index_urls (Iterable[str]): Other package indexes, by priority.
+        index_strategy (str): One of `INDEX_STRATEGIES`, see `list_candidates`.
+        stats (IndexStats | None): Receives the latency and errors of each index.
+        max_concurrency (int | None): Maximum number of packages queried
+            concurrently, `None` to only bound the requests in flight.
+
+    Returns:
+        list[IndexQueryResult]: One result per package, in the input order.
+    """
+    if session is None:
+        async with AsyncIndexSession() as session:  # noqa: PLR1704
+            return await list_candidates_batch_async(
+                package_names,
+                index_url=index_url,
+                cache=cache,
+                session=session,
+                extra_index_urls=extra_index_urls,
+                index_strategy=index_strategy,
+                stats=stats,
+                max_concurrency=max_concurrency,
+            )
+
+    extra_index_urls = list(extra_index_urls)
+    semaphore = (
+        asyncio.Semaphore(max_concurrency)
+        if max_concurrency is not None
+        else contextlib.nullcontext()
+    )
+
+    async def _query(package_name: str) -> IndexQueryResult:
+        async with semaphore:
+            start_t = time.perf_counter()
+            candidates = await list_candidates_async(
+                package_name,
+                index_url=index_url,
+                cache=cache,
+                session=session,
+                extra_index_urls=extra_index_urls,
+                index_strategy=index_strategy,
+                stats=stats,
+            )
+        return IndexQueryResult(
+            package_name=package_name,
+            candidates=candidates,
+            elapsed=time.perf_counter() - start_t,
+        )
+
+    async with asyncio.TaskGroup() as task_group:
+        tasks = [
+            task_group.create_task(_query(package_name))
+            for package_name in package_names
+        ]
+
+    return [task.result() for task in tasks]
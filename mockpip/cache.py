@@ -0,0 +1,898 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import typing
+import uuid
+from collections.abc import Generator
+from collections.abc import Iterable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TTL = 600  # seconds
+DEFAULT_CACHE_MAX_SIZE = 256 * 1024 * 1024  # 256 MiB
+DEFAULT_PROVIDER_CACHE_TTL = 24 * 3600  # seconds
+DEFAULT_VARIANT_ORDER_CACHE_ENTRIES = 8
+DEFAULT_ENTRY_POINT_CACHE_ENTRIES = 16
+DEFAULT_WHEEL_CACHE_MAX_SIZE = 2 * 1024 * 1024 * 1024  # 2 GiB
+
+FICLONE = 0x40049409  # Linux ioctl cloning a file (copy-on-write)
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def get_default_cache_dir(env: typing.Mapping[str, str] | None = None) -> Path:
+    """
+    Returns the default cache root, honoring `XDG_CACHE_HOME` when set.
+
+    Args:
+        env (Mapping[str, str] | None): The environment. Defaults to `os.environ`.
+
+    Returns:
+        Path: `$XDG_CACHE_HOME/mockpip` or `~/.cache/mockpip`.
+    """
+    env = env if env is not None else os.environ
+    if (xdg_cache := env.get("XDG_CACHE_HOME")) is not None:
+        return Path(xdg_cache) / "mockpip"
+    return Path(env.get("HOME") or Path.home()) / ".cache" / "mockpip"
+
+
+class CacheEntry(typing.NamedTuple):
+    url: str
+    body_path: Path
+    etag: str | None
+    last_modified: str | None
+    content_type: str | None
+    fetched_at: float
+
+    def read(self) -> bytes:
+        return self.body_path.read_bytes()
+
+    def iter_chunks(self, chunk_size: int) -> Generator[bytes]:
+        with self.body_path.open("rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class IndexCache:
+    """
+    On-disk HTTP cache for Simple-index pages.
+
+    Each page is stored as two files named after the sha256 of its URL: the raw
+    body (`<key>.body`) and its validators (`<key>.json`). Freshness is driven by
+    `ttl` using the time of the last successful fetch or revalidation, while the
+    body file's mtime is used as the LRU clock for size-bounded eviction.
+
+    Args:
+        cache_dir (str | Path): Directory where the pages are stored.
+        ttl (float): Number of seconds a page is served without revalidation.
+        max_size (int): Maximum total size in bytes of the cached bodies.
+        offline (bool): Only serve from the cache, never hit the network.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        ttl: float = DEFAULT_CACHE_TTL,
+        max_size: int = DEFAULT_CACHE_MAX_SIZE,
+        offline: bool = False,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = self._key(url)
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.json"
+
+    def get(self, url: str) -> CacheEntry | None:
+        """
+        Fetch the cached entry for `url` and mark it as recently used.
+
+        Args:
+            url (str): The URL of the index page.
+
+        Returns:
+            CacheEntry | None: The cached entry or `None` on cache miss.
+        """
+        body_path, meta_path = self._paths(url)
+
+        try:
+            with meta_path.open() as f:
+                metadata = json.load(f)
+            os.utime(body_path)  # LRU bookkeeping
+
+        except (OSError, ValueError):
+            return None
+
+        return CacheEntry(
+            url=url,
+            body_path=body_path,
+            etag=metadata.get("etag"),
+            last_modified=metadata.get("last_modified"),
+            content_type=metadata.get("content_type"),
+            fetched_at=metadata.get("fetched_at", 0.0),
+        )
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.age() < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry | None) -> dict[str, str]:
+        """
+        Build the headers used to revalidate `entry` with the server.
+
+        Args:
+            entry (CacheEntry | None): The cached entry if any.
+
+        Returns:
+            dict[str, str]: `If-None-Match` / `If-Modified-Since` headers.
+        """
+        headers = {}
+        if entry is None:
+            return headers
+
+        if entry.etag is not None:
+            headers["If-None-Match"] = entry.etag
+
+        if entry.last_modified is not None:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        return headers
+
+    def _write_metadata(self, meta_path: Path, metadata: dict) -> None:
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.cache_dir, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(metadata, f)
+        Path(f.name).replace(meta_path)
+
+    def store(
+        self, url: str, body: bytes, headers: typing.Mapping[str, str]
+    ) -> CacheEntry | None:
+        """
+        Store a freshly fetched page and evict old entries if needed.
+
+        Args:
+            url (str): The URL of the index page.
+            body (bytes): The raw response body.
+            headers (Mapping[str, str]): The response headers.
+
+        Returns:
+            CacheEntry | None: The newly stored entry, `None` if it was evicted.
+        """
+        with self.open_writer(url, headers) as writer:
+            writer.write(body)
+        return self.get(url)
+
+    def open_writer(
+        self, url: str, headers: typing.Mapping[str, str]
+    ) -> "IndexCacheWriter":
+        """
+        Store a page whose body is received incrementally.
+
+        Args:
+            url (str): The URL of the index page.
+            headers (Mapping[str, str]): The response headers.
+
+        Returns:
+            IndexCacheWriter: Receives the body, see `IndexCacheWriter`.
+        """
+        return IndexCacheWriter(self, url, headers)
+
+    def revalidate(
+        self, entry: CacheEntry, headers: typing.Mapping[str, str]
+    ) -> CacheEntry:
+        """
+        Refresh `entry` after the server answered `304 Not Modified`.
+
+        Args:
+            entry (CacheEntry): The entry that was revalidated.
+            headers (Mapping[str, str]): The `304` response headers.
+
+        Returns:
+            CacheEntry: The refreshed entry.
+        """
+        _, meta_path = self._paths(entry.url)
+
+        entry = entry._replace(
+            etag=headers.get("ETag", entry.etag),
+            last_modified=headers.get("Last-Modified", entry.last_modified),
+            fetched_at=time.time(),
+        )
+
+        metadata = entry._asdict()
+        del metadata["body_path"]
+        self._write_metadata(meta_path, metadata)
+
+        return entry
+
+    def size(self) -> int:
+        return sum(path.stat().st_size for path in self.cache_dir.glob("*.body"))
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until under `max_size`."""
+        bodies = []
+        for body_path in self.cache_dir.glob("*.body"):
+            with contextlib.suppress(OSError):
+                stat = body_path.stat()
+                bodies.append((stat.st_mtime, stat.st_size, body_path))
+
+        total_size = sum(size for _, size, _ in bodies)
+        if total_size <= self.max_size:
+            return
+
+        for _, size, body_path in sorted(bodies):
+            if total_size <= self.max_size:
+                break
+            logger.debug(f"Evicting `{body_path.stem}` from the index cache")
+            with contextlib.suppress(OSError):
+                body_path.with_suffix(".json").unlink()
+                body_path.unlink()
+            total_size -= size
+
+    def clear(self) -> None:
+        for path in self.cache_dir.iterdir():
+            if path.suffix in (".body", ".json", ".tmp"):
+                with contextlib.suppress(OSError):
+                    path.unlink()
+
+
+class IndexCacheWriter:
+    """
+    Push-based writer of an `IndexCache` entry, for bodies received in chunks
+    (e.g. from an asyncio transport).
+
+    The body is written to a temporary file and the entry is only committed by
+    `commit()`, a partially received page is never stored. Used as a context
+    manager, the entry is committed on success and discarded on error.
+    """
+
+    __slots__ = ["_file", "cache", "headers", "url"]
+
+    def __init__(
+        self, cache: IndexCache, url: str, headers: typing.Mapping[str, str]
+    ) -> None:
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+        self._file = tempfile.NamedTemporaryFile(  # noqa: SIM115
+            "wb", dir=cache.cache_dir, suffix=".tmp", delete=False
+        )
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+
+    def commit(self) -> None:
+        body_path, meta_path = self.cache._paths(self.url)  # noqa: SLF001
+
+        self._file.close()
+        Path(self._file.name).replace(body_path)
+
+        self.cache._write_metadata(  # noqa: SLF001
+            meta_path,
+            {
+                "url": self.url,
+                "etag": self.headers.get("ETag"),
+                "last_modified": self.headers.get("Last-Modified"),
+                "content_type": self.headers.get("Content-Type"),
+                "fetched_at": time.time(),
+            },
+        )
+
+        self.cache.evict()
+
+    def abort(self) -> None:
+        self._file.close()
+        with contextlib.suppress(OSError):
+            Path(self._file.name).unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+class ProviderCacheEntry(typing.NamedTuple):
+    plugin_name: str
+    plugin_version: str | None
+    fingerprint: str | None
+    config: dict
+    created_at: float
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class ProviderConfigCache:
+    """
+    On-disk cache of the `ProviderConfig` produced by each variant plugin.
+
+    Plugins may probe the hardware and drivers, which is slow and gives the same
+    result on every run. The serialized configs are stored in a single JSON file
+    keyed by plugin name. An entry is only used if it was produced by the same
+    plugin version, is younger than `ttl` and, if the plugin supplies one, has
+    the same fingerprint (checked by the caller).
+
+    Args:
+        cache_dir (str | Path): Directory where the cache file is stored.
+        ttl (float): Number of seconds after which an entry is recomputed.
+    """
+
+    FILENAME = "providers.json"
+
+    def __init__(
+        self, cache_dir: str | Path, ttl: float = DEFAULT_PROVIDER_CACHE_TTL
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+
+        self._entries = None
+        self._lock = threading.Lock()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def path(self) -> Path:
+        return self.cache_dir / self.FILENAME
+
+    def _load(self) -> dict[str, dict]:
+        if self._entries is None:
+            try:
+                with self.path.open() as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+            self._entries = entries if isinstance(entries, dict) else {}
+        return self._entries
+
+    def _dump(self) -> None:
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.cache_dir, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(self._entries, f)
+        Path(f.name).replace(self.path)
+
+    def get(
+        self, plugin_name: str, plugin_version: str | None
+    ) -> ProviderCacheEntry | None:
+        """
+        Fetch the cached config of a plugin, stale entries are discarded.
+
+        Args:
+            plugin_name (str): The name of the plugin entry point.
+            plugin_version (str | None): The version of the installed plugin.
+
+        Returns:
+            ProviderCacheEntry | None: The cached entry or `None` if missing or
+                stale.
+        """
+        with self._lock:
+            data = self._load().get(plugin_name)
+
+        if data is None:
+            return None
+
+        try:
+            entry = ProviderCacheEntry(plugin_name=plugin_name, **data)
+        except TypeError:
+            entry = None
+
+        if entry is None or entry.plugin_version != plugin_version:
+            logger.debug(f"Plugin `{plugin_name}` changed, invalidating its cache")
+            self.invalidate(plugin_name)
+            return None
+
+        if entry.age() >= self.ttl:
+            logger.debug(f"Cached config of plugin `{plugin_name}` expired")
+            self.invalidate(plugin_name)
+            return None
+
+        return entry
+
+    def store(
+        self,
+        plugin_name: str,
+        plugin_version: str | None,
+        fingerprint: str | None,
+        config: dict,
+    ) -> ProviderCacheEntry:
+        """
+        Store the serialized config produced by a plugin.
+
+        Args:
+            plugin_name (str): The name of the plugin entry point.
+            plugin_version (str | None): The version of the installed plugin.
+            fingerprint (str | None): The fingerprint supplied by the plugin.
+            config (dict): The serialized `ProviderConfig`.
+
+        Returns:
+            ProviderCacheEntry: The stored entry.
+        """
+        entry = ProviderCacheEntry(
+            plugin_name=plugin_name,
+            plugin_version=plugin_version,
+            fingerprint=fingerprint,
+            config=config,
+            created_at=time.time(),
+        )
+
+        data = entry._asdict()
+        del data["plugin_name"]
+
+        with self._lock:
+            self._load()[plugin_name] = data
+            self._dump()
+
+        return entry
+
+    def invalidate(self, plugin_name: str) -> None:
+        with self._lock:
+            if self._load().pop(plugin_name, None) is not None:
+                self._dump()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = {}
+            with contextlib.suppress(OSError):
+                self.path.unlink()
+
+
+class PipConfigEntry(typing.NamedTuple):
+    files: dict[str, int | None]  # path -> mtime in ns, `None` if missing
+    value: str | None
+
+
+class PipConfigCache:
+    """
+    On-disk cache of a value read from the pip configuration files.
+
+    Locating the configuration files may require importing pip internals, and
+    reading them parses every global, user, site and environment file. The
+    files considered and the value they yield are stored in a single JSON file,
+    keyed by a digest of the environment variables that locate the files
+    (computed by the caller). An entry is only used while none of its files was
+    created, modified or deleted, i.e. their mtimes are unchanged.
+
+    Args:
+        cache_dir (str | Path): Directory where the cache file is stored.
+    """
+
+    FILENAME = "pip_config.json"
+
+    def __init__(self, cache_dir: str | Path) -> None:
+        self.cache_dir = Path(cache_dir)
+        self._entries = None
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def path(self) -> Path:
+        return self.cache_dir / self.FILENAME
+
+    @staticmethod
+    def get_mtimes(files: Iterable[str]) -> dict[str, int | None]:
+        mtimes = {}
+        for fname in files:
+            try:
+                mtimes[fname] = Path(fname).stat().st_mtime_ns
+            except OSError:
+                mtimes[fname] = None
+        return mtimes
+
+    def _load(self) -> dict[str, dict]:
+        if self._entries is None:
+            try:
+                with self.path.open() as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+            self._entries = entries if isinstance(entries, dict) else {}
+        return self._entries
+
+    def get(self, key: str) -> PipConfigEntry | None:
+        """
+        Fetch the cached value, entries whose files changed are discarded.
+
+        Args:
+            key (str): The digest of the environment locating the files.
+
+        Returns:
+            PipConfigEntry | None: The cached entry or `None` if missing or stale.
+        """
+        data = self._load().get(key)
+        if data is None:
+            return None
+
+        try:
+            entry = PipConfigEntry(**data)
+        except TypeError:
+            return None
+
+        if self.get_mtimes(entry.files) != entry.files:
+            logger.debug("pip configuration changed, invalidating its cache")
+            return None
+
+        return entry
+
+    def store(
+        self, key: str, files: dict[str, int | None], value: str | None
+    ) -> PipConfigEntry:
+        """
+        Store the value read from the pip configuration files.
+
+        Args:
+            key (str): The digest of the environment locating the files.
+            files (dict[str, int | None]): The mtimes of the files, as returned
+                by `get_mtimes` before they were read.
+            value (str | None): The value read, `None` if unset.
+
+        Returns:
+            PipConfigEntry: The stored entry.
+        """
+        entry = PipConfigEntry(files=files, value=value)
+        self._load()[key] = entry._asdict()
+
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.cache_dir, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(self._entries, f)
+        Path(f.name).replace(self.path)
+
+        return entry
+
+
+class VariantOrderCache:
+    """
+    On-disk cache of the variants supported by the system, in priority order.
+
+    Enumerating and hashing every combination of the provider configs is
+    expensive and gives the same result as long as the configs don't change.
+    Each order is stored in its own JSON file named after `key`, a digest of the
+    configs computed by the caller. Only the `max_entries` most recently used
+    orders are kept.
+
+    Args:
+        cache_dir (str | Path): Directory where the orders are stored.
+        max_entries (int): Maximum number of orders kept.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_entries: int = DEFAULT_VARIANT_ORDER_CACHE_ENTRIES,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"order-{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        """
+        Fetch a cached order and mark it as recently used.
+
+        Args:
+            key (str): The digest of the provider configs.
+
+        Returns:
+            dict | None: The serialized order or `None` on cache miss.
+        """
+        path = self._path(key)
+        try:
+            with path.open() as f:
+                order = json.load(f)
+            os.utime(path)  # LRU bookkeeping
+        except (OSError, ValueError):
+            return None
+
+        return order if isinstance(order, dict) else None
+
+    def store(self, key: str, order: dict) -> None:
+        """
+        Store an order and evict the least recently used ones.
+
+        Args:
+            key (str): The digest of the provider configs.
+            order (dict): The serialized order.
+        """
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.cache_dir, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(order, f, separators=(",", ":"))
+        Path(f.name).replace(self._path(key))
+
+        orders = []
+        for path in self.cache_dir.glob("order-*.json"):
+            with contextlib.suppress(OSError):
+                orders.append((path.stat().st_mtime, path))
+
+        for _, path in sorted(orders, reverse=True)[self.max_entries :]:
+            with contextlib.suppress(OSError):
+                path.unlink()
+
+
+class EntryPointCache:
+    """
+    On-disk cache of the entry points registered by the installed distributions.
+
+    Listing the entry points reads the metadata of every distribution on
+    `sys.path`, which gets slow in large environments. Each environment (a
+    digest of its `sys.path` computed by the caller) gets its own JSON file,
+    holding the entry points along with the fingerprint of the distributions
+    they were read from. An entry is only used while the fingerprint matches.
+    Only the `max_entries` most recently used environments are kept.
+
+    Args:
+        cache_dir (str | Path): Directory where the registries are stored.
+        max_entries (int): Maximum number of environments kept.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_entries: int = DEFAULT_ENTRY_POINT_CACHE_ENTRIES,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"entry-points-{key}.json"
+
+    def get(self, key: str, fingerprint: str) -> dict[str, list] | None:
+        """
+        Fetch the entry points of an environment and mark them as recently used.
+
+        Args:
+            key (str): The digest of the environment.
+            fingerprint (str): The current fingerprint of its distributions.
+
+        Returns:
+            dict[str, list] | None: The serialized entry points by group, `None`
+                on cache miss or if the distributions changed.
+        """
+        path = self._path(key)
+        try:
+            with path.open() as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get("fingerprint") != fingerprint:
+            logger.debug("Installed distributions changed, rescanning entry points")
+            return None
+
+        with contextlib.suppress(OSError):
+            os.utime(path)  # LRU bookkeeping
+
+        entry_points = data.get("entry_points")
+        return entry_points if isinstance(entry_points, dict) else None
+
+    def store(self, key: str, fingerprint: str, entry_points: dict[str, list]) -> None:
+        """
+        Store the entry points of an environment and evict the least recently
+        used environments.
+
+        Args:
+            key (str): The digest of the environment.
+            fingerprint (str): The fingerprint of its distributions.
+            entry_points (dict[str, list]): The serialized entry points by group.
+        """
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.cache_dir, suffix=".tmp", delete=False
+        ) as f:
+            json.dump(
+                {"fingerprint": fingerprint, "entry_points": entry_points},
+                f,
+                separators=(",", ":"),
+            )
+        Path(f.name).replace(self._path(key))
+
+        registries = []
+        for path in self.cache_dir.glob("entry-points-*.json"):
+            with contextlib.suppress(OSError):
+                registries.append((path.stat().st_mtime, path))
+
+        for _, path in sorted(registries, reverse=True)[self.max_entries :]:
+            with contextlib.suppress(OSError):
+                path.unlink()
+
+
+def link_or_copy(src: Path, dst: Path) -> str:
+    """
+    Place `src` at `dst` without copying its data when possible.
+
+    `dst` is replaced atomically. A hardlink is tried first, then a
+    copy-on-write clone (`FICLONE`, e.g. on btrfs and XFS) when `src` is on
+    another filesystem, and a plain copy as a last resort.
+
+    Args:
+        src (Path): The file to place.
+        dst (Path): Where to place it.
+
+    Returns:
+        str: `"hardlink"`, `"reflink"` or `"copy"`.
+    """
+    tmp_path = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        os.link(src, tmp_path)
+        method = "hardlink"
+
+    except OSError:
+        with src.open("rb") as fsrc, tmp_path.open("wb") as fdst:
+            try:
+                import fcntl
+
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                method = "reflink"
+            except (ImportError, OSError):
+                shutil.copyfileobj(fsrc, fdst)
+                method = "copy"
+
+    tmp_path.replace(dst)
+    return method
+
+
+class WheelCache:
+    """
+    Content-addressed on-disk store of the downloaded distribution files.
+
+    Files are stored under the sha256 published by the index
+    (`<sha256[:2]>/<sha256[2:]>`), so a file is only downloaded once whatever
+    the index or URL it comes from. Files are placed in and out of the store
+    with `link_or_copy`. Copies are stored read-only, as the hardlinks placed
+    from them share their data, while a file stored as a hardlink keeps the mode
+    of the downloaded file. The mtime of each file is used as the LRU clock for
+    size-bounded eviction.
+
+    The store can be shared by several processes (e.g. a cache volume mounted by
+    CI workers): files are placed under a shared `flock` on `<cache_dir>/.lock`,
+    and stored and evicted under an exclusive one.
+
+    Args:
+        cache_dir (str | Path): Directory where the files are stored.
+        max_size (int): Maximum total size in bytes of the stored files.
+    """
+
+    LOCK_FILENAME = ".lock"
+
+    def __init__(
+        self, cache_dir: str | Path, max_size: int = DEFAULT_WHEEL_CACHE_MAX_SIZE
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, filehash: str) -> Path:
+        filehash = filehash.lower()
+        if not SHA256_RE.fullmatch(filehash):
+            raise ValueError(f"Invalid sha256 value: `{filehash}`")
+        return self.cache_dir / filehash[:2] / filehash[2:]
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive: bool) -> Generator[None]:
+        try:
+            import fcntl
+        except ImportError:  # Windows, only safe within a single process.
+            yield
+            return
+
+        # Each call opens its own file description: threads exclude each other
+        # like processes do.
+        with (self.cache_dir / self.LOCK_FILENAME).open("a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def place(self, filehash: str, dest: Path) -> bool:
+        """
+        Place the stored file with hash `filehash` at `dest`, and mark it as
+        recently used.
+
+        Args:
+            filehash (str): The sha256 of the file.
+            dest (Path): Where to place the file.
+
+        Returns:
+            bool: `False` on cache miss.
+        """
+        path = self._path(filehash)
+
+        with self._locked(exclusive=False):
+            try:
+                method = link_or_copy(path, dest)
+            except OSError:
+                return False
+
+            # The file may belong to another user of a shared cache.
+            with contextlib.suppress(OSError):
+                os.utime(path)  # LRU bookkeeping
+
+        logger.debug(f"Placed `{dest.name}` from the wheel cache ({method})")
+        return True
+
+    def store(self, filehash: str, src: Path) -> None:
+        """
+        Store a verified file and evict old files if needed.
+
+        Args:
+            filehash (str): The sha256 of the file.
+            src (Path): The file, left in place.
+        """
+        path = self._path(filehash)
+        path.parent.mkdir(exist_ok=True)
+
+        with self._locked(exclusive=True):
+            try:
+                # A hardlink shares its mode with `src`, which must stay as is.
+                if link_or_copy(src, path) != "hardlink":
+                    path.chmod(0o444)
+            except OSError as e:
+                logger.warning(f"Failed to store `{src.name}` in the wheel cache: {e}")
+                return
+
+            self._evict()
+
+    def _iter_files(self) -> Generator[tuple[float, int, Path]]:
+        for path in self.cache_dir.glob("??/*"):
+            if path.name.endswith(".tmp"):
+                continue
+            with contextlib.suppress(OSError):
+                stat = path.stat()
+                yield stat.st_mtime, stat.st_size, path
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._iter_files())
+
+    def evict(self) -> None:
+        """Remove the least recently used files until under `max_size`."""
+        with self._locked(exclusive=True):
+            self._evict()
+
+    def _evict(self) -> None:
+        # The exclusive lock must be held.
+        files = list(self._iter_files())
+        total_size = sum(size for _, size, _ in files)
+
+        for _, size, path in sorted(files):
+            if total_size <= self.max_size:
+                break
+            logger.debug(
+                f"Evicting `{path.parent.name}{path.name}` from the wheel cache"
+            )
+            with contextlib.suppress(OSError):
+                path.unlink()
+            total_size -= size
+
+    def clear(self) -> None:
+        with self._locked(exclusive=True):
+            for path in self.cache_dir.glob("??"):
+                shutil.rmtree(path, ignore_errors=True)
@@ -1,32 +1,353 @@
 # #!/usr/bin/env python3
 
 import argparse
+import contextlib
+import functools
 import logging
+import operator
 import os
 import re
+import threading
+import time
+import typing
+from pathlib import Path
 from urllib.parse import unquote
 
-from variantlib import VARIANT_HASH_LEN
+from mockpip.cache import DEFAULT_CACHE_TTL
+from mockpip.cache import EntryPointCache
+from mockpip.cache import IndexCache
+from mockpip.cache import PipConfigCache
+from mockpip.cache import ProviderConfigCache
+from mockpip.cache import VariantOrderCache
+from mockpip.cache import WheelCache
+from mockpip.cache import get_default_cache_dir
+from mockpip.download import DEFAULT_MAX_DOWNLOADS
+from mockpip.download import download_candidates
+from mockpip.installer import InvalidWheelError
+from mockpip.installer import get_default_install_target
+from mockpip.installer import install_wheel
+from mockpip.logger import queued_logging
+from mockpip.progress_bar import TransferProgress
+from mockpip.repository import DEFAULT_CONNECT_TIMEOUT
+from mockpip.repository import DEFAULT_INDEX_STRATEGY
+from mockpip.repository import DEFAULT_MAX_RETRIES
+from mockpip.repository import DEFAULT_MAX_WORKERS
+from mockpip.repository import DEFAULT_POOL_SIZE
+from mockpip.repository import DEFAULT_READ_TIMEOUT
+from mockpip.repository import INDEX_STRATEGIES
+from mockpip.repository import ConnectionStats
+from mockpip.repository import IndexSession
+from mockpip.repository import IndexStats
+from mockpip.repository import IndexStatsEntry
+from mockpip.repository import NetworkSettings
+from mockpip.repository import PackageCandidate
+from mockpip.repository import fetch_core_metadata
+from mockpip.repository import iter_release_groups
+from mockpip.repository import list_candidates_batch
+from mockpip.requirements import parse_requirement
+from mockpip.requirements import read_requirements_file
+from mockpip.variant_hash import DEFAULT_PLUGIN_TIMEOUT
+from mockpip.variant_hash import DEFAULT_PLUGINS_TIMEOUT
+from mockpip.variant_hash import HostProfile
+from mockpip.variant_hash import VariantPreferenceOrder
+from mockpip.variant_hash import get_default_host_profile_path
+from mockpip.variant_hash import get_provider_configs
+from mockpip.variant_hash import get_provider_configs_fingerprint
+from mockpip.variant_hash import get_tag_priority
+from mockpip.variant_hash import get_variant_preference_order
+from mockpip.variant_hash import load_host_profile
+from mockpip.variant_hash import parse_wheel_filename
+from mockpip.variant_selection import VariantRanker
+from mockpip.variant_selection import get_published_variants
 
-from mockpip.progress_bar import fake_install_progress
-from mockpip.repository import list_candidates
-from mockpip.variant_hash import get_variant_hash_from_wheel
-from mockpip.variant_hash import get_variant_hashes_by_priority
+if typing.TYPE_CHECKING:
+    from collections.abc import Callable
+    from collections.abc import Mapping
+
+    from variantlib.config import ProviderConfig
+    from variantlib.meta import VariantDescription
 
 logger = logging.getLogger(__name__)
 
+# `each`: one debug record per variant tried, `summary`: a single record with the
+# number of variants tried.
+VARIANT_LOG_MODES = ("each", "summary", "off")
+DEFAULT_VARIANT_LOG_MODE = "summary"
+
+
+class PackageTiming(typing.NamedTuple):
+    fetch: float  # seconds
+    select: float  # seconds
+
+
+class WarmState:
+    """
+    Resources kept alive across the `install` calls served by `mockpip serve`.
+
+    The HTTP sessions (and their pooled connections), the cache instances, the
+    host profile, the provider configs returned by the plugins and the variant
+    orders are created on first use and reused by the next calls with the same
+    options and inputs (see `get_provider_configs_fingerprint`). Plugins stay
+    imported by the process.
+    """
+
+    __slots__ = ["_lock", "_resources"]
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._resources = {}
+
+    def get(
+        self,
+        key: tuple,
+        factory: "Callable[[], typing.Any]",
+        refresh: bool = False,
+    ) -> typing.Any:
+        """
+        Args:
+            key (tuple): Identifies the resource, including every option it
+                depends on.
+            factory (Callable): Creates the resource on first use.
+            refresh (bool): Replace the resource with a new one.
+
+        Returns:
+            Any: The resource.
+        """
+        with self._lock:
+            if refresh or key not in self._resources:
+                self._resources[key] = factory()
+            return self._resources[key]
+
+    def close(self) -> None:
+        with self._lock:
+            for resource in self._resources.values():
+                if isinstance(resource, IndexSession):
+                    resource.close()
+            self._resources.clear()
+
+
+def log_best_variant(vhash: str, vdesc: "VariantDescription") -> None:
+    logger.info(f"{'#' * 27} Best Variant: `{vhash}` {'#' * 27}")
+    for vmeta in vdesc.data:
+        logger.info(f"Variant-Data: {vmeta.to_str()}")
+    logger.info("#" * 80)
+
+
+def select_candidate(
+    pkg_candidates: list[PackageCandidate],
+    get_variants: "Callable[[], VariantPreferenceOrder]",
+    no_variants: bool = False,
+    describe_variants: "Callable[[dict], dict | None] | None" = None,
+    get_ranker: "Callable[[], VariantRanker] | None" = None,
+    variant_log: str = DEFAULT_VARIANT_LOG_MODE,
+    env: "Mapping[str, str] | None" = None,
+) -> PackageCandidate | None:
+    """
+    Select the package to install among the candidates found on the index.
+
+    Releases are visited from newest to oldest and the search stops at the first
+    release providing a wheel which can be installed, so older releases are
+    never looked at. Wheels whose tags are not supported by the interpreter are
+    discarded before the variant lookup.
+
+    Args:
+        pkg_candidates (list[PackageCandidate]): Candidates found on the index.
+        get_variants (Callable): Returns the variants supported by the system,
+            in priority order.
+        no_variants (bool): Ignore the variant information.
+        describe_variants (Callable | None): Returns the description of the
+            variants published for a release (see `get_published_variants`),
+            `None` if they can't all be described.
+        get_ranker (Callable | None): Returns the `VariantRanker` of the system.
+            When the published variants can be described, the best one is
+            picked by ranking them instead of enumerating `get_variants()`.
+        variant_log (str): One of `VARIANT_LOG_MODES`, how the enumeration of
+            `get_variants()` is logged.
+        env (Mapping[str, str] | None): The environment, read for
+            `PIP_FORCE_INSTALL_VARIANT_HASH`. Defaults to `os.environ`.
+
+    Returns:
+        PackageCandidate | None: The selected candidate if any.
+    """
+    from variantlib import VARIANT_HASH_LEN
+
+    env = env if env is not None else os.environ
+    forced_vhash = env.get("PIP_FORCE_INSTALL_VARIANT_HASH", None)
+
+    if no_variants:
+        logger.info("Forced installation to ignore variant ...")
+        forced_vhash = None
+        use_variants = False
+
+    elif forced_vhash is None:
+        use_variants = True
+
+    elif re.match(rf"^[a-fA-F0-9]{{{VARIANT_HASH_LEN}}}$", forced_vhash) is not None:
+        logger.info(f"Forced installation of variant: {forced_vhash}")
+        use_variants = False
+
+    else:
+        logger.info("Forced installation to ignore variant ...")
+        forced_vhash = None
+        use_variants = False
+
+    for release_candidates in iter_release_groups(pkg_candidates):
+        compatible_wheels = []
+        for pkg in release_candidates:
+            filename = unquote(pkg.filename)
+            if filename[-4:] != ".whl":
+                continue
+            logger.info(f"Found: `{filename}`")
+            wheel_info = parse_wheel_filename(filename)
+            tag_priority = get_tag_priority(
+                wheel_info.python_tag, wheel_info.abi_tag, wheel_info.platform_tag
+            )
+            if tag_priority is None:
+                logger.debug(f"Skipping `{filename}`: unsupported platform tags")
+                continue
+            compatible_wheels.append((tag_priority, wheel_info.variant_hash, pkg))
+
+        # Most specific tags first: they win when wheels share a variant hash.
+        compatible_wheels.sort(key=operator.itemgetter(0))
+
+        pkg_candidate_dict_by_vhash = {}
+        for _, variant_hash, pkg in compatible_wheels:
+            pkg_candidate_dict_by_vhash.setdefault(variant_hash, pkg)
+
+        if not pkg_candidate_dict_by_vhash:
+            continue
+
+        logger.info("")  # visual spacing
+
+        if not use_variants:
+            selected_pkg = pkg_candidate_dict_by_vhash.get(forced_vhash)
+            if selected_pkg is not None:
+                return selected_pkg
+            continue
+
+        published = (
+            describe_variants(pkg_candidate_dict_by_vhash)
+            if describe_variants is not None and get_ranker is not None
+            else None
+        )
+
+        if published is not None:
+            # Index-driven: rank the few published variants.
+            if published and (best := get_ranker().select(published)) is not None:
+                vhash, vdesc = best
+                log_best_variant(vhash, vdesc)
+                return pkg_candidate_dict_by_vhash[vhash]
+
+        else:
+            # Enumerate the variants supported by the system until one matches.
+            variant_order = get_variants()
+            # Checked once: the loop may go over thousands of variants.
+            log_each = variant_log == "each" and logger.isEnabledFor(logging.DEBUG)
+            enumerate_start_t = time.perf_counter()
+            selected_pkg = None
+            vid = -1
+            for vid, vhash in enumerate(variant_order.hashes):
+                selected_pkg = pkg_candidate_dict_by_vhash.get(vhash)
+                if selected_pkg is not None:
+                    break
+
+                if log_each:
+                    logger.debug("[Variant: %04d] `%s`: NOT FOUND ...", vid, vhash)
+
+            if variant_log == "summary":
+                logger.info(
+                    "Tried %d variant(s) in %.1f ms",
+                    vid + 1,
+                    (time.perf_counter() - enumerate_start_t) * 1e3,
+                )
+
+            if selected_pkg is not None:
+                log_best_variant(vhash, variant_order.describe(vid))
+                return selected_pkg
+
+        # The one package without variant information
+        if (selected_pkg := pkg_candidate_dict_by_vhash.get(None)) is not None:
+            return selected_pkg
+
+    return None
+
+
+def log_timing_summary(
+    timings: dict[str, PackageTiming],
+    wall_clock: float,
+    connection_stats: ConnectionStats | None = None,
+    index_stats: list[IndexStatsEntry] | None = None,
+) -> None:
+    logger.info("")
+    logger.info(f"{'#' * 33} Timing Summary {'#' * 33}")
+    for package_name, timing in timings.items():
+        logger.info(
+            f"{package_name:<40} fetch: {timing.fetch * 1e3:9.1f} ms | "
+            f"select: {timing.select * 1e3:9.1f} ms"
+        )
+    serial_fetch = sum(timing.fetch for timing in timings.values())
+    serial_select = sum(timing.select for timing in timings.values())
+    logger.info("#" * 80)
+    logger.info(
+        f"Resolved {len(timings)} package(s) in {wall_clock * 1e3:.1f} ms "
+        f"(serial estimate: {(serial_fetch + serial_select) * 1e3:.1f} ms)"
+    )
+    if connection_stats is not None:
+        logger.info(
+            f"HTTP: {connection_stats.requests} request(s) over "
+            f"{connection_stats.connections} connection(s) "
+            f"({connection_stats.reused} reused)"
+        )
+    for entry in index_stats or []:
+        logger.info(
+            f"Index `{entry.index_url}`: {entry.queries} lookup(s), "
+            f"{entry.errors} error(s), {entry.wins} won | "
+            f"mean: {entry.mean_latency * 1e3:.1f} ms | "
+            f"max: {entry.max_latency * 1e3:.1f} ms"
+        )
+
 
-def install(args: list[str]) -> int:
-    logger.setLevel(logging.DEBUG)
+def install(
+    args: list[str],
+    state: WarmState | None = None,
+    cwd: str | Path | None = None,
+    env: "Mapping[str, str] | None" = None,
+) -> int:
+    # The daemon serves clients with their own working directory and environment:
+    # relative paths and environment variables are resolved against these, never
+    # against the process, so the keys of the warm state are those of the client.
+    cwd = Path(cwd) if cwd is not None else Path.cwd()
+    env = env if env is not None else os.environ
+
+    def get_resource(
+        key: "tuple | Callable[[], tuple]",
+        factory: "Callable[[], typing.Any]",
+        refresh: bool = False,
+    ) -> typing.Any:
+        # The key may be a callable, only computed for the warm state.
+        if state is None:
+            return factory()
+        return state.get(key() if callable(key) else key, factory, refresh=refresh)
 
     parser = argparse.ArgumentParser(prog="mockpip install")
 
     parser.add_argument(
-        "package_name",  # Positional Argument
+        "package_names",  # Positional Argument
+        metavar="package_name",
         type=str,
+        nargs="*",
         help="Package name with optional version specifier (e.g., 'requests>=2.0.0').",
     )
 
+    parser.add_argument(
+        "-r",
+        "--requirement",
+        dest="requirements",
+        action="append",
+        default=[],
+        help="Install from the given requirements file. Can be used multiple times.",
+    )
+
     parser.add_argument(
         "-i",
         "--index-url",
@@ -37,6 +358,74 @@ def install(args: list[str]) -> int:
         help="Python Package Repository URL.",
     )
 
+    parser.add_argument(
+        "--extra-index-url",
+        dest="extra_index_urls",
+        action="append",
+        default=[],
+        help="Other Python Package Repository URL, queried concurrently with "
+        "`--index-url`. Can be used multiple times.",
+    )
+
+    parser.add_argument(
+        "--index-strategy",
+        dest="index_strategy",
+        choices=INDEX_STRATEGIES,
+        default=DEFAULT_INDEX_STRATEGY,
+        help="With extra indexes: `merge` the candidates of every index, or "
+        "`race` for the first index answering with candidates.",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Maximum number of index pages fetched concurrently.",
+    )
+
+    parser.add_argument(
+        "--max-downloads",
+        dest="max_downloads",
+        type=int,
+        default=DEFAULT_MAX_DOWNLOADS,
+        help="Maximum number of files downloaded concurrently.",
+    )
+
+    parser.add_argument(
+        "--pool-size",
+        dest="pool_size",
+        type=int,
+        default=None,
+        help="Maximum number of HTTP connections kept alive per host "
+        "(default: max(jobs, 10)).",
+    )
+
+    parser.add_argument(
+        "--retries",
+        dest="retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help="Maximum number of retries of a failing HTTP request.",
+    )
+
+    parser.add_argument(
+        "--connect-timeout",
+        dest="connect_timeout",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help="Timeout in seconds to establish an HTTP connection.",
+    )
+
+    parser.add_argument(
+        "--timeout",
+        dest="read_timeout",
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help="Timeout in seconds while waiting for data from the server.",
+    )
+
     parser.add_argument(
         "-p",
         "--variant_provider",
@@ -45,6 +434,22 @@ def install(args: list[str]) -> int:
         help="Variant Providers in order of priority",
     )
 
+    parser.add_argument(
+        "--plugin-timeout",
+        dest="plugin_timeout",
+        type=float,
+        default=DEFAULT_PLUGIN_TIMEOUT,
+        help="Timeout in seconds of each variant plugin.",
+    )
+
+    parser.add_argument(
+        "--plugins-timeout",
+        dest="plugins_timeout",
+        type=float,
+        default=DEFAULT_PLUGINS_TIMEOUT,
+        help="Timeout in seconds for all the variant plugins to run.",
+    )
+
     parser.add_argument(
         "--no_variants",
         action="store_true",
@@ -52,91 +457,487 @@ def install(args: list[str]) -> int:
         help="disables variant support",
     )
 
-    parsed_args = parser.parse_args(args)
+    parser.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        type=str,
+        default=None,
+        help="Directory of the index page, wheel, entry point and variant provider "
+        "caches (default: ~/.cache/mockpip).",
+    )
 
-    logger.info(
-        f"Received install request for: `{parsed_args.package_name}` "
-        f"from index: {parsed_args.index_url}."
+    parser.add_argument(
+        "--download-dir",
+        dest="download_dir",
+        type=str,
+        default=None,
+        help="Directory receiving the downloaded files, where interrupted "
+        "downloads are resumed from (default: ~/.cache/mockpip/downloads).",
     )
 
-    pkg_candidates = list_candidates(
-        package_name=parsed_args.package_name, index_url=parsed_args.index_url
+    parser.add_argument(
+        "-t",
+        "--target",
+        dest="target",
+        type=str,
+        default=get_default_install_target(env),
+        help="Install the packages into this directory instead of the current "
+        "environment (default: $MOCKPIP_TARGET).",
     )
 
-    if not pkg_candidates:
-        logger.error(f"No candidate package was found for `{parsed_args.package_name}`")
-        return 1
+    parser.add_argument(
+        "--cache-ttl",
+        dest="cache_ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        help="Seconds during which a cached index page is used without "
+        "revalidation.",
+    )
 
-    logger.info("")  # visual spacing
+    parser.add_argument(
+        "--no-cache",
+        dest="no_cache",
+        action="store_true",
+        default=False,
+        help="disables the index page, wheel and variant provider caches",
+    )
+
+    parser.add_argument(
+        "--variant-profile",
+        dest="variant_profile",
+        type=str,
+        default=get_default_host_profile_path(env),
+        help="Host profile generated by `mockpip variants refresh` "
+        "(default: $MOCKPIP_VARIANT_PROFILE or "
+        "~/.cache/mockpip/variants/host.json).",
+    )
+
+    parser.add_argument(
+        "--refresh-variants",
+        dest="refresh_variants",
+        action="store_true",
+        default=False,
+        help="run the variant plugins even if their result is cached",
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        default=False,
+        help="only resolve the packages, don't install them",
+    )
+
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        default=False,
+        help="only use cached index pages and wheels, never access the network",
+    )
+
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        default=False,
+        help="show the debug messages",
+    )
+
+    parser.add_argument(
+        "--variant-log",
+        dest="variant_log",
+        choices=VARIANT_LOG_MODES,
+        default=DEFAULT_VARIANT_LOG_MODE,
+        help="How the variants tried are logged: `each` of them (with "
+        "`--verbose`), a `summary` of their number and time, or `off`.",
+    )
+
+    parsed_args = parser.parse_args(args)
+    logger.setLevel(logging.DEBUG if parsed_args.verbose else logging.INFO)
+
+    if parsed_args.no_cache and parsed_args.offline:
+        parser.error("`--offline` can not be used with `--no-cache`")
 
-    pkg_candidate_dict_by_vhash = {}
-    for pkg in pkg_candidates:
-        filename = unquote(pkg.filename)
-        if filename[-4:] != ".whl":
+    package_names = list(parsed_args.package_names)
+    for requirements_file in parsed_args.requirements:
+        package_names.extend(read_requirements_file(cwd / requirements_file))
+
+    if not package_names:
+        parser.error("at least one package name or requirements file is required")
+
+    retcode = 0
+    requirements = []
+    for package_name in package_names:
+        if (requirement := parse_requirement(package_name)) is None:
+            retcode = 1
             continue
-        logger.info(f"Found: `{filename}`")
-        variant_hash = get_variant_hash_from_wheel(filename)
-        pkg_candidate_dict_by_vhash[variant_hash] = pkg
 
-    logger.info("")  # visual spacing
+        # Markers only depend on the interpreter, the same for the daemon and its
+        # clients (see `ResolverDaemon`), not on `env`.
+        if requirement.marker is not None and not requirement.marker.evaluate():
+            logger.info(
+                f"Ignoring `{package_name}`: markers `{requirement.marker}` don't "
+                "match your environment"
+            )
+            continue
 
-    if not parsed_args.no_variants:
-        variant_providers = parsed_args.variant_providers
-        variant_providers = (
-            {name: idx for idx, name in enumerate(variant_providers)}
-            if variant_providers is not None
-            else None
+        # The markers were evaluated above and extras are not resolved, only the
+        # name and the version specifier are relevant to the index query.
+        requirement.marker = None
+        requirement.extras = set()
+        requirements.append(str(requirement))
+
+    cache_dir = cwd / (
+        parsed_args.cache_dir
+        if parsed_args.cache_dir is not None
+        else get_default_cache_dir(env)
+    )
+    variant_profile = cwd / parsed_args.variant_profile
+    target = cwd / parsed_args.target if parsed_args.target is not None else None
+
+    cache = (
+        get_resource(
+            ("index_cache", cache_dir, parsed_args.cache_ttl, parsed_args.offline),
+            lambda: IndexCache(
+                cache_dir=cache_dir / "http",
+                ttl=parsed_args.cache_ttl,
+                offline=parsed_args.offline,
+            ),
         )
+        if not parsed_args.no_cache
+        else None
+    )
 
-        if (
-            forced_vhash := os.environ.get("PIP_FORCE_INSTALL_VARIANT_HASH", None)
-        ) is None:
-            selected_pkg = None
-            for vid, vdesc in enumerate(
-                get_variant_hashes_by_priority(variant_providers)
-            ):
-                vhash = vdesc.hexdigest
-                selected_pkg = pkg_candidate_dict_by_vhash.get(vhash)
+    plugin_cache = (
+        get_resource(
+            ("plugin_cache", cache_dir),
+            lambda: ProviderConfigCache(cache_dir=cache_dir / "variants"),
+        )
+        if not parsed_args.no_cache
+        else None
+    )
 
-                if selected_pkg is not None:
-                    logger.info(f"{'#' * 27} Best Variant: `{vhash}` {'#' * 27}")
-                    for vmeta in vdesc.data:
-                        logger.info(f"Variant-Data: {vmeta.to_str()}")
-                    logger.info("#" * 80)
-                    break
+    order_cache = (
+        get_resource(
+            ("order_cache", cache_dir),
+            lambda: VariantOrderCache(cache_dir=cache_dir / "variants"),
+        )
+        if not parsed_args.no_cache
+        else None
+    )
 
-                logger.debug(f"[Variant: {vid:04d}] `{vhash}`: NOT FOUND ...")
+    entry_point_cache = (
+        get_resource(
+            ("entry_point_cache", cache_dir),
+            lambda: EntryPointCache(cache_dir=cache_dir / "entry_points"),
+        )
+        if not parsed_args.no_cache
+        else None
+    )
 
-            else:
-                # The one package without variant information
-                selected_pkg = pkg_candidate_dict_by_vhash[None]
+    wheel_cache = (
+        get_resource(
+            ("wheel_cache", cache_dir),
+            lambda: WheelCache(cache_dir=cache_dir / "wheels"),
+        )
+        if not parsed_args.no_cache
+        else None
+    )
 
-        elif (
-            re.match(rf"^[a-fA-F0-9]{{{VARIANT_HASH_LEN}}}$", forced_vhash) is not None
-        ):
-            logger.info(f"Forced installation of variant: {forced_vhash}")
-            selected_pkg = pkg_candidate_dict_by_vhash.get(forced_vhash)
+    pip_config_cache = (
+        get_resource(
+            ("pip_config_cache", cache_dir),
+            lambda: PipConfigCache(cache_dir=cache_dir / "variants"),
+        )
+        if not parsed_args.no_cache
+        else None
+    )
 
-        else:
-            logger.info("Forced installation to ignore variant ...")
-            selected_pkg = pkg_candidate_dict_by_vhash.get(None)
+    pool_size = (
+        parsed_args.pool_size
+        if parsed_args.pool_size is not None
+        else max(parsed_args.jobs, DEFAULT_POOL_SIZE)
+    )
+    network = NetworkSettings.from_environ(env)
+    session = get_resource(
+        (
+            "session",
+            pool_size,
+            parsed_args.retries,
+            parsed_args.connect_timeout,
+            parsed_args.read_timeout,
+            network,
+        ),
+        lambda: IndexSession(
+            pool_size=pool_size,
+            max_retries=parsed_args.retries,
+            connect_timeout=parsed_args.connect_timeout,
+            read_timeout=parsed_args.read_timeout,
+            network=network,
+        ),
+    )
 
-    else:
-        logger.info("Forced installation to ignore variant ...")
-        selected_pkg = pkg_candidate_dict_by_vhash.get(None)
+    index_urls = ", ".join([parsed_args.index_url, *parsed_args.extra_index_urls])
+    for package_name in requirements:
+        logger.info(
+            f"Received install request for: `{package_name}` "
+            f"from index: {index_urls}."
+        )
+
+    start_t = time.perf_counter()
 
-    if selected_pkg is not None:
+    index_stats = IndexStats()
+    query_results = list_candidates_batch(
+        package_names=requirements,
+        index_url=parsed_args.index_url,
+        cache=cache,
+        session=session,
+        max_workers=parsed_args.jobs,
+        extra_index_urls=parsed_args.extra_index_urls,
+        index_strategy=parsed_args.index_strategy,
+        stats=index_stats,
+    )
+
+    variant_providers = parsed_args.variant_providers
+    variant_providers = (
+        {name: idx for idx, name in enumerate(variant_providers)}
+        if variant_providers is not None
+        else None
+    )
+
+    # The host profile replaces the plugins, unless specific plugins are
+    # requested or their results must be refreshed.
+    @functools.cache
+    def get_host_profile() -> HostProfile | None:
+        if variant_providers is not None or parsed_args.refresh_variants:
+            return None
+        try:
+            profile_mtime = variant_profile.stat().st_mtime_ns
+        except OSError:
+            profile_mtime = None
+        profile = get_resource(
+            ("host_profile", variant_profile, profile_mtime),
+            lambda: load_host_profile(variant_profile),
+        )
+        if profile is not None:
+            logger.info(f"Using host profile: `{parsed_args.variant_profile}`")
+        return profile
+
+    # Identifies the results of the plugins across the calls served by the
+    # daemon: they are run again when their inputs change.
+    @functools.cache
+    def get_plugins_key() -> tuple:
+        return (
+            get_provider_configs_fingerprint(
+                variant_providers, pip_config_cache=pip_config_cache, env=env
+            ),
+            parsed_args.plugin_timeout,
+            parsed_args.plugins_timeout,
+        )
+
+    # Computed once, on first use, and shared by every package.
+    @functools.cache
+    def get_provider_cfgs() -> list["ProviderConfig"]:
+        if (profile := get_host_profile()) is not None:
+            return profile.provider_cfgs
+        return get_resource(
+            lambda: ("provider_cfgs", *get_plugins_key()),
+            lambda: get_provider_configs(
+                variant_providers,
+                plugin_cache=plugin_cache,
+                refresh=parsed_args.refresh_variants,
+                plugin_timeout=parsed_args.plugin_timeout,
+                timeout=parsed_args.plugins_timeout,
+                entry_point_cache=entry_point_cache,
+                pip_config_cache=pip_config_cache,
+                env=env,
+            ),
+            refresh=parsed_args.refresh_variants,
+        )
+
+    @functools.cache
+    def get_variants() -> VariantPreferenceOrder:
+        if (profile := get_host_profile()) is not None:
+            return profile.variant_order
+        # Outside of the factory: the warm state is locked while it runs.
+        provider_cfgs = get_provider_cfgs()
+        return get_resource(
+            lambda: ("variant_order", *get_plugins_key()),
+            lambda: get_variant_preference_order(
+                provider_cfgs, order_cache=order_cache
+            ),
+            refresh=parsed_args.refresh_variants,
+        )
+
+    @functools.cache
+    def get_ranker() -> VariantRanker:
+        return VariantRanker(get_provider_cfgs())
+
+    def describe_variants(
+        pkg_candidate_dict_by_vhash: dict[str | None, PackageCandidate],
+    ) -> dict[str, "VariantDescription"] | None:
+        return get_published_variants(
+            pkg_candidate_dict_by_vhash,
+            fetch_metadata=functools.partial(
+                fetch_core_metadata, cache=cache, session=session
+            ),
+            max_workers=parsed_args.jobs,
+        )
+
+    timings = {}
+    selected_pkgs = {}
+    # One record per variant tried: leave their formatting and output to a
+    # background thread, flushed before anything else is written.
+    log_each_variant = parsed_args.variant_log == "each" and parsed_args.verbose
+    with queued_logging() if log_each_variant else contextlib.nullcontext():
+        for query_result in query_results:
+            package_name = query_result.package_name
+
+            if not query_result.candidates:
+                logger.error(f"No candidate package was found for `{package_name}`")
+                timings[package_name] = PackageTiming(
+                    fetch=query_result.elapsed, select=0
+                )
+                retcode = 1
+                continue
+
+            logger.info("")  # visual spacing
+
+            select_start_t = time.perf_counter()
+            selected_pkgs[package_name] = select_candidate(
+                query_result.candidates,
+                get_variants=get_variants,
+                no_variants=parsed_args.no_variants,
+                describe_variants=describe_variants,
+                get_ranker=get_ranker,
+                variant_log=parsed_args.variant_log,
+                env=env,
+            )
+            timings[package_name] = PackageTiming(
+                fetch=query_result.elapsed,
+                select=time.perf_counter() - select_start_t,
+            )
+
+    wall_clock = time.perf_counter() - start_t
+
+    to_install = {}
+    package_name_by_filename = {}
+    for package_name, selected_pkg in selected_pkgs.items():
+        if selected_pkg is None:
+            logger.error(
+                f"Impossible to find a suitable package to install for "
+                f"`{package_name}` ..."
+            )
+            continue
+
+        if parsed_args.dry_run:
+            logger.info(
+                f"Would install: {selected_pkg.filename} "
+                f"(`{package_name}` version: `{selected_pkg.version}`)"
+            )
+            continue
+
+        # e.g. `requests 'requests>=2'`: the same file is only installed once.
+        if (other := package_name_by_filename.get(selected_pkg.filename)) is not None:
+            logger.info(
+                f"`{package_name}` is satisfied by {selected_pkg.filename}, "
+                f"already selected for `{other}`"
+            )
+            continue
+
+        package_name_by_filename[selected_pkg.filename] = package_name
+        to_install[package_name] = selected_pkg
+
+    if to_install:
         logger.info("")
-        logger.info(f"Installing: {selected_pkg.filename} ...")
-        fake_install_progress(total_time=2)
+        for selected_pkg in to_install.values():
+            logger.info(f"Installing: {selected_pkg.filename} ...")
+
+        download_dir = (
+            cwd / parsed_args.download_dir
+            if parsed_args.download_dir is not None
+            else cache_dir / "downloads"
+        )
+        download_start_t = time.perf_counter()
+        with (
+            TransferProgress() as progress,
+            progress.clearing_log_records(),
+        ):
+            downloads = download_candidates(
+                list(to_install.values()),
+                dest_dir=download_dir,
+                session=session,
+                max_workers=parsed_args.max_downloads,
+                progress=progress.callback,
+                wheel_cache=wheel_cache,
+                offline=parsed_args.offline,
+            )
+        download_time = time.perf_counter() - download_start_t
         logger.info("")
 
+        for package_name, download in zip(to_install, downloads, strict=True):
+            if download.error is not None:
+                logger.error(
+                    f"Failed to download `{download.candidate.filename}`: "
+                    f"{download.error}"
+                )
+                retcode = 1
+                continue
+
+            if download.cached:
+                logger.info(f"Using cached `{download.path}`")
+            else:
+                resumed = f", {download.resumed} resumed" if download.resumed else ""
+                logger.info(
+                    f"Downloaded `{download.path}` ({download.size} bytes{resumed}) "
+                    f"in {download.elapsed * 1e3:.1f} ms"
+                )
+
+            if download.candidate.extension != "whl":
+                logger.error(
+                    f"Can't install `{download.candidate.filename}`: building "
+                    "source distributions is not supported"
+                )
+                retcode = 1
+                continue
+
+            try:
+                installed = install_wheel(download.path, target=target)
+            except (InvalidWheelError, OSError) as e:
+                logger.error(  # noqa: TRY400
+                    f"Failed to install `{download.candidate.filename}`: {e}"
+                )
+                retcode = 1
+                continue
+
+            logger.info(
+                f"Installed {len(installed.files)} file(s) "
+                f"({installed.size / 2**20:.1f} MiB) in "
+                f"{installed.elapsed * 1e3:.1f} ms"
+            )
+            logger.info(
+                f"The package: `{package_name}` "
+                f"(Version: `{download.candidate.version}`) was installed with "
+                "success ..."
+            )
+
+        total_size = sum(
+            download.size for download in downloads if not download.cached
+        )
         logger.info(
-            f"The package: `{parsed_args.package_name}` "
-            f"(Version: `{selected_pkg.version}`) was installed with success ..."
+            f"Downloaded {total_size / 2**20:.1f} MiB in "
+            f"{download_time * 1e3:.1f} ms"
         )
 
-    else:
-        logger.error("Impossible to find a suitable package to install ...")
+    if timings:
+        log_timing_summary(
+            timings,
+            wall_clock=wall_clock,
+            connection_stats=session.stats(),
+            index_stats=index_stats.summary() if parsed_args.extra_index_urls else None,
+        )
+
+    if state is None:
+        session.close()
 
-    return 0
+    return retcode
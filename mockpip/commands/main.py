@@ -1,26 +1,62 @@
 # #!/usr/bin/env python3
 
 import argparse
-from importlib.metadata import entry_points
+import sys
 
 import mockpip
+from mockpip.daemon import forward_to_daemon
+from mockpip.entry_points import get_default_entry_point_cache
+from mockpip.entry_points import get_entry_points
+
+
+class VersionAction(argparse.Action):
+    """
+    `--version` action resolving the version of mockpip only when invoked.
+
+    The builtin `version` action needs the version string when the parser is
+    built, i.e. a distribution metadata lookup on every command.
+    """
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, help=None):  # noqa: A002
+        super().__init__(
+            option_strings=option_strings,
+            dest=dest,
+            default=argparse.SUPPRESS,
+            nargs=0,
+            help=help or "show program's version number and exit",
+        )
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        sys.stdout.write(f"{parser.prog} version: {mockpip.__version__}\n")
+        parser.exit()
 
 
 def main():
-    registered_commands = entry_points(group="mockpip.actions")
+    # Thin client: hand the command over to `mockpip serve` when it's running,
+    # before even listing the registered commands.
+    if len(sys.argv) > 1 and (
+        retcode := forward_to_daemon(sys.argv[1], sys.argv[2:])
+    ) is not None:
+        return retcode
+
+    registered_commands = {
+        entry_point.name: entry_point
+        for entry_point in get_entry_points(
+            "mockpip.actions", cache=get_default_entry_point_cache()
+        )
+    }
 
     parser = argparse.ArgumentParser(prog="mockpip")
 
     parser.add_argument(
         "-v",
         "--version",
-        action="version",
-        version=f"%(prog)s version: {mockpip.__version__}",
+        action=VersionAction,
     )
 
     parser.add_argument(
         "command",
-        choices=registered_commands.names,
+        choices=list(registered_commands),
     )
 
     parser.add_argument(
@@ -0,0 +1,81 @@
+# #!/usr/bin/env python3
+
+import argparse
+import logging
+
+from mockpip.daemon import ResolverDaemon
+from mockpip.daemon import get_default_socket_path
+from mockpip.daemon import ping_daemon
+from mockpip.daemon import stop_daemon
+
+logger = logging.getLogger(__name__)
+
+
+def serve(args: list[str]) -> int:
+    logger.setLevel(logging.DEBUG)
+
+    parser = argparse.ArgumentParser(prog="mockpip serve")
+
+    parser.add_argument(
+        "--socket",
+        dest="socket_path",
+        type=str,
+        default=get_default_socket_path(),
+        help="Path of the Unix domain socket (default: $MOCKPIP_DAEMON_SOCKET or "
+        "~/.cache/mockpip/daemon.sock).",
+    )
+
+    parser.add_argument(
+        "--idle-timeout",
+        dest="idle_timeout",
+        type=float,
+        default=None,
+        help="Stop after this many seconds without request (default: never).",
+    )
+
+    parser.add_argument(
+        "--stop",
+        action="store_true",
+        default=False,
+        help="stop the daemon listening on the socket",
+    )
+
+    parser.add_argument(
+        "--status",
+        action="store_true",
+        default=False,
+        help="check whether a daemon is listening on the socket",
+    )
+
+    parsed_args = parser.parse_args(args)
+
+    if parsed_args.stop or parsed_args.status:
+        running = (
+            stop_daemon(parsed_args.socket_path)
+            if parsed_args.stop
+            else ping_daemon(parsed_args.socket_path)
+        )
+        if not running:
+            logger.error(f"No daemon is listening on `{parsed_args.socket_path}`")
+            return 1
+        logger.info(
+            f"Daemon on `{parsed_args.socket_path}` "
+            f"{'stopped' if parsed_args.stop else 'is running'}"
+        )
+        return 0
+
+    daemon = ResolverDaemon(
+        parsed_args.socket_path, idle_timeout=parsed_args.idle_timeout
+    )
+    try:
+        daemon.bind()
+    except OSError as e:
+        logger.error(f"Can't listen on `{parsed_args.socket_path}`: {e}")  # noqa: TRY400
+        return 1
+
+    logger.info(
+        f"Serving `mockpip install` on `{parsed_args.socket_path}`, "
+        "stop with `mockpip serve --stop`"
+    )
+    daemon.serve_forever()
+    return 0
@@ -0,0 +1,115 @@
+# #!/usr/bin/env python3
+
+import argparse
+import logging
+import time
+
+from mockpip.variant_hash import DEFAULT_PLUGIN_TIMEOUT
+from mockpip.variant_hash import DEFAULT_PLUGINS_TIMEOUT
+from mockpip.variant_hash import generate_host_profile
+from mockpip.variant_hash import get_default_host_profile_path
+from mockpip.variant_hash import load_host_profile
+from mockpip.variant_hash import save_host_profile
+
+logger = logging.getLogger(__name__)
+
+
+def refresh(parsed_args: argparse.Namespace) -> int:
+    variant_providers = parsed_args.variant_providers
+    variant_providers = (
+        {name: idx for idx, name in enumerate(variant_providers)}
+        if variant_providers is not None
+        else None
+    )
+
+    start_t = time.perf_counter()
+    profile = generate_host_profile(
+        variant_providers,
+        plugin_timeout=parsed_args.plugin_timeout,
+        timeout=parsed_args.plugins_timeout,
+    )
+    save_host_profile(profile, parsed_args.profile)
+
+    logger.info(
+        f"Host profile written to `{parsed_args.profile}` in "
+        f"{(time.perf_counter() - start_t) * 1e3:.1f} ms: "
+        f"{len(profile.provider_cfgs)} provider(s), "
+        f"{len(profile.variant_order)} variant(s)"
+    )
+    return 0
+
+
+def show(parsed_args: argparse.Namespace) -> int:
+    profile = load_host_profile(parsed_args.profile)
+    if profile is None:
+        logger.error(
+            f"No host profile found at `{parsed_args.profile}`, "
+            "run `mockpip variants refresh`"
+        )
+        return 1
+
+    logger.info(f"Host profile: `{parsed_args.profile}`")
+    created_at = time.localtime(profile.created_at)
+    logger.info(f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S', created_at)}")
+    for provider_cfg in profile.provider_cfgs:
+        for key_cfg in provider_cfg.configs:
+            logger.info(
+                f"{provider_cfg.provider} :: {key_cfg.key} :: "
+                f"{', '.join(key_cfg.values)}"
+            )
+    logger.info(f"Variants: {len(profile.variant_order)}")
+    return 0
+
+
+def variants(args: list[str]) -> int:
+    logger.setLevel(logging.DEBUG)
+
+    parser = argparse.ArgumentParser(prog="mockpip variants")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    refresh_parser = subparsers.add_parser(
+        "refresh", help="Generate the host profile from the installed plugins."
+    )
+    show_parser = subparsers.add_parser("show", help="Display the host profile.")
+
+    for subparser in (refresh_parser, show_parser):
+        subparser.add_argument(
+            "--profile",
+            dest="profile",
+            type=str,
+            default=get_default_host_profile_path(),
+            help="Path of the host profile (default: $MOCKPIP_VARIANT_PROFILE or "
+            "~/.cache/mockpip/variants/host.json).",
+        )
+
+    refresh_parser.add_argument(
+        "-p",
+        "--variant_provider",
+        dest="variant_providers",
+        action="append",
+        help="Variant Providers in order of priority",
+    )
+
+    refresh_parser.add_argument(
+        "--plugin-timeout",
+        dest="plugin_timeout",
+        type=float,
+        default=DEFAULT_PLUGIN_TIMEOUT,
+        help="Timeout in seconds of each variant plugin.",
+    )
+
+    refresh_parser.add_argument(
+        "--plugins-timeout",
+        dest="plugins_timeout",
+        type=float,
+        default=DEFAULT_PLUGINS_TIMEOUT,
+        help="Timeout in seconds for all the variant plugins to run.",
+    )
+
+    parsed_args = parser.parse_args(args)
+
+    match parsed_args.action:
+        case "refresh":
+            return refresh(parsed_args)
+        case "show":
+            return show(parsed_args)
@@ -0,0 +1,518 @@
+import contextlib
+import functools
+import io
+import json
+import logging
+import os
+import socket
+import stat
+import struct
+import sys
+import threading
+import typing
+from pathlib import Path
+
+from mockpip.cache import get_default_cache_dir
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 1
+# Commands forwarded by the `mockpip` entry point when the daemon is running.
+DAEMON_COMMANDS = ("install",)
+CONNECT_TIMEOUT = 1.0  # seconds
+REQUEST_TIMEOUT = 10.0  # seconds
+
+# The environment variables of the client the commands read: the pip
+# configuration, the proxies and CA bundle of the HTTP requests, the XDG
+# directories and the mockpip settings. Nothing else is sent to the daemon.
+FORWARDED_ENV_PREFIXES = ("PIP_", "MOCKPIP_", "XDG_")
+FORWARDED_ENV_VARS = (
+    "HOME",
+    "APPDATA",
+    "PROGRAMDATA",
+    "HTTP_PROXY",
+    "HTTPS_PROXY",
+    "ALL_PROXY",
+    "NO_PROXY",
+    "REQUESTS_CA_BUNDLE",
+    "CURL_CA_BUNDLE",
+)
+
+
+def get_default_socket_path() -> Path:
+    """
+    Returns:
+        Path: `$MOCKPIP_DAEMON_SOCKET` or `~/.cache/mockpip/daemon.sock`.
+    """
+    if (socket_path := os.environ.get("MOCKPIP_DAEMON_SOCKET")) is not None:
+        return Path(socket_path)
+    return get_default_cache_dir() / "daemon.sock"
+
+
+def is_forwarded_env_var(name: str) -> bool:
+    """
+    Returns:
+        bool: Whether the environment variable `name` of the client is sent to
+            the daemon, see `FORWARDED_ENV_VARS`.
+    """
+    name = name.upper()  # e.g. `https_proxy`
+    return name in FORWARDED_ENV_VARS or name.startswith(FORWARDED_ENV_PREFIXES)
+
+
+def _peer_uid(conn: socket.socket) -> int | None:
+    """
+    Returns:
+        int | None: The uid of the process at the other end of `conn`, `None`
+            if the platform doesn't tell (no `SO_PEERCRED`).
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _pid, uid, _gid = struct.unpack("3i", creds)
+    return uid
+
+
+def _is_trusted_peer(conn: socket.socket) -> bool:
+    # Without `SO_PEERCRED`, only the permissions of the socket protect it.
+    return _peer_uid(conn) in (None, os.getuid())
+
+
+def _is_trusted_socket(socket_path: Path) -> bool:
+    """
+    Returns:
+        bool: Whether `socket_path` is a socket owned by the current user, i.e.
+            not one another user could have created to collect the requests.
+    """
+    try:
+        st = socket_path.stat()
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def _send(conn: socket.socket, message: dict) -> None:
+    conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _send_output(
+    conn: socket.socket, lock: threading.Lock, stream: str, data: str
+) -> None:
+    # The command runs to completion even if its client went away. The output
+    # may come from several threads (downloads, progress bars, log listener):
+    # the messages must not interleave on the socket.
+    with lock, contextlib.suppress(OSError):
+        _send(conn, {"stream": stream, "data": data})
+
+
+def _connect(socket_path: Path) -> socket.socket:
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.settimeout(CONNECT_TIMEOUT)
+        conn.connect(str(socket_path))
+    except OSError:
+        conn.close()
+        raise
+    return conn
+
+
+class _RoutingStream(io.TextIOBase):
+    """
+    Text stream sending the writes to the client of the request being served,
+    or to `default` between requests.
+    """
+
+    def __init__(self, daemon: "ResolverDaemon", name: str, default) -> None:
+        super().__init__()
+        self._daemon = daemon
+        self.name = name
+        self.default = default
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: str) -> int:
+        if (sink := self._daemon._sink) is not None:  # noqa: SLF001
+            sink(self.name, data)
+        else:
+            self.default.write(data)
+        return len(data)
+
+    def flush(self) -> None:
+        if self._daemon._sink is None:  # noqa: SLF001
+            self.default.flush()
+
+    def isatty(self) -> bool:
+        if self._daemon._sink is not None:  # noqa: SLF001
+            return self._daemon._client_isatty.get(self.name, False)  # noqa: SLF001
+        return self.default.isatty()
+
+
+class ResolverDaemon:
+    """
+    Serve `mockpip install` calls over a Unix domain socket from a long-running
+    process, keeping the imports, plugins, caches and HTTP connections warm.
+
+    Requests are newline-delimited JSON objects. A `run` request carries the
+    command arguments along with the working directory and environment of the
+    client, the response streams the output of the command as
+    `{"stream": ..., "data": ...}` messages and ends with `{"retcode": ...}`.
+    Requests are served one at a time.
+
+    The working directory and environment of the process are never changed:
+    the command receives those of the client, and resolves its paths, cache,
+    pip configuration and proxies against them. Markers and plugins depend on
+    the interpreter and the host, shared by the daemon and its clients.
+
+    Args:
+        socket_path (str | Path): Path of the Unix domain socket.
+        idle_timeout (float | None): Exit after this many seconds without
+            request, `None` to serve until stopped.
+    """
+
+    def __init__(
+        self, socket_path: str | Path, idle_timeout: float | None = None
+    ) -> None:
+        # Imported here so that the thin client doesn't pay for it.
+        from mockpip.commands.install import WarmState
+        from mockpip.commands.install import install
+
+        self.socket_path = Path(socket_path)
+        self.idle_timeout = idle_timeout
+        self.state = WarmState()
+        self.commands = {"install": install}
+
+        self._sink = None
+        self._client_isatty = {}
+        self._running = False
+        self._sock = None
+
+    def bind(self) -> None:
+        """
+        Listen on the socket, only accessible to the current user.
+
+        Raises:
+            OSError: If another daemon is listening on the socket.
+        """
+        if self.socket_path.exists():
+            if ping_daemon(self.socket_path):
+                raise OSError(f"A daemon is already listening on `{self.socket_path}`")
+            self.socket_path.unlink()  # stale socket of a dead daemon
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        previous_umask = os.umask(0o177)
+        try:
+            self._sock.bind(str(self.socket_path))
+        finally:
+            os.umask(previous_umask)
+        self._sock.listen()
+        self._sock.settimeout(self.idle_timeout)
+
+    def serve_forever(self) -> None:
+        """
+        Serve requests until a `stop` request, the idle timeout or an interrupt.
+        """
+        if self._sock is None:
+            self.bind()
+
+        previous_streams = sys.stdout, sys.stderr
+        sys.stdout = _RoutingStream(self, "stdout", sys.stdout)
+        sys.stderr = _RoutingStream(self, "stderr", sys.stderr)
+
+        # Route the log records of the commands to their client as well.
+        handlers = []
+        for handler in logging.getLogger("mockpip").handlers:
+            if isinstance(handler, logging.StreamHandler):
+                routed = (
+                    sys.stderr if handler.stream is previous_streams[1] else sys.stdout
+                )
+                handlers.append((handler, handler.setStream(routed)))
+
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    conn, _ = self._sock.accept()
+                except TimeoutError:
+                    logger.info("Idle timeout reached, stopping the daemon")
+                    break
+                with conn:
+                    self._handle_connection(conn)
+
+        except KeyboardInterrupt:
+            logger.info("Interrupted, stopping the daemon")
+
+        finally:
+            for handler, stream in handlers:
+                handler.setStream(stream)
+            sys.stdout, sys.stderr = previous_streams
+            self.close()
+
+    def close(self) -> None:
+        self._running = False
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            with contextlib.suppress(OSError):
+                self.socket_path.unlink()
+        self.state.close()
+
+    def _handle_connection(self, conn: socket.socket) -> None:
+        if not _is_trusted_peer(conn):
+            logger.warning(f"Refusing a connection from uid {_peer_uid(conn)}")
+            return
+
+        # A client that never sends its request must not block the daemon.
+        conn.settimeout(REQUEST_TIMEOUT)
+        try:
+            with conn.makefile("rb") as f:
+                request = json.loads(f.readline())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring invalid request: {e}")
+            return
+
+        conn.settimeout(None)
+
+        try:
+            self._handle_request(conn, request)
+        except OSError as e:
+            logger.warning(f"Client disconnected: {e}")
+
+    def _handle_request(self, conn: socket.socket, request: dict) -> None:
+        if request.get("version") != PROTOCOL_VERSION:
+            _send(conn, {"error": f"unsupported protocol: {request.get('version')}"})
+            return
+
+        match request.get("action"):
+            case "ping":
+                _send(conn, {"pid": os.getpid(), "executable": sys.executable})
+
+            case "stop":
+                self._running = False
+                _send(conn, {"retcode": 0})
+
+            case "run":
+                if request.get("executable") != sys.executable:
+                    # Plugins and entry points depend on the environment.
+                    _send(conn, {"error": "the daemon runs another interpreter"})
+                    return
+
+                if (command := self.commands.get(request.get("command"))) is None:
+                    _send(conn, {"error": f"unknown command: {request.get('command')}"})
+                    return
+
+                # The variables the client doesn't forward are the daemon's own.
+                env = {
+                    name: value
+                    for name, value in os.environ.items()
+                    if not is_forwarded_env_var(name)
+                }
+                env.update(
+                    (name, value)
+                    for name, value in request.get("env", {}).items()
+                    if is_forwarded_env_var(name)
+                )
+                retcode = self.run(
+                    command,
+                    args=request.get("args", []),
+                    cwd=request.get("cwd", str(Path.cwd())),
+                    env=env,
+                    isatty=request.get("isatty", {}),
+                    sink=functools.partial(_send_output, conn, threading.Lock()),
+                )
+                _send(conn, {"retcode": retcode})
+
+            case action:
+                _send(conn, {"error": f"unknown action: {action}"})
+
+    def run(
+        self,
+        command: "Callable[..., int]",
+        args: list[str],
+        cwd: str,
+        env: dict[str, str],
+        isatty: dict[str, bool],
+        sink: "Callable[[str, str], None]",
+    ) -> int:
+        """
+        Run a command on behalf of a client.
+
+        Args:
+            command (Callable): The command, e.g. `install`, called with the
+                arguments, the warm state, and the working directory and
+                environment of the client.
+            args (list[str]): The arguments of the command.
+            cwd (str): The working directory of the client.
+            env (dict[str, str]): The environment of the client.
+            isatty (dict[str, bool]): Whether the `stdout` and `stderr` of the
+                client are terminals.
+            sink (Callable[[str, str], None]): Receives the output of the
+                command, as `(stream name, data)`.
+
+        Returns:
+            int: The exit code of the command.
+        """
+        self._sink = sink
+        self._client_isatty = isatty
+        try:
+            return command(args, state=self.state, cwd=cwd, env=env)
+
+        except SystemExit as e:  # e.g. argparse errors and `--help`
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            sys.stderr.write(f"{e.code}\n")
+            return 1
+
+        except Exception:
+            logger.exception("The command failed")
+            return 1
+
+        finally:
+            sys.stdout.flush()
+            self._sink = None
+            self._client_isatty = {}
+
+
+def ping_daemon(socket_path: str | Path) -> bool:
+    """
+    Returns:
+        bool: Whether a daemon is listening on `socket_path`.
+    """
+    try:
+        with _connect(Path(socket_path)) as conn:
+            _send(conn, {"version": PROTOCOL_VERSION, "action": "ping"})
+            with conn.makefile("rb") as f:
+                return "pid" in json.loads(f.readline())
+    except (OSError, ValueError):
+        return False
+
+
+def stop_daemon(socket_path: str | Path) -> bool:
+    """
+    Returns:
+        bool: Whether a daemon was listening on `socket_path` and stopped.
+    """
+    try:
+        with _connect(Path(socket_path)) as conn:
+            _send(conn, {"version": PROTOCOL_VERSION, "action": "stop"})
+            with conn.makefile("rb") as f:
+                return json.loads(f.readline()).get("retcode") == 0
+    except (OSError, ValueError):
+        return False
+
+
+def forward_to_daemon(
+    command: str,
+    args: list[str],
+    socket_path: str | Path | None = None,
+    stdout: typing.TextIO | None = None,
+    stderr: typing.TextIO | None = None,
+) -> int | None:
+    """
+    Run a command through the daemon, if one is running.
+
+    Set `MOCKPIP_NO_DAEMON` to always run the commands in-process. Nothing is
+    sent unless the socket and the process listening on it belong to the
+    current user, and only the environment variables the commands read are
+    sent (see `FORWARDED_ENV_VARS`).
+
+    Args:
+        command (str): The command, e.g. `install`.
+        args (list[str]): The arguments of the command.
+        socket_path (str | Path | None): The socket of the daemon. Defaults to
+            `get_default_socket_path()`.
+        stdout (TextIO | None): Receives the standard output of the command.
+            Defaults to `sys.stdout`.
+        stderr (TextIO | None): Receives the standard error of the command.
+            Defaults to `sys.stderr`.
+
+    Returns:
+        int | None: The exit code of the command, `None` if the daemon is not
+            running or can't serve the command (the caller runs it in-process).
+    """
+    if os.environ.get("MOCKPIP_NO_DAEMON") or command not in DAEMON_COMMANDS:
+        return None
+
+    socket_path = Path(socket_path or get_default_socket_path())
+    if not socket_path.exists():
+        return None
+
+    streams = {
+        "stdout": stdout if stdout is not None else sys.stdout,
+        "stderr": stderr if stderr is not None else sys.stderr,
+    }
+
+    if not _is_trusted_socket(socket_path):
+        logger.warning(f"Ignoring `{socket_path}`: not a socket of the current user")
+        return None
+
+    try:
+        conn = _connect(socket_path)
+    except OSError:
+        return None  # stale socket
+
+    with conn:
+        if not _is_trusted_peer(conn):
+            logger.warning(
+                f"Ignoring `{socket_path}`: served by uid {_peer_uid(conn)}, "
+                "not by the current user"
+            )
+            return None
+        return _run_remotely(conn, command, args, streams)
+
+
+def _run_remotely(
+    conn: socket.socket, command: str, args: list[str], streams: dict
+) -> int | None:
+    output_received = False
+    try:
+        _send(
+            conn,
+            {
+                "version": PROTOCOL_VERSION,
+                "action": "run",
+                "command": command,
+                "args": args,
+                "cwd": str(Path.cwd()),
+                "env": {
+                    name: value
+                    for name, value in os.environ.items()
+                    if is_forwarded_env_var(name)
+                },
+                "executable": sys.executable,
+                "isatty": {name: stream.isatty() for name, stream in streams.items()},
+            },
+        )
+        conn.settimeout(None)  # commands may take a while
+
+        with conn.makefile("rb") as f:
+            for line in f:
+                message = json.loads(line)
+                if "stream" in message:
+                    output_received = True
+                    stream = streams.get(message["stream"], streams["stdout"])
+                    stream.write(message["data"])
+                    stream.flush()
+                elif "retcode" in message:
+                    return message["retcode"]
+                else:
+                    logger.debug(
+                        f"The daemon can't serve `{command}`: {message.get('error')}"
+                    )
+                    break
+
+        error = "The mockpip daemon closed the connection"
+
+    except (OSError, ValueError) as e:
+        error = f"Lost connection to the mockpip daemon: {e}"
+
+    if not output_received:
+        return None  # nothing happened yet, the caller runs the command
+
+    streams["stderr"].write(f"{error}\n")
+    return 1
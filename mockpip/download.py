@@ -0,0 +1,380 @@
+import contextlib
+import hashlib
+import logging
+import os
+import time
+import typing
+from collections.abc import Generator
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from mockpip.cache import WheelCache
+from mockpip.repository import CHUNK_SIZE
+from mockpip.repository import PackageCandidate
+from mockpip.repository import get_default_session
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from mockpip.repository import IndexSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DOWNLOADS = 4
+DEFAULT_MAX_RESUMES = 3
+PARTIAL_SUFFIX = ".part"
+
+
+class DownloadResult(typing.NamedTuple):
+    candidate: PackageCandidate
+    path: Path | None  # `None` if the download failed
+    size: int  # bytes
+    resumed: int  # bytes reused from a previously interrupted transfer
+    elapsed: float  # seconds
+    error: str | None = None
+    cached: bool = False  # placed from the wheel cache
+
+
+class PartialDownload:
+    """
+    The `.part` file of a download in progress and the sha256 of its content.
+
+    The hash is updated as the chunks are appended, so the file is never read
+    back once complete. Only the data left by an interrupted transfer is hashed
+    when the download is resumed.
+
+    Args:
+        path (Path): The `.part` file, which may not exist yet.
+    """
+
+    __slots__ = ["_hasher", "path", "size"]
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+        try:
+            with self.path.open("rb") as f:
+                while chunk := f.read(CHUNK_SIZE):
+                    self._hasher.update(chunk)
+                    self.size += len(chunk)
+        except FileNotFoundError:
+            pass
+
+    def append(
+        self,
+        chunks: Iterable[bytes],
+        on_chunk: "Callable[[], None] | None" = None,
+    ) -> None:
+        """
+        Args:
+            chunks (Iterable[bytes]): The data received, appended in order.
+            on_chunk (Callable[[], None] | None): Called after each chunk.
+        """
+        with self.path.open("ab") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                self._hasher.update(chunk)
+                self.size += len(chunk)
+                if on_chunk is not None:
+                    on_chunk()
+
+    def reset(self) -> None:
+        self.path.write_bytes(b"")
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+
+
+@contextlib.contextmanager
+def _locked(path: Path) -> Generator[None]:
+    """
+    Hold an exclusive `flock` on `path`, created if missing, so that a single
+    process (or thread) at a time writes a `.part` file. The file may have been
+    renamed or removed by the previous holder, in which case the new file at
+    `path` is locked instead.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Windows, only safe within a single process.
+        yield
+        return
+
+    while True:
+        # Each call opens its own file description: threads exclude each other
+        # like processes do.
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                current = path.stat().st_ino == os.fstat(fd).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                yield
+                return
+        finally:
+            os.close(fd)  # releases the lock
+
+
+def _parse_content_range_start(content_range: str | None) -> int | None:
+    # `bytes 100-199/200`
+    unit, _, byte_range = (content_range or "").partition(" ")
+    start = byte_range.partition("-")[0]
+    return int(start) if unit == "bytes" and start.isdigit() else None
+
+
+def _transfer(
+    url: str,
+    partial: PartialDownload,
+    session: "IndexSession",
+    max_resumes: int,
+    progress: "Callable[[str, int, int | None], None] | None",
+) -> str | None:
+    """
+    Download the rest of `url` to `partial`, see `download_candidate`.
+
+    Returns:
+        str | None: The error that interrupted the transfer for good, if any.
+    """
+    import requests
+
+    filename = partial.path.name.removesuffix(PARTIAL_SUFFIX)
+    total = None
+    attempt = 0
+
+    def _on_chunk() -> None:
+        progress(filename, partial.size, total)
+
+    while True:
+        # The file is hashed as received: it must not be decoded by `requests`.
+        headers = {"Accept-Encoding": "identity"}
+        if partial.size > 0:
+            headers["Range"] = f"bytes={partial.size}-"
+
+        try:
+            response = session.get(url, headers=headers, stream=True)
+
+            try:
+                if response.status_code == 416 and partial.size > 0:  # noqa: PLR2004
+                    # Nothing left to download: the hash tells if it's complete.
+                    return None
+
+                if response.status_code == 200:  # noqa: PLR2004
+                    if partial.size > 0:
+                        logger.debug(f"Range not supported, restarting `{filename}`")
+                        partial.reset()
+
+                elif response.status_code != 206 or partial.size != (  # noqa: PLR2004
+                    _parse_content_range_start(response.headers.get("Content-Range"))
+                ):
+                    return f"HTTP {response.status_code}"
+
+                if (length := response.headers.get("Content-Length")) is not None:
+                    total = partial.size + int(length)
+
+                partial.append(
+                    response.iter_content(chunk_size=CHUNK_SIZE),
+                    on_chunk=_on_chunk if progress is not None else None,
+                )
+                return None
+
+            finally:
+                response.close()
+
+        except requests.RequestException as e:
+            if attempt >= max_resumes:
+                logger.error(f"Error downloading {url}: {e}")  # noqa: TRY400
+                return str(e)
+
+            attempt += 1
+            logger.warning(
+                f"Download of `{filename}` interrupted after {partial.size} "
+                f"bytes, resuming ({attempt}/{max_resumes}): {e}"
+            )
+
+
+def download_candidate(
+    candidate: PackageCandidate,
+    dest_dir: str | Path,
+    session: "IndexSession | None" = None,
+    max_resumes: int = DEFAULT_MAX_RESUMES,
+    progress: "Callable[[str, int, int | None], None] | None" = None,
+    wheel_cache: WheelCache | None = None,
+    offline: bool = False,
+) -> DownloadResult:
+    """
+    Stream a distribution file to `dest_dir`, verifying its sha256 on the fly.
+
+    The data is written to `<filename>.part`, renamed to `<filename>` once the
+    hash matches `candidate.filehash`. A transfer interrupted mid-way resumes
+    from the end of the `.part` file with an HTTP `Range` request, up to
+    `max_resumes` times, and the `.part` file left by a failed run is resumed
+    by the next one. If the server ignores the `Range` header the download
+    starts over. The `.part` file is locked while it is written: concurrent
+    downloads of the same file wait for each other.
+
+    With a `wheel_cache`, a file already stored under `candidate.filehash` is
+    placed in `dest_dir` without any network access, and downloaded files are
+    added to the cache.
+
+    Args:
+        candidate (PackageCandidate): The file to download, its `url` must be set.
+        dest_dir (str | Path): Directory receiving the file.
+        session (IndexSession | None): HTTP session to use. Defaults to a shared
+            module-level session.
+        max_resumes (int): Maximum number of resumed transfers after a
+            connection error.
+        progress (Callable | None): Called with the filename, the number of bytes
+            downloaded and the total size (if known) as the chunks arrive.
+        wheel_cache (WheelCache | None): Optional content-addressed file store.
+        offline (bool): Only place files from `wheel_cache`, never download.
+
+    Returns:
+        DownloadResult: The downloaded file, or the error that prevented it.
+    """
+    start_t = time.perf_counter()
+
+    def _result(
+        path: Path | None,
+        size: int = 0,
+        resumed: int = 0,
+        error: str | None = None,
+        cached: bool = False,
+    ) -> DownloadResult:
+        return DownloadResult(
+            candidate=candidate,
+            path=path,
+            size=size,
+            resumed=resumed,
+            elapsed=time.perf_counter() - start_t,
+            error=error,
+            cached=cached,
+        )
+
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    path = dest_dir / candidate.filename
+
+    use_cache = wheel_cache is not None and candidate.filehash is not None
+    if use_cache and wheel_cache.place(candidate.filehash, path):
+        return _result(path, size=path.stat().st_size, cached=True)
+
+    if offline or candidate.url is None:
+        return _result(
+            None, error="not in the wheel cache (offline mode)" if offline else "no URL"
+        )
+
+    if session is None:
+        session = get_default_session()
+
+    partial_path = path.with_name(f"{path.name}{PARTIAL_SUFFIX}")
+    with _locked(partial_path):
+        # Another download of the same file may have just completed.
+        if use_cache and wheel_cache.place(candidate.filehash, path):
+            return _result(path, size=path.stat().st_size, cached=True)
+
+        partial = PartialDownload(partial_path)
+        resumed = partial.size
+
+        error = _transfer(candidate.url, partial, session, max_resumes, progress)
+
+        if error is None and candidate.filehash is None:
+            logger.warning(f"No sha256 published for `{path.name}`, not verified")
+
+        elif error is None and (
+            (digest := partial.hexdigest()) != candidate.filehash.lower()
+        ):
+            partial.path.unlink()
+            if resumed > 0:
+                # The interrupted transfer may have been of another file: retry
+                # once from scratch before giving up.
+                logger.warning(f"`{path.name}` is corrupted, downloading it again")
+                return download_candidate(
+                    candidate,
+                    dest_dir,
+                    session=session,
+                    max_resumes=max_resumes,
+                    progress=progress,
+                    wheel_cache=wheel_cache,
+                    offline=offline,
+                )
+            logger.error(
+                f"sha256 mismatch for `{path.name}`: expected "
+                f"`{candidate.filehash}`, got `{digest}`"
+            )
+            error = "sha256 mismatch"
+
+        if error is not None:
+            if partial.size == 0:  # nothing to resume, only created by the lock
+                partial.path.unlink(missing_ok=True)
+            return _result(None, resumed=resumed, error=error)
+
+        partial.path.replace(path)
+        if use_cache:
+            wheel_cache.store(candidate.filehash, path)
+
+        return _result(path, size=partial.size, resumed=resumed)
+
+
+def download_candidates(
+    candidates: list[PackageCandidate],
+    dest_dir: str | Path,
+    session: "IndexSession | None" = None,
+    max_workers: int = DEFAULT_MAX_DOWNLOADS,
+    max_resumes: int = DEFAULT_MAX_RESUMES,
+    progress: "Callable[[str, int, int | None], None] | None" = None,
+    wheel_cache: WheelCache | None = None,
+    offline: bool = False,
+) -> list[DownloadResult]:
+    """
+    Download several files concurrently, see `download_candidate`.
+
+    Candidates with the same filename (e.g. the same file selected for two
+    requirements) are downloaded once.
+
+    Args:
+        candidates (list[PackageCandidate]): The files to download.
+        dest_dir (str | Path): Directory receiving the files.
+        session (IndexSession | None): HTTP session shared by all the downloads.
+        max_workers (int): Maximum number of files downloaded concurrently.
+        max_resumes (int): Maximum number of resumed transfers per file.
+        progress (Callable | None): Progress callback, called from the download
+            threads.
+        wheel_cache (WheelCache | None): Optional content-addressed file store.
+        offline (bool): Only place files from `wheel_cache`, never download.
+
+    Returns:
+        list[DownloadResult]: One result per file, in the input order.
+    """
+
+    def _download(candidate: PackageCandidate) -> DownloadResult:
+        return download_candidate(
+            candidate,
+            dest_dir,
+            session=session,
+            max_resumes=max_resumes,
+            progress=progress,
+            wheel_cache=wheel_cache,
+            offline=offline,
+        )
+
+    unique = {}
+    for candidate in candidates:
+        unique.setdefault(candidate.filename, candidate)
+
+    if len(unique) <= 1 or max_workers <= 1:
+        results = [_download(candidate) for candidate in unique.values()]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(unique)),
+            thread_name_prefix="mockpip-download",
+        ) as executor:
+            results = list(executor.map(_download, unique.values()))
+
+    by_filename = {result.candidate.filename: result for result in results}
+    return [by_filename[candidate.filename] for candidate in candidates]
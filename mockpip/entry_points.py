@@ -0,0 +1,231 @@
+import hashlib
+import importlib
+import json
+import logging
+import os
+import re
+import stat
+import sys
+import typing
+from collections.abc import Iterable
+from pathlib import Path
+
+from mockpip.cache import EntryPointCache
+from mockpip.cache import get_default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+DIST_INFO_SUFFIXES = (".dist-info", ".egg-info")
+METADATA_NAME_RE = re.compile(r"^Name:[ \t]*(.+?)[ \t]*$", re.MULTILINE)
+METADATA_VERSION_RE = re.compile(r"^Version:[ \t]*(.+?)[ \t]*$", re.MULTILINE)
+
+
+class RegisteredDistribution(typing.NamedTuple):
+    name: str
+    version: str | None
+
+
+class RegisteredEntryPoint(typing.NamedTuple):
+    """
+    Entry point read from the registry, see `get_entry_points`.
+
+    Mirrors the parts of `importlib.metadata.EntryPoint` used by mockpip, without
+    requiring the distribution metadata to be read again.
+    """
+
+    name: str
+    value: str
+    group: str
+    dist: RegisteredDistribution | None
+
+    def load(self) -> typing.Any:
+        """
+        Import the object the entry point refers to, e.g. `module:attr`.
+        """
+        module_name, _, attrs = self.value.partition("[")[0].partition(":")
+        obj = importlib.import_module(module_name.strip())
+        for attr in filter(None, attrs.strip().split(".")):
+            obj = getattr(obj, attr)
+        return obj
+
+
+def get_default_entry_point_cache() -> EntryPointCache | None:
+    """
+    Returns:
+        EntryPointCache | None: The cache under the default cache root, `None`
+            if it can't be created (e.g. read-only home directory).
+    """
+    try:
+        return EntryPointCache(get_default_cache_dir() / "entry_points")
+    except OSError as e:
+        logger.debug(f"Entry point cache disabled: {e}")
+        return None
+
+
+def get_environment_key(paths: Iterable[str]) -> str:
+    """
+    Digest identifying an environment by the paths its distributions are read
+    from, so environments sharing a cache directory don't evict each other.
+    """
+    paths = [str(Path(path or ".").absolute()) for path in paths]
+    return hashlib.sha256(json.dumps(paths).encode()).hexdigest()[:32]
+
+
+def get_environment_fingerprint(paths: Iterable[str]) -> str:
+    """
+    Cheap digest of the distributions installed on `paths`.
+
+    Only the directory listings are read: the mtime of each path and the name
+    and mtime of each `*.dist-info` / `*.egg-info` entry. Installing, upgrading
+    or uninstalling a distribution renames, adds or removes such an entry and
+    rewriting its metadata in place updates its mtime, all of which change the
+    fingerprint.
+
+    Args:
+        paths (Iterable[str]): The paths searched for distributions.
+
+    Returns:
+        str: The fingerprint of the installed distributions.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        path = Path(path or ".").absolute()  # noqa: PLW2901
+        try:
+            path_stat = path.stat()
+        except OSError:
+            digest.update(f"{path}\0-\n".encode())
+            continue
+
+        digest.update(f"{path}\0{path_stat.st_mtime_ns}\n".encode())
+        if not stat.S_ISDIR(path_stat.st_mode):
+            continue
+
+        try:
+            with os.scandir(path) as it:
+                dist_infos = sorted(
+                    (entry for entry in it if entry.name.endswith(DIST_INFO_SUFFIXES)),
+                    key=lambda entry: entry.name,
+                )
+            for entry in dist_infos:
+                try:
+                    mtime = entry.stat().st_mtime_ns
+                except OSError:
+                    mtime = None
+                digest.update(f"{entry.name}\0{mtime}\n".encode())
+        except OSError:
+            continue
+
+    return digest.hexdigest()
+
+
+def read_name_and_version(dist) -> tuple[str | None, str | None]:
+    """
+    Read the name and version of a distribution from its metadata headers.
+
+    `Distribution.metadata` builds a full `email.message.Message` on every
+    access, a regex over the header block is several times faster.
+    """
+    text = dist.read_text("METADATA") or dist.read_text("PKG-INFO") or ""
+    headers = text.partition("\n\n")[0]
+    name = METADATA_NAME_RE.search(headers)
+    version = METADATA_VERSION_RE.search(headers)
+    return (
+        name.group(1) if name is not None else None,
+        version.group(1) if version is not None else None,
+    )
+
+
+def scan_entry_points(paths: list[str]) -> dict[str, list]:
+    """
+    Read the entry points of every distribution installed on `paths`.
+
+    Like `importlib.metadata.entry_points`, only the first distribution found
+    for a given name is considered.
+
+    Args:
+        paths (list[str]): The paths searched for distributions.
+
+    Returns:
+        dict[str, list]: The `[name, value, dist name, dist version]` of the entry
+            points, by group.
+    """
+    from importlib.metadata import distributions
+
+    registry = {}
+    seen = set()
+    for dist in distributions(path=paths):
+        # Same de-duplication key as `importlib.metadata.entry_points`: derived
+        # from the `.dist-info` directory name when available, which avoids
+        # parsing the metadata of the distributions without entry points.
+        normalized_name = getattr(dist, "_normalized_name", None)
+        if normalized_name is None:
+            normalized_name = re.sub(r"[-_.]+", "_", dist.name or "").lower()
+        if normalized_name in seen:
+            continue
+        seen.add(normalized_name)
+
+        if not (entry_points := dist.entry_points):
+            continue
+
+        dist_name, dist_version = read_name_and_version(dist)
+        for entry_point in entry_points:
+            registry.setdefault(entry_point.group, []).append([
+                entry_point.name,
+                entry_point.value,
+                dist_name,
+                dist_version,
+            ])
+
+    return registry
+
+
+def get_entry_points(
+    group: str,
+    cache: EntryPointCache | None = None,
+    paths: list[str] | None = None,
+) -> list[RegisteredEntryPoint]:
+    """
+    List the entry points of a group, reusing the registry of a previous run
+    while the installed distributions did not change.
+
+    Args:
+        group (str): The entry point group, e.g. `mockpip.actions`.
+        cache (EntryPointCache | None): Cache of the registry. Without cache the
+            distributions are always scanned.
+        paths (list[str] | None): The paths searched for distributions. Defaults
+            to `sys.path`.
+
+    Returns:
+        list[RegisteredEntryPoint]: The entry points of the group.
+    """
+    paths = list(sys.path) if paths is None else paths
+
+    registry = None
+    if cache is not None:
+        key = get_environment_key(paths)
+        # Computed before scanning: a distribution installed meanwhile
+        # invalidates the stored registry.
+        fingerprint = get_environment_fingerprint(paths)
+        registry = cache.get(key, fingerprint)
+
+    if registry is None:
+        registry = scan_entry_points(paths)
+        if cache is not None:
+            try:
+                cache.store(key, fingerprint, registry)
+            except OSError as e:
+                logger.debug(f"Failed to cache the entry points: {e}")
+
+    return [
+        RegisteredEntryPoint(
+            name=name,
+            value=value,
+            group=group,
+            dist=(
+                RegisteredDistribution(name=dist_name, version=dist_version)
+                if dist_name is not None
+                else None
+            ),
+        )
+        for name, value, dist_name, dist_version in registry.get(group, [])
+    ]
@@ -0,0 +1,630 @@
+import base64
+import configparser
+import contextlib
+import csv
+import hashlib
+import io
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import sysconfig
+import tempfile
+import time
+import typing
+import uuid
+import zipfile
+import zlib
+from collections.abc import Generator
+from collections.abc import Iterable
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesHeaderParser
+from pathlib import Path
+from pathlib import PurePosixPath
+
+from packaging.utils import canonicalize_name
+
+if typing.TYPE_CHECKING:
+    from email.message import Message
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_EXTRACT_WORKERS = min(8, os.cpu_count() or 1)
+EXTRACT_CHUNK_SIZE = 1024 * 1024  # bytes
+INSTALLER_NAME = "mockpip"
+SCHEME_KEYS = ("purelib", "platlib", "scripts", "data", "headers")
+# Rewritten by the installer, or invalidated by the new RECORD.
+SKIPPED_DIST_INFO_FILES = ("RECORD", "RECORD.jws", "RECORD.p7s", "INSTALLER")
+
+# signature, (version, flags, method, time, date, crc, sizes), name and extra
+# field lengths
+ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")
+ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+SCRIPT_TEMPLATE = """\
+#!{executable}
+import re
+import sys
+from {module} import {import_name}
+if __name__ == "__main__":
+    sys.argv[0] = re.sub(r"(-script\\.pyw|\\.exe)?$", "", sys.argv[0])
+    sys.exit({func}())
+"""
+
+
+class InvalidWheelError(ValueError):
+    pass
+
+
+class InstallScheme(typing.NamedTuple):
+    purelib: Path
+    platlib: Path
+    scripts: Path
+    data: Path
+    headers: Path
+
+
+class InstalledFile(typing.NamedTuple):
+    path: Path
+    digest: str  # `sha256=<urlsafe-b64>`, as in RECORD files
+    size: int  # bytes
+
+
+class WheelInstallResult(typing.NamedTuple):
+    name: str
+    version: str
+    dist_info: Path
+    files: list[InstalledFile]
+    elapsed: float  # seconds
+
+    @property
+    def size(self) -> int:
+        return sum(installed_file.size for installed_file in self.files)
+
+
+def get_default_install_target(env: Mapping[str, str] | None = None) -> str | None:
+    """
+    Args:
+        env (Mapping[str, str] | None): The environment. Defaults to `os.environ`.
+
+    Returns:
+        str | None: `$MOCKPIP_TARGET`, `None` to install in the environment.
+    """
+    return (env if env is not None else os.environ).get("MOCKPIP_TARGET")
+
+
+def get_install_scheme(
+    dist_name: str, target: str | Path | None = None
+) -> InstallScheme:
+    """
+    Args:
+        dist_name (str): The name of the distribution, used for its headers.
+        target (str | Path | None): Install everything in this directory (and
+            the scripts in its `bin` subdirectory) instead of the environment.
+
+    Returns:
+        InstallScheme: Where each category of files is installed.
+    """
+    if target is not None:
+        target = Path(target)
+        return InstallScheme(
+            purelib=target,
+            platlib=target,
+            scripts=target / "bin",
+            data=target,
+            headers=target / "include" / dist_name,
+        )
+
+    paths = sysconfig.get_paths()
+    return InstallScheme(
+        purelib=Path(paths["purelib"]),
+        platlib=Path(paths["platlib"]),
+        scripts=Path(paths["scripts"]),
+        data=Path(paths["data"]),
+        headers=Path(paths["include"]) / dist_name,
+    )
+
+
+def record_digest(hasher: "hashlib._Hash") -> str:
+    digest = base64.urlsafe_b64encode(hasher.digest()).rstrip(b"=").decode()
+    return f"{hasher.name}={digest}"
+
+
+def _iter_member_chunks(
+    wheel: zipfile.ZipFile, mapped: mmap.mmap, info: zipfile.ZipInfo
+) -> Generator[bytes | memoryview]:
+    """
+    Yield the uncompressed content of a member straight from the mapped wheel.
+
+    Stored members are yielded as views of the mapping, without any copy, and
+    deflated members are inflated chunk by chunk from it. Unlike
+    `ZipFile.open`, no lock serializes the reads of the threads sharing
+    `mapped`. Other compression methods fall back to `ZipFile.open`.
+    """
+    if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        with wheel.open(info) as f:
+            while chunk := f.read(EXTRACT_CHUNK_SIZE):
+                yield chunk
+        return
+
+    if info.flag_bits & 0x1:
+        raise InvalidWheelError(f"`{info.filename}` is encrypted")
+
+    signature, name_length, extra_length = ZIP_LOCAL_HEADER.unpack_from(
+        mapped, info.header_offset
+    )
+    if signature != ZIP_LOCAL_HEADER_SIGNATURE:
+        raise InvalidWheelError(f"Bad local file header for `{info.filename}`")
+
+    start = info.header_offset + ZIP_LOCAL_HEADER.size + name_length + extra_length
+    end = start + info.compress_size
+    decompressor = (
+        zlib.decompressobj(-zlib.MAX_WBITS)
+        if info.compress_type == zipfile.ZIP_DEFLATED
+        else None
+    )
+
+    # The views are released as soon as they are consumed: the mapping can't be
+    # closed while any is alive.
+    with memoryview(mapped) as view:
+        for pos in range(start, end, EXTRACT_CHUNK_SIZE):
+            with view[pos : min(pos + EXTRACT_CHUNK_SIZE, end)] as chunk:
+                if decompressor is None:
+                    yield chunk
+                    continue
+
+                # Bounded output: a highly compressed chunk can inflate a lot.
+                data = decompressor.decompress(chunk, EXTRACT_CHUNK_SIZE)
+                while data:
+                    yield data
+                    data = decompressor.decompress(
+                        decompressor.unconsumed_tail, EXTRACT_CHUNK_SIZE
+                    )
+
+    if decompressor is not None and (data := decompressor.flush()):
+        yield data
+
+
+def _rewrite_shebang(chunks: Iterable[bytes | memoryview]) -> Generator[bytes]:
+    # `#!python` is a placeholder for the interpreter of the environment.
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += bytes(chunk)
+        if b"\n" in head:
+            break
+
+    if head.startswith(b"#!python"):
+        _, newline, rest = head.partition(b"\n")
+        head = b"#!" + os.fsencode(sys.executable) + newline + rest
+
+    yield head
+    yield from chunks
+
+
+def _write_file(
+    path: Path, chunks: Iterable[bytes | memoryview], executable: bool = False
+) -> InstalledFile:
+    """
+    Write `chunks` to `path`, computing its RECORD entry in the same pass.
+
+    The data is written to a temporary file, renamed over `path` once complete:
+    a running process using the previous version of the file is not affected.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with tmp_path.open("wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                hasher.update(chunk)
+                size += len(chunk)
+
+        if executable:
+            tmp_path.chmod(0o755)
+        tmp_path.replace(path)
+
+    except BaseException:
+        with contextlib.suppress(OSError):
+            tmp_path.unlink()
+        raise
+
+    return InstalledFile(path=path, digest=record_digest(hasher), size=size)
+
+
+def _extract_member(
+    wheel: zipfile.ZipFile,
+    mapped: mmap.mmap,
+    info: zipfile.ZipInfo,
+    dest: Path,
+    expected_digest: str | None,
+    is_script: bool,
+) -> InstalledFile:
+    chunks = _iter_member_chunks(wheel, mapped, info)
+    with contextlib.closing(chunks):
+        installed_file = _write_file(
+            dest,
+            _rewrite_shebang(chunks) if is_script else chunks,
+            # Keep the executable bits of the archive.
+            executable=is_script or bool((info.external_attr >> 16) & 0o111),
+        )
+
+    # Scripts are modified, their RECORD entry is the one of the installed file.
+    if not is_script and (
+        installed_file.size != info.file_size
+        or (expected_digest is not None and installed_file.digest != expected_digest)
+    ):
+        dest.unlink()
+        raise InvalidWheelError(
+            f"`{info.filename}` doesn't match the RECORD of the wheel"
+        )
+
+    return installed_file
+
+
+def _find_dist_info(names: Iterable[str]) -> str:
+    dist_infos = {
+        top_level
+        for name in names
+        if (top_level := name.partition("/")[0]).endswith(".dist-info")
+    }
+    if len(dist_infos) != 1:
+        raise InvalidWheelError(
+            f"Expected a single `.dist-info` directory, found: {sorted(dist_infos)}"
+        )
+    return dist_infos.pop()
+
+
+def _read_record(wheel: zipfile.ZipFile, dist_info: str) -> dict[str, str]:
+    try:
+        content = wheel.read(f"{dist_info}/RECORD").decode("utf-8")
+    except KeyError:
+        raise InvalidWheelError(f"`{dist_info}/RECORD` is missing") from None
+
+    return {row[0]: row[1] or None for row in csv.reader(io.StringIO(content)) if row}
+
+
+def _iter_entry_point_scripts(
+    wheel: zipfile.ZipFile, dist_info: str
+) -> Generator[tuple[str, bytes]]:
+    try:
+        content = wheel.read(f"{dist_info}/entry_points.txt").decode("utf-8")
+    except KeyError:
+        return
+
+    parser = configparser.ConfigParser(delimiters=("=",), interpolation=None)
+    parser.optionxform = str  # Script names are case sensitive.
+    parser.read_string(content)
+
+    for section in ("console_scripts", "gui_scripts"):
+        if not parser.has_section(section):
+            continue
+        for script_name, value in parser.items(section):
+            module, _, func = value.partition(":")
+            # Extras (`[extra]`) are not resolved.
+            func = func.partition("[")[0].strip() or "main"
+            yield (
+                script_name,
+                SCRIPT_TEMPLATE.format(
+                    executable=sys.executable,
+                    module=module.strip(),
+                    import_name=func.partition(".")[0],
+                    func=func,
+                ).encode("utf-8"),
+            )
+
+
+def _find_installed_dist_info(lib_dir: Path, name: str) -> Path | None:
+    canonical_name = canonicalize_name(name)
+    for dist_info in lib_dir.glob("*.dist-info"):
+        dist_name = dist_info.name.removesuffix(".dist-info").rpartition("-")[0]
+        if canonicalize_name(dist_name) == canonical_name:
+            return dist_info
+    return None
+
+
+def _recorded_paths(dist_info: Path, lib_dir: Path) -> list[Path]:
+    try:
+        content = (dist_info / "RECORD").read_text("utf-8")
+    except OSError:
+        content = ""
+
+    return list(
+        dict.fromkeys(
+            lib_dir / row[0] for row in csv.reader(io.StringIO(content)) if row
+        )
+    )
+
+
+def _remove_empty_parents(paths: Iterable[Path], lib_dir: Path) -> None:
+    parents = {path.parent for path in paths}
+    for parent in parents:
+        with contextlib.suppress(OSError):
+            shutil.rmtree(parent / "__pycache__")
+
+    # Remove the directories left empty, deepest first.
+    for parent in sorted(parents, key=lambda path: len(path.parts), reverse=True):
+        directory = parent
+        while directory != lib_dir and lib_dir in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+
+def _backup_distribution(
+    lib_dir: Path, name: str, backup_dir: Path
+) -> list[tuple[Path, Path]]:
+    """
+    Move the files of an installed distribution to `backup_dir`, so that they can
+    be put back by `_restore_distribution` if its replacement fails to install.
+
+    Returns:
+        list[tuple[Path, Path]]: The installed path and the backup path of each
+            file moved, empty if the distribution is not installed.
+    """
+    if (dist_info := _find_installed_dist_info(lib_dir, name)) is None:
+        return []
+
+    # The `.dist-info` directory is moved as a whole, last.
+    paths = [
+        path
+        for path in _recorded_paths(dist_info, lib_dir)
+        if dist_info not in path.parents
+    ]
+    moved = []
+    try:
+        for path in [*paths, dist_info]:
+            backup = backup_dir / str(len(moved))
+            try:
+                shutil.move(path, backup)
+            except FileNotFoundError:
+                continue
+            moved.append((path, backup))
+    except BaseException:
+        _restore_distribution(moved)
+        raise
+
+    return moved
+
+
+def _restore_distribution(moved: list[tuple[Path, Path]]) -> None:
+    for path, backup in reversed(moved):
+        if path.is_dir():
+            # Left by a failed installation of the same version.
+            shutil.rmtree(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(backup, path)
+
+
+def install_wheel(
+    wheel_path: str | Path,
+    target: str | Path | None = None,
+    max_workers: int = DEFAULT_MAX_EXTRACT_WORKERS,
+) -> WheelInstallResult:
+    """
+    Install a wheel, replacing any installed version of the distribution.
+
+    The wheel is mapped in memory and its members are extracted in parallel,
+    largest first, each one streamed directly from the mapping to its
+    destination (see `_iter_member_chunks`). The sha256 of each file is
+    computed while it's written: it's checked against the RECORD of the wheel
+    and the RECORD of the installation is written at the end, without reading
+    any installed file back.
+
+    The files of the installed version are moved aside first, and put back if
+    the new version fails to install.
+
+    Args:
+        wheel_path (str | Path): The wheel file.
+        target (str | Path | None): Install in this directory instead of the
+            environment, see `get_install_scheme`.
+        max_workers (int): Maximum number of members extracted concurrently.
+
+    Returns:
+        WheelInstallResult: The installed distribution and its files.
+
+    Raises:
+        InvalidWheelError: If the wheel is invalid or doesn't match its RECORD.
+    """
+    start_t = time.perf_counter()
+
+    with Path(wheel_path).open("rb") as f:
+        try:
+            wheel = zipfile.ZipFile(f)
+        except zipfile.BadZipFile as e:
+            raise InvalidWheelError(f"`{wheel_path}` is not a wheel: {e}") from None
+
+        with wheel, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            infos = [info for info in wheel.infolist() if not info.is_dir()]
+            dist_info = _find_dist_info(info.filename for info in infos)
+            name, _, version = dist_info.removesuffix(".dist-info").rpartition("-")
+
+            metadata = _read_wheel_metadata(wheel, dist_info)
+            scheme = get_install_scheme(name, target=target)
+            lib_dir = (
+                scheme.purelib
+                if (metadata.get("Root-Is-Purelib") or "").lower() == "true"
+                else scheme.platlib
+            )
+
+            members = _plan_members(
+                infos,
+                record=_read_record(wheel, dist_info),
+                dist_info=dist_info,
+                data_dir=f"{name}-{version}.data",
+                scheme=scheme,
+                lib_dir=lib_dir,
+            )
+            scripts = list(_iter_entry_point_scripts(wheel, dist_info))
+
+            # The previous version is moved aside rather than removed: it is put
+            # back if anything goes wrong until the new RECORD is written.
+            lib_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.TemporaryDirectory(
+                prefix=".mockpip-backup-", dir=lib_dir
+            ) as backup_dir:
+                previous = _backup_distribution(lib_dir, name, Path(backup_dir))
+                if previous:
+                    logger.info(f"Replacing the installed version of `{name}`")
+
+                installed_files = []
+                try:
+                    installed_files.extend(
+                        _extract_members(wheel, mapped, members, max_workers)
+                    )
+                    for script_name, content in scripts:
+                        installed_files.append(
+                            _write_file(
+                                scheme.scripts / script_name, [content], executable=True
+                            )
+                        )
+
+                    dist_info_path = lib_dir / dist_info
+                    installed_files.append(
+                        _write_file(
+                            dist_info_path / "INSTALLER",
+                            [f"{INSTALLER_NAME}\n".encode()],
+                        )
+                    )
+                    write_record(dist_info_path / "RECORD", installed_files, lib_dir)
+
+                except BaseException:
+                    # Everything at the paths of the new files is new: the
+                    # previous version was moved aside.
+                    new_paths = [
+                        *(dest for _, dest, _, _ in members),
+                        *(scheme.scripts / script_name for script_name, _ in scripts),
+                        *(
+                            lib_dir / dist_info / filename
+                            for filename in ("INSTALLER", "RECORD")
+                        ),
+                    ]
+                    for path in new_paths:
+                        with contextlib.suppress(OSError):
+                            path.unlink()
+                    _remove_empty_parents(new_paths, lib_dir)
+                    _restore_distribution(previous)
+                    raise
+
+                # The files of the previous version not overwritten by the new one.
+                _remove_empty_parents((path for path, _ in previous), lib_dir)
+
+    return WheelInstallResult(
+        name=name,
+        version=version,
+        dist_info=dist_info_path,
+        files=installed_files,
+        elapsed=time.perf_counter() - start_t,
+    )
+
+
+def _read_wheel_metadata(wheel: zipfile.ZipFile, dist_info: str) -> "Message":
+    try:
+        metadata = BytesHeaderParser().parsebytes(wheel.read(f"{dist_info}/WHEEL"))
+    except KeyError:
+        raise InvalidWheelError(f"`{dist_info}/WHEEL` is missing") from None
+
+    if (metadata.get("Wheel-Version") or "").partition(".")[0] != "1":
+        raise InvalidWheelError(
+            f"Unsupported Wheel-Version: `{metadata.get('Wheel-Version')}`"
+        )
+
+    return metadata
+
+
+def _plan_members(
+    infos: list[zipfile.ZipInfo],
+    record: dict[str, str | None],
+    dist_info: str,
+    data_dir: str,
+    scheme: InstallScheme,
+    lib_dir: Path,
+) -> list[tuple[zipfile.ZipInfo, Path, str | None, bool]]:
+    """
+    Map each member of the wheel to its destination, largest first: a large
+    member extracted last would run alone.
+
+    Returns:
+        list[tuple]: The member, its destination, its digest in the RECORD of
+            the wheel and whether it's a script.
+    """
+    members = []
+    for info in infos:
+        parts = PurePosixPath(info.filename).parts
+        if info.filename.startswith("/") or ".." in parts:
+            raise InvalidWheelError(f"Unsafe path in the wheel: `{info.filename}`")
+
+        top_level, _, relative_path = info.filename.partition("/")
+        if top_level == dist_info and relative_path in SKIPPED_DIST_INFO_FILES:
+            continue
+
+        is_script = False
+        if top_level == data_dir:
+            if len(parts) < 3 or parts[1] not in SCHEME_KEYS:  # noqa: PLR2004
+                raise InvalidWheelError(f"Unknown data path: `{info.filename}`")
+            dest = getattr(scheme, parts[1]).joinpath(*parts[2:])
+            is_script = parts[1] == "scripts"
+        else:
+            dest = lib_dir.joinpath(*parts)
+
+        members.append((info, dest, record.get(info.filename), is_script))
+
+    members.sort(key=lambda member: member[0].file_size, reverse=True)
+    return members
+
+
+def _extract_members(
+    wheel: zipfile.ZipFile,
+    mapped: mmap.mmap,
+    members: list[tuple[zipfile.ZipInfo, Path, str | None, bool]],
+    max_workers: int,
+) -> list[InstalledFile]:
+    if len(members) <= 1 or max_workers <= 1:
+        return [_extract_member(wheel, mapped, *member) for member in members]
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(members)),
+        thread_name_prefix="mockpip-extract",
+    ) as executor:
+        futures = [
+            executor.submit(_extract_member, wheel, mapped, *member)
+            for member in members
+        ]
+
+    # Removed by `install_wheel` if any member failed.
+    return [future.result() for future in futures]
+
+
+def write_record(
+    record_path: Path, installed_files: Iterable[InstalledFile], lib_dir: Path
+) -> None:
+    """
+    Write the RECORD of an installed distribution.
+
+    Args:
+        record_path (Path): The RECORD file.
+        installed_files (Iterable[InstalledFile]): The installed files, with
+            their digest and size.
+        lib_dir (Path): The paths are relative to this directory.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    for installed_file in installed_files:
+        writer.writerow(
+            [
+                Path(os.path.relpath(installed_file.path, lib_dir)).as_posix(),
+                installed_file.digest,
+                installed_file.size,
+            ]
+        )
+    writer.writerow([Path(os.path.relpath(record_path, lib_dir)).as_posix(), "", ""])
+
+    _write_file(record_path, [output.getvalue().encode("utf-8")])
@@ -3,10 +3,58 @@
 
 # Copyright (c) 2024, NVIDIA CORPORATION. All rights reserved.
 
+import contextlib
 import logging as _logging
+import logging.handlers as _handlers
+import queue
 import sys
+from collections.abc import Generator
 
-from mockpip import __version__
+import mockpip
+
+
+class _VersionFormatter(_logging.Formatter):
+    # The version is resolved on the first formatted record rather than on import.
+    def format(self, record: _logging.LogRecord) -> str:
+        record.version = mockpip.__version__
+        return super().format(record)
+
+
+class _DeferredQueueHandler(_handlers.QueueHandler):
+    # The records stay in the process: unlike `QueueHandler.prepare`, leave the
+    # `msg % args` formatting to the listener thread.
+    def prepare(self, record: _logging.LogRecord) -> _logging.LogRecord:
+        return record
+
+
+@contextlib.contextmanager
+def queued_logging(name: str = "mockpip") -> Generator[None]:
+    """
+    Hand the records of the `name` logger to its handlers from a background
+    thread, so that logging only costs the calling thread a record creation.
+
+    The records are formatted by the listener: pass the values as arguments
+    (`logger.debug("%s", value)`), not as mutable objects modified afterwards.
+    All the records are written when leaving the context.
+
+    Args:
+        name (str): The logger whose handlers are moved behind the queue.
+    """
+    _logger = _logging.getLogger(name)
+    handlers = list(_logger.handlers)
+    records = queue.SimpleQueue()
+    listener = _handlers.QueueListener(records, *handlers, respect_handler_level=True)
+
+    _logger.handlers = [_DeferredQueueHandler(records)]
+    listener.start()
+    try:
+        yield
+    finally:
+        listener.stop()
+        _logger.handlers = handlers
+        # Records emitted while the listener was stopping.
+        while not records.empty():
+            listener.handle(records.get_nowait())
 
 
 class _LoggerAPI:
@@ -90,10 +138,10 @@ class _LoggerAPI:
             # %M: Minute as a decimal number [00,59].
             # %S: Second as a decimal number [00,61].
             # ----------------------------------------------------------
-            formatter = _logging.Formatter(
+            formatter = _VersionFormatter(
                 fmt=(
                     "[%(levelname)1.1s %(asctime)s.%(msecs)03d %(name)s:%(lineno)d"
-                    f" v{__version__}] %(message)s"
+                    " v%(version)s] %(message)s"
                 ),
                 datefmt="%Y-%m-%d %H:%M:%S",
             )
@@ -1,26 +1,224 @@
+import contextlib
+import logging
 import sys
-import time
+import threading
 
+DEFAULT_REFRESH_RATE = 10  # frames per second
 
-def progress_bar(current, bar_length=40):
+
+def format_bar(fraction, bar_length=40):
     """
-    Displays a progress bar in the terminal.
     Args:
-        current (int): The current progress value.
+        fraction (float): The progress, from 0 to 1.
         bar_length (int): The length of the progress bar in characters.
+
+    Returns:
+        str: The bar, e.g. `[=====     ]`.
     """
-    fraction = current / 100
     arrow = "=" * int(fraction * bar_length)  # Progress indicator
     spaces = " " * (bar_length - len(arrow))  # Remaining space
+    return f"[{arrow}{spaces}]"
+
+
+def progress_bar(current, bar_length=40, total=100):
+    """
+    Displays a progress bar in the terminal, nothing is written when stdout is
+    not a terminal.
+    Args:
+        current (int): The current progress value.
+        bar_length (int): The length of the progress bar in characters.
+        total (int): The value of `current` once complete.
+    """
+    if not sys.stdout.isatty():
+        return
+
+    fraction = current / total
     percent = int(fraction * 100)  # Percentage complete
 
     # Print the progress bar
-    sys.stdout.write(f"\r[{arrow}{spaces}] {percent}%")
+    sys.stdout.write(f"\r{format_bar(fraction, bar_length)} {percent}%")
     sys.stdout.flush()
 
 
-def fake_install_progress(total_time=5):
-    for i in range(101):
-        progress_bar(i)
-        time.sleep(total_time/100)
-    sys.stdout.write("\n")
+class TransferProgress:
+    """
+    One progress bar per concurrent transfer, fed with byte counts.
+
+    `update` only records the counters: the bars are redrawn from a background
+    thread at most `refresh_rate` times per second, with a single write and
+    flush per frame, so the transfer threads never wait on the terminal.
+    Unless `enabled` is forced, the bars are only shown when `stream` is a
+    terminal, and `callback` is then `None` so the transfers don't report
+    anything at all. Log records written meanwhile go through
+    `clearing_log_records`, so they don't end up in the middle of the bars.
+
+    Args:
+        stream (TextIO | None): Where to draw the bars. Defaults to `sys.stdout`.
+        refresh_rate (float): Maximum number of frames per second.
+        bar_length (int): The length of each bar in characters.
+        enabled (bool | None): Force the bars on or off, `None` to draw them only
+            on a terminal.
+    """
+
+    def __init__(
+        self,
+        stream=None,
+        refresh_rate=DEFAULT_REFRESH_RATE,
+        bar_length=30,
+        enabled=None,
+    ):
+        self.stream = stream if stream is not None else sys.stdout
+        self.enabled = self.stream.isatty() if enabled is None else enabled
+        self.refresh_interval = 1 / refresh_rate
+        self.bar_length = bar_length
+
+        self._lock = threading.Lock()
+        # Serializes the writes of the frames with `clear`.
+        self._draw_lock = threading.Lock()
+        self._transfers = {}  # name -> (done, total), in order of appearance
+        self._dirty = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self._drawn_lines = 0
+
+    @property
+    def callback(self):
+        """
+        Returns:
+            Callable | None: `update`, or `None` when the bars are disabled.
+        """
+        return self.update if self.enabled else None
+
+    def update(self, name, done, total):
+        """
+        Args:
+            name (str): The transfer, one bar is drawn per distinct name.
+            done (int): Number of bytes transferred so far.
+            total (int | None): Size of the transfer, if known.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._transfers[name] = (done, total)
+            if self._thread is None and not self._closed.is_set():
+                self._thread = threading.Thread(
+                    target=self._render_loop, name="mockpip-progress", daemon=True
+                )
+                self._thread.start()
+        self._dirty.set()
+
+    def close(self):
+        """
+        Stop the rendering thread and draw the final state of the bars.
+        """
+        with self._lock:
+            self._closed.set()
+            thread = self._thread
+        self._dirty.set()
+        if thread is not None:
+            thread.join()
+            self._render()
+
+    def clear(self):
+        """
+        Erase the bars drawn so far, they are redrawn on the next frame.
+        """
+        with self._draw_lock:
+            self._clear()
+        self._dirty.set()
+
+    @contextlib.contextmanager
+    def suspended(self):
+        """
+        Erase the bars and don't draw them while in the context, so that
+        something else can be written to the terminal.
+        """
+        with self._draw_lock:
+            self._clear()
+            yield
+        self._dirty.set()
+
+    @contextlib.contextmanager
+    def clearing_log_records(self, name="mockpip"):
+        """
+        Suspend the bars around each record written by the stream handlers of
+        the `name` logger while in the context.
+
+        Args:
+            name (str): The logger whose stream handlers are hooked.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        handlers = [
+            handler
+            for handler in logging.getLogger(name).handlers
+            if isinstance(handler, logging.StreamHandler)
+        ]
+        for handler in handlers:
+            handler.emit = self._suspending(handler.emit)
+        try:
+            yield
+        finally:
+            for handler in handlers:
+                # Back to the method of the class.
+                del handler.emit
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _render_loop(self):
+        while not self._closed.is_set():
+            self._dirty.wait()
+            if self._closed.is_set():
+                break
+            self._dirty.clear()
+            self._render()
+            # Updates arriving meanwhile are coalesced into the next frame.
+            self._closed.wait(self.refresh_interval)
+
+    def _render(self):
+        with self._lock:
+            transfers = list(self._transfers.items())
+
+        with self._draw_lock:
+            # Move back to the first line of the previous frame and overwrite it.
+            frame = [f"\x1b[{self._drawn_lines}F"] if self._drawn_lines else []
+            frame.extend(
+                f"{self._format_line(name, done, total)}\x1b[K\n"
+                for name, (done, total) in transfers
+            )
+            self._drawn_lines = len(transfers)
+
+            self.stream.write("".join(frame))
+            self.stream.flush()
+
+    def _clear(self):
+        # Move back to the first line of the bars and erase down to the end.
+        if self._drawn_lines:
+            self.stream.write(f"\x1b[{self._drawn_lines}F\x1b[J")
+            self.stream.flush()
+            self._drawn_lines = 0
+
+    def _suspending(self, emit):
+        def suspending_emit(record):
+            with self.suspended():
+                emit(record)
+
+        return suspending_emit
+
+    def _format_line(self, name, done, total):
+        size = f"{done / 2**20:.1f}"
+        if not total:
+            return f"{name[:40]:<40} [{' ' * self.bar_length}] {size} MiB"
+
+        fraction = min(done / total, 1)
+        return (
+            f"{name[:40]:<40} {format_bar(fraction, self.bar_length)} "
+            f"{size}/{total / 2**20:.1f} MiB {int(fraction * 100):3d}%"
+        )
@@ -1,61 +1,889 @@
+import asyncio
+import codecs
+import functools
+import heapq
+import itertools
+import json
 import logging
 import re
+import threading
 import typing
-from urllib.parse import parse_qs
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Generator
+from collections.abc import Iterable
+from urllib.parse import urljoin
 from urllib.parse import urlparse
 
-import requests
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
 from packaging.version import Version
 
+from mockpip.cache import IndexCache
+from mockpip.requirements import parse_requirement
+
+# `requests` is only imported once an HTTP session is needed: it is the bulk of
+# the import time of this module.
+if typing.TYPE_CHECKING:
+    import requests
+
+    from mockpip.async_repository import AsyncIndexSession
+    from mockpip.cache import IndexCacheWriter
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_WORKERS = 8
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.25  # 0.25s, 0.5s, 1s, ...
+DEFAULT_CONNECT_TIMEOUT = 5  # seconds
+DEFAULT_READ_TIMEOUT = 10  # seconds
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# How the candidates of several indexes are combined, see `list_candidates`.
+INDEX_STRATEGIES = ("merge", "race")
+DEFAULT_INDEX_STRATEGY = "merge"
+
+CHUNK_SIZE = 64 * 1024  # bytes
+MAX_PENDING_CHARS = 64 * 1024
+
+HREF_RE = re.compile(r'href=["\'](.*?)["\']')
+# The attributes of an HTML anchor, its text is not used.
+ANCHOR_RE = re.compile(r"<a\s([^>]*)>", re.IGNORECASE)
+# PEP 658 & PEP 714: `true` or the hash of the metadata file, `data-core-metadata`
+# replaced `data-dist-info-metadata`.
+CORE_METADATA_RE = re.compile(
+    r'data-(core|dist-info)-metadata=["\']([^"\']*)["\']', re.IGNORECASE
+)
+
+FILENAME_RE = re.compile(
+    r"(?P<filename>"               # Named group 'filename' to capture the entire filename               # noqa: E501
+    r"([a-zA-Z0-9_\-]+)"           # Matches the base project name
+    r"-"                           # Matches the separator before the version
+    r"(?P<version>\d+\.\d+\.\d+)"  # Named group 'version' to capture semantic version (e.g., '2.32.3')  # noqa: E501
+    r"([^\s]*?)"                   # Optionally matches additional tags (e.g., '-py3-none-any')          # noqa: E501
+    r"\."                          # Matches the dot before the file extension
+    r"(?P<extension>"              # Named group 'extension' to capture file extensions                  # noqa: E501
+    r"tar\.gz|"                    # Matches '.tar.gz'
+    r"whl"                         # Matches '.whl'
+    r"))"
+)
+
+SHA256_RE = re.compile(r"^[a-fA-F0-9]{64}$")
+
+# PEP 691 - JSON-based Simple API for Python Package Indexes
+SIMPLE_JSON_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+SIMPLE_HTML_CONTENT_TYPE = "application/vnd.pypi.simple.v1+html"
+SIMPLE_ACCEPT_HEADER = (
+    f"{SIMPLE_JSON_CONTENT_TYPE}, "
+    f"{SIMPLE_HTML_CONTENT_TYPE};q=0.2, "
+    "text/html;q=0.01"
+)
 
-class PackageCandidate(typing.NamedTuple):
-    filename: str
-    version: Version
-    extension: str        # One of [`tar.gz`, `whl`]
-    filehash: str | None  # optional sha256 value
 
+FILETYPE_ORDER = {
+    "tar.gz": 0,  # sdist
+    "whl": 1,     # wheel
+}
 
-def list_candidates(package_name, index_url):
+
+class PackageCandidate:
+    """
+    A file of a package found on the index.
+
+    The `Version` object is only built when `version` is first accessed. Ordering
+    candidates relies on `release` instead, a tuple of integers which orders like
+    `Version` for the final releases (`X.Y.Z`) matched by `FILENAME_RE`.
     """
-    Query a package index for available versions.
+
+    __slots__ = [
+        "_release",
+        "_version",
+        "core_metadata",
+        "extension",
+        "filehash",
+        "filename",
+        "url",
+        "version_str",
+    ]
+
+    def __init__(
+        self,
+        filename: str,
+        version: Version | str,
+        extension: str,             # One of [`tar.gz`, `whl`]
+        filehash: str | None,       # optional sha256 value
+        url: str | None = None,     # absolute URL of the file, without fragment
+        core_metadata: bool = False,  # PEP 658 metadata available at `{url}.metadata`
+    ) -> None:
+        self.filename = filename
+        self.extension = extension
+        self.filehash = filehash
+        self.url = url
+        self.core_metadata = core_metadata
+
+        if isinstance(version, Version):
+            self._version = version
+            self.version_str = str(version)
+        else:
+            self._version = None
+            self.version_str = version
+
+        self._release = None
+
+    @property
+    def version(self) -> Version:
+        if self._version is None:
+            self._version = Version(self.version_str)
+        return self._version
+
+    @property
+    def release(self) -> tuple[int, ...]:
+        if self._release is None:
+            try:
+                release = tuple(map(int, self.version_str.split(".")))
+            except ValueError:
+                # Not a final release: only its release segment is used.
+                release = self.version.release
+
+            # Trailing zeros are not significant: `1.0 == 1.0.0`
+            while len(release) > 1 and release[-1] == 0:
+                release = release[:-1]
+            self._release = release
+
+        return self._release
+
+    @property
+    def sort_key(self) -> tuple[tuple[int, ...], int]:
+        return (self.release, FILETYPE_ORDER[self.extension])
+
+    def _astuple(self) -> tuple:
+        return (
+            self.filename,
+            self.version,
+            self.extension,
+            self.filehash,
+            self.url,
+            self.core_metadata,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PackageCandidate):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __hash__(self) -> int:
+        return hash((self.filename, self.url))
+
+    def __repr__(self) -> str:
+        return (
+            f"PackageCandidate(filename={self.filename!r}, "
+            f"version={self.version_str!r}, extension={self.extension!r}, "
+            f"filehash={self.filehash!r}, url={self.url!r}, "
+            f"core_metadata={self.core_metadata!r})"
+        )
+
+
+class ConnectionStats(typing.NamedTuple):
+    requests: int  # HTTP requests sent, including retries
+    connections: int  # TCP (and TLS) connections opened
+
+    @property
+    def reused(self) -> int:
+        return self.requests - self.connections
+
+
+class NetworkSettings(typing.NamedTuple):
+    """
+    The proxies and CA bundle of the HTTP requests, which `requests` otherwise
+    reads from `os.environ`, see `from_environ`.
+    """
+
+    proxies: tuple[tuple[str, str], ...]  # (`http`, `https` or `all`, proxy URL)
+    no_proxy: tuple[str, ...]  # hosts and domains reached without proxy
+    ca_bundle: str | None
+
+    @classmethod
+    def from_environ(cls, env: typing.Mapping[str, str]) -> "NetworkSettings":
+        """
+        Read the settings from the same environment variables as `requests`:
+        `<scheme>_proxy`, `all_proxy` and `no_proxy` (lowercase first), and
+        `REQUESTS_CA_BUNDLE` or `CURL_CA_BUNDLE`.
+        """
+
+        def get(name: str) -> str | None:
+            return env.get(name) or env.get(name.upper())
+
+        return cls(
+            proxies=tuple(
+                (scheme, proxy)
+                for scheme in ("http", "https", "all")
+                if (proxy := get(f"{scheme}_proxy"))
+            ),
+            no_proxy=tuple(
+                host.lstrip(".")
+                for host in (get("no_proxy") or "").replace(" ", "").split(",")
+                if host
+            ),
+            ca_bundle=env.get("REQUESTS_CA_BUNDLE") or env.get("CURL_CA_BUNDLE"),
+        )
+
+    def get_proxies(self, url: str) -> dict[str, str]:
+        hostname = urlparse(url).hostname or ""
+        if any(
+            host in ("*", hostname) or hostname.endswith(f".{host}")
+            for host in self.no_proxy
+        ):
+            return {}
+        return dict(self.proxies)
+
+
+class IndexSession:
+    """
+    Pooled HTTP session used to access package indexes.
+
+    Connections are kept alive and reused across requests (and threads), which
+    saves the TCP and TLS handshakes. Transient failures (connection errors,
+    timeouts and `RETRY_STATUS_CODES`) are retried with exponential backoff.
+
+    The index pages are queried by an `AsyncIndexSession` with the same
+    settings, on an event loop of the session running in a background thread,
+    see `run_async`. `get` sends the other requests (files, metadata) with
+    `requests`.
+
     Args:
-        package_name (str): The name of the package to query.
-        index_url (str): The URL of the package index. Defaults to PyPI's Simple Index.
-    Returns:
-        list[dict]: List of available versions with metadata.
+        pool_size (int): Maximum number of connections kept alive per host.
+        max_retries (int): Maximum number of retries per request.
+        backoff_factor (float): Backoff factor between retries in seconds.
+        connect_timeout (float): Timeout to establish a connection in seconds.
+        read_timeout (float): Timeout between two bytes received in seconds.
+        network (NetworkSettings | None): The proxies and CA bundle to use,
+            instead of those of `os.environ`.
     """
-    package_url = f"{index_url.rstrip('/')}/{package_name}/"
-    logger.info(f"Querying `{package_url}` for package `{package_name}`")
 
-    try:
-        response = requests.get(package_url, timeout=10)
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        network: NetworkSettings | None = None,
+    ) -> None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.network = network
+
+        self._async_settings = {
+            "pool_size": pool_size,
+            "max_retries": max_retries,
+            "backoff_factor": backoff_factor,
+            "connect_timeout": connect_timeout,
+            "read_timeout": read_timeout,
+            "network": network,
+        }
+        self._loop_lock = threading.Lock()
+        self._loop = None  # started by the first `run_async`
+        self._loop_thread = None
+        self._async_session = None
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+
+        self._session = requests.Session()
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+        if network is not None:
+            self._session.trust_env = False
+            self._session.verify = network.ca_bundle or True
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        kwargs.setdefault("timeout", self.timeout)
+        if self.network is not None:
+            kwargs.setdefault("proxies", self.network.get_proxies(url))
+        return self._session.get(url, **kwargs)
+
+    def run_async(
+        self, coroutine_function: "Callable[[AsyncIndexSession], Awaitable]"
+    ) -> typing.Any:
+        """
+        Run a coroutine on the event loop of the session and wait for its result.
+        Can be called from several threads at once.
+
+        Args:
+            coroutine_function (Callable[[AsyncIndexSession], Awaitable]):
+                Creates the coroutine, from the asyncio session to use.
+
+        Returns:
+            Any: The result of the coroutine.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                from mockpip.async_repository import AsyncIndexSession
 
-        match response.status_code:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="mockpip-index", daemon=True
+                )
+                self._loop_thread.start()
+                self._async_session = AsyncIndexSession(**self._async_settings)
+            loop = self._loop
+            async_session = self._async_session
+
+        future = asyncio.run_coroutine_threadsafe(
+            coroutine_function(async_session), loop
+        )
+        try:
+            return future.result()
+        except BaseException:
+            # e.g. `KeyboardInterrupt` while waiting.
+            future.cancel()
+            raise
+
+    def stats(self) -> ConnectionStats:
+        """
+        Returns:
+            ConnectionStats: The number of requests sent and connections opened
+                by the connection pools currently alive.
+        """
+        pools = self._adapter.poolmanager.pools
+        conn_pools = [
+            conn_pool
+            for key in pools.keys()  # noqa: SIM118
+            if (conn_pool := pools.get(key)) is not None
+        ]
+        async_stats = (
+            self._async_session.stats()
+            if self._async_session is not None
+            else ConnectionStats(requests=0, connections=0)
+        )
+
+        return ConnectionStats(
+            requests=sum(conn_pool.num_requests for conn_pool in conn_pools)
+            + async_stats.requests,
+            connections=sum(conn_pool.num_connections for conn_pool in conn_pools)
+            + async_stats.connections,
+        )
+
+    def close(self) -> None:
+        """
+        Close the connections and stop the event loop, the session can still
+        be used afterwards.
+        """
+        self._session.close()
+
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+            thread, self._loop_thread = self._loop_thread, None
+            async_session, self._async_session = self._async_session, None
+
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(async_session.aclose(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+@functools.cache
+def get_default_session() -> IndexSession:
+    return IndexSession()
+
+
+class IndexQuery:
+    """
+    Lookup of a package on an index, independent of the HTTP transport.
+
+    Driven by `query_index_async`: unless `result` is already known
+    (unsupported requirement, fresh cache entry, offline mode), the transport
+    sends `request_headers()` to `package_url`, hands the status and headers
+    of the response over to `handle_response()`, and streams the body to the
+    returned reader, if any. Transport errors are reported with `fail()`.
+
+    Args:
+        package_name (str): The name of the package to query, optionally with a
+            PEP 508 version specifier (e.g., 'requests>=2.0.0').
+        index_url (str): The URL of the package index.
+        cache (IndexCache | None): Optional on-disk cache of index pages.
+    """
+
+    __slots__ = [
+        "cache",
+        "cache_entry",
+        "error",
+        "package_name",
+        "package_url",
+        "result",
+        "specifier",
+    ]
+
+    def __init__(
+        self, package_name: str, index_url: str, cache: IndexCache | None = None
+    ) -> None:
+        self.cache = cache
+        self.cache_entry = None
+        self.package_name = package_name
+        self.package_url = None
+        self.specifier = None
+        self.result = None
+        self.error = None
+
+        if (requirement := parse_requirement(package_name)) is None:
+            self.result = []
+            return
+
+        self.specifier = requirement.specifier if requirement.specifier else None
+        self.package_name = canonicalize_name(requirement.name)
+
+        self.package_url = f"{index_url.rstrip('/')}/{self.package_name}/"
+        logger.info(f"Querying `{self.package_url}` for package `{self.package_name}`")
+
+        if cache is None:
+            return
+
+        self.cache_entry = cache.get(self.package_url)
+
+        if self.cache_entry is not None and (
+            cache.offline or cache.is_fresh(self.cache_entry)
+        ):
+            logger.info(f"Using cached package data for `{self.package_url}`")
+            self.result = self._parse_cache_entry()
+
+        elif cache.offline:
+            logger.error(f"Offline mode: `{self.package_url}` is not in the cache ...")
+            self.result = []
+            self.error = "not in the cache (offline mode)"
+
+    def _parse_cache_entry(self) -> list[PackageCandidate]:
+        return parse_versions_from_stream(
+            self.cache_entry.iter_chunks(CHUNK_SIZE),
+            content_type=self.cache_entry.content_type,
+            base_url=self.package_url,
+            sort=False,
+            specifier=self.specifier,
+        )
+
+    def request_headers(self) -> dict[str, str]:
+        return {
+            "Accept": SIMPLE_ACCEPT_HEADER,
+            **IndexCache.conditional_headers(self.cache_entry),
+        }
+
+    def handle_response(
+        self, status_code: int, headers: typing.Mapping[str, str]
+    ) -> "IndexPageReader | None":
+        """
+        Args:
+            status_code (int): The HTTP status of the response.
+            headers (Mapping[str, str]): The headers of the response.
+
+        Returns:
+            IndexPageReader | None: Receives the body of the page, `None` if the
+                body is not needed, `result` is then set.
+        """
+        match status_code:
 
             case 200:
-                logger.info(f"Successfully fetched package data from `{package_url}`")
-                return parse_versions_from_index(response.text)
+                logger.info(
+                    f"Successfully fetched package data from `{self.package_url}`"
+                )
+                return IndexPageReader(
+                    content_type=headers.get("Content-Type"),
+                    base_url=self.package_url,
+                    specifier=self.specifier,
+                    cache_writer=(
+                        self.cache.open_writer(self.package_url, headers)
+                        if self.cache is not None
+                        else None
+                    ),
+                )
+
+            case 304 if self.cache_entry is not None:
+                logger.info(f"Package data from `{self.package_url}` is up to date")
+                self.cache_entry = self.cache.revalidate(self.cache_entry, headers)
+                self.result = self._parse_cache_entry()
 
             case 404:
                 logger.info(
-                    f"No candidate found for `{package_name}` from `{package_url}`"
+                    f"No candidate found for `{self.package_name}` "
+                    f"from `{self.package_url}`"
                 )
+                self.result = []
 
             case _:
                 logger.error(
-                    f"Failed to fetch package data from {package_url} "
-                    f"(HTTP {response.status_code})"
+                    f"Failed to fetch package data from {self.package_url} "
+                    f"(HTTP {status_code})"
                 )
+                self.result = []
+                self.error = f"HTTP {status_code}"
+
+        return None
+
+    def fail(self, error: str) -> None:
+        """
+        Record a transport error (connection error, timeout, ...).
+        """
+        self.result = []
+        self.error = error
+
+
+class IndexPageReader:
+    """
+    Receives the body of an index page as it is downloaded.
+
+    The page is parsed as the chunks are fed and stored in the cache once fully
+    received. Used as a context manager, a partially received page is discarded
+    on error.
+
+    Args:
+        content_type (str | None): The `Content-Type` of the page.
+        base_url (str | None): The URL relative file URLs are resolved against.
+        specifier (SpecifierSet | None): If provided, only the candidates whose
+            version satisfies it are returned.
+        cache_writer (IndexCacheWriter | None): Stores the page in the cache.
+    """
+
+    __slots__ = ["_candidates", "_parser", "cache_writer", "specifier"]
+
+    def __init__(
+        self,
+        content_type: str | None = None,
+        base_url: str | None = None,
+        specifier: SpecifierSet | None = None,
+        cache_writer: "IndexCacheWriter | None" = None,
+    ) -> None:
+        self._parser = IndexPageParser(content_type=content_type, base_url=base_url)
+        self._candidates = []
+        self.specifier = specifier
+        self.cache_writer = cache_writer
+
+    def feed(self, chunk: bytes) -> None:
+        if self.cache_writer is not None:
+            self.cache_writer.write(chunk)
+        self._candidates.extend(self._parser.feed(chunk))
+
+    def close(self) -> list[PackageCandidate]:
+        """
+        Returns:
+            list[PackageCandidate]: The candidates in page order.
+        """
+        self._candidates.extend(self._parser.close())
+        if self.cache_writer is not None:
+            self.cache_writer.commit()
+            self.cache_writer = None
+
+        if self.specifier is not None:
+            return list(filter_candidates(self._candidates, self.specifier))
+        return self._candidates
+
+    def abort(self) -> None:
+        if self.cache_writer is not None:
+            self.cache_writer.abort()
+            self.cache_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+
+
+class IndexResponse(typing.NamedTuple):
+    index_url: str
+    candidates: list[PackageCandidate]
+    elapsed: float  # seconds spent querying the index
+    error: str | None  # `None` if the index answered, even without candidate
+
+
+class IndexStatsEntry(typing.NamedTuple):
+    index_url: str
+    queries: int
+    errors: int
+    total_latency: float  # seconds
+    max_latency: float  # seconds
+    wins: int  # `race` strategy: number of queries answered by this index
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.queries if self.queries else 0.0
+
+
+class IndexStats:
+    """
+    Latency and error statistics of each index, recorded by `list_candidates`
+    from several threads, to spot slow or failing mirrors.
+    """
+
+    __slots__ = ["_entries", "_lock"]
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _get(self, index_url: str) -> IndexStatsEntry:
+        return self._entries.get(
+            index_url,
+            IndexStatsEntry(
+                index_url=index_url,
+                queries=0,
+                errors=0,
+                total_latency=0.0,
+                max_latency=0.0,
+                wins=0,
+            ),
+        )
+
+    def record(self, response: IndexResponse) -> None:
+        with self._lock:
+            entry = self._get(response.index_url)
+            self._entries[response.index_url] = entry._replace(
+                queries=entry.queries + 1,
+                errors=entry.errors + (response.error is not None),
+                total_latency=entry.total_latency + response.elapsed,
+                max_latency=max(entry.max_latency, response.elapsed),
+            )
+
+    def record_win(self, index_url: str) -> None:
+        with self._lock:
+            entry = self._get(index_url)
+            self._entries[index_url] = entry._replace(wins=entry.wins + 1)
+
+    def summary(self) -> list[IndexStatsEntry]:
+        """
+        Returns:
+            list[IndexStatsEntry]: The statistics of each index, in the order
+                the indexes were first queried.
+        """
+        with self._lock:
+            return list(self._entries.values())
+
+
+def merge_candidates(responses: Iterable[IndexResponse]) -> list[PackageCandidate]:
+    """
+    Merge the candidates found on several indexes, in the order of `responses`.
+
+    A file listed by several indexes is only kept once, from the first index
+    listing it. A file whose sha256 differs between two indexes is kept from
+    both, and reported: the first one still wins the selection.
+
+    Args:
+        responses (Iterable[IndexResponse]): The responses, by index priority.
+
+    Returns:
+        list[PackageCandidate]: The merged candidates.
+    """
+    merged = []
+    seen = {}
+    for response in responses:
+        for candidate in response.candidates:
+            if (previous := seen.get(candidate.filename)) is None:
+                seen[candidate.filename] = (candidate, response.index_url)
+                merged.append(candidate)
+                continue
+
+            previous_candidate, previous_index_url = previous
+            if (
+                previous_candidate.filehash is None
+                or candidate.filehash is None
+                or previous_candidate.filehash == candidate.filehash
+            ):
+                continue
+
+            logger.warning(
+                f"`{candidate.filename}` has a different sha256 on "
+                f"`{response.index_url}` than on `{previous_index_url}`"
+            )
+            merged.append(candidate)
+
+    return merged
+
+
+def list_candidates(
+    package_name,
+    index_url,
+    cache: IndexCache | None = None,
+    session: IndexSession | None = None,
+    extra_index_urls: Iterable[str] = (),
+    index_strategy: str = DEFAULT_INDEX_STRATEGY,
+    stats: IndexStats | None = None,
+):
+    """
+    Query a package index for available versions, with `list_candidates_async`
+    run on the event loop of `session`.
+
+    With `extra_index_urls`, all the indexes are queried concurrently and,
+    depending on `index_strategy`:
+    - `merge`: the candidates of every index are merged, see `merge_candidates`.
+    - `race`: the candidates of the first index answering without error with at
+      least one candidate are used. The slower queries complete in the
+      background until the session is closed, to feed the cache and `stats`.
+
+    Args:
+        package_name (str): The name of the package to query, optionally with a
+            PEP 508 version specifier (e.g., 'requests>=2.0.0'). Only the name is
+            sent to the index, the specifier filters the candidates.
+        index_url (str): The URL of the package index. Defaults to PyPI's Simple Index.
+        cache (IndexCache | None): Optional on-disk cache of index pages.
+        session (IndexSession | None): HTTP session to use. Defaults to a shared
+            module-level session.
+        extra_index_urls (Iterable[str]): Other package indexes, by priority.
+        index_strategy (str): One of `INDEX_STRATEGIES`.
+        stats (IndexStats | None): Receives the latency and errors of each index.
+    Returns:
+        list[PackageCandidate]: The candidates in index order, see
+            `iter_candidates_by_priority` to consume them newest first.
+    """
+    from mockpip.async_repository import list_candidates_async
+
+    if session is None:
+        session = get_default_session()
 
-    except requests.exceptions.Timeout:
-        logger.error(f"Timeout while accessing: `{package_url}` ...")  # noqa: TRY400
+    return session.run_async(
+        lambda async_session: list_candidates_async(
+            package_name,
+            index_url=index_url,
+            cache=cache,
+            session=async_session,
+            extra_index_urls=extra_index_urls,
+            index_strategy=index_strategy,
+            stats=stats,
+        )
+    )
+
+
+class IndexQueryResult(typing.NamedTuple):
+    package_name: str
+    candidates: list[PackageCandidate]
+    elapsed: float  # seconds spent querying the index
+
+
+def list_candidates_batch(
+    package_names: list[str],
+    index_url: str,
+    cache: IndexCache | None = None,
+    session: IndexSession | None = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    extra_index_urls: Iterable[str] = (),
+    index_strategy: str = DEFAULT_INDEX_STRATEGY,
+    stats: IndexStats | None = None,
+) -> list[IndexQueryResult]:
+    """
+    Query a package index for several packages concurrently, with
+    `list_candidates_batch_async` run on the event loop of `session`.
+
+    Args:
+        package_names (list[str]): The names of the packages to query.
+        index_url (str): The URL of the package index.
+        cache (IndexCache | None): Optional on-disk cache of index pages.
+        session (IndexSession | None): HTTP session shared by all the queries.
+        max_workers (int): Maximum number of packages queried concurrently.
+        extra_index_urls (Iterable[str]): Other package indexes, by priority.
+        index_strategy (str): One of `INDEX_STRATEGIES`, see `list_candidates`.
+        stats (IndexStats | None): Receives the latency and errors of each index.
 
+    Returns:
+        list[IndexQueryResult]: One result per package, in the input order.
+    """
+    from mockpip.async_repository import list_candidates_batch_async
+
+    if session is None:
+        session = get_default_session()
+
+    return session.run_async(
+        lambda async_session: list_candidates_batch_async(
+            package_names,
+            index_url=index_url,
+            cache=cache,
+            session=async_session,
+            extra_index_urls=extra_index_urls,
+            index_strategy=index_strategy,
+            stats=stats,
+            max_concurrency=max_workers,
+        )
+    )
+
+
+def fetch_core_metadata(
+    candidate: PackageCandidate,
+    cache: IndexCache | None = None,
+    session: IndexSession | None = None,
+) -> str | None:
+    """
+    Fetch the core metadata of a distribution served next to it (PEP 658).
+
+    Metadata files never change once published, so a cached copy is always used.
+    It is cached under the sha256 of the distribution when the index publishes
+    it, the same file having the same metadata on every index and mirror.
+
+    Args:
+        candidate (PackageCandidate): The distribution, its `url` must be set.
+        cache (IndexCache | None): Optional on-disk cache.
+        session (IndexSession | None): HTTP session to use. Defaults to a shared
+            module-level session.
+
+    Returns:
+        str | None: The content of the `METADATA` file, `None` if unavailable.
+    """
+    import requests
+
+    if candidate.url is None or not candidate.core_metadata:
+        return None
+
+    metadata_url = f"{candidate.url.partition('#')[0]}.metadata"
+    cache_key = (
+        f"sha256:{candidate.filehash}.metadata"
+        if candidate.filehash is not None
+        else metadata_url
+    )
+
+    if cache is not None and (cache_entry := cache.get(cache_key)) is not None:
+        return cache_entry.read().decode("utf-8", errors="replace")
+
+    if cache is not None and cache.offline:
+        logger.error(f"Offline mode: `{metadata_url}` is not in the cache ...")
+        return None
+
+    if session is None:
+        session = get_default_session()
+
+    try:
+        response = session.get(metadata_url)
     except requests.RequestException as e:
-        logger.error(f"Error connecting to {package_url}: {e}")  # noqa: TRY400
+        logger.error(f"Error connecting to {metadata_url}: {e}")  # noqa: TRY400
+        return None
+
+    if response.status_code != 200:  # noqa: PLR2004
+        logger.debug(
+            f"Core metadata unavailable at `{metadata_url}` "
+            f"(HTTP {response.status_code})"
+        )
+        return None
 
-    return []
+    if cache is not None:
+        cache.store(cache_key, response.content, response.headers)
+
+    return response.content.decode("utf-8", errors="replace")
 
 
 def extract_href_links(html_content):
@@ -68,85 +896,413 @@ def extract_href_links(html_content):
     Returns:
         list[str]: A list of href URLs found in the HTML content.
     """
-    # Regular expression to match href attributes
-    href_pattern = r'href=["\'](.*?)["\']'
-    return re.findall(href_pattern, html_content)
+    return HREF_RE.findall(html_content)
+
 
+def resolve_url(base_url: str, url: str) -> str:
+    # `urljoin` is comparatively slow, skip it for the common absolute URLs.
+    if url.startswith(("https://", "http://")):
+        return url
+    return urljoin(base_url, url)
 
-def extract_details_from_url(url):
+
+def extract_details_from_url(url, base_url=None, core_metadata=False):
     """
     Extracts filename, version, extension, and file hash from a given URL.
 
     Args:
         url (str): The URL to parse.
+        base_url (str | None): If provided, relative URLs are resolved against it
+            and the resulting URL is stored in the candidate.
+        core_metadata (bool): Whether the index serves the core metadata of the
+            file (PEP 658).
 
     Returns:
         dict: A dictionary with extracted components.
     """
-    # Regex pattern to match the required components
-    pattern = (
-        r"(?P<filename>"               # Named group 'filename' to capture the entire filename               # noqa: E501
-        r"([a-zA-Z0-9_\-]+)"           # Matches the base project name
-        r"-"                           # Matches the separator before the version
-        r"(?P<version>\d+\.\d+\.\d+)"  # Named group 'version' to capture semantic version (e.g., '2.32.3')  # noqa: E501
-        r"([^\s]*?)"                   # Optionally matches additional tags (e.g., '-py3-none-any')          # noqa: E501
-        r"\."                          # Matches the dot before the file extension
-        r"(?P<extension>"              # Named group 'extension' to capture file extensions                  # noqa: E501
-        r"tar\.gz|"                    # Matches '.tar.gz'
-        r"whl"                         # Matches '.whl'
-        r"))"
-    )
+    url, _, fragment = url.partition("#")
+    path = url.partition("?")[0]
 
-    # Parse the URL
-    parsed_url = urlparse(url)
-    filename_match = re.search(pattern, parsed_url.path)
+    # Only the last path segment can hold the filename
+    filename_match = FILENAME_RE.search(path, path.rfind("/") + 1)
 
     if not filename_match:
         raise ValueError("Improper URL - Does not match a known python package.")
 
     # Extract hash from the fragment if present
-    query_hash = parse_qs(parsed_url.fragment)
-    filehash = query_hash.get("sha256", [None])[0]
+    filehash = None
+    for param in fragment.split("&"):
+        if param.startswith("sha256="):
+            filehash = param[7:]
+            break
 
     if filehash is not None:
-        sha256_pattern = r"^[a-fA-F0-9]{64}$"
         # if the hash is not a valid sha256 value, drop the value and ignore
-        filehash = filehash if re.match(sha256_pattern, filehash) else None
+        filehash = filehash if SHA256_RE.match(filehash) else None
 
     return PackageCandidate(
         filename = filename_match.group("filename"),
-        version = Version(filename_match.group("version")),
+        version = filename_match.group("version"),
         extension = filename_match.group("extension"),
         filehash = filehash,
+        url = resolve_url(base_url, url) if base_url is not None else None,
+        core_metadata = core_metadata,
     )
 
 
+def has_core_metadata(attributes: str) -> bool:
+    """
+    Args:
+        attributes (str): The attributes of an anchor of an HTML index page.
 
-def parse_versions_from_index(html_content):
+    Returns:
+        bool: Whether the anchor declares the core metadata of its file
+            (PEP 658), `data-core-metadata` taking precedence (PEP 714).
     """
-    Parse versions and file types of a package from the given HTML content.
+    values = {
+        match.group(1).lower(): match.group(2)
+        for match in CORE_METADATA_RE.finditer(attributes)
+    }
+    value = values.get("core", values.get("dist-info"))
+    return value is not None and value.lower() != "false"
+
+
+def extract_details_from_json_file(file_info, base_url=None):
+    """
+    Extracts filename, version, extension, and file hash from a PEP 691 file entry.
 
     Args:
-        html_content (str): The HTML content of the index page.
+        file_info (dict): An entry of the `files` list of a JSON index page.
+        base_url (str | None): The URL relative file URLs are resolved against.
 
     Returns:
-        list[dict]: A list of dictionaries with 'version' and 'file' keys.
+        PackageCandidate: The extracted candidate.
+    """
+    filename_match = FILENAME_RE.search(file_info.get("filename", ""))
+
+    if not filename_match:
+        raise ValueError("Improper file - Does not match a known python package.")
+
+    filehash = file_info.get("hashes", {}).get("sha256")
+    if filehash is not None:
+        # if the hash is not a valid sha256 value, drop the value and ignore
+        filehash = filehash if SHA256_RE.match(filehash) else None
+
+    url = file_info.get("url")
+    if url is not None and base_url is not None:
+        url = resolve_url(base_url, url)
+
+    # PEP 714 renamed `dist-info-metadata` to `core-metadata`
+    core_metadata = file_info.get(
+        "core-metadata", file_info.get("dist-info-metadata", False)
+    )
+
+    return PackageCandidate(
+        filename = filename_match.group("filename"),
+        version = filename_match.group("version"),
+        extension = filename_match.group("extension"),
+        filehash = filehash,
+        url = url,
+        core_metadata = bool(core_metadata),
+    )
+
+
+class IndexPageParser:
+    """
+    Push-based parser of an index page: the content is fed chunk by chunk as it
+    is received, e.g. by an asyncio transport, and each call returns the
+    candidates found so far.
+
+    HTML pages are parsed in a single pass, anchor by anchor: only the tail of
+    the current chunk which may hold an incomplete anchor is carried over, and it
+    is dropped once it grows over `MAX_PENDING_CHARS`. The `data-core-metadata`
+    attribute of the anchors is honored (PEP 714). PEP 691 JSON pages are parsed
+    once complete.
+
+    Args:
+        content_type (str | None): The `Content-Type` of the page. PEP 691 JSON
+            pages are parsed as such, anything else is parsed as HTML.
+        base_url (str | None): The URL relative links are resolved against.
     """
 
-    parsed_versions = []
-    for href in extract_href_links(html_content):
+    __slots__ = ["_buffer", "_chunks", "_decoder", "base_url", "is_json"]
+
+    def __init__(
+        self, content_type: str | None = None, base_url: str | None = None
+    ) -> None:
+        self.base_url = base_url
+        self.is_json = is_json_content_type(content_type)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._chunks = []
+
+    def _extract(self, buffer: str) -> tuple[list[PackageCandidate], int]:
+        candidates = []
+        end = 0
+        for anchor_match in ANCHOR_RE.finditer(buffer):
+            end = anchor_match.end()
+            attributes = anchor_match.group(1)
+            if (href_match := HREF_RE.search(attributes)) is None:
+                continue
+            try:
+                candidates.append(
+                    extract_details_from_url(
+                        href_match.group(1),
+                        self.base_url,
+                        core_metadata=(
+                            "metadata" in attributes and has_core_metadata(attributes)
+                        ),
+                    )
+                )
+            except ValueError:
+                continue
+        return candidates, end
+
+    def feed(self, chunk: bytes | str) -> list[PackageCandidate]:
+        """
+        Returns:
+            list[PackageCandidate]: The candidates completed by `chunk`.
+        """
+        if self.is_json:
+            self._chunks.append(chunk)
+            return []
+
+        buffer = self._buffer + (
+            self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        )
+        candidates, end = self._extract(buffer)
+
+        # Keep what may be the beginning of an anchor split across chunks.
+        pending_start = buffer.rfind("<", end)
+        buffer = buffer[pending_start:] if pending_start != -1 else ""
+
+        self._buffer = buffer if len(buffer) <= MAX_PENDING_CHARS else ""
+        return candidates
+
+    def close(self) -> list[PackageCandidate]:
+        """
+        Returns:
+            list[PackageCandidate]: The remaining candidates of the page.
+        """
+        if self.is_json:
+            chunks, self._chunks = self._chunks, []
+            return list(iter_candidates_from_json(chunks, self.base_url))
+
+        buffer, self._buffer = self._buffer + self._decoder.decode(b"", final=True), ""
+        return self._extract(buffer)[0]
+
+
+def iter_candidates_from_chunks(
+    chunks: Iterable[bytes | str],
+    base_url: str | None = None,
+) -> Generator[PackageCandidate]:
+    """
+    Incrementally parse an HTML index page and yield its candidates as they are
+    found, see `IndexPageParser`.
+
+    Args:
+        chunks (Iterable[bytes | str]): The content of the index page.
+        base_url (str | None): The URL relative links are resolved against.
+
+    Yields:
+        PackageCandidate: The candidates in page order.
+    """
+    parser = IndexPageParser(base_url=base_url)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def iter_candidates_from_json(
+    chunks: Iterable[bytes | str],
+    base_url: str | None = None,
+) -> Generator[PackageCandidate]:
+    """
+    Parse a PEP 691 JSON index page and yield its candidates.
+
+    Args:
+        chunks (Iterable[bytes | str]): The content of the index page.
+        base_url (str | None): The URL relative file URLs are resolved against.
+
+    Yields:
+        PackageCandidate: The candidates in page order.
+    """
+    content = b"".join(
+        chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        for chunk in chunks
+    )
+
+    try:
+        files = json.loads(content).get("files", [])
+    except (ValueError, AttributeError):
+        logger.exception("Invalid JSON index page")
+        return
+
+    for file_info in files:
         try:
-            parsed_versions.append(extract_details_from_url(href))
-        except ValueError:
+            yield extract_details_from_json_file(file_info, base_url)
+        except (ValueError, AttributeError):
             continue
 
-    filetype_order = {
-        "tar.gz": 0,  # sdist
-        "whl": 1,     # wheel
-    }
 
-    return sorted(
-        parsed_versions,
-        key=lambda item: (item.version, filetype_order[item.extension]),
-        reverse=True
+def sort_candidates(
+    candidates: Iterable[PackageCandidate],
+) -> list[PackageCandidate]:
+    """
+    Sort candidates from newest to oldest, wheels before sdists.
+    """
+    return sorted(candidates, key=lambda item: item.sort_key, reverse=True)
+
+
+def iter_candidates_by_priority(
+    candidates: Iterable[PackageCandidate],
+) -> Generator[PackageCandidate]:
+    """
+    Lazily yield candidates from newest to oldest, wheels before sdists.
+
+    The candidates are heapified in O(n) and each one is popped in O(log n), so
+    consumers which stop after the newest few candidates never pay for sorting
+    the whole list. Equal candidates are yielded in their input order.
+
+    Args:
+        candidates (Iterable[PackageCandidate]): The candidates in any order.
+
+    Yields:
+        PackageCandidate: The candidates in priority order.
+    """
+    # `heapq` is a min-heap: the release is negated, and terminated by `1` (larger
+    # than any negated value) so that `1.2` still pops before `1.2.1`.
+    heap = [
+        (
+            (*[-part for part in candidate.release], 1),
+            -FILETYPE_ORDER[candidate.extension],
+            idx,
+            candidate,
+        )
+        for idx, candidate in enumerate(candidates)
+    ]
+    heapq.heapify(heap)
+
+    while heap:
+        yield heapq.heappop(heap)[-1]
+
+
+def iter_release_groups(
+    candidates: Iterable[PackageCandidate],
+) -> Generator[list[PackageCandidate]]:
+    """
+    Lazily yield the candidates grouped by release, from newest to oldest.
+
+    The newest release, usually the one installed, is found with a single linear
+    scan. The remaining candidates are only heapified if the consumer asks for
+    older releases.
+
+    Args:
+        candidates (Iterable[PackageCandidate]): The candidates in any order.
+
+    Yields:
+        list[PackageCandidate]: The candidates of one release, wheels first.
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return
+
+    newest = max(candidate.release for candidate in candidates)
+    yield sorted(
+        (candidate for candidate in candidates if candidate.release == newest),
+        key=lambda item: FILETYPE_ORDER[item.extension],
+        reverse=True,
+    )
+
+    for _, group in itertools.groupby(
+        iter_candidates_by_priority(
+            candidate for candidate in candidates if candidate.release != newest
+        ),
+        key=lambda item: item.release,
+    ):
+        yield list(group)
+
+
+def filter_candidates(
+    candidates: Iterable[PackageCandidate],
+    specifier: SpecifierSet,
+) -> Generator[PackageCandidate]:
+    """
+    Lazily drop the candidates whose version does not satisfy `specifier`.
+
+    The specifier is evaluated once per distinct version: index pages usually
+    list several files (sdist, wheels) for each release.
+
+    Args:
+        candidates (Iterable[PackageCandidate]): The candidates to filter.
+        specifier (SpecifierSet): The version specifier to satisfy.
+
+    Yields:
+        PackageCandidate: The candidates satisfying `specifier`.
+    """
+    is_allowed = {}
+    for candidate in candidates:
+        allowed = is_allowed.get(candidate.version_str)
+        if allowed is None:
+            allowed = specifier.contains(candidate.version)
+            is_allowed[candidate.version_str] = allowed
+        if allowed:
+            yield candidate
+
+
+def parse_versions_from_stream(
+    chunks: Iterable[bytes | str],
+    content_type: str | None = None,
+    base_url: str | None = None,
+    sort: bool = True,
+    specifier: SpecifierSet | None = None,
+):
+    """
+    Parse versions and file types of a package from a streamed index page.
+
+    Args:
+        chunks (Iterable[bytes | str]): The content of the index page.
+        content_type (str | None): The `Content-Type` of the page. PEP 691 JSON
+            pages are parsed as such, anything else is parsed as HTML.
+        base_url (str | None): The URL relative file URLs are resolved against.
+        sort (bool): Sort the candidates from newest to oldest. Otherwise they
+            are returned in page order.
+        specifier (SpecifierSet | None): If provided, only the candidates whose
+            version satisfies it are returned.
+
+    Returns:
+        list[PackageCandidate]: The candidates found on the page.
+    """
+    if is_json_content_type(content_type):
+        candidates = iter_candidates_from_json(chunks, base_url)
+    else:
+        candidates = iter_candidates_from_chunks(chunks, base_url)
+
+    if specifier is not None:
+        candidates = filter_candidates(candidates, specifier)
+
+    return sort_candidates(candidates) if sort else list(candidates)
+
+
+def is_json_content_type(content_type: str | None) -> bool:
+    if content_type is None:
+        return False
+    mime_type = content_type.partition(";")[0].strip().lower()
+    return mime_type.startswith("application/vnd.pypi.simple.") and (
+        mime_type.endswith("+json")
     )
+
+
+def parse_versions_from_index(html_content, specifier=None):
+    """
+    Parse versions and file types of a package from the given HTML content.
+
+    Args:
+        html_content (str): The HTML content of the index page.
+        specifier (SpecifierSet | None): If provided, only the candidates whose
+            version satisfies it are returned.
+
+    Returns:
+        list[PackageCandidate]: The candidates sorted from newest to oldest.
+    """
+    return parse_versions_from_stream([html_content], specifier=specifier)
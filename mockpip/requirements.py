@@ -0,0 +1,70 @@
+import logging
+from pathlib import Path
+
+from packaging.requirements import InvalidRequirement
+from packaging.requirements import Requirement
+
+logger = logging.getLogger(__name__)
+
+
+def read_requirements_file(path: str | Path) -> list[str]:
+    """
+    Read the requirements listed in a pip-style requirements file.
+
+    Comments, blank lines and line continuations are handled. Nested files
+    referenced with `-r` / `--requirement` are read recursively, any other
+    option line is ignored.
+
+    Args:
+        path (str | Path): Path to the requirements file.
+
+    Returns:
+        list[str]: The requirement strings in file order.
+    """
+    path = Path(path)
+    requirements = []
+
+    with path.open() as f:
+        content = f.read().replace("\\\n", "")
+
+    for raw_line in content.splitlines():
+        line = raw_line.split(" #", 1)[0].strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if line.startswith(("-r ", "--requirement ", "--requirement=")):
+            nested = line.split("=", 1)[1] if "=" in line else line.split(None, 1)[1]
+            requirements.extend(read_requirements_file(path.parent / nested.strip()))
+            continue
+
+        if line.startswith("-"):
+            logger.warning(f"Ignoring unsupported option in `{path}`: `{line}`")
+            continue
+
+        requirements.append(line)
+
+    return requirements
+
+
+def parse_requirement(requirement: str) -> Requirement | None:
+    """
+    Parse a PEP 508 requirement which can be resolved against a package index.
+
+    Args:
+        requirement (str): The requirement string (e.g., 'requests>=2.0.0').
+
+    Returns:
+        Requirement | None: The parsed requirement, `None` if it is invalid or
+            is a direct URL reference.
+    """
+    try:
+        parsed = Requirement(requirement)
+    except InvalidRequirement as e:
+        logger.error(f"Invalid requirement `{requirement}`: {e}")  # noqa: TRY400
+        return None
+
+    if parsed.url is not None:
+        logger.error(f"Direct URL requirements are not supported: `{requirement}`")
+        return None
+
+    return parsed
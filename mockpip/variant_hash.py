@@ -1,73 +1,623 @@
+import configparser
+import functools
+import hashlib
 import json
+import locale
 import logging
+import os
 import re
+import sys
+import tempfile
+import threading
+import time
+import typing
+from collections import OrderedDict
 from collections.abc import Generator
-from importlib.metadata import entry_points
+from collections.abc import Iterable
+from collections.abc import Mapping
+from concurrent.futures import Future
+from pathlib import Path
 
-from pip._internal.configuration import Configuration
-from pip._internal.exceptions import ConfigurationError
-from pip._internal.exceptions import InvalidWheelFilename
-from pip._internal.exceptions import PipError
-from variantlib.combination import get_combinations
-from variantlib.config import ProviderConfig
-from variantlib.meta import VariantDescription
+from packaging.tags import Tag
+from packaging.tags import parse_tag
+from packaging.tags import sys_tags
+
+from mockpip.cache import EntryPointCache
+from mockpip.cache import PipConfigCache
+from mockpip.cache import ProviderConfigCache
+from mockpip.cache import VariantOrderCache
+from mockpip.cache import get_default_cache_dir
+from mockpip.entry_points import RegisteredEntryPoint
+from mockpip.entry_points import get_entry_points
+from mockpip.entry_points import get_environment_fingerprint
+
+# pip internals and variantlib are only imported on the code paths using them:
+# they account for most of the import time of this module.
+if typing.TYPE_CHECKING:
+    from variantlib.config import ProviderConfig
+    from variantlib.meta import VariantDescription
 
 logger = logging.getLogger(__name__)
 
+# Only the `WheelInfo` fields are capturing groups, in the same order.
+WHEEL_FILE_RE = re.compile(
+    r"""^(?P<name>[^\s-]+)-(?P<ver>[^\s-]*?)
+    (?:(?:-(?P<build>\d[^-]*?))?(?:~(?P<variant_hash>[0-9a-f]{8}))?
+    -(?P<pyver>[^\s-]+)-(?P<abi>[^\s-]+)-(?P<plat>[^\s-]+)
+    \.whl|\.dist-info)$""",
+    re.VERBOSE,
+)
+
+WHEEL_INFO_CACHE_SIZE = 4096
+
+DEFAULT_PLUGIN_TIMEOUT = 10  # seconds
+DEFAULT_PLUGINS_TIMEOUT = 30  # seconds
+
+HOST_PROFILE_FORMAT = 1
+
+PIP_CONFIG_PROVIDER_PRIORITY_KEY = "variantlib.provider_priority"
+# Environment variables used by pip to locate its configuration files.
+PIP_CONFIG_BASENAME = "pip.ini" if sys.platform == "win32" else "pip.conf"
+PIP_CONFIG_ENV_VARS = (
+    "PIP_CONFIG_FILE",
+    "HOME",
+    "XDG_CONFIG_HOME",
+    "XDG_CONFIG_DIRS",
+    "APPDATA",
+    "PROGRAMDATA",
+)
 
-def get_variant_hash_from_wheel(filename: str):
-    wheel_file_re = re.compile(
-        r"""^(?P<namever>(?P<name>[^\s-]+?)-(?P<ver>[^\s-]*?))
-        ((-(?P<build>\d[^-]*?))?(~(?P<variant_hash>[0-9a-f]{8}))?
-        -(?P<pyver>[^\s-]+?)-(?P<abi>[^\s-]+?)-(?P<plat>[^\s-]+?)
-        \.whl|\.dist-info)$""",
-        re.VERBOSE,
-    )
 
-    wheel_info = wheel_file_re.match(filename)
+class WheelInfo(typing.NamedTuple):
+    name: str
+    version: str
+    build: str | None
+    variant_hash: str | None
+    python_tag: str | None  # compressed tag sets, e.g. `py2.py3`
+    abi_tag: str | None
+    platform_tag: str | None
+
+
+@functools.lru_cache(maxsize=WHEEL_INFO_CACHE_SIZE)
+def parse_wheel_filename(filename: str) -> WheelInfo:
+    """
+    Parse the components of a wheel filename.
+
+    The result is memoized: `install` parses the same filenames for every
+    release group it visits and on every run against a cached index page.
+
+    Args:
+        filename (str): The (unquoted) wheel filename.
+
+    Returns:
+        WheelInfo: The components of the filename.
+
+    Raises:
+        InvalidWheelFilename: If `filename` is not a valid wheel filename.
+    """
+    wheel_info = WHEEL_FILE_RE.match(filename)
 
     if not wheel_info:
+        from pip._internal.exceptions import InvalidWheelFilename
+
         raise InvalidWheelFilename(f"{filename} is not a valid wheel filename.")
 
-    return wheel_info.group("variant_hash")
+    return WheelInfo._make(wheel_info.groups())
 
 
-def read_provider_priority_from_pip_config() -> dict[str, int]:
-    try:
-        # Create a Configuration object and load all sources
-        config = Configuration(isolated=False)
-        config.load()  # Loads configuration from all applicable sources
+def parse_wheel_filenames(filenames: Iterable[str]) -> list[WheelInfo]:
+    """
+    Parse a batch of wheel filenames, e.g. all the wheels of an index page.
 
-        # Retrieve and return the merged configuration values
-        # return {key: value for key, value in config.items()}
+    Args:
+        filenames (Iterable[str]): The (unquoted) wheel filenames.
 
-    except PipError:
-        logging.exception("Error while reading PIP configuration")
-        return {}
+    Returns:
+        list[WheelInfo]: The components of each filename, in input order.
 
-    try:
-        provider_priority = config.get_value("variantlib.provider_priority")
-        provider_priority = json.loads(provider_priority)  # str to list[str]
-        if (
-            provider_priority is None
-            or not isinstance(provider_priority, list)
-            or not all(isinstance(provider, str) for provider in provider_priority)
-        ):
+    Raises:
+        InvalidWheelFilename: If any filename is not a valid wheel filename.
+    """
+    return list(map(parse_wheel_filename, filenames))
+
+
+def get_variant_hash_from_wheel(filename: str) -> str | None:
+    return parse_wheel_filename(filename).variant_hash
+
+
+@functools.cache
+def get_supported_tags() -> dict[Tag, int]:
+    """
+    Returns the tags supported by the running interpreter.
+
+    Computed once: `sys_tags()` inspects the interpreter, glibc and the OS.
+
+    Returns:
+        dict[Tag, int]: The supported tags mapped to their priority, `0` being
+            the most specific tag.
+    """
+    return {tag: priority for priority, tag in enumerate(sys_tags())}
+
+
+@functools.lru_cache(maxsize=WHEEL_INFO_CACHE_SIZE)
+def get_tag_priority(
+    python_tag: str | None, abi_tag: str | None, platform_tag: str | None
+) -> int | None:
+    """
+    Rank the (compressed) tag sets of a wheel against the supported tags.
+
+    Args:
+        python_tag (str | None): The python tag set of the wheel, e.g. `py2.py3`.
+        abi_tag (str | None): The ABI tag set of the wheel.
+        platform_tag (str | None): The platform tag set of the wheel.
+
+    Returns:
+        int | None: The priority of the best supported tag of the wheel, lower is
+            better. `None` if the wheel can not be installed on this machine.
+    """
+    if python_tag is None or abi_tag is None or platform_tag is None:
+        return None
+
+    supported_tags = get_supported_tags()
+    return min(
+        (
+            priority
+            for tag in parse_tag(f"{python_tag}-{abi_tag}-{platform_tag}")
+            if (priority := supported_tags.get(tag)) is not None
+        ),
+        default=None,
+    )
+
+
+def get_pip_config_key(env: Mapping[str, str] | None = None) -> str:
+    """
+    Digest of the environment locating the pip configuration files, see
+    `pip._internal.configuration.get_configuration_files`.
+
+    Args:
+        env (Mapping[str, str] | None): The environment. Defaults to `os.environ`.
+    """
+    env = env if env is not None else os.environ
+    return hashlib.sha256(
+        json.dumps([
+            sys.platform,
+            sys.prefix,
+            *(env.get(name) for name in PIP_CONFIG_ENV_VARS),
+        ]).encode()
+    ).hexdigest()[:32]
+
+
+def get_pip_config_files(env: Mapping[str, str] | None = None) -> list[str]:
+    """
+    Locate the pip configuration files, as `pip config` does.
+
+    pip locates them from `os.environ`: the files depending on the environment
+    (`PIP_CONFIG_FILE`, the XDG and home directories) are located here from
+    `env` instead, so that the daemon finds those of its client.
+
+    Args:
+        env (Mapping[str, str] | None): The environment. Defaults to `os.environ`.
+
+    Returns:
+        list[str]: The global, user, site and `PIP_CONFIG_FILE` files in
+            increasing order of priority, empty if `PIP_CONFIG_FILE` is
+            `os.devnull`.
+    """
+    env = env if env is not None else os.environ
+    config_file = env.get("PIP_CONFIG_FILE")
+    if config_file == os.devnull:
+        return []
+
+    home = Path(env.get("HOME") or Path.home())
+    if sys.platform in ("win32", "darwin"):
+        # Not located from the environment on these platforms.
+        from pip._internal.utils import appdirs
+
+        global_dirs = [Path(path) for path in appdirs.site_config_dirs("pip")]
+        user_dir = Path(appdirs.user_config_dir("pip"))
+    else:
+        xdg_config_dirs = env.get("XDG_CONFIG_DIRS", "").strip() or "/etc/xdg"
+        global_dirs = [
+            *(Path(path) / "pip" for path in xdg_config_dirs.split(os.pathsep)),
+            Path("/etc"),
+        ]
+        xdg_config_home = env.get("XDG_CONFIG_HOME", "").strip()
+        user_dir = Path(xdg_config_home or home / ".config") / "pip"
+
+    files = [str(path / PIP_CONFIG_BASENAME) for path in global_dirs]
+    # The user files are ignored when `PIP_CONFIG_FILE` exists.
+    if not (config_file and Path(config_file).exists()):
+        legacy_dir = home / ("pip" if sys.platform == "win32" else ".pip")
+        files.append(str(legacy_dir / PIP_CONFIG_BASENAME))
+        files.append(str(user_dir / PIP_CONFIG_BASENAME))
+    files.append(str(Path(sys.prefix) / PIP_CONFIG_BASENAME))
+    if config_file is not None:
+        files.append(config_file)
+    return files
+
+
+def normalize_pip_config_name(name: str) -> str:
+    return name.lower().replace("_", "-")
+
+
+def read_pip_config_value(files: list[str], key: str) -> str | None:
+    """
+    Read a `section.name` key from the pip configuration files.
+
+    Only the requested key is extracted, the files being parsed with the same
+    rules as pip: option names are case and `_`/`-` insensitive and the last
+    file defining the key wins.
+
+    Args:
+        files (list[str]): The configuration files, in increasing priority.
+        key (str): The key to read, e.g. `variantlib.provider_priority`.
+
+    Returns:
+        str | None: The raw value of the key, `None` if unset.
+
+    Raises:
+        configparser.Error: If a file is not a valid configuration file.
+        UnicodeDecodeError: If a file is not encoded in the locale encoding.
+    """
+    section, _, name = key.partition(".")
+    name = normalize_pip_config_name(name)
+
+    value = None
+    for fname in files:
+        if not Path(fname).exists():
+            continue
+
+        parser = configparser.RawConfigParser()
+        parser.read(fname, encoding=locale.getpreferredencoding(do_setlocale=False))
+        if not parser.has_section(section):
+            continue
+
+        for option, option_value in parser.items(section):
+            if normalize_pip_config_name(option) == name:
+                value = option_value
+
+    return value
+
+
+def read_provider_priority_from_pip_config(
+    config_cache: PipConfigCache | None = None,
+    env: Mapping[str, str] | None = None,
+) -> dict[str, int]:
+    """
+    Read `variantlib.provider_priority` from the pip configuration.
+
+    The configuration files are only located and parsed when the value is not
+    cached, or when any of the files changed since it was cached.
+
+    Args:
+        config_cache (PipConfigCache | None): Cache of the value.
+        env (Mapping[str, str] | None): The environment locating the files.
+            Defaults to `os.environ`.
+
+    Returns:
+        dict[str, int]: The priority of each provider, lower is preferred.
+    """
+    key = get_pip_config_key(env)
+    cache_entry = config_cache.get(key) if config_cache is not None else None
+
+    if cache_entry is not None:
+        provider_priority = cache_entry.value
+
+    else:
+        files = get_pip_config_files(env)
+        # Captured before reading: a file modified meanwhile invalidates the
+        # cached value.
+        mtimes = PipConfigCache.get_mtimes(files)
+        try:
+            provider_priority = read_pip_config_value(
+                files, PIP_CONFIG_PROVIDER_PRIORITY_KEY
+            )
+        except (configparser.Error, UnicodeDecodeError):
+            logging.exception("Error while reading PIP configuration")
             return {}
 
-        return {item: idx for idx, item in enumerate(provider_priority)}
+        if config_cache is not None:
+            config_cache.store(key, mtimes, provider_priority)
 
-    except ConfigurationError:
+    if provider_priority is None:
         # the user didn't set a special configuration
         logging.warning("No Variant Provider prioritization was set inside `pip.conf`.")
         return {}
 
+    try:
+        provider_priority = json.loads(provider_priority)  # str to list[str]
+    except ValueError:
+        logging.warning(
+            f"Invalid `{PIP_CONFIG_PROVIDER_PRIORITY_KEY}` inside `pip.conf`, "
+            "expected a JSON list of provider names."
+        )
+        return {}
 
-def get_variant_hashes_by_priority(
+    if (
+        provider_priority is None
+        or not isinstance(provider_priority, list)
+        or not all(isinstance(provider, str) for provider in provider_priority)
+    ):
+        return {}
+
+    return {item: idx for idx, item in enumerate(provider_priority)}
+
+
+def provider_config_to_dict(provider_cfg: "ProviderConfig") -> dict:
+    return {
+        "provider": provider_cfg.provider,
+        "configs": [
+            {"key": key_cfg.key, "values": list(key_cfg.values)}
+            for key_cfg in provider_cfg.configs
+        ],
+    }
+
+
+def provider_config_from_dict(data: dict) -> "ProviderConfig":
+    from variantlib.config import KeyConfig
+    from variantlib.config import ProviderConfig
+
+    return ProviderConfig(
+        provider=data["provider"],
+        configs=[
+            KeyConfig(key=key_cfg["key"], values=key_cfg["values"])
+            for key_cfg in data["configs"]
+        ],
+    )
+
+
+def get_plugin_fingerprint(plugin_instance) -> str | None:
+    """
+    Returns the fingerprint optionally supplied by a plugin.
+
+    Plugins can implement `fingerprint()` to return a cheap digest of what their
+    `run()` depends on (e.g., a driver version). Their cached config is
+    recomputed whenever it changes.
+    """
+    get_fingerprint = getattr(plugin_instance, "fingerprint", None)
+    if not callable(get_fingerprint):
+        return None
+
+    fingerprint = get_fingerprint()
+    return str(fingerprint) if fingerprint is not None else None
+
+
+def load_provider_config(
+    plugin: RegisteredEntryPoint,
+    plugin_cache: ProviderConfigCache | None = None,
+    refresh: bool = False,
+    cancelled: threading.Event | None = None,
+) -> "ProviderConfig | None":
+    """
+    Run a variant plugin, or reuse its config cached by a previous run.
+
+    Args:
+        plugin (RegisteredEntryPoint): The `variantlib.plugins` entry point.
+        plugin_cache (ProviderConfigCache | None): Cache of plugin results.
+        refresh (bool): Ignore the cached config and run the plugin.
+        cancelled (threading.Event | None): Set when the result is no longer
+            awaited (the plugin timed out): it is then not cached either.
+
+    Returns:
+        ProviderConfig | None: The config of the plugin, `None` on failure.
+    """
+    plugin_version = plugin.dist.version if plugin.dist is not None else None
+
+    cache_entry = (
+        plugin_cache.get(plugin.name, plugin_version)
+        if plugin_cache is not None and not refresh
+        else None
+    )
+
+    # Entries without fingerprint are used without even loading the plugin.
+    if cache_entry is not None and cache_entry.fingerprint is None:
+        logger.info(f"Using cached config of plugin: {plugin.name} - v{plugin_version}")
+        return provider_config_from_dict(cache_entry.config)
+
+    try:
+        logger.info(f"Loading plugin: {plugin.name} - v{plugin_version}")
+        plugin_class = plugin.load()  # Dynamically load the plugin class
+        plugin_instance = plugin_class()  # Instantiate the plugin
+        fingerprint = get_plugin_fingerprint(plugin_instance)
+
+        if cache_entry is not None and cache_entry.fingerprint == fingerprint:
+            logger.info(f"Using cached config of plugin: {plugin.name}")
+            return provider_config_from_dict(cache_entry.config)
+
+        provider_cfg = plugin_instance.run()  # Call the `run` method of the plugin
+
+    except Exception:
+        logging.exception("An unknown error happened - Ignoring plugin")
+        return None
+
+    from variantlib.config import ProviderConfig
+
+    if not isinstance(provider_cfg, ProviderConfig):
+        logging.error(
+            f"Provider: {plugin.name} returned an unexpected type: "
+            f"{type(provider_cfg)} - Expected: `ProviderConfig`. Ignoring..."
+        )
+        return None
+
+    if cancelled is not None and cancelled.is_set():
+        logger.warning(
+            f"Plugin: {plugin.name} answered after its timeout - Not caching its "
+            "config"
+        )
+
+    elif plugin_cache is not None:
+        plugin_cache.store(
+            plugin.name,
+            plugin_version,
+            fingerprint=fingerprint,
+            config=provider_config_to_dict(provider_cfg),
+        )
+
+    return provider_cfg
+
+
+class PluginResult(typing.NamedTuple):
+    plugin_name: str
+    provider_cfg: "ProviderConfig | None"
+    elapsed: float | None  # seconds, `None` if the plugin timed out
+
+
+# The thread of the last run of each plugin, by name: a plugin still running
+# after its timeout is not started again (e.g. by the next request served by the
+# daemon) until that run returns.
+_plugin_threads: dict[str, threading.Thread] = {}
+_plugin_threads_lock = threading.Lock()
+
+
+def _submit_plugin(
+    plugin: RegisteredEntryPoint,
+    plugin_cache: ProviderConfigCache | None,
+    refresh: bool,
+    cancelled: threading.Event,
+) -> Future | None:
+    # A dedicated daemon thread rather than a `ThreadPoolExecutor`: the workers
+    # of an executor are joined at interpreter exit, so a hung plugin would
+    # still block the install after it timed out.
+    future = Future()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        start_t = time.perf_counter()
+        try:
+            provider_cfg = load_provider_config(
+                plugin, plugin_cache=plugin_cache, refresh=refresh, cancelled=cancelled
+            )
+        except BaseException as e:  # noqa: BLE001
+            future.set_exception(e)
+        else:
+            future.set_result((provider_cfg, time.perf_counter() - start_t))
+
+    with _plugin_threads_lock:
+        previous = _plugin_threads.get(plugin.name)
+        if previous is not None and previous.is_alive():
+            return None
+
+        thread = threading.Thread(
+            target=target, name=f"mockpip-plugin-{plugin.name}", daemon=True
+        )
+        _plugin_threads[plugin.name] = thread
+        thread.start()
+
+    return future
+
+
+def run_plugins(
+    plugins: list[RegisteredEntryPoint],
+    plugin_cache: ProviderConfigCache | None = None,
+    refresh: bool = False,
+    plugin_timeout: float = DEFAULT_PLUGIN_TIMEOUT,
+    timeout: float = DEFAULT_PLUGINS_TIMEOUT,
+) -> list[PluginResult]:
+    """
+    Run the variant plugins concurrently and collect their `ProviderConfig`.
+
+    A plugin which does not answer within `plugin_timeout` seconds, or before
+    `timeout` seconds elapsed for the whole batch, is dropped with a warning.
+    Its config is not cached if it answers later, and it is not run again
+    while that run is still going on.
+
+    Args:
+        plugins (list[RegisteredEntryPoint]): The plugins, in priority order.
+        plugin_cache (ProviderConfigCache | None): Cache of plugin results.
+        refresh (bool): Ignore the cached configs and run the plugins.
+        plugin_timeout (float): Maximum number of seconds per plugin.
+        timeout (float): Maximum number of seconds for all the plugins.
+
+    Returns:
+        list[PluginResult]: The result of each plugin, in priority order.
+    """
+    start_t = time.perf_counter()
+    deadline = start_t + min(plugin_timeout, timeout)
+
+    # Set once the deadline is over: the late plugins don't cache their config.
+    cancelled = threading.Event()
+    futures = [
+        _submit_plugin(plugin, plugin_cache, refresh, cancelled) for plugin in plugins
+    ]
+
+    results = []
+    for plugin, future in zip(plugins, futures, strict=True):
+        if future is None:
+            logger.warning(
+                f"Plugin: {plugin.name} is still running since it timed out, it "
+                "may be hung - Ignoring plugin"
+            )
+            results.append(PluginResult(plugin.name, None, None))
+            continue
+
+        try:
+            provider_cfg, elapsed = future.result(
+                timeout=max(deadline - time.perf_counter(), 0)
+            )
+        except TimeoutError:
+            cancelled.set()
+            logger.warning(
+                f"Plugin: {plugin.name} did not answer within "
+                f"{min(plugin_timeout, timeout):.1f} s - Ignoring plugin"
+            )
+            provider_cfg, elapsed = None, None
+        except Exception:
+            logger.exception(f"Plugin: {plugin.name} failed - Ignoring plugin")
+            provider_cfg, elapsed = None, None
+
+        results.append(PluginResult(plugin.name, provider_cfg, elapsed))
+
+    logger.info(
+        f"Ran {len(plugins)} plugin(s) in "
+        f"{(time.perf_counter() - start_t) * 1e3:.1f} ms"
+    )
+    for result in results:
+        latency = (
+            f"{result.elapsed * 1e3:9.1f} ms"
+            if result.elapsed is not None
+            else "  timeout"
+        )
+        logger.info(f"Plugin: {result.plugin_name:<40} {latency}")
+
+    return results
+
+
+def get_provider_configs(
     provider_priority_dict: dict[str:int] | None = None,
-) -> Generator[VariantDescription]:
+    plugin_cache: ProviderConfigCache | None = None,
+    refresh: bool = False,
+    plugin_timeout: float = DEFAULT_PLUGIN_TIMEOUT,
+    timeout: float = DEFAULT_PLUGINS_TIMEOUT,
+    entry_point_cache: EntryPointCache | None = None,
+    pip_config_cache: PipConfigCache | None = None,
+    env: Mapping[str, str] | None = None,
+) -> "list[ProviderConfig]":
+    """
+    Discover and run the variant plugins.
+
+    Args:
+        provider_priority_dict (dict[str, int] | None): Plugins to use, mapped to
+            their priority. Defaults to every installed plugin, prioritized by
+            `variantlib.provider_priority` from the pip configuration.
+        plugin_cache (ProviderConfigCache | None): Cache of plugin results.
+        refresh (bool): Ignore the cached configs and run the plugins.
+        plugin_timeout (float): Maximum number of seconds per plugin.
+        timeout (float): Maximum number of seconds for all the plugins.
+        entry_point_cache (EntryPointCache | None): Cache of the installed entry
+            points, the plugins are discovered by scanning the distributions
+            without it.
+        pip_config_cache (PipConfigCache | None): Cache of the provider priority
+            read from the pip configuration.
+        env (Mapping[str, str] | None): The environment locating the pip
+            configuration. Defaults to `os.environ`. The plugins themselves
+            describe the host: they run with the environment of the process.
+
+    Returns:
+        list[ProviderConfig]: The configs of the providers, in priority order.
+    """
     logger.info("Discovering plugins...")
-    plugins = entry_points().select(group="variantlib.plugins")
+    plugins = get_entry_points("variantlib.plugins", cache=entry_point_cache)
 
     if provider_priority_dict is not None:
         plugins = [
@@ -76,48 +626,431 @@ def get_variant_hashes_by_priority(
 
     else:
         # sorting providers in priority order:
-        provider_priority_dict = read_provider_priority_from_pip_config()
+        provider_priority_dict = read_provider_priority_from_pip_config(
+            config_cache=pip_config_cache, env=env
+        )
 
     plugins = sorted(plugins, key=lambda plg: provider_priority_dict.get(plg.name, 1e6))
 
-    provider_cfgs = []
-    for plugin in plugins:
-        try:
-            logger.info(f"Loading plugin: {plugin.name} - v{plugin.dist.version}")
-            plugin_class = plugin.load()  # Dynamically load the plugin class
-            plugin_instance = plugin_class()  # Instantiate the plugin
-            provider_cfg = plugin_instance.run()  # Call the `run` method of the plugi
-            if not isinstance(provider_cfg, ProviderConfig):
-                logging.error(
-                    f"Provider: {plugin.name} returned an unexpected type: "
-                    f"{type(provider_cfg)} - Expected: `ProviderConfig`. Ignoring..."
-                )
-                continue
-            provider_cfgs.append(provider_cfg)
-        except Exception:
-            logging.exception("An unknown error happened - Ignoring plugin")
+    return [
+        result.provider_cfg
+        for result in run_plugins(
+            plugins,
+            plugin_cache=plugin_cache,
+            refresh=refresh,
+            plugin_timeout=plugin_timeout,
+            timeout=timeout,
+        )
+        if result.provider_cfg is not None
+    ]
+
+
+def get_pip_config_fingerprint(
+    config_cache: PipConfigCache | None = None,
+    env: Mapping[str, str] | None = None,
+) -> str:
+    """
+    Digest of the pip configuration files: their location and mtimes.
+
+    Args:
+        config_cache (PipConfigCache | None): Cache holding the files of the
+            environment, they are located when it has no valid entry.
+        env (Mapping[str, str] | None): The environment locating the files.
+            Defaults to `os.environ`.
+
+    Returns:
+        str: The fingerprint of the pip configuration.
+    """
+    key = get_pip_config_key(env)
+    cache_entry = config_cache.get(key) if config_cache is not None else None
+    files = (
+        cache_entry.files
+        if cache_entry is not None
+        else PipConfigCache.get_mtimes(get_pip_config_files(env))
+    )
+    return hashlib.sha256(json.dumps([key, files], sort_keys=True).encode()).hexdigest()
+
+
+def get_provider_configs_fingerprint(
+    provider_priority_dict: dict[str, int] | None = None,
+    pip_config_cache: PipConfigCache | None = None,
+    paths: list[str] | None = None,
+    env: Mapping[str, str] | None = None,
+) -> str:
+    """
+    Digest of what the result of `get_provider_configs` depends on, besides the
+    plugins themselves: the providers requested, or the pip configuration
+    prioritizing them, and the installed distributions the plugins come from.
+
+    Args:
+        provider_priority_dict (dict[str, int] | None): The plugins requested,
+            see `get_provider_configs`.
+        pip_config_cache (PipConfigCache | None): Cache of the pip configuration.
+        paths (list[str] | None): The paths searched for plugins. Defaults to
+            `sys.path`.
+        env (Mapping[str, str] | None): The environment locating the pip
+            configuration. Defaults to `os.environ`.
+
+    Returns:
+        str: The fingerprint of the inputs of `get_provider_configs`.
+    """
+    providers = (
+        sorted(provider_priority_dict.items())
+        if provider_priority_dict is not None
+        else get_pip_config_fingerprint(pip_config_cache, env=env)
+    )
+    environment = get_environment_fingerprint(
+        list(sys.path) if paths is None else paths
+    )
+    return hashlib.sha256(json.dumps([providers, environment]).encode()).hexdigest()
+
+
+def get_variant_descriptions(
+    provider_cfgs: "list[ProviderConfig]",
+) -> "Generator[VariantDescription]":
+    from variantlib.combination import get_combinations
 
     yield from get_combinations(provider_cfgs) if provider_cfgs else []
 
 
-def get_system_variant_preference_order():
-    return [
-        # fictional_hw :: architecture :: tars
-        # fictional_hw :: compute_capability :: 8
-        # fictional_hw :: compute_accuracy :: 8
-        # fictional_hw :: humor :: 10
-        "714c4f9e",
-        # fictional_hw :: architecture :: HAL9000
-        # fictional_hw :: compute_capability :: 6
-        # fictional_hw :: humor :: 2
-        "9f43005d",
-        # gcc :: version :: 1.2.3
-        "e4d430bf",
-        # fictional_hw :: architecture :: mother
-        # fictional_hw :: compute_capability :: 4
-        "7d95521c",
-        # fictional_hw :: architecture :: deepthought
-        # fictional_hw :: compute_capability :: 10
-        # fictional_hw :: compute_accuracy :: 10
-        "411f372e",
-    ]
+def get_variant_hashes_by_priority(
+    provider_priority_dict: dict[str:int] | None = None,
+    plugin_cache: ProviderConfigCache | None = None,
+    refresh: bool = False,
+    plugin_timeout: float = DEFAULT_PLUGIN_TIMEOUT,
+    timeout: float = DEFAULT_PLUGINS_TIMEOUT,
+) -> "Generator[VariantDescription]":
+    yield from get_variant_descriptions(
+        get_provider_configs(
+            provider_priority_dict,
+            plugin_cache=plugin_cache,
+            refresh=refresh,
+            plugin_timeout=plugin_timeout,
+            timeout=timeout,
+        )
+    )
+
+
+def get_variantlib_version() -> str | None:
+    from importlib.metadata import PackageNotFoundError
+    from importlib.metadata import version
+
+    try:
+        return version("variantlib")
+    except PackageNotFoundError:
+        return None
+
+
+def get_provider_configs_key(provider_cfgs: "list[ProviderConfig]") -> str:
+    """
+    Digest of the content of the provider configs, in priority order.
+
+    The version of variantlib is part of the digest as it defines the hashes.
+    """
+    payload = json.dumps(
+        {
+            "variantlib": get_variantlib_version(),
+            "providers": [provider_config_to_dict(cfg) for cfg in provider_cfgs],
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class VariantPreferenceOrder:
+    """
+    The hashes of the variants supported by the system, best first.
+
+    The matching only needs the hashes: the description of a variant is built
+    on demand from its serialized properties (`provider :: key :: value` lines)
+    when it is not already known.
+    """
+
+    __slots__ = ("_descriptions", "_properties", "hashes")
+
+    def __init__(
+        self,
+        hashes: list[str],
+        properties: list[str] | None = None,
+        descriptions: "list[VariantDescription] | None" = None,
+    ) -> None:
+        self.hashes = hashes
+        self._properties = properties
+        self._descriptions = descriptions
+
+    @classmethod
+    def from_descriptions(
+        cls, vdescs: "Iterable[VariantDescription]"
+    ) -> "VariantPreferenceOrder":
+        descriptions = list(vdescs)
+        return cls(
+            hashes=[vdesc.hexdigest for vdesc in descriptions],
+            descriptions=descriptions,
+        )
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __iter__(self) -> "Generator[tuple[str, VariantDescription]]":
+        for idx, vhash in enumerate(self.hashes):
+            yield vhash, self.describe(idx)
+
+    def describe(self, idx: int) -> "VariantDescription":
+        if self._descriptions is not None:
+            return self._descriptions[idx]
+
+        from variantlib.meta import VariantDescription
+        from variantlib.meta import VariantMeta
+
+        return VariantDescription(
+            data=[
+                VariantMeta(provider=provider, key=key, value=value)
+                for provider, key, value in (
+                    line.split(" :: ", 2)
+                    for line in self._properties[idx].splitlines()
+                )
+            ]
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "hashes": self.hashes,
+            "properties": (
+                self._properties
+                if self._properties is not None
+                else [
+                    "\n".join(vmeta.to_str() for vmeta in vdesc.data)
+                    for vdesc in self._descriptions
+                ]
+            ),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "VariantPreferenceOrder":
+        return cls(hashes=data["hashes"], properties=data["properties"])
+
+
+# Orders computed by this process, by `get_provider_configs_key`. A daemon may
+# see many provider configs over its lifetime: only the most recently used
+# orders are kept in memory, the others are reloaded from the `order_cache`.
+VARIANT_ORDERS_MAX_ENTRIES = 4
+_variant_orders: OrderedDict[str, VariantPreferenceOrder] = OrderedDict()
+_variant_orders_lock = threading.Lock()
+
+
+def get_variant_preference_order(
+    provider_cfgs: "list[ProviderConfig]",
+    order_cache: VariantOrderCache | None = None,
+) -> VariantPreferenceOrder:
+    """
+    Returns the variants supported by the system, best first.
+
+    The enumeration of the variants is memoized in memory (for the
+    `VARIANT_ORDERS_MAX_ENTRIES` most recently used provider configs) and, if
+    `order_cache` is provided, on disk: later calls with the same provider
+    configs only load the precomputed order.
+
+    Args:
+        provider_cfgs (list[ProviderConfig]): The configs of the providers, in
+            priority order.
+        order_cache (VariantOrderCache | None): On-disk cache of the orders.
+
+    Returns:
+        VariantPreferenceOrder: The variants in priority order.
+    """
+    key = get_provider_configs_key(provider_cfgs)
+
+    with _variant_orders_lock:
+        if (variant_order := _variant_orders.get(key)) is not None:
+            _variant_orders.move_to_end(key)
+            return variant_order
+
+    cached = order_cache.get(key) if order_cache is not None else None
+
+    try:
+        variant_order = (
+            VariantPreferenceOrder.from_dict(cached) if cached is not None else None
+        )
+    except (KeyError, TypeError):
+        variant_order = None
+
+    if variant_order is not None:
+        logger.info("Using cached variant preference order")
+
+    else:
+        variant_order = VariantPreferenceOrder.from_descriptions(
+            get_variant_descriptions(provider_cfgs)
+        )
+        if order_cache is not None:
+            order_cache.store(key, variant_order.to_dict())
+
+    with _variant_orders_lock:
+        _variant_orders[key] = variant_order
+        _variant_orders.move_to_end(key)
+        while len(_variant_orders) > VARIANT_ORDERS_MAX_ENTRIES:
+            _variant_orders.popitem(last=False)
+    return variant_order
+
+
+class HostProfile(typing.NamedTuple):
+    """
+    The variant configuration of a host, generated once from its plugins.
+
+    Installs load it instead of discovering and running the plugins, which
+    also lets fleet images ship a pre-baked profile.
+    """
+
+    created_at: float
+    variantlib_version: str | None
+    provider_cfgs: "list[ProviderConfig]"
+    variant_order: VariantPreferenceOrder
+
+    def to_dict(self) -> dict:
+        return {
+            "format": HOST_PROFILE_FORMAT,
+            "created_at": self.created_at,
+            "variantlib_version": self.variantlib_version,
+            "providers": [provider_config_to_dict(cfg) for cfg in self.provider_cfgs],
+            "variants": self.variant_order.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HostProfile":
+        if data.get("format") != HOST_PROFILE_FORMAT:
+            raise ValueError(f"Unsupported host profile format: {data.get('format')}")
+        return cls(
+            created_at=data["created_at"],
+            variantlib_version=data["variantlib_version"],
+            provider_cfgs=[provider_config_from_dict(cfg) for cfg in data["providers"]],
+            variant_order=VariantPreferenceOrder.from_dict(data["variants"]),
+        )
+
+
+def get_default_host_profile_path(env: Mapping[str, str] | None = None) -> Path:
+    """
+    Returns the path of the host profile, honoring `MOCKPIP_VARIANT_PROFILE`.
+
+    Args:
+        env (Mapping[str, str] | None): The environment. Defaults to `os.environ`.
+
+    Returns:
+        Path: `$MOCKPIP_VARIANT_PROFILE` or `~/.cache/mockpip/variants/host.json`.
+    """
+    env = env if env is not None else os.environ
+    if (profile_path := env.get("MOCKPIP_VARIANT_PROFILE")) is not None:
+        return Path(profile_path)
+    return get_default_cache_dir(env) / "variants" / "host.json"
+
+
+def generate_host_profile(
+    provider_priority_dict: dict[str:int] | None = None,
+    plugin_timeout: float = DEFAULT_PLUGIN_TIMEOUT,
+    timeout: float = DEFAULT_PLUGINS_TIMEOUT,
+) -> HostProfile:
+    """
+    Run the installed plugins and enumerate the variants they support.
+
+    Args:
+        provider_priority_dict (dict[str, int] | None): Plugins to use, mapped to
+            their priority. Defaults to every installed plugin.
+        plugin_timeout (float): Maximum number of seconds per plugin.
+        timeout (float): Maximum number of seconds for all the plugins.
+
+    Returns:
+        HostProfile: The profile of the host.
+    """
+    provider_cfgs = get_provider_configs(
+        provider_priority_dict,
+        refresh=True,
+        plugin_timeout=plugin_timeout,
+        timeout=timeout,
+    )
+    return HostProfile(
+        created_at=time.time(),
+        variantlib_version=get_variantlib_version(),
+        provider_cfgs=provider_cfgs,
+        variant_order=VariantPreferenceOrder.from_descriptions(
+            get_variant_descriptions(provider_cfgs)
+        ),
+    )
+
+
+def save_host_profile(profile: HostProfile, path: str | Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, suffix=".tmp", delete=False
+    ) as f:
+        json.dump(profile.to_dict(), f, separators=(",", ":"))
+    Path(f.name).replace(path)
+
+
+def load_host_profile(path: str | Path) -> HostProfile | None:
+    """
+    Load a host profile generated by `mockpip variants refresh`.
+
+    Args:
+        path (str | Path): Path of the profile.
+
+    Returns:
+        HostProfile | None: The profile, `None` if missing, invalid or generated
+            with another version of variantlib.
+    """
+    try:
+        with Path(path).open() as f:
+            profile = HostProfile.from_dict(json.load(f))
+
+    except FileNotFoundError:
+        return None
+
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring invalid host profile `{path}`: {e}")
+        return None
+
+    if profile.variantlib_version != get_variantlib_version():
+        logger.warning(
+            f"Ignoring host profile `{path}` generated with variantlib "
+            f"{profile.variantlib_version}, run `mockpip variants refresh`"
+        )
+        return None
+
+    return profile
+
+
+def get_system_variant_preference_order(
+    provider_priority_dict: dict[str:int] | None = None,
+    plugin_cache: ProviderConfigCache | None = None,
+    order_cache: VariantOrderCache | None = None,
+    profile_path: str | Path | None = None,
+) -> list[str]:
+    """
+    Returns the hashes of the variants supported by the system, best first.
+
+    The host profile is used when it exists (and no specific plugins are
+    requested), otherwise the plugins are run.
+
+    Args:
+        provider_priority_dict (dict[str, int] | None): Plugins to use, mapped to
+            their priority. Defaults to every installed plugin.
+        plugin_cache (ProviderConfigCache | None): Cache of plugin results.
+        order_cache (VariantOrderCache | None): On-disk cache of the orders.
+        profile_path (str | Path | None): Path of the host profile. Defaults to
+            `get_default_host_profile_path()`.
+
+    Returns:
+        list[str]: The variant hashes in priority order.
+    """
+    if provider_priority_dict is None:
+        profile = load_host_profile(
+            profile_path
+            if profile_path is not None
+            else get_default_host_profile_path()
+        )
+        if profile is not None:
+            return profile.variant_order.hashes
+
+    provider_cfgs = get_provider_configs(
+        provider_priority_dict, plugin_cache=plugin_cache
+    )
+    return get_variant_preference_order(provider_cfgs, order_cache=order_cache).hashes
@@ -0,0 +1,211 @@
+import logging
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from email.parser import HeaderParser
+
+from mockpip.repository import DEFAULT_MAX_WORKERS
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from variantlib.config import ProviderConfig
+    from variantlib.meta import VariantDescription
+
+    from mockpip.repository import PackageCandidate
+
+logger = logging.getLogger(__name__)
+
+# Core metadata headers of a variant wheel, as written by `variantlib`: one
+# `Variant-property: <namespace> :: <feature> :: <value>` per property, and the
+# hash of the resulting variant.
+METADATA_VARIANT_PROPERTY_HEADER = "Variant-property"
+METADATA_VARIANT_HASH_HEADER = "Variant-hash"
+
+
+def parse_variant_metadata(metadata: str) -> "VariantDescription | None":
+    """
+    Read the variant properties declared in the core metadata of a wheel.
+
+    Each property is declared by a `Variant-property` header, and the variant
+    hash by the `Variant-hash` header, as in the `METADATA` of the wheel itself.
+
+    Args:
+        metadata (str): The content of the `METADATA` file.
+
+    Returns:
+        VariantDescription | None: The variant of the wheel, `None` if the wheel
+            declares no valid variant property or if its properties don't match
+            its declared hash.
+    """
+    from variantlib.meta import VariantDescription
+    from variantlib.meta import VariantMeta
+
+    vmetas = []
+    headers = HeaderParser().parsestr(metadata, headersonly=True)
+    for field in headers.get_all(METADATA_VARIANT_PROPERTY_HEADER, []):
+        parts = [part.strip() for part in field.split("::")]
+        if len(parts) != 3 or not all(parts):  # noqa: PLR2004
+            logger.debug(f"Ignoring invalid variant property: `{field}`")
+            continue
+        provider, key, value = parts
+        vmetas.append(VariantMeta(provider=provider, key=key, value=value))
+
+    if not vmetas:
+        return None
+
+    vdesc = VariantDescription(data=vmetas)
+    vhash = headers.get(METADATA_VARIANT_HASH_HEADER)
+    if vhash is not None and vhash.strip() != vdesc.hexdigest:
+        logger.debug(
+            f"Variant properties don't match `{METADATA_VARIANT_HASH_HEADER}: "
+            f"{vhash.strip()}` (expected `{vdesc.hexdigest}`)"
+        )
+        return None
+    return vdesc
+
+
+def get_published_variants(
+    pkg_candidate_dict_by_vhash: "dict[str | None, PackageCandidate]",
+    fetch_metadata: "Callable[[PackageCandidate], str | None]",
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> "dict[str, VariantDescription] | None":
+    """
+    Describe the variants published for a release from their core metadata.
+
+    The metadata of the variants are fetched concurrently. As soon as one of
+    them can't be described, the fetches not started yet are cancelled.
+
+    Args:
+        pkg_candidate_dict_by_vhash (dict): The wheels of the release by variant
+            hash, `None` being the wheel without variant.
+        fetch_metadata (Callable): Returns the core metadata of a wheel, called
+            from several threads.
+        max_workers (int): Maximum number of metadata fetched concurrently.
+
+    Returns:
+        dict[str, VariantDescription] | None: The description of each variant
+            hash, `None` if any of them could not be described (the metadata is
+            unavailable or does not match the hash).
+    """
+    variants = {
+        vhash: pkg
+        for vhash, pkg in pkg_candidate_dict_by_vhash.items()
+        if vhash is not None
+    }
+    if not variants:
+        return {}
+
+    published = {}
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(variants)),
+        thread_name_prefix="mockpip-metadata",
+    ) as executor:
+        futures = {
+            executor.submit(fetch_metadata, pkg): vhash
+            for vhash, pkg in variants.items()
+        }
+        for future in as_completed(futures):
+            vhash = futures[future]
+            metadata = future.result()
+            vdesc = parse_variant_metadata(metadata) if metadata is not None else None
+
+            if vdesc is None or vdesc.hexdigest != vhash:
+                logger.debug(
+                    f"Variant `{vhash}` of `{variants[vhash].filename}` can't be "
+                    "described"
+                )
+                executor.shutdown(wait=False, cancel_futures=True)
+                return None
+
+            published[vhash] = vdesc
+
+    # In the order of the index page.
+    return {vhash: published[vhash] for vhash in variants}
+
+
+class VariantRanker:
+    """
+    Rank variant descriptions against the providers configs of the system.
+
+    The rank of a description is its position in the enumeration of
+    `get_combinations(provider_cfgs)`, computed directly from the description:
+    descriptions with more properties come first, then those using the
+    highest priority provider keys, then those using the preferred values.
+    Ranking the handful of variants published for a release is thereby
+    independent from the size of the combination space.
+
+    Args:
+        provider_cfgs (list[ProviderConfig]): The configs of the providers, in
+            priority order.
+    """
+
+    def __init__(self, provider_cfgs: "list[ProviderConfig]") -> None:
+        # (provider, key) -> (key priority, {value: value priority})
+        self._priorities = {}
+        for provider_cfg in provider_cfgs:
+            for key_cfg in provider_cfg.configs:
+                self._priorities.setdefault(
+                    (provider_cfg.provider, key_cfg.key),
+                    (
+                        len(self._priorities),
+                        {value: idx for idx, value in enumerate(key_cfg.values)},
+                    ),
+                )
+
+    def rank(self, vdesc: "VariantDescription") -> tuple | None:
+        """
+        Compute the sort key of a variant description.
+
+        Args:
+            vdesc (VariantDescription): The variant to rank.
+
+        Returns:
+            tuple | None: The sort key, lower is better. `None` if the variant is
+                not supported by the system.
+        """
+        ranks = []
+        for vmeta in vdesc.data:
+            key_priority, value_priorities = self._priorities.get(
+                (vmeta.provider, vmeta.key), (None, None)
+            )
+            if key_priority is None:
+                return None
+            if (value_priority := value_priorities.get(vmeta.value)) is None:
+                return None
+            ranks.append((key_priority, value_priority))
+
+        ranks.sort()
+        key_priorities = tuple(key_priority for key_priority, _ in ranks)
+        if len(set(key_priorities)) != len(key_priorities):
+            return None  # the same key can't have two values
+
+        return (
+            -len(ranks),
+            key_priorities,
+            tuple(value_priority for _, value_priority in ranks),
+        )
+
+    def select(
+        self, published: "dict[str, VariantDescription]"
+    ) -> "tuple[str, VariantDescription] | None":
+        """
+        Select the best published variant supported by the system.
+
+        Args:
+            published (dict[str, VariantDescription]): The published variants.
+
+        Returns:
+            tuple[str, VariantDescription] | None: The variant hash and
+                description of the best variant, `None` if none is supported.
+        """
+        best = None
+        best_rank = None
+        for vhash, vdesc in published.items():
+            rank = self.rank(vdesc)
+            if rank is None:
+                logger.debug(f"Variant `{vhash}` is not supported by this system")
+                continue
+            if best_rank is None or rank < best_rank:
+                best, best_rank = (vhash, vdesc), rank
+        return best
@@ -1,20 +1,51 @@
+import hashlib
+import logging
+import os
 import shlex
 import subprocess
+import tempfile
 import unittest
+import zipfile
+from pathlib import Path
 from random import choice
 from string import ascii_lowercase
+from unittest.mock import MagicMock
+from unittest.mock import patch
 
+from packaging.tags import sys_tags
 from parameterized import parameterized
+from variantlib.combination import get_combinations
+from variantlib.config import KeyConfig
+from variantlib.config import ProviderConfig
+
+from mockpip.commands.install import install
+from mockpip.commands.install import logger as install_logger
+from mockpip.commands.install import select_candidate
+from mockpip.repository import PackageCandidate
+from mockpip.variant_hash import VariantPreferenceOrder
+from mockpip.variant_selection import VariantRanker
+from tests.index_server import LocalIndexServer
+from tests.index_server import make_index_page
+from tests.index_server import make_wheel
+from tests.index_server import read_wheel_metadata
 
 
 class TestMockpipMain(unittest.TestCase):
-    def run_command(self, command: str):
-        return subprocess.run(  # noqa: S603
-            shlex.split(f"mockpip {command}"),  # noqa: S603
-            capture_output=True,
-            text=True,
-            check=False,
-        )
+    def run_command(self, command: str, target: str | None = None):
+        # Each run starts with an empty index cache, and installs the packages
+        # in `target` or a temporary directory rather than the environment.
+        with tempfile.TemporaryDirectory() as cache_home:
+            return subprocess.run(  # noqa: S603
+                shlex.split(f"mockpip {command}"),  # noqa: S603
+                capture_output=True,
+                text=True,
+                check=False,
+                env={
+                    **os.environ,
+                    "XDG_CACHE_HOME": cache_home,
+                    "MOCKPIP_TARGET": target or str(Path(cache_home) / "target"),
+                },
+            )
 
     @parameterized.expand(
         [
@@ -48,9 +79,25 @@ class TestMockpipMain(unittest.TestCase):
         )
         assert "Found: `requests" in result.stdout
         assert "Installing: requests" in result.stdout
-        assert "[========================================] 100%" in result.stdout
+        # Not a terminal: no progress bars in the output.
+        assert "\x1b[" not in result.stdout
         assert "was installed with success ..." in result.stdout
 
+    def test_install_multiple_packages(self):
+        result = self.run_command("install requests urllib3")
+
+        for pkg_name in ["requests", "urllib3"]:
+            assert (
+                f"Received install request for: `{pkg_name}` "
+                "from index: https://pypi.org/simple" in result.stdout
+            )
+            assert f"Installing: {pkg_name}" in result.stdout
+            assert f"The package: `{pkg_name}`" in result.stdout
+
+        assert "Timing Summary" in result.stdout
+        assert "Resolved 2 package(s)" in result.stdout
+        assert result.returncode == 0
+
     def test_install_nonexisting_pkg(self):
         """Test the version command to ensure it returns the correct version."""
         pkg_name = "".join(choice(ascii_lowercase) for i in range(12))
@@ -73,6 +120,301 @@ class TestMockpipMain(unittest.TestCase):
         assert f"No candidate package was found for `{pkg_name}`" in result.stderr
         assert result.returncode != 0
 
+    def test_install_extra_index_urls(self):
+        primary = LocalIndexServer({
+            "/simple/example/": make_index_page(["example-1.0.0-py3-none-any.whl"])
+        })
+        mirror = LocalIndexServer({
+            "/simple/example/": make_index_page(["example-2.0.0-py3-none-any.whl"])
+        })
+
+        with primary, mirror:
+            result = self.run_command(
+                f"install example --dry-run --no_variants "
+                f"--index-url={primary.url}/simple "
+                f"--extra-index-url={mirror.url}/simple"
+            )
+
+        assert result.returncode == 0
+        assert "Would install: example-2.0.0-py3-none-any.whl" in result.stdout
+        for server in (primary, mirror):
+            assert (
+                f"Index `{server.url}/simple`: 1 lookup(s), 0 error(s)" in result.stdout
+            )
+
+    def test_install_downloads_selected_file(self):
+        filename = "example-1.0.0-py3-none-any.whl"
+        data = os.urandom(100_000)
+        wheel = make_wheel(
+            files={"example/data.bin": data}, compression=zipfile.ZIP_STORED
+        )
+        server = LocalIndexServer({
+            "/simple/example/": make_index_page(
+                [filename], hashes={filename: hashlib.sha256(wheel).hexdigest()}
+            ),
+            f"/packages/{filename}": wheel,
+        })
+        server.truncations[f"/packages/{filename}"] = 1
+
+        with (
+            server,
+            tempfile.TemporaryDirectory() as download_dir,
+            tempfile.TemporaryDirectory() as target,
+        ):
+            result = self.run_command(
+                f"install example --no_variants --index-url={server.url}/simple "
+                f"--download-dir={download_dir}",
+                target=target,
+            )
+
+            assert (Path(download_dir) / filename).read_bytes() == wheel
+            assert (Path(target) / "example" / "data.bin").read_bytes() == data
+            assert (Path(target) / "example-1.0.0.dist-info" / "RECORD").exists()
+
+        assert result.returncode == 0
+        assert f"Download of `{filename}` interrupted" in result.stderr
+        # Not a terminal: no progress bars in the output.
+        assert "\x1b[" not in result.stdout
+        assert "was installed with success ..." in result.stdout
+
+    def test_repeat_install_uses_wheel_cache(self):
+        filename = "example-1.0.0-py3-none-any.whl"
+        wheel = make_wheel()
+        server = LocalIndexServer({
+            "/simple/example/": make_index_page(
+                [filename], hashes={filename: hashlib.sha256(wheel).hexdigest()}
+            ),
+            f"/packages/{filename}": wheel,
+        })
+
+        with server, tempfile.TemporaryDirectory() as cache_dir:
+            command = (
+                f"install example --no_variants --index-url={server.url}/simple "
+                f"--cache-dir={cache_dir}"
+            )
+            first = self.run_command(command)
+            (Path(cache_dir) / "downloads" / filename).unlink()
+            second = self.run_command(f"{command} --offline")
+
+        assert first.returncode == second.returncode == 0
+        assert "Using cached" not in first.stdout
+        assert f"Using cached `{cache_dir}/downloads/{filename}`" in second.stdout
+        assert len(server.requests) == 2  # noqa: PLR2004
+
+    def test_same_file_for_several_requirements(self):
+        filename = "example-1.0.0-py3-none-any.whl"
+        wheel = make_wheel()
+        server = LocalIndexServer({
+            "/simple/example/": make_index_page(
+                [filename], hashes={filename: hashlib.sha256(wheel).hexdigest()}
+            ),
+            f"/packages/{filename}": wheel,
+        })
+
+        with server, tempfile.TemporaryDirectory() as target:
+            result = self.run_command(
+                f"install example 'example>=1' --no_variants --no-cache "
+                f"--index-url={server.url}/simple",
+                target=target,
+            )
+
+        assert result.returncode == 0
+        assert server.requests.count(f"/packages/{filename}") == 1
+        assert result.stdout.count("was installed with success ...") == 1
+        assert (
+            f"`example>=1` is satisfied by {filename}, already selected for "
+            "`example`" in result.stdout
+        )
+
+
+class TestSelectCandidate(unittest.TestCase):
+    @staticmethod
+    def make_candidate(filename: str) -> PackageCandidate:
+        version = filename.split("-")[1].split("~")[0]
+        return PackageCandidate(filename, version, "whl", None)
+
+    def test_incompatible_tags_are_skipped(self):
+        best_tag = next(iter(sys_tags()))
+        native = self.make_candidate(f"example-1.0.0-{best_tag}.whl")
+        candidates = [
+            self.make_candidate("example-2.0.0-cp312-cp312-fictional_os_x86_64.whl"),
+            self.make_candidate("example-1.0.0-py3-none-any.whl"),
+            native,
+        ]
+
+        # 2.0.0 is not installable, the native 1.0.0 wheel wins over the pure
+        # python one.
+        selected = select_candidate(candidates, get_variants=list, no_variants=True)
+        assert selected is native
+
+    def test_index_driven_variant_selection(self):
+        provider_cfgs = [
+            ProviderConfig(
+                provider="fictional_hw",
+                configs=[KeyConfig(key="architecture", values=["HAL9000", "tars"])],
+            )
+        ]
+        vdescs = list(get_combinations(provider_cfgs))
+        candidates = {
+            vdesc.hexdigest: self.make_candidate(
+                f"example-1.0.0~{vdesc.hexdigest}-py3-none-any.whl"
+            )
+            for vdesc in vdescs
+        }
+        published = {vdesc.hexdigest: vdesc for vdesc in vdescs}
+        get_variants = MagicMock(
+            return_value=VariantPreferenceOrder.from_descriptions(vdescs)
+        )
+
+        with patch.dict(os.environ):
+            os.environ.pop("PIP_FORCE_INSTALL_VARIANT_HASH", None)
+
+            selected = select_candidate(
+                list(candidates.values()),
+                get_variants=get_variants,
+                describe_variants=lambda _: published,
+                get_ranker=lambda: VariantRanker(provider_cfgs),
+            )
+            assert selected is candidates[vdescs[0].hexdigest]
+            get_variants.assert_not_called()
+
+            # Fallback to the enumeration when the variants can't be described.
+            selected = select_candidate(
+                list(candidates.values()),
+                get_variants=get_variants,
+                describe_variants=lambda _: None,
+                get_ranker=lambda: VariantRanker(provider_cfgs),
+            )
+            assert selected is candidates[vdescs[0].hexdigest]
+            get_variants.assert_called_once()
+
+    def select_with_variant_log(self, variant_log: str) -> list[str]:
+        hashes = [f"{idx:08x}" for idx in range(4)]
+        best = self.make_candidate(f"example-1.0.0~{hashes[-1]}-py3-none-any.whl")
+        get_variants = MagicMock(return_value=MagicMock(hashes=hashes))
+
+        with (
+            patch.dict(os.environ),
+            patch("mockpip.commands.install.log_best_variant"),
+            self.assertLogs("mockpip.commands.install", level="DEBUG") as logs,
+        ):
+            os.environ.pop("PIP_FORCE_INSTALL_VARIANT_HASH", None)
+            selected = select_candidate(
+                [best], get_variants=get_variants, variant_log=variant_log
+            )
+
+        assert selected is best
+        return [
+            message
+            for record in logs.records
+            if "variant" in (message := record.getMessage()).lower()
+        ]
+
+    def test_variant_log_each(self):
+        messages = self.select_with_variant_log("each")
+        assert messages == [
+            f"[Variant: {idx:04d}] `{idx:08x}`: NOT FOUND ..." for idx in range(3)
+        ]
+
+    def test_variant_log_each_not_verbose(self):
+        previous_level = install_logger.level
+        install_logger.setLevel(logging.INFO)
+        try:
+            with patch.object(install_logger, "debug") as debug:
+                select_candidate(
+                    [self.make_candidate("example-1.0.0~00000003-py3-none-any.whl")],
+                    get_variants=lambda: MagicMock(hashes=["00000000"]),
+                    variant_log="each",
+                )
+        finally:
+            install_logger.setLevel(previous_level)
+
+        debug.assert_not_called()
+
+    def test_variant_log_summary(self):
+        messages = self.select_with_variant_log("summary")
+        assert len(messages) == 1
+        assert messages[0].startswith("Tried 4 variant(s) in ")
+
+    def test_variant_log_off(self):
+        assert self.select_with_variant_log("off") == []
+
+
+class TestIndexDrivenVariantSelection(unittest.TestCase):
+    PROVIDER_CFGS = [
+        ProviderConfig(
+            provider="fictional_hw",
+            configs=[
+                KeyConfig(key="architecture", values=["HAL9000", "tars", "mother"])
+            ],
+        )
+    ]
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmpdir.cleanup)
+
+        # The best variant of the system is not published.
+        self.published = list(get_combinations(self.PROVIDER_CFGS))[1:]
+        self.filenames = {
+            vdesc.hexdigest: f"example-1.0.0~{vdesc.hexdigest}-py3-none-any.whl"
+            for vdesc in self.published
+        }
+        self.pages = {
+            "/simple/example/": make_index_page(
+                ["example-1.0.0-py3-none-any.whl", *self.filenames.values()],
+                core_metadata=True,
+            ),
+            # The metadata served by the index is the one shipped in the wheel.
+            **{
+                f"/packages/{self.filenames[vdesc.hexdigest]}.metadata": (
+                    read_wheel_metadata(make_wheel(variant=vdesc))
+                )
+                for vdesc in self.published
+            },
+        }
+
+    def install(self, server: LocalIndexServer) -> list[str]:
+        with (
+            patch(
+                "mockpip.commands.install.get_provider_configs",
+                return_value=self.PROVIDER_CFGS,
+            ),
+            patch(
+                "mockpip.commands.install.get_variant_preference_order"
+            ) as get_variant_preference_order,
+            self.assertLogs("mockpip.commands.install", level="INFO") as logs,
+        ):
+            retcode = install(
+                ["example", "--dry-run", f"--index-url={server.url}/simple"],
+                env={
+                    **{
+                        name: value
+                        for name, value in os.environ.items()
+                        if name != "PIP_FORCE_INSTALL_VARIANT_HASH"
+                    },
+                    "XDG_CACHE_HOME": self._tmpdir.name,
+                },
+            )
+
+        assert retcode == 0
+        # The published variants are ranked, the combinations are not enumerated.
+        get_variant_preference_order.assert_not_called()
+        return [record.getMessage() for record in logs.records]
+
+    def test_html_index(self):
+        with LocalIndexServer(self.pages) as server:
+            messages = self.install(server)
+
+        best = self.published[0].hexdigest
+        assert f"Would install: {self.filenames[best]} " in "\n".join(messages)
+        metadata_requests = [
+            path for path in server.requests if path.endswith(".metadata")
+        ]
+        assert sorted(metadata_requests) == sorted(
+            f"/packages/{filename}.metadata" for filename in self.filenames.values()
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,46 @@
+import os
+import shlex
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+class TestMockpipVariants(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.profile_path = Path(self._tmpdir.name) / "host.json"
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def run_command(self, command: str):
+        return subprocess.run(  # noqa: S603
+            shlex.split(f"mockpip variants {command}"),
+            capture_output=True,
+            text=True,
+            check=False,
+            env={**os.environ, "MOCKPIP_VARIANT_PROFILE": str(self.profile_path)},
+        )
+
+    def test_show_missing_profile(self):
+        result = self.run_command("show")
+
+        assert "No host profile found" in result.stderr
+        assert result.returncode != 0
+
+    def test_refresh(self):
+        result = self.run_command("refresh")
+
+        assert result.returncode == 0
+        assert f"Host profile written to `{self.profile_path}`" in result.stdout
+        assert self.profile_path.exists()
+
+        result = self.run_command("show")
+
+        assert result.returncode == 0
+        assert f"Host profile: `{self.profile_path}`" in result.stdout
+
+
+if __name__ == "__main__":
+    unittest.main()
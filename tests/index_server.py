@@ -0,0 +1,234 @@
+import base64
+import hashlib
+import io
+import json
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+
+def make_index_page(
+    filenames: list[str],
+    hashes: dict[str, str] | None = None,
+    core_metadata: bool = False,
+) -> str:
+    hashes = hashes or {}
+    links = "\n".join(
+        f'    <a href="../../packages/{filename}{fragment}"{attributes}>'
+        f"{filename}</a><br/>"
+        for filename in filenames
+        for fragment in [f"#sha256={hashes[filename]}" if filename in hashes else ""]
+        for attributes in [
+            ' data-core-metadata="true"'
+            if core_metadata and filename.endswith(".whl")
+            else ""
+        ]
+    )
+    return f"<!DOCTYPE html>\n<html>\n  <body>\n{links}\n  </body>\n</html>\n"
+
+
+def make_json_index_page(filenames: list[str], name: str = "example") -> str:
+    return json.dumps({
+        "meta": {"api-version": "1.1"},
+        "name": name,
+        "files": [
+            {
+                "filename": filename,
+                "url": f"../../packages/{filename}",
+                "hashes": {"sha256": hashlib.sha256(filename.encode()).hexdigest()},
+                "core-metadata": filename.endswith(".whl"),
+            }
+            for filename in filenames
+        ],
+    })
+
+
+def make_metadata(name: str = "example", version: str = "1.0.0", variant=None) -> str:
+    """
+    Core metadata of a wheel, declaring the properties and the hash of `variant`
+    (a `VariantDescription`) if any.
+    """
+    lines = ["Metadata-Version: 2.1", f"Name: {name}", f"Version: {version}"]
+    if variant is not None:
+        lines.extend(f"Variant-property: {vmeta.to_str()}" for vmeta in variant.data)
+        lines.append(f"Variant-hash: {variant.hexdigest}")
+    return "\n".join(lines) + "\n"
+
+
+def make_wheel(
+    name: str = "example",
+    version: str = "1.0.0",
+    files: dict[str, bytes] | None = None,
+    compression: int = zipfile.ZIP_DEFLATED,
+    variant=None,
+) -> bytes:
+    """
+    Build a pure-Python wheel holding `files` (archive path -> content), along
+    with its `.dist-info` metadata (see `make_metadata`) and RECORD.
+    """
+    if files is None:
+        files = {f"{name}/__init__.py": b"__version__ = '%s'\n" % version.encode()}
+
+    dist_info = f"{name}-{version}.dist-info"
+    files = {
+        **files,
+        f"{dist_info}/METADATA": make_metadata(name, version, variant).encode(),
+        f"{dist_info}/WHEEL": (
+            b"Wheel-Version: 1.0\nGenerator: tests\nRoot-Is-Purelib: true\n"
+            b"Tag: py3-none-any\n"
+        ),
+    }
+
+    record = []
+    for path, content in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(content).digest())
+        record.append(f"{path},sha256={digest.rstrip(b'=').decode()},{len(content)}")
+    record.append(f"{dist_info}/RECORD,,")
+
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=compression) as wheel:
+        for path, content in files.items():
+            wheel.writestr(path, content)
+        wheel.writestr(f"{dist_info}/RECORD", "\n".join(record) + "\n")
+    return output.getvalue()
+
+
+def read_wheel_metadata(wheel: bytes) -> str:
+    """The content of the `.dist-info/METADATA` file of `wheel`."""
+    with zipfile.ZipFile(io.BytesIO(wheel)) as archive:
+        (path,) = [
+            name for name in archive.namelist() if name.endswith(".dist-info/METADATA")
+        ]
+        return archive.read(path).decode()
+
+
+class _ThreadingHTTPServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops the SYNs of concurrent clients, which then
+    # retry after a second.
+    request_queue_size = 128
+
+
+class LocalIndexServer:
+    """
+    Minimal Simple-index stand-in serving `pages` (path -> body) over HTTP.
+
+    Every page is served with an `ETag` and honors `If-None-Match`. The paths of
+    all the received requests are recorded in `requests`. `failures` maps a path
+    to the number of `503` responses to send before serving the page.
+
+    A page can also be a dict mapping content types to bodies, in which case the
+    first content type listed in the `Accept` header is served (content
+    negotiation), falling back to `text/html`.
+
+    `Range: bytes=<start>-` requests are answered with `206`, unless
+    `range_support` is disabled. `truncations` maps a path to the number of
+    responses cut after half of their body, with the connection closed.
+    Every response is delayed by `latency` seconds.
+    """
+
+    def __init__(self, pages: dict[str, str | bytes]) -> None:
+        self.pages = pages
+        self.failures = {}
+        self.truncations = {}
+        self.range_support = True
+        self.latency = 0.0
+        self.requests = []
+        self.request_headers = []
+
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # The headers and the body are sent separately: with Nagle's
+            # algorithm, every keep-alive request waits for a delayed ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args, **kwargs):
+                pass
+
+            def do_GET(self):  # noqa: N802
+                server.requests.append(self.path)
+                server.request_headers.append(dict(self.headers))
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if server.failures.get(self.path, 0) > 0:
+                    server.failures[self.path] -= 1
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                body = server.pages.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                content_type = "text/html"
+                if isinstance(body, dict):
+                    accept = self.headers.get("Accept", "")
+                    content_type = next(
+                        (ctype for ctype in body if ctype in accept), "text/html"
+                    )
+                    body = body[content_type]
+
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+
+                etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                status = 200
+                byte_range = self.headers.get("Range", "")
+                if server.range_support and byte_range.startswith("bytes="):
+                    start = int(byte_range[6:].partition("-")[0])
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(body)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+                    content_range = f"bytes {start}-{len(body) - 1}/{len(body)}"
+                    body = body[start:]
+
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 206:  # noqa: PLR2004
+                    self.send_header("Content-Range", content_range)
+                self.end_headers()
+
+                if server.truncations.get(self.path, 0) > 0:
+                    server.truncations[self.path] -= 1
+                    self.wfile.write(body[: len(body) // 2])
+                    self.close_connection = True
+                    return
+
+                self.wfile.write(body)
+
+        self.httpd = _ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
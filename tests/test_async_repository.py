@@ -0,0 +1,252 @@
+import asyncio
+import gzip
+import tempfile
+import unittest
+
+from mockpip.async_repository import AsyncIndexSession
+from mockpip.async_repository import Headers
+from mockpip.async_repository import list_candidates_async
+from mockpip.async_repository import list_candidates_batch_async
+from mockpip.cache import IndexCache
+from mockpip.repository import SIMPLE_JSON_CONTENT_TYPE
+from mockpip.repository import IndexStats
+from mockpip.repository import NetworkSettings
+from mockpip.repository import list_candidates
+from tests.index_server import LocalIndexServer
+from tests.index_server import make_index_page
+from tests.index_server import make_json_index_page
+
+FILENAMES = [
+    "example-1.0.0.tar.gz",
+    "example-1.0.0-py3-none-any.whl",
+    "example-1.1.0-py3-none-any.whl",
+]
+
+
+class RawHTTPServer:
+    """
+    asyncio server answering every connection with `response`, or never
+    answering if it is `None`.
+    """
+
+    def __init__(self, response: bytes | None) -> None:
+        self.response = response
+        self.connections = 0
+        self.requests = []
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self.connected.set()
+        self.requests.append(await reader.readuntil(b"\r\n\r\n"))
+        if self.response is None:
+            await asyncio.sleep(3600)
+        writer.write(self.response)
+        await writer.drain()
+        writer.close()
+
+    async def __aenter__(self):
+        self.connected = asyncio.Event()
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        self.url = f"http://{host}:{port}"
+        return self
+
+    async def __aexit__(self, *args):
+        self.server.close()
+
+
+class TestListCandidatesAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = LocalIndexServer({
+            "/simple/example/": make_index_page(FILENAMES),
+            "/simple/json-example/": {
+                SIMPLE_JSON_CONTENT_TYPE: make_json_index_page(
+                    FILENAMES, name="json-example"
+                )
+            },
+        })
+        self.server.__enter__()
+        self.index_url = f"{self.server.url}/simple"
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    async def test_matches_sync_client(self):
+        for package_name in ["example", "json-example", "example>1.0", "missing"]:
+            candidates = await list_candidates_async(package_name, self.index_url)
+            assert candidates == list_candidates(package_name, self.index_url)
+
+    async def test_connections_are_reused(self):
+        async with AsyncIndexSession() as session:
+            for _ in range(5):
+                candidates = await list_candidates_async(
+                    "example", self.index_url, session=session
+                )
+                assert len(candidates) == 3  # noqa: PLR2004
+
+            stats = session.stats()
+
+        assert stats.requests == 5  # noqa: PLR2004
+        assert stats.connections == 1
+
+    async def test_retry_on_server_error(self):
+        self.server.failures["/simple/example/"] = 2
+
+        async with AsyncIndexSession(max_retries=2, backoff_factor=0.01) as session:
+            candidates = await list_candidates_async(
+                "example", self.index_url, session=session
+            )
+
+        assert len(candidates) == 3  # noqa: PLR2004
+        assert len(self.server.requests) == 3  # noqa: PLR2004
+
+    async def test_retries_exhausted(self):
+        self.server.failures["/simple/example/"] = 3
+
+        async with AsyncIndexSession(max_retries=1, backoff_factor=0.01) as session:
+            candidates = await list_candidates_async(
+                "example", self.index_url, session=session
+            )
+
+        assert candidates == []
+        assert len(self.server.requests) == 2  # noqa: PLR2004
+
+    async def test_cache_revalidation(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = IndexCache(tmpdir, ttl=0)
+            first = await list_candidates_async("example", self.index_url, cache=cache)
+            second = await list_candidates_async(
+                "example", self.index_url, cache=cache
+            )
+
+            assert first == second
+            assert len(first) == 3  # noqa: PLR2004
+            assert cache.size() > 0
+
+        assert self.server.request_headers[1]["If-None-Match"] is not None
+
+    async def test_batch(self):
+        package_names = ["example", "json-example", "missing"]
+        async with AsyncIndexSession(max_concurrency=2) as session:
+            results = await list_candidates_batch_async(
+                package_names, self.index_url, session=session
+            )
+
+        assert [result.package_name for result in results] == package_names
+        assert [len(result.candidates) for result in results] == [3, 3, 0]
+
+    async def test_extra_index_urls(self):
+        mirror = LocalIndexServer({
+            "/simple/example/": make_index_page(["example-2.0.0-py3-none-any.whl"])
+        })
+        with mirror:
+            merged = await list_candidates_async(
+                "example",
+                self.index_url,
+                extra_index_urls=[f"{mirror.url}/simple"],
+            )
+            assert [candidate.filename for candidate in merged] == [
+                *FILENAMES,
+                "example-2.0.0-py3-none-any.whl",
+            ]
+
+            # The primary index fails: the mirror wins the race.
+            self.server.failures["/simple/example/"] = 10
+            stats = IndexStats()
+            async with AsyncIndexSession(max_retries=0) as session:
+                raced = await list_candidates_async(
+                    "example",
+                    self.index_url,
+                    session=session,
+                    extra_index_urls=[f"{mirror.url}/simple"],
+                    index_strategy="race",
+                    stats=stats,
+                )
+
+        assert [candidate.filename for candidate in raced] == [
+            "example-2.0.0-py3-none-any.whl"
+        ]
+        assert {entry.index_url: entry.wins for entry in stats.summary()}.get(
+            f"{mirror.url}/simple"
+        ) == 1
+
+
+class TestAsyncIndexSession(unittest.IsolatedAsyncioTestCase):
+    async def test_chunked_gzip_response(self):
+        body = gzip.compress(make_index_page(FILENAMES).encode())
+        chunks = b"".join(
+            b"%x\r\n%s\r\n" % (len(body[idx : idx + 100]), body[idx : idx + 100])
+            for idx in range(0, len(body), 100)
+        )
+        response = (
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n"
+            b"Transfer-Encoding: chunked\r\nContent-Encoding: gzip\r\n\r\n"
+            + chunks
+            + b"0\r\n\r\n"
+        )
+
+        async with RawHTTPServer(response) as server:
+            candidates = await list_candidates_async("example", f"{server.url}/simple")
+
+        assert [candidate.filename for candidate in candidates] == FILENAMES
+
+    async def test_read_timeout(self):
+        async with (
+            RawHTTPServer(None) as server,
+            AsyncIndexSession(read_timeout=0.1, max_retries=0) as session,
+        ):
+            candidates = await list_candidates_async(
+                "example", f"{server.url}/simple", session=session
+            )
+
+        assert candidates == []
+
+    async def test_cancellation(self):
+        async with (
+            RawHTTPServer(None) as server,
+            AsyncIndexSession(max_concurrency=1) as session,
+        ):
+            task = asyncio.create_task(
+                list_candidates_batch_async(
+                    ["pkg1", "pkg2"], f"{server.url}/simple", session=session
+                )
+            )
+            await server.connected.wait()
+
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):  # noqa: PT027
+                await task
+
+            # The concurrency slot is released and no connection is pooled.
+            assert not session._semaphore.locked()  # noqa: SLF001
+            assert not any(session._idle.values())  # noqa: SLF001
+            assert server.connections == 1
+
+    async def test_https_proxy_tunnel(self):
+        response = b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n"
+
+        async with RawHTTPServer(response) as proxy:
+            proxy_url = proxy.url.replace("http://", "http://user:secret@")
+            network = NetworkSettings.from_environ({"https_proxy": proxy_url})
+            async with AsyncIndexSession(max_retries=0, network=network) as session:
+                candidates = await list_candidates_async(
+                    "example", "https://index.invalid/simple", session=session
+                )
+
+        assert candidates == []
+        # Only the tunnel was requested from the proxy, with its credentials.
+        assert proxy.requests == [
+            b"CONNECT index.invalid:443 HTTP/1.1\r\n"
+            b"Host: index.invalid:443\r\n"
+            b"Proxy-Authorization: Basic dXNlcjpzZWNyZXQ=\r\n\r\n"
+        ]
+
+    def test_headers_are_case_insensitive(self):
+        headers = Headers([("ETag", '"a"'), ("Vary", "Accept"), ("vary", "Host")])
+        assert headers["etag"] == headers.get("ETAG") == '"a"'
+        assert headers["Vary"] == "Accept, Host"
+        assert list(headers) == ["ETag", "Vary"]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,464 @@
+import contextlib
+import errno
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mockpip.cache import EntryPointCache
+from mockpip.cache import IndexCache
+from mockpip.cache import PipConfigCache
+from mockpip.cache import ProviderConfigCache
+from mockpip.cache import VariantOrderCache
+from mockpip.cache import WheelCache
+from mockpip.cache import link_or_copy
+from mockpip.repository import SIMPLE_JSON_CONTENT_TYPE
+from mockpip.repository import list_candidates
+from tests.index_server import LocalIndexServer
+from tests.index_server import make_index_page
+from tests.index_server import make_json_index_page
+
+INDEX_PAGE = make_index_page([
+    "example-1.0.0.tar.gz",
+    "example-1.0.0-py3-none-any.whl",
+    "example-1.1.0-py3-none-any.whl",
+])
+
+
+class TestIndexCache(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmpdir.name)
+
+        self.server = LocalIndexServer({"/simple/example/": INDEX_PAGE})
+        self.server.__enter__()
+        self.index_url = f"{self.server.url}/simple"
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self._tmpdir.cleanup()
+
+    def test_cache_hit_skips_network(self):
+        cache = IndexCache(self.cache_dir, ttl=60)
+
+        first = list_candidates("example", index_url=self.index_url, cache=cache)
+        second = list_candidates("example", index_url=self.index_url, cache=cache)
+
+        assert len(first) == 3  # noqa: PLR2004
+        assert first == second
+        assert len(self.server.requests) == 1
+
+    def test_stale_entry_is_revalidated(self):
+        cache = IndexCache(self.cache_dir, ttl=0)
+
+        first = list_candidates("example", index_url=self.index_url, cache=cache)
+        second = list_candidates("example", index_url=self.index_url, cache=cache)
+
+        assert first == second
+        assert len(self.server.requests) == 2  # noqa: PLR2004
+        assert "If-None-Match" not in self.server.request_headers[0]
+        assert "If-None-Match" in self.server.request_headers[1]
+
+    def test_changed_page_is_refetched(self):
+        cache = IndexCache(self.cache_dir, ttl=0)
+
+        first = list_candidates("example", index_url=self.index_url, cache=cache)
+        self.server.pages["/simple/example/"] = make_index_page(
+            ["example-2.0.0-py3-none-any.whl"]
+        )
+        second = list_candidates("example", index_url=self.index_url, cache=cache)
+
+        assert len(first) == 3  # noqa: PLR2004
+        assert [candidate.filename for candidate in second] == [
+            "example-2.0.0-py3-none-any.whl"
+        ]
+
+    def test_cached_json_page(self):
+        self.server.pages["/simple/example/"] = {
+            SIMPLE_JSON_CONTENT_TYPE: make_json_index_page(
+                ["example-3.0.0-py3-none-any.whl"]
+            )
+        }
+        cache = IndexCache(self.cache_dir, ttl=60)
+
+        first = list_candidates("example", index_url=self.index_url, cache=cache)
+        second = list_candidates("example", index_url=self.index_url, cache=cache)
+
+        assert first == second
+        assert [candidate.filename for candidate in second] == [
+            "example-3.0.0-py3-none-any.whl"
+        ]
+        assert len(self.server.requests) == 1
+
+    def test_offline_serves_stale_entries(self):
+        list_candidates(
+            "example",
+            index_url=self.index_url,
+            cache=IndexCache(self.cache_dir, ttl=60),
+        )
+
+        cache = IndexCache(self.cache_dir, ttl=0, offline=True)
+        candidates = list_candidates("example", index_url=self.index_url, cache=cache)
+
+        assert len(candidates) == 3  # noqa: PLR2004
+        assert len(self.server.requests) == 1
+
+    def test_offline_cache_miss(self):
+        cache = IndexCache(self.cache_dir, offline=True)
+        candidates = list_candidates("example", index_url=self.index_url, cache=cache)
+
+        assert candidates == []
+        assert self.server.requests == []
+
+    def test_size_bounded_eviction(self):
+        cache = IndexCache(self.cache_dir)
+
+        for idx in range(3):
+            cache.store(f"https://example.com/{idx}/", INDEX_PAGE.encode(), {})
+            entry = cache.get(f"https://example.com/{idx}/")
+            past = time.time() - 100 + idx
+            os.utime(entry.body_path, (past, past))
+
+        # Access #0 so #1 becomes the least recently used entry.
+        cache.max_size = 2 * len(INDEX_PAGE)
+        cache.get("https://example.com/0/")
+        cache.store("https://example.com/3/", INDEX_PAGE.encode(), {})
+
+        assert cache.get("https://example.com/1/") is None
+        assert cache.get("https://example.com/2/") is None
+        assert cache.get("https://example.com/0/") is not None
+        assert cache.get("https://example.com/3/") is not None
+        assert cache.size() <= cache.max_size
+
+    def test_partial_page_is_not_stored(self):
+        cache = IndexCache(self.cache_dir)
+        url = "https://example.com/simple/example/"
+
+        with contextlib.suppress(ConnectionError), cache.open_writer(url, {}) as writer:
+            writer.write(INDEX_PAGE.encode()[:100])
+            raise ConnectionError
+
+        assert cache.get(url) is None
+        assert list(self.cache_dir.iterdir()) == []
+
+        with cache.open_writer(url, {"ETag": '"v1"'}) as writer:
+            writer.write(INDEX_PAGE.encode())
+
+        assert cache.get(url).etag == '"v1"'
+        assert cache.get(url).read() == INDEX_PAGE.encode()
+
+
+class TestWheelCache(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmpdir.name) / "wheels"
+        self.work_dir = Path(self._tmpdir.name) / "work"
+        self.work_dir.mkdir()
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def make_file(self, name: str, size: int = 1000) -> tuple[str, Path]:
+        path = self.work_dir / name
+        path.write_bytes(os.urandom(size))
+        return hashlib.sha256(path.read_bytes()).hexdigest(), path
+
+    def test_store_and_place(self):
+        cache = WheelCache(self.cache_dir)
+        filehash, path = self.make_file("example-1.0.0-py3-none-any.whl")
+        dest = self.work_dir / "dest.whl"
+
+        assert not cache.place(filehash, dest)
+        cache.store(filehash, path)
+        assert cache.place(filehash.upper(), dest)
+
+        assert dest.read_bytes() == path.read_bytes()
+        # Hardlinked: the stored file keeps the mode of the downloaded one.
+        assert dest.stat().st_ino == path.stat().st_ino
+        assert path.stat().st_mode & 0o200
+
+    def test_copies_are_stored_read_only(self):
+        cache = WheelCache(self.cache_dir)
+        filehash, path = self.make_file("example.whl")
+
+        with patch("os.link", side_effect=OSError(errno.EXDEV, "cross-device")):
+            cache.store(filehash, path)
+
+        mode = cache._path(filehash).stat().st_mode  # noqa: SLF001
+        assert mode & 0o777 == 0o444  # noqa: PLR2004
+        assert path.stat().st_mode & 0o200
+
+    def test_place_file_of_another_user(self):
+        cache = WheelCache(self.cache_dir)
+        filehash, path = self.make_file("example.whl")
+        cache.store(filehash, path)
+        dest = self.work_dir / "dest.whl"
+
+        with patch("os.utime", side_effect=PermissionError(errno.EPERM, "EPERM")):
+            assert cache.place(filehash, dest)
+
+        assert dest.read_bytes() == path.read_bytes()
+
+    def test_store_waits_for_readers(self):
+        cache = WheelCache(self.cache_dir)
+        filehash, path = self.make_file("example.whl")
+        stored = threading.Event()
+
+        def _store():
+            cache.store(filehash, path)
+            stored.set()
+
+        with cache._locked(exclusive=False):  # noqa: SLF001
+            thread = threading.Thread(target=_store)
+            thread.start()
+            assert not stored.wait(0.2)
+
+        thread.join()
+        assert stored.is_set()
+        assert cache.place(filehash, self.work_dir / "dest.whl")
+
+    def test_invalid_hash(self):
+        cache = WheelCache(self.cache_dir)
+        with pytest.raises(ValueError, match="Invalid sha256"):
+            cache.place("../../etc/passwd", self.work_dir / "dest")
+
+    def test_least_recently_used_files_are_evicted(self):
+        cache = WheelCache(self.cache_dir, max_size=2500)
+        hashes = []
+
+        for idx in range(2):
+            filehash, path = self.make_file(f"example{idx}.whl")
+            cache.store(filehash, path)
+            past = time.time() - 100 + idx
+            os.utime(cache._path(filehash), (past, past))  # noqa: SLF001
+            hashes.append(filehash)
+
+        # Use #0 so #1 becomes the least recently used file.
+        assert cache.place(hashes[0], self.work_dir / "dest.whl")
+        filehash, path = self.make_file("example2.whl")
+        cache.store(filehash, path)
+
+        assert cache.size() == 2000  # noqa: PLR2004
+        assert not cache.place(hashes[1], self.work_dir / "dest.whl")
+        assert cache.place(hashes[0], self.work_dir / "dest.whl")
+        assert cache.place(filehash, self.work_dir / "dest.whl")
+
+    def test_eviction_waits_for_readers(self):
+        cache = WheelCache(self.cache_dir, max_size=0)
+        evicted = threading.Event()
+
+        def _evict():
+            cache.evict()
+            evicted.set()
+
+        with cache._locked(exclusive=False):  # noqa: SLF001
+            thread = threading.Thread(target=_evict)
+            thread.start()
+            assert not evicted.wait(0.2)
+
+        thread.join()
+        assert evicted.is_set()
+
+    def test_placed_file_survives_eviction(self):
+        cache = WheelCache(self.cache_dir)
+        filehash, path = self.make_file("example.whl")
+        cache.store(filehash, path)
+        path.unlink()
+
+        dest = self.work_dir / "dest.whl"
+        assert cache.place(filehash, dest)
+        cache.clear()
+
+        assert hashlib.sha256(dest.read_bytes()).hexdigest() == filehash
+        assert cache.size() == 0
+
+    def test_copy_across_filesystems(self):
+        filehash, path = self.make_file("example.whl")
+        dest = self.work_dir / "dest.whl"
+
+        with patch("os.link", side_effect=OSError(errno.EXDEV, "cross-device")):
+            method = link_or_copy(path, dest)
+
+        assert method in ("reflink", "copy")
+        assert dest.read_bytes() == path.read_bytes()
+        assert dest.stat().st_ino != path.stat().st_ino
+
+
+class TestProviderConfigCache(unittest.TestCase):
+    CONFIG = {
+        "provider": "fictional_hw",
+        "configs": [{"key": "architecture", "values": ["HAL9000"]}],
+    }
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmpdir.name)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_store_and_get(self):
+        cache = ProviderConfigCache(self.cache_dir)
+        cache.store("fictional_hw", "1.0.0", fingerprint=None, config=self.CONFIG)
+
+        # A new instance reads the entries persisted by the previous one.
+        entry = ProviderConfigCache(self.cache_dir).get("fictional_hw", "1.0.0")
+        assert entry.config == self.CONFIG
+        assert entry.fingerprint is None
+
+    def test_missing_entry(self):
+        cache = ProviderConfigCache(self.cache_dir)
+        assert cache.get("fictional_hw", "1.0.0") is None
+
+    def test_plugin_upgrade_invalidates_entry(self):
+        cache = ProviderConfigCache(self.cache_dir)
+        cache.store("fictional_hw", "1.0.0", fingerprint="abc", config=self.CONFIG)
+
+        assert cache.get("fictional_hw", "2.0.0") is None
+        # The stale entry was dropped.
+        assert cache.get("fictional_hw", "1.0.0") is None
+
+    def test_expired_entry(self):
+        cache = ProviderConfigCache(self.cache_dir, ttl=0)
+        cache.store("fictional_hw", "1.0.0", fingerprint=None, config=self.CONFIG)
+        assert cache.get("fictional_hw", "1.0.0") is None
+
+    def test_corrupted_cache_file(self):
+        (self.cache_dir / ProviderConfigCache.FILENAME).write_text("{not json")
+        cache = ProviderConfigCache(self.cache_dir)
+
+        assert cache.get("fictional_hw", "1.0.0") is None
+        cache.store("fictional_hw", "1.0.0", fingerprint=None, config=self.CONFIG)
+        assert cache.get("fictional_hw", "1.0.0") is not None
+
+    def test_clear(self):
+        cache = ProviderConfigCache(self.cache_dir)
+        cache.store("fictional_hw", "1.0.0", fingerprint=None, config=self.CONFIG)
+        cache.clear()
+
+        assert cache.get("fictional_hw", "1.0.0") is None
+        assert not cache.path.exists()
+
+
+class TestPipConfigCache(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmpdir.name)
+        self.config_file = self.cache_dir / "pip.conf"
+        self.config_file.write_text("[variantlib]\n")
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_store_and_get(self):
+        cache = PipConfigCache(self.cache_dir)
+        assert cache.get("env") is None
+
+        files = [str(self.config_file), str(self.cache_dir / "missing.conf")]
+        cache.store("env", PipConfigCache.get_mtimes(files), '["nvidia"]')
+
+        # A new instance reads the entries persisted by the previous one.
+        entry = PipConfigCache(self.cache_dir).get("env")
+        assert entry.value == '["nvidia"]'
+        assert entry.files[str(self.cache_dir / "missing.conf")] is None
+
+    def test_changed_files_invalidate_entry(self):
+        cache = PipConfigCache(self.cache_dir)
+        missing_file = self.cache_dir / "missing.conf"
+        files = [str(self.config_file), str(missing_file)]
+        cache.store("env", PipConfigCache.get_mtimes(files), None)
+
+        future = time.time() + 100
+        os.utime(self.config_file, (future, future))
+        assert cache.get("env") is None
+
+        cache.store("env", PipConfigCache.get_mtimes(files), None)
+        missing_file.write_text("[variantlib]\n")
+        assert cache.get("env") is None
+
+
+class TestVariantOrderCache(unittest.TestCase):
+    ORDER = {"hashes": ["714c4f9e"], "properties": ["gcc :: version :: 1.2.3"]}
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmpdir.name)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_store_and_get(self):
+        cache = VariantOrderCache(self.cache_dir)
+        assert cache.get("abc") is None
+
+        cache.store("abc", self.ORDER)
+        assert cache.get("abc") == self.ORDER
+
+    def test_least_recently_used_orders_are_evicted(self):
+        cache = VariantOrderCache(self.cache_dir, max_entries=2)
+
+        for idx, key in enumerate(["a", "b"]):
+            cache.store(key, self.ORDER)
+            past = time.time() - 100 + idx
+            os.utime(cache.cache_dir / f"order-{key}.json", (past, past))
+
+        cache.get("a")  # "b" becomes the least recently used order
+        cache.store("c", self.ORDER)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == self.ORDER
+        assert cache.get("c") == self.ORDER
+
+
+class TestEntryPointCache(unittest.TestCase):
+    ENTRY_POINTS = {
+        "mockpip.actions": [
+            ["install", "mockpip.commands.install:install", "mockpip", "0.1.0"]
+        ]
+    }
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self._tmpdir.name)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_store_and_get(self):
+        cache = EntryPointCache(self.cache_dir)
+        assert cache.get("env", "abc") is None
+
+        cache.store("env", "abc", self.ENTRY_POINTS)
+        assert cache.get("env", "abc") == self.ENTRY_POINTS
+
+    def test_fingerprint_mismatch(self):
+        cache = EntryPointCache(self.cache_dir)
+        cache.store("env", "abc", self.ENTRY_POINTS)
+
+        assert cache.get("env", "def") is None
+        assert cache.get("other_env", "abc") is None
+
+    def test_least_recently_used_environments_are_evicted(self):
+        cache = EntryPointCache(self.cache_dir, max_entries=2)
+
+        for idx, key in enumerate(["a", "b"]):
+            cache.store(key, "abc", self.ENTRY_POINTS)
+            past = time.time() - 100 + idx
+            os.utime(cache.cache_dir / f"entry-points-{key}.json", (past, past))
+
+        cache.get("a", "abc")  # "b" becomes the least recently used environment
+        cache.store("c", "abc", self.ENTRY_POINTS)
+
+        assert cache.get("b", "abc") is None
+        assert cache.get("a", "abc") == self.ENTRY_POINTS
+        assert cache.get("c", "abc") == self.ENTRY_POINTS
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+import hashlib
+import io
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from mockpip.daemon import ResolverDaemon
+from mockpip.daemon import forward_to_daemon
+from mockpip.daemon import ping_daemon
+from mockpip.daemon import stop_daemon
+from tests.index_server import LocalIndexServer
+from tests.index_server import make_index_page
+from tests.index_server import make_wheel
+
+
+class TestResolverDaemon(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.socket_path = Path(self._tmpdir.name) / "daemon.sock"
+
+        self._env = patch.dict(
+            os.environ,
+            {"XDG_CACHE_HOME": str(Path(self._tmpdir.name) / "cache")},
+        )
+        self._env.start()
+        os.environ.pop("MOCKPIP_NO_DAEMON", None)
+
+        self.server = LocalIndexServer({
+            "/simple/example/": make_index_page([
+                "example-1.0.0-py3-none-any.whl",
+                "example-2.0.0-py3-none-any.whl",
+            ])
+        })
+        self.server.__enter__()
+
+        self.daemon = ResolverDaemon(self.socket_path, idle_timeout=30)
+        self.daemon.bind()
+        self._thread = threading.Thread(target=self.daemon.serve_forever)
+        self._thread.start()
+
+    def tearDown(self):
+        stop_daemon(self.socket_path)
+        self._thread.join(timeout=10)
+        self.server.__exit__(None, None, None)
+        self._env.stop()
+        self._tmpdir.cleanup()
+
+    def forward(self, *args: str, tty: bool = False) -> tuple[int | None, str, str]:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        stdout.isatty = lambda: tty
+        retcode = forward_to_daemon(
+            "install",
+            list(args),
+            socket_path=self.socket_path,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        return retcode, stdout.getvalue(), stderr.getvalue()
+
+    def test_ping(self):
+        assert ping_daemon(self.socket_path)
+        assert not ping_daemon(Path(self._tmpdir.name) / "missing.sock")
+
+    def test_install(self):
+        args = ["example", "--dry-run", f"--index-url={self.server.url}/simple"]
+        for _ in range(2):  # the second run is served from the warm state
+            retcode, stdout, _ = self.forward(*args)
+            assert retcode == 0
+            assert "Would install: example-2.0.0-py3-none-any.whl" in stdout
+
+        # The index session is kept across the requests.
+        assert len(self.daemon.state._resources) > 0  # noqa: SLF001
+
+    def test_plugins_run_once(self):
+        self.server.pages["/simple/variant/"] = make_index_page([
+            "variant-1.0.0~0123abcd-py3-none-any.whl",
+            "variant-1.0.0-py3-none-any.whl",
+        ])
+        args = ["variant", "--dry-run", f"--index-url={self.server.url}/simple"]
+        with patch(
+            "mockpip.commands.install.get_provider_configs", return_value=[]
+        ) as get_provider_configs:
+            for _ in range(2):
+                assert self.forward(*args)[0] == 0
+            get_provider_configs.assert_called_once()
+
+            # A refresh runs the plugins again, and replaces their results.
+            assert self.forward(*args, "--refresh-variants")[0] == 0
+            assert self.forward(*args)[0] == 0
+            assert get_provider_configs.call_count == 2  # noqa: PLR2004
+
+    def test_relative_paths_follow_client(self):
+        args = [
+            "example",
+            "--dry-run",
+            "--cache-dir=cache",
+            f"--index-url={self.server.url}/simple",
+        ]
+        previous_cwd = Path.cwd()
+        self.addCleanup(os.chdir, previous_cwd)
+        for name in ("a", "b"):
+            client_dir = Path(self._tmpdir.name) / name
+            client_dir.mkdir()
+            os.chdir(client_dir)
+            assert self.forward(*args)[0] == 0
+            assert (client_dir / "cache" / "http").is_dir()
+
+        # Each client has its own cache, not the one of the previous client.
+        cache_dirs = {
+            key[1]
+            for key in self.daemon.state._resources  # noqa: SLF001
+            if key[0] == "index_cache"
+        }
+        assert cache_dirs == {
+            Path(self._tmpdir.name) / name / "cache" for name in ("a", "b")
+        }
+
+    def test_progress_follows_client_terminal(self):
+        wheel = make_wheel(name="other")
+        filename = "other-1.0.0-py3-none-any.whl"
+        self.server.pages["/simple/other/"] = make_index_page(
+            [filename], hashes={filename: hashlib.sha256(wheel).hexdigest()}
+        )
+        self.server.pages[f"/packages/{filename}"] = wheel
+        args = [
+            "other",
+            "--no_variants",
+            "--no-cache",
+            f"--index-url={self.server.url}/simple",
+        ]
+
+        with patch.dict(
+            os.environ, {"MOCKPIP_TARGET": str(Path(self._tmpdir.name) / "target")}
+        ):
+            _, not_a_tty, _ = self.forward(*args)
+            retcode, tty, _ = self.forward(*args, tty=True)
+
+        assert retcode == 0
+        assert "\x1b[" not in not_a_tty
+        assert f"{filename[:40]:<40} [" in tty
+
+    def test_invalid_arguments(self):
+        retcode, _, stderr = self.forward("--no-such-option")
+        assert retcode == 2  # noqa: PLR2004
+        assert "error:" in stderr
+
+    def test_not_forwarded(self):
+        assert forward_to_daemon("serve", [], socket_path=self.socket_path) is None
+        assert (
+            forward_to_daemon(
+                "install", [], socket_path=Path(self._tmpdir.name) / "missing.sock"
+            )
+            is None
+        )
+        with patch.dict(os.environ, {"MOCKPIP_NO_DAEMON": "1"}):
+            retcode = forward_to_daemon("install", [], socket_path=self.socket_path)
+            assert retcode is None
+
+    def test_only_read_environment_forwarded(self):
+        self.daemon.commands["install"] = MagicMock(return_value=0)
+        with (
+            patch.dict(
+                os.environ,
+                {
+                    "PIP_INDEX_URL": "http://index",
+                    "https_proxy": "http://proxy",
+                    "MOCKPIP_TARGET": "target",
+                    "UNRELATED_VARIABLE": "not sent",
+                },
+            ),
+            patch.object(
+                self.daemon,
+                "_handle_request",
+                wraps=self.daemon._handle_request,  # noqa: SLF001
+            ) as handle_request,
+        ):
+            assert self.forward("example")[0] == 0
+
+        env = handle_request.call_args.args[1]["env"]
+        assert env["PIP_INDEX_URL"] == "http://index"
+        assert env["https_proxy"] == "http://proxy"
+        assert env["MOCKPIP_TARGET"] == "target"
+        assert "UNRELATED_VARIABLE" not in env
+        assert "PATH" not in env
+
+    def test_process_environment_unchanged(self):
+        seen = []
+
+        def command(args, state, cwd, env):
+            seen.append((Path.cwd(), os.environ.get("PIP_INDEX_URL"), cwd, env))
+            return 0
+
+        # Background threads of the daemon would see a process-wide swap.
+        env = {"PIP_INDEX_URL": "http://client"}
+        retcode = self.daemon.run(
+            command,
+            args=[],
+            cwd=self._tmpdir.name,
+            env=env,
+            isatty={},
+            sink=lambda stream, data: None,
+        )
+
+        assert retcode == 0
+        assert seen == [
+            (Path.cwd(), os.environ.get("PIP_INDEX_URL"), self._tmpdir.name, env)
+        ]
+
+    def test_socket_of_another_user(self):
+        self.daemon.commands["install"] = command = MagicMock(return_value=0)
+        with patch("mockpip.daemon.os.getuid", return_value=os.getuid() + 1):
+            assert self.forward("example")[0] is None
+        command.assert_not_called()
+
+        not_a_socket = Path(self._tmpdir.name) / "file.sock"
+        not_a_socket.touch()
+        assert forward_to_daemon("install", [], socket_path=not_a_socket) is None
+
+    def test_peer_of_another_user(self):
+        self.daemon.commands["install"] = command = MagicMock(return_value=0)
+        with patch("mockpip.daemon._peer_uid", return_value=os.getuid() + 1):
+            # Neither the client sends its request...
+            assert self.forward("example")[0] is None
+
+            # ... nor the daemon reads it.
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.connect(str(self.socket_path))
+                with conn.makefile("rb") as f:
+                    assert f.readline() == b""
+
+        command.assert_not_called()
+
+    def test_already_running(self):
+        with pytest.raises(OSError, match="already listening"):
+            ResolverDaemon(self.socket_path).bind()
+
+    def test_stop(self):
+        assert stop_daemon(self.socket_path)
+        self._thread.join(timeout=10)
+        assert not self._thread.is_alive()
+        assert not self.socket_path.exists()
+        assert not stop_daemon(self.socket_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,221 @@
+import hashlib
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from mockpip.cache import WheelCache
+from mockpip.download import PARTIAL_SUFFIX
+from mockpip.download import download_candidate
+from mockpip.download import download_candidates
+from mockpip.repository import IndexSession
+from mockpip.repository import PackageCandidate
+from tests.index_server import LocalIndexServer
+
+WHEEL = bytes(range(256)) * 1024  # 256 KiB
+SHA256 = hashlib.sha256(WHEEL).hexdigest()
+FILENAME = "example-1.0.0-py3-none-any.whl"
+
+
+class TestDownload(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.dest_dir = Path(self._tmpdir.name)
+
+        self.server = LocalIndexServer({f"/packages/{FILENAME}": WHEEL})
+        self.server.__enter__()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        self._tmpdir.cleanup()
+
+    def make_candidate(
+        self, filename: str = FILENAME, filehash: str | None = SHA256
+    ) -> PackageCandidate:
+        return PackageCandidate(
+            filename,
+            "1.0.0",
+            "whl",
+            filehash,
+            url=f"{self.server.url}/packages/{filename}",
+        )
+
+    @property
+    def partial_path(self) -> Path:
+        return self.dest_dir / f"{FILENAME}{PARTIAL_SUFFIX}"
+
+    def test_download(self):
+        progress = []
+        result = download_candidate(
+            self.make_candidate(),
+            self.dest_dir,
+            progress=lambda *args: progress.append(args),
+        )
+
+        assert result.error is None
+        assert result.path == self.dest_dir / FILENAME
+        assert result.path.read_bytes() == WHEEL
+        assert result.size == len(WHEEL)
+        assert result.resumed == 0
+        assert not self.partial_path.exists()
+        assert progress[-1] == (FILENAME, len(WHEEL), len(WHEEL))
+
+    def test_resume_interrupted_transfer(self):
+        self.server.truncations[f"/packages/{FILENAME}"] = 2
+
+        result = download_candidate(self.make_candidate(), self.dest_dir)
+
+        assert result.error is None
+        assert result.path.read_bytes() == WHEEL
+        assert len(self.server.requests) == 3  # noqa: PLR2004
+        assert "Range" not in self.server.request_headers[0]
+        assert self.server.request_headers[1]["Range"] == f"bytes={len(WHEEL) // 2}-"
+
+    def test_resume_previous_run(self):
+        self.server.truncations[f"/packages/{FILENAME}"] = 1
+
+        with IndexSession(max_retries=0) as session:
+            failed = download_candidate(
+                self.make_candidate(), self.dest_dir, session=session, max_resumes=0
+            )
+        assert failed.error is not None
+        assert self.partial_path.stat().st_size == len(WHEEL) // 2
+
+        result = download_candidate(self.make_candidate(), self.dest_dir)
+
+        assert result.error is None
+        assert result.resumed == len(WHEEL) // 2
+        assert result.path.read_bytes() == WHEEL
+
+    def test_range_not_supported(self):
+        self.server.range_support = False
+        self.partial_path.write_bytes(WHEEL[:1000])
+
+        result = download_candidate(self.make_candidate(), self.dest_dir)
+
+        assert result.error is None
+        assert result.path.read_bytes() == WHEEL
+
+    def test_complete_partial_file(self):
+        self.partial_path.write_bytes(WHEEL)
+
+        result = download_candidate(self.make_candidate(), self.dest_dir)
+
+        assert result.error is None
+        assert result.path.read_bytes() == WHEEL
+        assert self.server.request_headers[0]["Range"] == f"bytes={len(WHEEL)}-"
+
+    def test_corrupted_partial_file(self):
+        self.partial_path.write_bytes(b"\0" * 1000)
+
+        result = download_candidate(self.make_candidate(), self.dest_dir)
+
+        assert result.error is None
+        assert result.path.read_bytes() == WHEEL
+        assert len(self.server.requests) == 2  # noqa: PLR2004
+
+    def test_sha256_mismatch(self):
+        result = download_candidate(
+            self.make_candidate(filehash="0" * 64), self.dest_dir
+        )
+
+        assert result.error == "sha256 mismatch"
+        assert result.path is None
+        assert list(self.dest_dir.iterdir()) == []
+
+    def test_missing_file(self):
+        result = download_candidate(
+            self.make_candidate(filename="missing-1.0.0-py3-none-any.whl"),
+            self.dest_dir,
+        )
+
+        assert result.error == "HTTP 404"
+        assert list(self.dest_dir.iterdir()) == []
+
+    def test_wheel_cache(self):
+        cache = WheelCache(self.dest_dir / "wheels")
+        first = download_candidate(
+            self.make_candidate(), self.dest_dir / "a", wheel_cache=cache
+        )
+        # Same file from another index and under another name.
+        self.server.pages["/packages/copy-1.0.0-py3-none-any.whl"] = WHEEL
+        second = download_candidate(
+            self.make_candidate("copy-1.0.0-py3-none-any.whl"),
+            self.dest_dir / "b",
+            wheel_cache=cache,
+            offline=True,
+        )
+
+        assert not first.cached
+        assert second.cached
+        assert second.error is None
+        assert second.path.read_bytes() == WHEEL
+        assert len(self.server.requests) == 1
+
+    def test_offline_cache_miss(self):
+        result = download_candidate(
+            self.make_candidate(),
+            self.dest_dir,
+            wheel_cache=WheelCache(self.dest_dir / "wheels"),
+            offline=True,
+        )
+
+        assert result.error == "not in the wheel cache (offline mode)"
+        assert self.server.requests == []
+
+    def test_download_batch(self):
+        filenames = [f"example{idx}-1.0.0-py3-none-any.whl" for idx in range(5)]
+        for idx, filename in enumerate(filenames):
+            self.server.pages[f"/packages/{filename}"] = WHEEL[idx:]
+
+        candidates = [
+            self.make_candidate(filename, hashlib.sha256(WHEEL[idx:]).hexdigest())
+            for idx, filename in enumerate(filenames)
+        ]
+        results = download_candidates(candidates, self.dest_dir, max_workers=3)
+
+        assert [result.candidate for result in results] == candidates
+        for idx, result in enumerate(results):
+            assert result.error is None
+            assert result.path.read_bytes() == WHEEL[idx:]
+
+    def test_download_batch_same_file(self):
+        # e.g. `example 'example>=1'`
+        candidates = [self.make_candidate(), self.make_candidate()]
+        results = download_candidates(candidates, self.dest_dir, max_workers=2)
+
+        assert [result.candidate for result in results] == candidates
+        assert results[0] == results[1]
+        assert results[0].path.read_bytes() == WHEEL
+        assert len(self.server.requests) == 1
+
+    def test_concurrent_downloads_of_same_file(self):
+        # e.g. two processes sharing a download directory and a wheel cache
+        self.server.latency = 0.2
+        wheel_cache = WheelCache(self.dest_dir / "wheels")
+        barrier = threading.Barrier(2)
+        results = []
+
+        def download():
+            barrier.wait()
+            results.append(
+                download_candidate(
+                    self.make_candidate(), self.dest_dir, wheel_cache=wheel_cache
+                )
+            )
+
+        threads = [threading.Thread(target=download) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # The second one waited for the first one, and used its file.
+        assert sorted(result.cached for result in results) == [False, True]
+        assert all(result.error is None for result in results)
+        assert (self.dest_dir / FILENAME).read_bytes() == WHEEL
+        assert len(self.server.requests) == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from mockpip.cache import EntryPointCache
+from mockpip.entry_points import get_entry_points
+from mockpip.entry_points import get_environment_fingerprint
+from mockpip.entry_points import get_environment_key
+
+
+def make_distribution(
+    site_packages: Path, name: str, version: str, entry_points: str
+) -> Path:
+    dist_info = site_packages / f"{name}-{version}.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text(
+        f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n\nDescription\n"
+    )
+    (dist_info / "entry_points.txt").write_text(entry_points)
+    return dist_info
+
+
+class TestEntryPoints(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.site_packages = Path(self._tmpdir.name) / "site-packages"
+        self.site_packages.mkdir()
+        self.paths = [str(self.site_packages)]
+        self.cache = EntryPointCache(Path(self._tmpdir.name) / "cache")
+
+        make_distribution(
+            self.site_packages,
+            "fictional_hw",
+            "1.0.0",
+            "[variantlib.plugins]\nfictional_hw = json:JSONDecoder\n",
+        )
+        make_distribution(
+            self.site_packages,
+            "other",
+            "2.0.0",
+            "[console_scripts]\nother = other.cli:main\n",
+        )
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_get_entry_points(self):
+        (plugin,) = get_entry_points("variantlib.plugins", paths=self.paths)
+
+        assert plugin.name == "fictional_hw"
+        assert plugin.group == "variantlib.plugins"
+        assert plugin.dist.name == "fictional_hw"
+        assert plugin.dist.version == "1.0.0"
+        assert plugin.load() is json.JSONDecoder
+
+    def test_missing_group(self):
+        assert get_entry_points("mockpip.actions", paths=self.paths) == []
+
+    def test_cache_hit_skips_scan(self):
+        first = get_entry_points(
+            "variantlib.plugins", cache=self.cache, paths=self.paths
+        )
+
+        with patch("mockpip.entry_points.scan_entry_points") as scan_mock:
+            second = get_entry_points(
+                "console_scripts", cache=self.cache, paths=self.paths
+            )
+            scan_mock.assert_not_called()
+
+        assert [entry_point.name for entry_point in first] == ["fictional_hw"]
+        assert [entry_point.name for entry_point in second] == ["other"]
+
+    def test_installed_distribution_invalidates_cache(self):
+        get_entry_points("variantlib.plugins", cache=self.cache, paths=self.paths)
+
+        make_distribution(
+            self.site_packages,
+            "another_hw",
+            "0.1.0",
+            "[variantlib.plugins]\nanother_hw = json:JSONEncoder\n",
+        )
+        plugins = get_entry_points(
+            "variantlib.plugins", cache=self.cache, paths=self.paths
+        )
+
+        assert sorted(plugin.name for plugin in plugins) == [
+            "another_hw",
+            "fictional_hw",
+        ]
+
+    def test_upgraded_distribution_invalidates_cache(self):
+        get_entry_points("variantlib.plugins", cache=self.cache, paths=self.paths)
+
+        shutil.rmtree(self.site_packages / "fictional_hw-1.0.0.dist-info")
+        make_distribution(
+            self.site_packages,
+            "fictional_hw",
+            "1.1.0",
+            "[variantlib.plugins]\nfictional_hw = json:JSONDecoder\n",
+        )
+        (plugin,) = get_entry_points(
+            "variantlib.plugins", cache=self.cache, paths=self.paths
+        )
+
+        assert plugin.dist.version == "1.1.0"
+
+    def test_fingerprint_tracks_metadata_changes(self):
+        before = get_environment_fingerprint(self.paths)
+        assert get_environment_fingerprint(self.paths) == before
+
+        dist_info = self.site_packages / "other-2.0.0.dist-info"
+        future = time.time() + 100
+        os.utime(dist_info, (future, future))
+
+        assert get_environment_fingerprint(self.paths) != before
+
+    def test_environment_key(self):
+        assert get_environment_key(self.paths) == get_environment_key(self.paths)
+        assert get_environment_key(self.paths) != get_environment_key(
+            [*self.paths, self._tmpdir.name]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
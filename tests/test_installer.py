@@ -0,0 +1,206 @@
+import csv
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+import pytest
+from parameterized import parameterized
+
+from mockpip.installer import EXTRACT_CHUNK_SIZE
+from mockpip.installer import InvalidWheelError
+from mockpip.installer import install_wheel
+from mockpip.installer import record_digest
+from tests.index_server import make_wheel
+
+# Larger than a chunk, and compressible.
+LARGE_FILE = os.urandom(1000) * (3 * EXTRACT_CHUNK_SIZE // 1000)
+
+
+class TestInstallWheel(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = Path(self._tmpdir.name)
+        self.target = self.tmpdir / "site-packages"
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def write_wheel(self, content: bytes, name: str = "example.whl") -> Path:
+        path = self.tmpdir / name
+        path.write_bytes(content)
+        return path
+
+    def read_record(self) -> dict[str, tuple[str, str]]:
+        with (self.target / "example-1.0.0.dist-info" / "RECORD").open() as f:
+            return {row[0]: (row[1], row[2]) for row in csv.reader(f)}
+
+    @parameterized.expand([
+        (zipfile.ZIP_STORED, 1),
+        (zipfile.ZIP_DEFLATED, 1),
+        (zipfile.ZIP_STORED, 4),
+        (zipfile.ZIP_DEFLATED, 4),
+    ])
+    def test_install(self, compression, max_workers):
+        files = {
+            "example/__init__.py": b"",
+            "example/large.bin": LARGE_FILE,
+            "example/empty.txt": b"",
+        }
+        wheel_path = self.write_wheel(make_wheel(files=files, compression=compression))
+
+        result = install_wheel(wheel_path, target=self.target, max_workers=max_workers)
+
+        assert (result.name, result.version) == ("example", "1.0.0")
+        for path, content in files.items():
+            assert (self.target / path).read_bytes() == content
+
+        record = self.read_record()
+        assert record["example/large.bin"] == (
+            record_digest(hashlib.sha256(LARGE_FILE)),
+            str(len(LARGE_FILE)),
+        )
+        assert record["example-1.0.0.dist-info/RECORD"] == ("", "")
+        assert "example-1.0.0.dist-info/INSTALLER" in record
+        assert len(record) == len(result.files) + 1
+
+    def test_scripts_and_data(self):
+        entry_points = b"[console_scripts]\nexample-cli = example.cli:main\n"
+        wheel_path = self.write_wheel(
+            make_wheel(
+                files={
+                    "example/__init__.py": b"",
+                    "example-1.0.0.data/scripts/tool": b"#!python\nprint('tool')\n",
+                    "example-1.0.0.data/data/share/example.txt": b"data",
+                    "example-1.0.0.dist-info/entry_points.txt": entry_points,
+                }
+            )
+        )
+
+        install_wheel(wheel_path, target=self.target)
+
+        tool = self.target / "bin" / "tool"
+        assert tool.read_bytes() == f"#!{sys.executable}\nprint('tool')\n".encode()
+        assert os.access(tool, os.X_OK)
+        assert (self.target / "share" / "example.txt").read_bytes() == b"data"
+
+        cli = (self.target / "bin" / "example-cli").read_text()
+        assert "from example.cli import main" in cli
+        assert os.access(self.target / "bin" / "example-cli", os.X_OK)
+
+        record = self.read_record()
+        assert record["bin/tool"][0] == record_digest(
+            hashlib.sha256(tool.read_bytes())
+        )
+        assert "bin/example-cli" in record
+
+    def test_reinstall_removes_previous_version(self):
+        install_wheel(
+            self.write_wheel(make_wheel(files={"example/old.py": b""})),
+            target=self.target,
+        )
+        install_wheel(
+            self.write_wheel(
+                make_wheel(version="2.0.0", files={"example/new.py": b""}), "v2.whl"
+            ),
+            target=self.target,
+        )
+
+        assert not (self.target / "example" / "old.py").exists()
+        assert not (self.target / "example-1.0.0.dist-info").exists()
+        assert (self.target / "example" / "new.py").exists()
+        assert (self.target / "example-2.0.0.dist-info").exists()
+
+    @parameterized.expand([1, 4])
+    def test_failed_upgrade_keeps_previous_version(self, max_workers):
+        install_wheel(
+            self.write_wheel(
+                make_wheel(
+                    files={
+                        "example/__init__.py": b"VERSION = 1\n",
+                        "example/old.py": b"",
+                    }
+                )
+            ),
+            target=self.target,
+        )
+
+        # The large file is extracted before the tampered one fails.
+        upgrade = zipfile.ZipFile(
+            io.BytesIO(
+                make_wheel(
+                    version="2.0.0",
+                    files={
+                        "example/__init__.py": b"VERSION = 2\n",
+                        "example/sub/large.bin": LARGE_FILE,
+                    },
+                )
+            )
+        )
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, "w") as tampered:
+            for info in upgrade.infolist():
+                content = upgrade.read(info)
+                if info.filename == "example/__init__.py":
+                    content = b"VERSION = 3\n"
+                tampered.writestr(info, content)
+
+        with pytest.raises(InvalidWheelError, match="doesn't match the RECORD"):
+            install_wheel(
+                self.write_wheel(output.getvalue(), "v2.whl"),
+                target=self.target,
+                max_workers=max_workers,
+            )
+
+        assert sorted(path.name for path in self.target.iterdir()) == [
+            "example",
+            "example-1.0.0.dist-info",
+        ]
+        assert not (self.target / "example" / "sub").exists()
+        assert (self.target / "example" / "old.py").exists()
+        assert "example/old.py" in self.read_record()
+
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-c", "import example; print(example.VERSION)"],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": str(self.target)},
+        )
+        assert result.stdout == "1\n"
+
+    def test_record_mismatch(self):
+        original = zipfile.ZipFile(io.BytesIO(make_wheel()))
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, "w") as tampered:
+            for info in original.infolist():
+                content = original.read(info)
+                if info.filename == "example/__init__.py":
+                    content = b"import os; os.system('...')\n"
+                tampered.writestr(info, content)
+
+        with pytest.raises(InvalidWheelError, match="doesn't match the RECORD"):
+            install_wheel(self.write_wheel(output.getvalue()), target=self.target)
+
+        assert not (self.target / "example" / "__init__.py").exists()
+
+    def test_unsafe_path(self):
+        wheel_path = self.write_wheel(make_wheel(files={"../evil.py": b""}))
+
+        with pytest.raises(InvalidWheelError, match="Unsafe path"):
+            install_wheel(wheel_path, target=self.target)
+
+        assert not (self.tmpdir / "evil.py").exists()
+
+    def test_not_a_wheel(self):
+        with pytest.raises(InvalidWheelError, match="is not a wheel"):
+            install_wheel(self.write_wheel(b"not a zip file"), target=self.target)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+import unittest
+
+from parameterized import parameterized
+
+HEAVY_MODULES = ["pip._internal", "requests", "variantlib"]
+
+
+class TestLazyImports(unittest.TestCase):
+    @parameterized.expand([
+        "mockpip",
+        "mockpip.commands.main",
+        "mockpip.commands.install",
+        "mockpip.commands.variants",
+        "mockpip.variant_hash",
+        "mockpip.variant_selection",
+    ])
+    def test_no_heavy_import_at_startup(self, module):
+        result = subprocess.run(  # noqa: S603
+            [
+                sys.executable,
+                "-c",
+                f"import json, sys, {module}; print(json.dumps(list(sys.modules)))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        imported = json.loads(result.stdout)
+
+        for heavy_module in HEAVY_MODULES:
+            assert heavy_module not in imported, f"{module} imports {heavy_module}"
+
+    def test_version_is_resolved_lazily(self):
+        result = subprocess.run(  # noqa: S603
+            [
+                sys.executable,
+                "-c",
+                "import sys, mockpip; "
+                "print('importlib.metadata' in sys.modules, mockpip.__version__)",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        metadata_imported, version = result.stdout.split()
+
+        assert metadata_imported == "False"
+        assert version
+
+
+if __name__ == "__main__":
+    unittest.main()
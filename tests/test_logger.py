@@ -1,4 +1,5 @@
 import logging as _logging
+import threading
 import unittest
 from unittest.mock import MagicMock
 from unittest.mock import patch
@@ -7,6 +8,7 @@ import pytest
 
 import mockpip
 from mockpip.logger import _LoggerAPI
+from mockpip.logger import queued_logging
 
 
 class TestLoggerAPI(unittest.TestCase):
@@ -209,5 +211,53 @@ class TestLoggerAPI(unittest.TestCase):
         assert repr(self.logger) == "<Logger mockpip (INFO)>"
 
 
+class _ThreadRecordingHandler(_logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record: _logging.LogRecord) -> None:
+        self.messages.append(self.format(record))
+        self.threads.add(threading.current_thread().name)
+
+
+class TestQueuedLogging(unittest.TestCase):
+    def setUp(self):
+        self.logger = _logging.getLogger("mockpip_test_queued")
+        self.logger.propagate = False
+        self.logger.setLevel(_LoggerAPI.DEBUG)
+        self.handler = _ThreadRecordingHandler()
+        self.handler.setLevel(_LoggerAPI.INFO)
+        self.logger.handlers = [self.handler]
+
+    def tearDown(self):
+        self.logger.handlers = []
+
+    def test_records_are_handled_in_background(self):
+        with queued_logging(self.logger.name):
+            assert self.logger.handlers != [self.handler]
+            for idx in range(100):
+                self.logger.info("[Variant: %04d] `%s`", idx, "abc")
+            self.logger.debug("below the level of the handler")
+
+        assert self.logger.handlers == [self.handler]
+        assert self.handler.messages == [
+            f"[Variant: {idx:04d}] `abc`" for idx in range(100)
+        ]
+        assert threading.current_thread().name not in self.handler.threads
+
+    def test_records_are_flushed_on_error(self):
+        def fail():
+            with queued_logging(self.logger.name):
+                self.logger.error("before the error")
+                raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            fail()
+
+        assert self.handler.messages == ["before the error"]
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,18 +1,22 @@
+import logging
 import sys
 import time
 import unittest
 from io import StringIO
 
-from parameterized import parameterized
-
-from mockpip.progress_bar import fake_install_progress
+from mockpip.progress_bar import TransferProgress
 from mockpip.progress_bar import progress_bar
 
 
+class TerminalStringIO(StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
 class TestProgressBar(unittest.TestCase):
     def setUp(self):
         # Redirect stdout to capture progress bar output
-        self.held_output = StringIO()
+        self.held_output = TerminalStringIO()
         self.original_stdout = sys.stdout
         sys.stdout = self.held_output
 
@@ -48,17 +52,112 @@ class TestProgressBar(unittest.TestCase):
         expected_output = "\r[=====               ] 25%"
         assert expected_output in output
 
-    @parameterized.expand([1, 2, 5])
-    def test_fake_progress_bar(self, duration):
+    def test_progress_bar_not_a_terminal(self):
+        sys.stdout = held_output = StringIO()
+        progress_bar(50, bar_length=20)
+        assert held_output.getvalue() == ""
+
+
+class CountingStream(StringIO):
+    def __init__(self, tty: bool):
+        super().__init__()
+        self.tty = tty
+        self.writes = 0
+        self.flushes = 0
+
+    def isatty(self) -> bool:
+        return self.tty
+
+    def write(self, data: str) -> int:
+        self.writes += 1
+        return super().write(data)
+
+    def flush(self) -> None:
+        self.flushes += 1
+
+
+class TestTransferProgress(unittest.TestCase):
+    def test_disabled_when_not_a_terminal(self):
+        stream = CountingStream(tty=False)
+        with TransferProgress(stream=stream) as progress:
+            assert progress.callback is None
+            progress.update("example.whl", 10, 100)
+
+        assert progress._thread is None  # noqa: SLF001
+        assert stream.getvalue() == ""
+
+    def test_concurrent_transfers(self):
+        stream = CountingStream(tty=True)
+        with TransferProgress(stream=stream, bar_length=10) as progress:
+            assert progress.callback == progress.update
+            progress.update("a.whl", 2**20, 2 * 2**20)
+            progress.update("b.whl", 2**20, None)
+            progress.update("a.whl", 2 * 2**20, 2 * 2**20)
+
+        # The last frame moves back over the previous one.
+        last_frame = stream.getvalue().rpartition("\x1b[2F")[2]
+        a, b = last_frame.splitlines()
+        assert a.startswith("a.whl")
+        assert a.endswith("[==========] 2.0/2.0 MiB 100%\x1b[K")
+        assert b.startswith("b.whl")
+        assert b.endswith("1.0 MiB\x1b[K")
+
+    def test_redraws_are_throttled(self):
+        stream = CountingStream(tty=True)
         start_t = time.perf_counter()
-        fake_install_progress(total_time=duration)
-        total_t = time.perf_counter() - start_t
+        with TransferProgress(stream=stream, refresh_rate=20) as progress:
+            for done in range(1, 100_001):
+                progress.update("example.whl", done, 100_000)
+        elapsed = time.perf_counter() - start_t
 
-        assert total_t - duration <= 0.5  # noqa: PLR2004
+        # One frame per refresh interval, plus the final one.
+        assert stream.writes == stream.flushes
+        assert stream.writes <= elapsed * 20 + 2
+        assert "100%" in stream.getvalue().rpartition("\x1b[1F")[2]
 
-        output = self.held_output.getvalue()
-        expected_output = "\r[========================================] 100%"
-        assert expected_output in output
+    def test_suspended(self):
+        stream = CountingStream(tty=True)
+        with TransferProgress(stream=stream, refresh_rate=1000) as progress:
+            progress.update("a.whl", 1, 2)
+            progress.update("b.whl", 1, 2)
+            while not stream.getvalue():
+                time.sleep(0.001)
+            with progress.suspended():
+                assert stream.getvalue().endswith("\x1b[2F\x1b[J")
+                progress.update("a.whl", 2, 2)
+                time.sleep(0.01)
+                assert stream.getvalue().endswith("\x1b[2F\x1b[J")
+
+        # Redrawn from scratch after the suspension.
+        after = stream.getvalue().rpartition("\x1b[J")[2]
+        assert after.startswith("a.whl")
+        assert "100%" in after.rpartition("\x1b[2F")[2]
+
+    def test_log_records_between_bars(self):
+        stream = CountingStream(tty=True)
+        _logger = logging.getLogger("mockpip.tests.progress")
+        _logger.propagate = False
+        handler = logging.StreamHandler(stream)
+        _logger.addHandler(handler)
+        self.addCleanup(_logger.removeHandler, handler)
+
+        with (
+            TransferProgress(stream=stream, refresh_rate=1000) as progress,
+            progress.clearing_log_records(_logger.name),
+        ):
+            progress.update("a.whl", 1, 2)
+            while not stream.getvalue():
+                time.sleep(0.001)
+            _logger.warning("Resuming the download")
+            progress.update("a.whl", 2, 2)
+
+        # The bar is erased before the record, and drawn again below it.
+        before, _, after = stream.getvalue().partition("Resuming the download\n")
+        assert before.endswith("\x1b[1F\x1b[J")
+        assert after.startswith("a.whl")
+        assert "100%" in after
+        # The handler is back to its own `emit`.
+        assert "emit" not in vars(handler)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,36 @@
+import os
+import socket
+import tempfile
+import time
 import unittest
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
-import requests
+import pytest
+from packaging.specifiers import SpecifierSet
+from packaging.version import Version
 from parameterized import parameterized
 
+from mockpip.cache import IndexCache
+from mockpip.repository import SIMPLE_JSON_CONTENT_TYPE
+from mockpip.repository import IndexResponse
+from mockpip.repository import IndexSession
+from mockpip.repository import IndexStats
+from mockpip.repository import NetworkSettings
+from mockpip.repository import PackageCandidate
+from mockpip.repository import fetch_core_metadata
+from mockpip.repository import iter_candidates_by_priority
+from mockpip.repository import iter_candidates_from_chunks
+from mockpip.repository import iter_release_groups
 from mockpip.repository import list_candidates
+from mockpip.repository import list_candidates_batch
+from mockpip.repository import merge_candidates
+from mockpip.repository import parse_versions_from_index
+from mockpip.repository import parse_versions_from_stream
+from mockpip.repository import sort_candidates
+from tests.index_server import LocalIndexServer
+from tests.index_server import make_index_page
+from tests.index_server import make_json_index_page
 
 
 class TestListCandidatesFromIndex(unittest.TestCase):
@@ -24,36 +49,608 @@ class TestListCandidatesFromIndex(unittest.TestCase):
         candidates = list_candidates("nonexistent", index_url="https://pypi.org/simple")
         assert candidates == []
 
-    @parameterized.expand([404, 500])
-    @patch("requests.get")
-    def test_get_with_bad_status_code(self, status_code: int, mock_get):
+    @parameterized.expand([(404, 0), (503, 1)])
+    def test_get_with_bad_status_code(self, status_code: int, failures: int):
         """Simulate an HTTP error response."""
+        stats = IndexStats()
+        with LocalIndexServer({}) as server, IndexSession(max_retries=0) as session:
+            server.failures["/simple/example/"] = failures
+            candidates = list_candidates(
+                "example",
+                index_url=f"{server.url}/simple",
+                session=session,
+                stats=stats,
+            )
 
-        # Create a mock response object
-        mock_response = MagicMock()
-        mock_response.status_code = status_code
+        assert len(candidates) == 0
+        assert len(server.requests) == 1
+        assert [entry.errors for entry in stats.summary()] == [failures]
 
-        # Assign the mock response to requests.get
-        mock_get.return_value = mock_response
+    def test_connection_refused(self):
+        with socket.create_server(("127.0.0.1", 0)) as listener:
+            port = listener.getsockname()[1]
 
-        # Call the function and verify behavior
-        candidates = list_candidates("example", index_url="https://pypi.org/simple")
-        assert len(candidates) == 0
+        # Nothing listens on the port anymore.
+        stats = IndexStats()
+        with IndexSession(max_retries=0) as session:
+            candidates = list_candidates(
+                "example",
+                index_url=f"http://127.0.0.1:{port}/simple",
+                session=session,
+                stats=stats,
+            )
+
+        assert candidates == []
+        assert [entry.errors for entry in stats.summary()] == [1]
+
+    def test_read_timeout(self):
+        stats = IndexStats()
+        # The connection is accepted by the kernel, but never answered.
+        with (
+            socket.create_server(("127.0.0.1", 0)) as listener,
+            IndexSession(read_timeout=0.1, max_retries=0) as session,
+        ):
+            port = listener.getsockname()[1]
+            candidates = list_candidates(
+                "example",
+                index_url=f"http://127.0.0.1:{port}/simple",
+                session=session,
+                stats=stats,
+            )
+
+        assert candidates == []
+        assert [entry.errors for entry in stats.summary()] == [1]
+
+
+class TestIndexSession(unittest.TestCase):
+    def setUp(self):
+        self.server = LocalIndexServer(
+            {"/simple/example/": make_index_page(["example-1.0.0-py3-none-any.whl"])}
+        )
+        self.server.__enter__()
+        self.index_url = f"{self.server.url}/simple"
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def test_connections_are_reused(self):
+        with IndexSession() as session:
+            for _ in range(5):
+                candidates = list_candidates(
+                    "example", index_url=self.index_url, session=session
+                )
+                assert len(candidates) == 1
+
+            stats = session.stats()
+
+        assert stats.requests == 5  # noqa: PLR2004
+        assert stats.connections == 1
+        assert stats.reused == 4  # noqa: PLR2004
+
+    def test_retry_on_server_error(self):
+        self.server.failures["/simple/example/"] = 2
+
+        with IndexSession(max_retries=2, backoff_factor=0.01) as session:
+            candidates = list_candidates(
+                "example", index_url=self.index_url, session=session
+            )
+
+        assert len(candidates) == 1
+        assert len(self.server.requests) == 3  # noqa: PLR2004
+
+    def test_retries_exhausted(self):
+        self.server.failures["/simple/example/"] = 3
+
+        with IndexSession(max_retries=1, backoff_factor=0.01) as session:
+            candidates = list_candidates(
+                "example", index_url=self.index_url, session=session
+            )
+
+        assert candidates == []
+        assert len(self.server.requests) == 2  # noqa: PLR2004
+
+    def test_timeouts(self):
+        session = IndexSession(connect_timeout=1, read_timeout=2)
+        assert session.timeout == (1, 2)
+
+    def test_event_loop_stopped_on_close(self):
+        session = IndexSession()
+        list_candidates("example", index_url=self.index_url, session=session)
+        thread = session._loop_thread  # noqa: SLF001
+        assert thread.is_alive()
+
+        session.close()
+        assert not thread.is_alive()
+
+        # A closed session starts a new event loop when used again.
+        with session:
+            candidates = list_candidates(
+                "example", index_url=self.index_url, session=session
+            )
+        assert len(candidates) == 1
+
+    def test_proxy_of_given_environment(self):
+        # The local server acts as the proxy of an unreachable index.
+        index_url = "http://index.invalid/simple"
+        self.server.pages[f"{index_url}/example/"] = self.server.pages[
+            "/simple/example/"
+        ]
+        network = NetworkSettings.from_environ({"http_proxy": self.server.url})
+
+        with (
+            patch.dict(os.environ, {"HTTP_PROXY": "http://process.invalid"}),
+            IndexSession(max_retries=0, network=network) as session,
+        ):
+            candidates = list_candidates(
+                "example", index_url=index_url, session=session
+            )
+
+        assert len(candidates) == 1
+        assert self.server.requests == [f"{index_url}/example/"]
+
+
+class TestNetworkSettings(unittest.TestCase):
+    def test_from_environ(self):
+        network = NetworkSettings.from_environ({
+            "http_proxy": "http://lower",
+            "HTTP_PROXY": "http://upper",
+            "HTTPS_PROXY": "http://secure",
+            "no_proxy": "localhost, .internal",
+            "REQUESTS_CA_BUNDLE": "/ca.pem",
+        })
+        assert network == NetworkSettings(
+            proxies=(("http", "http://lower"), ("https", "http://secure")),
+            no_proxy=("localhost", "internal"),
+            ca_bundle="/ca.pem",
+        )
 
     @parameterized.expand([
-        requests.RequestException(),
-        requests.exceptions.Timeout("Request timed out")
+        ("https://pypi.org/simple/", {"https": "http://proxy"}),
+        ("https://localhost:8080/simple/", {}),
+        ("https://index.internal/simple/", {}),
+        ("https://internal/simple/", {}),
+        ("https://notinternal/simple/", {"https": "http://proxy"}),
     ])
-    @patch("requests.get")
-    def test_get_raises_error(self, exception: OSError, mock_get):
-        """Simulate an `requests` error."""
+    def test_no_proxy(self, url, proxies):
+        network = NetworkSettings.from_environ({
+            "https_proxy": "http://proxy",
+            "no_proxy": "localhost,.internal",
+        })
+        assert network.get_proxies(url) == proxies
 
-        # Assign the mock response to requests.get
-        mock_get.side_effect = exception
 
-        # Call the function and verify behavior
-        candidates = list_candidates("example", index_url="https://pypi.org/simple")
-        assert len(candidates) == 0
+class TestIterCandidatesFromChunks(unittest.TestCase):
+    html_content = make_index_page([
+        "example-1.0.0.tar.gz#sha256=" + "a" * 64,
+        "example-1.0.0-py3-none-any.whl",
+        "not-a-package",
+        "example-1.1.0-py3-none-any.whl#sha256=" + "b" * 64,
+        "example-2.0.0-py3-none-any.whl",
+    ])
+
+    def test_matches_full_document_parsing(self):
+        expected = parse_versions_from_index(self.html_content)
+        assert len(expected) == 4  # noqa: PLR2004
+
+        content = self.html_content.encode("utf-8")
+        for chunk_size in [1, 2, 3, 5, 7, 16, 64, len(content)]:
+            chunks = [
+                content[idx : idx + chunk_size]
+                for idx in range(0, len(content), chunk_size)
+            ]
+            candidates = list(iter_candidates_from_chunks(chunks))
+            assert sort_candidates(candidates) == expected, chunk_size
+
+    def test_yields_in_page_order(self):
+        candidates = iter_candidates_from_chunks([self.html_content])
+        assert next(candidates).filename == "example-1.0.0.tar.gz"
+        assert next(candidates).filename == "example-1.0.0-py3-none-any.whl"
+
+    @parameterized.expand([
+        ('data-core-metadata="true"', True),
+        ('data-core-metadata="sha256=' + "c" * 64 + '"', True),
+        ("data-dist-info-metadata='true'", True),
+        ('data-core-metadata="false" data-dist-info-metadata="true"', False),
+        ('data-requires-python="&gt;=3.8"', False),
+    ])
+    def test_core_metadata(self, attributes, expected):
+        content = (
+            f'<a {attributes} href="pkg-1.0.0-py3-none-any.whl">pkg</a>\n'
+            '<a href="pkg-1.0.0.tar.gz">pkg</a>'
+        )
+        for chunk_size in [1, 7, len(content)]:
+            chunks = [
+                content[idx : idx + chunk_size]
+                for idx in range(0, len(content), chunk_size)
+            ]
+            candidates = list(iter_candidates_from_chunks(chunks))
+            assert [c.core_metadata for c in candidates] == [expected, False]
+
+    def test_split_multibyte_characters(self):
+        content = '<a href="pkg-1.0.0-py3-none-any.whl">é</a>'.encode()
+        chunks = [content[:-6], content[-6:-5], content[-5:]]
+        candidates = list(iter_candidates_from_chunks(chunks))
+        assert [candidate.filename for candidate in candidates] == [
+            "pkg-1.0.0-py3-none-any.whl"
+        ]
+
+
+class TestJSONSimpleAPI(unittest.TestCase):
+    filenames = [
+        "example-1.0.0.tar.gz",
+        "example-1.0.0-py3-none-any.whl",
+        "example-1.1.0-py3-none-any.whl",
+    ]
+
+    def test_json_and_html_parse_paths_agree(self):
+        base_url = "https://example.com/simple/example/"
+        from_json = parse_versions_from_stream(
+            [make_json_index_page(self.filenames)],
+            content_type=SIMPLE_JSON_CONTENT_TYPE,
+            base_url=base_url,
+        )
+        from_html = parse_versions_from_stream(
+            [make_index_page(self.filenames, core_metadata=True)],
+            content_type="text/html",
+            base_url=base_url,
+        )
+
+        assert [c.filename for c in from_json] == [c.filename for c in from_html]
+        assert [c.url for c in from_json] == [c.url for c in from_html]
+        assert from_json[0].url == (
+            "https://example.com/packages/example-1.1.0-py3-none-any.whl"
+        )
+        assert all(c.filehash is not None for c in from_json)
+        assert [c.core_metadata for c in from_json] == [True, True, False]
+        assert [c.core_metadata for c in from_html] == [True, True, False]
+
+    def test_invalid_json_page(self):
+        candidates = parse_versions_from_stream(
+            ["{not json"], content_type=SIMPLE_JSON_CONTENT_TYPE
+        )
+        assert candidates == []
+
+    def test_json_is_negotiated(self):
+        page = {
+            SIMPLE_JSON_CONTENT_TYPE: make_json_index_page(self.filenames),
+            "text/html": make_index_page(["example-0.1.0-py3-none-any.whl"]),
+        }
+
+        with LocalIndexServer({"/simple/example/": page}) as server:
+            candidates = list_candidates("example", index_url=f"{server.url}/simple")
+
+        assert SIMPLE_JSON_CONTENT_TYPE in server.request_headers[0]["Accept"]
+        assert len(candidates) == 3  # noqa: PLR2004
+        assert [c.core_metadata for c in candidates] == [False, True, True]
+
+    def test_html_fallback(self):
+        page = make_index_page(self.filenames)
+
+        with LocalIndexServer({"/simple/example/": page}) as server:
+            candidates = list_candidates("example", index_url=f"{server.url}/simple")
+
+        assert len(candidates) == 3  # noqa: PLR2004
+        assert not candidates[0].core_metadata
+
+
+class TestCandidatesByPriority(unittest.TestCase):
+    filenames = [
+        "example-1.0.0.tar.gz",
+        "example-10.0.0-py3-none-any.whl",
+        "example-1.0.0-py3-none-any.whl",
+        "example-2.0.0.tar.gz",
+        "example-2.0-py3-none-any.whl",
+        "example-2.0.0-py3-none-manylinux_2_17_x86_64.whl",
+        "example-2.0.0-py3-none-any.whl",
+    ]
+
+    def setUp(self):
+        self.candidates = parse_versions_from_stream(
+            [make_index_page(self.filenames)], sort=False
+        )
+
+    def test_matches_full_sort(self):
+        by_priority = list(iter_candidates_by_priority(self.candidates))
+        assert by_priority == sort_candidates(self.candidates)
+        assert [str(c.version) for c in by_priority] == [
+            "10.0.0",
+            "2.0.0",
+            "2.0.0",
+            "2.0.0",
+            "1.0.0",
+            "1.0.0",
+        ]
+        assert [c.extension for c in by_priority[1:4]] == ["whl", "whl", "tar.gz"]
+
+    def test_release_groups_are_lazy(self):
+        groups = iter_release_groups(self.candidates)
+        assert [c.filename for c in next(groups)] == [
+            "example-10.0.0-py3-none-any.whl"
+        ]
+        assert [c.filename for c in next(groups)] == [
+            "example-2.0.0-py3-none-manylinux_2_17_x86_64.whl",
+            "example-2.0.0-py3-none-any.whl",
+            "example-2.0.0.tar.gz",
+        ]
+        # Ordering the candidates did not require building any `Version`
+        assert sum(c._version is not None for c in self.candidates) == 0  # noqa: SLF001
+
+    def test_release_ordering(self):
+        candidates = [
+            PackageCandidate("a-1.0.0.tar.gz", "1.0.0", "tar.gz", None),
+            PackageCandidate("a-1.0.tar.gz", Version("1.0"), "tar.gz", None),
+            PackageCandidate("a-1.0.1.tar.gz", "1.0.1", "tar.gz", None),
+            PackageCandidate("a-0.9.tar.gz", Version("0.9"), "tar.gz", None),
+        ]
+        assert candidates[0].release == candidates[1].release == (1,)
+        assert [c.filename for c in iter_candidates_by_priority(candidates)] == [
+            "a-1.0.1.tar.gz",
+            "a-1.0.0.tar.gz",
+            "a-1.0.tar.gz",
+            "a-0.9.tar.gz",
+        ]
+
+
+class TestListCandidatesBatch(unittest.TestCase):
+
+    @parameterized.expand([1, 4])
+    def test_list_candidates_batch(self, max_workers):
+        pages = {
+            f"/simple/pkg{idx}/": make_index_page(
+                [f"pkg{idx}-1.0.{idx}-py3-none-any.whl"]
+            )
+            for idx in range(6)
+        }
+        package_names = [f"pkg{idx}" for idx in range(6)] + ["missing"]
+
+        with LocalIndexServer(pages) as server:
+            results = list_candidates_batch(
+                package_names,
+                index_url=f"{server.url}/simple",
+                max_workers=max_workers,
+            )
+
+        assert [result.package_name for result in results] == package_names
+        for idx, result in enumerate(results[:-1]):
+            assert [str(candidate.version) for candidate in result.candidates] == [
+                f"1.0.{idx}"
+            ]
+            assert result.elapsed > 0
+        assert results[-1].candidates == []
+
+
+class TestSpecifierFiltering(unittest.TestCase):
+    FILENAMES = [
+        "example-1.0.0.tar.gz",
+        "example-1.0.0-py3-none-any.whl",
+        "example-1.5.0-py3-none-any.whl",
+        "example-2.0.0.tar.gz",
+        "example-2.0.0-py3-none-any.whl",
+        "example-2.1.0-py3-none-any.whl",
+    ]
+
+    @parameterized.expand([
+        (">=2.0", ["2.1.0", "2.0.0", "2.0.0"]),
+        ("<2,!=1.5.0", ["1.0.0", "1.0.0"]),
+        ("==1.5.*", ["1.5.0"]),
+        (">3", []),
+    ])
+    def test_parse_versions_with_specifier(self, specifier, expected):
+        candidates = parse_versions_from_index(
+            make_index_page(self.FILENAMES), specifier=SpecifierSet(specifier)
+        )
+        assert [str(candidate.version) for candidate in candidates] == expected
+
+    def test_specifier_is_evaluated_once_per_version(self):
+        specifier = MagicMock(wraps=SpecifierSet(">=2.0"))
+        candidates = parse_versions_from_stream(
+            [make_index_page(self.FILENAMES)], specifier=specifier
+        )
+        assert len(candidates) == 3  # noqa: PLR2004
+        assert specifier.contains.call_count == 4  # noqa: PLR2004
+
+    def test_list_candidates_with_requirement(self):
+        pages = {"/simple/example-pkg/": make_index_page(self.FILENAMES)}
+
+        with LocalIndexServer(pages) as server:
+            candidates = list_candidates(
+                "Example_Pkg[extra] >= 2.0, < 2.1",
+                index_url=f"{server.url}/simple",
+            )
+
+        # Only the canonical name is sent to the index.
+        assert server.requests == ["/simple/example-pkg/"]
+        assert [str(candidate.version) for candidate in candidates] == [
+            "2.0.0",
+            "2.0.0",
+        ]
+
+    @parameterized.expand([
+        ("example >=",),
+        ("example @ https://example.com/example-1.0.0-py3-none-any.whl",),
+    ])
+    def test_list_candidates_unsupported_requirement(self, requirement):
+        with LocalIndexServer({}) as server:
+            candidates = list_candidates(requirement, index_url=f"{server.url}/simple")
+
+        assert candidates == []
+        assert server.requests == []
+
+
+class TestFetchCoreMetadata(unittest.TestCase):
+    FILENAME = "example-1.0.0~714c4f9e-py3-none-any.whl"
+    METADATA = "Name: example\nVariant-property: fictional_hw :: architecture :: tars\n"
+
+    def make_candidate(self, server, core_metadata=True, filehash=None, path=None):
+        return PackageCandidate(
+            self.FILENAME,
+            "1.0.0",
+            "whl",
+            filehash,
+            url=f"{server.url}{path or '/packages'}/{self.FILENAME}#sha256=abc",
+            core_metadata=core_metadata,
+        )
+
+    def test_fetch_core_metadata(self):
+        pages = {f"/packages/{self.FILENAME}.metadata": self.METADATA}
+
+        with tempfile.TemporaryDirectory() as cache_dir, LocalIndexServer(
+            pages
+        ) as server:
+            cache = IndexCache(cache_dir, ttl=0)
+            candidate = self.make_candidate(server)
+
+            assert fetch_core_metadata(candidate, cache=cache) == self.METADATA
+            # Metadata never changes: the cached copy is used even if "stale".
+            assert fetch_core_metadata(candidate, cache=cache) == self.METADATA
+
+        assert server.requests == [f"/packages/{self.FILENAME}.metadata"]
+
+    def test_cached_per_file_hash(self):
+        pages = {
+            f"/packages/{self.FILENAME}.metadata": self.METADATA,
+            f"/mirror/{self.FILENAME}.metadata": self.METADATA,
+        }
+
+        with tempfile.TemporaryDirectory() as cache_dir, LocalIndexServer(
+            pages
+        ) as server:
+            cache = IndexCache(cache_dir)
+            for path in ("/packages", "/mirror"):
+                candidate = self.make_candidate(server, filehash="a" * 64, path=path)
+                assert fetch_core_metadata(candidate, cache=cache) == self.METADATA
+
+        # The same file, served by another index.
+        assert server.requests == [f"/packages/{self.FILENAME}.metadata"]
+
+    def test_metadata_unavailable(self):
+        with LocalIndexServer({}) as server:
+            assert fetch_core_metadata(self.make_candidate(server)) is None
+            assert (
+                fetch_core_metadata(self.make_candidate(server, core_metadata=False))
+                is None
+            )
+
+        assert len(server.requests) == 1
+
+
+class TestMultipleIndexes(unittest.TestCase):
+    def setUp(self):
+        self.primary = LocalIndexServer({
+            "/simple/example/": make_index_page([
+                "example-1.0.0-py3-none-any.whl",
+                "example-1.1.0-py3-none-any.whl",
+            ])
+        })
+        self.mirror = LocalIndexServer({
+            "/simple/example/": make_index_page([
+                "example-1.1.0-py3-none-any.whl",
+                "example-2.0.0-py3-none-any.whl",
+            ])
+        })
+        self.primary.__enter__()
+        self.mirror.__enter__()
+
+    def tearDown(self):
+        self.primary.__exit__(None, None, None)
+        self.mirror.__exit__(None, None, None)
+
+    def test_merge(self):
+        stats = IndexStats()
+        candidates = list_candidates(
+            "example",
+            index_url=f"{self.primary.url}/simple",
+            extra_index_urls=[f"{self.mirror.url}/simple"],
+            stats=stats,
+        )
+
+        assert [candidate.filename for candidate in candidates] == [
+            "example-1.0.0-py3-none-any.whl",
+            "example-1.1.0-py3-none-any.whl",
+            "example-2.0.0-py3-none-any.whl",
+        ]
+        # Duplicates are kept from the first index listing them.
+        assert candidates[1].url.startswith(self.primary.url)
+
+        summary = stats.summary()
+        assert sorted(entry.index_url for entry in summary) == sorted([
+            f"{self.primary.url}/simple",
+            f"{self.mirror.url}/simple",
+        ])
+        assert all(entry.queries == 1 and entry.errors == 0 for entry in summary)
+
+    def test_race_skips_failing_index(self):
+        self.primary.failures["/simple/example/"] = 10
+        stats = IndexStats()
+
+        with IndexSession(max_retries=0) as session:
+            candidates = list_candidates(
+                "example",
+                index_url=f"{self.primary.url}/simple",
+                session=session,
+                extra_index_urls=[f"{self.mirror.url}/simple"],
+                index_strategy="race",
+                stats=stats,
+            )
+
+            assert [candidate.filename for candidate in candidates] == [
+                "example-1.1.0-py3-none-any.whl",
+                "example-2.0.0-py3-none-any.whl",
+            ]
+
+        # The slower index completes in the background.
+        deadline = time.monotonic() + 5
+        while len(stats.summary()) < 2 and time.monotonic() < deadline:  # noqa: PLR2004
+            time.sleep(0.01)
+
+        entries = {entry.index_url: entry for entry in stats.summary()}
+        assert entries[f"{self.mirror.url}/simple"].wins == 1
+        assert entries[f"{self.mirror.url}/simple"].errors == 0
+        assert entries[f"{self.primary.url}/simple"].errors == 1
+
+    def test_race_without_candidates(self):
+        candidates = list_candidates(
+            "missing",
+            index_url=f"{self.primary.url}/simple",
+            extra_index_urls=[f"{self.mirror.url}/simple"],
+            index_strategy="race",
+        )
+        assert candidates == []
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError, match="Unknown index strategy"):
+            list_candidates(
+                "example",
+                index_url=f"{self.primary.url}/simple",
+                index_strategy="fastest",
+            )
+
+    def test_merge_sha256_mismatch(self):
+        def response(index_url: str, sha256: str | None) -> IndexResponse:
+            fragment = f"#sha256={sha256}" if sha256 is not None else ""
+            return IndexResponse(
+                index_url=index_url,
+                candidates=parse_versions_from_stream(
+                    [make_index_page([f"example-1.0.0-py3-none-any.whl{fragment}"])],
+                    sort=False,
+                ),
+                elapsed=0.0,
+                error=None,
+            )
+
+        merged = merge_candidates([
+            response("https://a.example.com", "a" * 64),
+            response("https://b.example.com", None),
+            response("https://c.example.com", "a" * 64),
+        ])
+        assert len(merged) == 1
+
+        with self.assertLogs("mockpip.repository", level="WARNING"):
+            merged = merge_candidates([
+                response("https://a.example.com", "a" * 64),
+                response("https://b.example.com", "b" * 64),
+            ])
+        assert [candidate.filehash for candidate in merged] == ["a" * 64, "b" * 64]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from parameterized import parameterized
+
+from mockpip.requirements import parse_requirement
+from mockpip.requirements import read_requirements_file
+
+
+class TestReadRequirementsFile(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = Path(self._tmpdir.name)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_read_requirements_file(self):
+        (self.tmpdir / "base.txt").write_text("numpy\n")
+        requirements_file = self.tmpdir / "requirements.txt"
+        requirements_file.write_text(
+            "# A comment\n"
+            "\n"
+            "requests>=2.0.0  # inline comment\n"
+            "--index-url https://example.com/simple\n"
+            "packaging \\\n"
+            "    >=23.0\n"
+            "-r base.txt\n"
+        )
+
+        assert read_requirements_file(requirements_file) == [
+            "requests>=2.0.0",
+            "packaging     >=23.0",
+            "numpy",
+        ]
+
+    def test_missing_requirements_file(self):
+        with self.assertRaises(FileNotFoundError):  # noqa: PT027
+            read_requirements_file(self.tmpdir / "missing.txt")
+
+
+class TestParseRequirement(unittest.TestCase):
+    def test_parse_requirement(self):
+        requirement = parse_requirement("Requests[socks] >=2.0.0; python_version>'3'")
+        assert requirement.name == "Requests"
+        assert str(requirement.specifier) == ">=2.0.0"
+        assert requirement.marker.evaluate()
+
+    @parameterized.expand([
+        ("requests >=",),
+        ("requests @ https://example.com/requests-2.0.0-py3-none-any.whl",),
+    ])
+    def test_unsupported_requirement(self, requirement):
+        assert parse_requirement(requirement) is None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,651 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+from packaging.tags import sys_tags
+from parameterized import parameterized
+from pip._internal.exceptions import InvalidWheelFilename
+from variantlib.config import KeyConfig
+from variantlib.config import ProviderConfig
+
+from mockpip import variant_hash
+from mockpip.cache import PipConfigCache
+from mockpip.cache import ProviderConfigCache
+from mockpip.cache import VariantOrderCache
+from mockpip.variant_hash import HostProfile
+from mockpip.variant_hash import VariantPreferenceOrder
+from mockpip.variant_hash import WheelInfo
+from mockpip.variant_hash import get_pip_config_files
+from mockpip.variant_hash import get_provider_configs_fingerprint
+from mockpip.variant_hash import get_provider_configs_key
+from mockpip.variant_hash import get_supported_tags
+from mockpip.variant_hash import get_system_variant_preference_order
+from mockpip.variant_hash import get_tag_priority
+from mockpip.variant_hash import get_variant_descriptions
+from mockpip.variant_hash import get_variant_hash_from_wheel
+from mockpip.variant_hash import get_variant_preference_order
+from mockpip.variant_hash import load_host_profile
+from mockpip.variant_hash import load_provider_config
+from mockpip.variant_hash import parse_wheel_filename
+from mockpip.variant_hash import parse_wheel_filenames
+from mockpip.variant_hash import read_provider_priority_from_pip_config
+from mockpip.variant_hash import run_plugins
+from mockpip.variant_hash import save_host_profile
+
+
+class TestParseWheelFilename(unittest.TestCase):
+    @parameterized.expand([
+        (
+            "requests-2.32.3-py3-none-any.whl",
+            WheelInfo("requests", "2.32.3", None, None, "py3", "none", "any"),
+        ),
+        (
+            "dummy_project-1.0.0~714c4f9e-py3-none-any.whl",
+            WheelInfo(
+                "dummy_project", "1.0.0", None, "714c4f9e", "py3", "none", "any"
+            ),
+        ),
+        (
+            "numpy-2.1.0-1~9f43005d-cp312-cp312-manylinux_2_17_x86_64."
+            "manylinux2014_x86_64.whl",
+            WheelInfo(
+                "numpy",
+                "2.1.0",
+                "1",
+                "9f43005d",
+                "cp312",
+                "cp312",
+                "manylinux_2_17_x86_64.manylinux2014_x86_64",
+            ),
+        ),
+        (
+            "six-1.16.0-py2.py3-none-any.whl",
+            WheelInfo("six", "1.16.0", None, None, "py2.py3", "none", "any"),
+        ),
+        (
+            "dummy_project-1.0.0.dist-info",
+            WheelInfo("dummy_project", "1.0.0", None, None, None, None, None),
+        ),
+    ])
+    def test_parse_wheel_filename(self, filename, expected):
+        assert parse_wheel_filename(filename) == expected
+        assert get_variant_hash_from_wheel(filename) == expected.variant_hash
+
+    @parameterized.expand([
+        "requests-2.32.3.tar.gz",
+        "requests-2.32.3-py3-none.whl",
+        "requests 2.32.3-py3-none-any.whl",
+        "requests-2.32.3-py3-none-any-extra.whl",
+    ])
+    def test_invalid_wheel_filename(self, filename):
+        with pytest.raises(InvalidWheelFilename):
+            parse_wheel_filename(filename)
+
+    def test_parse_wheel_filename_is_memoized(self):
+        parse_wheel_filename.cache_clear()
+        first = parse_wheel_filename("requests-2.32.3-py3-none-any.whl")
+        second = parse_wheel_filename("requests-2.32.3-py3-none-any.whl")
+
+        assert first is second
+        assert parse_wheel_filename.cache_info().hits == 1
+
+    def test_parse_wheel_filenames(self):
+        filenames = [
+            "dummy_project-1.0.0~714c4f9e-py3-none-any.whl",
+            "dummy_project-1.0.0-py3-none-any.whl",
+        ]
+        assert parse_wheel_filenames(filenames) == [
+            parse_wheel_filename(filename) for filename in filenames
+        ]
+
+        with pytest.raises(InvalidWheelFilename):
+            parse_wheel_filenames([*filenames, "dummy_project-1.0.0.tar.gz"])
+
+
+class TestTagPriority(unittest.TestCase):
+    def test_supported_tags_are_cached(self):
+        assert get_supported_tags() is get_supported_tags()
+        assert list(get_supported_tags()) == list(sys_tags())
+
+    def test_compatible_wheels_are_ranked(self):
+        best_tag = next(iter(sys_tags()))
+        best = get_tag_priority(best_tag.interpreter, best_tag.abi, best_tag.platform)
+        pure = get_tag_priority("py3", "none", "any")
+
+        assert best == 0
+        assert pure is not None
+        assert best < pure
+
+    def test_compressed_tag_sets(self):
+        assert get_tag_priority("py2.py3", "none", "any") == get_tag_priority(
+            "py3", "none", "any"
+        )
+
+    @parameterized.expand([
+        ("py2", "none", "any"),
+        ("cp312", "cp312", "fictional_os_42_arch"),
+        (None, None, None),
+    ])
+    def test_incompatible_wheels(self, python_tag, abi_tag, platform_tag):
+        assert get_tag_priority(python_tag, abi_tag, platform_tag) is None
+
+
+class FakePlugin:
+    runs = 0
+    fingerprint_value = None
+
+    def run(self):
+        type(self).runs += 1
+        return ProviderConfig(
+            provider="fictional_hw",
+            configs=[KeyConfig(key="architecture", values=["HAL9000", "tars"])],
+        )
+
+    def fingerprint(self):
+        return self.fingerprint_value
+
+
+class TestLoadProviderConfig(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.plugin_cache = ProviderConfigCache(self._tmpdir.name)
+
+        FakePlugin.runs = 0
+        FakePlugin.fingerprint_value = None
+
+        self.plugin = MagicMock()
+        self.plugin.name = "fictional_hw"
+        self.plugin.dist.version = "1.0.0"
+        self.plugin.load.return_value = FakePlugin
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def load(self, refresh=False):
+        return load_provider_config(
+            self.plugin, plugin_cache=self.plugin_cache, refresh=refresh
+        )
+
+    def test_cached_config_skips_plugin(self):
+        first = self.load()
+        second = self.load()
+
+        assert first == second
+        assert FakePlugin.runs == 1
+        # Without fingerprint, the plugin is not even imported.
+        assert self.plugin.load.call_count == 1
+
+    def test_fingerprint_change_invalidates_cache(self):
+        FakePlugin.fingerprint_value = "driver-1"
+        self.load()
+        self.load()
+        assert FakePlugin.runs == 1
+
+        FakePlugin.fingerprint_value = "driver-2"
+        self.load()
+        assert FakePlugin.runs == 2  # noqa: PLR2004
+
+    def test_plugin_upgrade_invalidates_cache(self):
+        self.load()
+        self.plugin.dist.version = "1.1.0"
+        self.load()
+        assert FakePlugin.runs == 2  # noqa: PLR2004
+
+    def test_refresh(self):
+        self.load()
+        self.load(refresh=True)
+        self.load()
+        assert FakePlugin.runs == 2  # noqa: PLR2004
+
+    def test_invalid_plugin_result_is_not_cached(self):
+        self.plugin.load.return_value = MagicMock(
+            return_value=MagicMock(run=MagicMock(return_value=None))
+        )
+        assert self.load() is None
+        assert self.plugin_cache.get("fictional_hw", "1.0.0") is None
+
+
+class TestRunPlugins(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()  # unblock the hung plugins
+        self.join_plugins()
+
+    @staticmethod
+    def join_plugins():
+        for thread in list(variant_hash._plugin_threads.values()):  # noqa: SLF001
+            thread.join(timeout=10)
+
+    def make_plugin(self, name, delay=0.0, hang=False):
+        release = self.release
+
+        class Plugin:
+            def run(self):
+                if hang:
+                    release.wait()
+                time.sleep(delay)
+                return ProviderConfig(
+                    provider=name, configs=[KeyConfig(key="key", values=["value"])]
+                )
+
+        plugin = MagicMock()
+        plugin.name = name
+        plugin.dist.version = "1.0.0"
+        plugin.load.return_value = Plugin
+        return plugin
+
+    def test_plugins_run_concurrently(self):
+        plugins = [self.make_plugin(f"plugin_{idx}", delay=0.2) for idx in range(5)]
+
+        start_t = time.perf_counter()
+        results = run_plugins(plugins)
+        elapsed = time.perf_counter() - start_t
+
+        assert elapsed < 0.2 * len(plugins) / 2
+        # Results are in priority order, whatever the completion order.
+        assert [result.plugin_name for result in results] == [
+            plugin.name for plugin in plugins
+        ]
+        for result in results:
+            assert result.provider_cfg.provider == result.plugin_name
+            assert result.elapsed >= 0.2  # noqa: PLR2004
+
+    def test_priority_order_is_kept(self):
+        plugins = [
+            self.make_plugin("slow", delay=0.2),
+            self.make_plugin("fast"),
+        ]
+        results = run_plugins(plugins)
+        assert [result.provider_cfg.provider for result in results] == ["slow", "fast"]
+
+    def test_plugin_timeout(self):
+        plugins = [
+            self.make_plugin("hung", hang=True),
+            self.make_plugin("fast"),
+        ]
+
+        start_t = time.perf_counter()
+        results = run_plugins(plugins, plugin_timeout=0.2)
+
+        assert time.perf_counter() - start_t < 1
+        assert results[0].provider_cfg is None
+        assert results[0].elapsed is None
+        assert results[1].provider_cfg.provider == "fast"
+
+    def test_global_timeout(self):
+        plugins = [self.make_plugin(f"hung_{idx}", hang=True) for idx in range(3)]
+
+        start_t = time.perf_counter()
+        results = run_plugins(plugins, plugin_timeout=10, timeout=0.2)
+
+        assert time.perf_counter() - start_t < 1
+        assert all(result.provider_cfg is None for result in results)
+
+    def test_late_plugin_not_cached(self):
+        plugin = self.make_plugin("late", hang=True)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            plugin_cache = ProviderConfigCache(cache_dir)
+            results = run_plugins([plugin], plugin_cache=plugin_cache, timeout=0.1)
+            assert results[0].provider_cfg is None
+
+            with self.assertLogs("mockpip.variant_hash", level="WARNING") as logs:
+                self.release.set()
+                self.join_plugins()
+
+            assert "answered after its timeout" in logs.output[0]
+            assert plugin_cache.get("late", "1.0.0") is None
+
+    def test_hung_plugin_not_restarted(self):
+        plugin = self.make_plugin("hung_again", hang=True)
+        run_plugins([plugin], timeout=0.1)
+
+        with self.assertLogs("mockpip.variant_hash", level="WARNING") as logs:
+            start_t = time.perf_counter()
+            results = run_plugins([plugin], timeout=10)
+
+        # Not waited for, nor run a second time.
+        assert time.perf_counter() - start_t < 1
+        assert results[0].provider_cfg is None
+        assert "may be hung" in logs.output[0]
+        plugin.load.assert_called_once()
+
+        # Started again once the previous run returned.
+        self.release.set()
+        self.join_plugins()
+        assert run_plugins([plugin])[0].provider_cfg.provider == "hung_again"
+        assert plugin.load.call_count == 2  # noqa: PLR2004
+
+
+@unittest.skipUnless(sys.platform == "linux", "XDG directories")
+class TestGetPipConfigFiles(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmpdir.cleanup)
+        self.config_file = Path(self._tmpdir.name) / "pip.conf"
+
+    def get_pip_files(self, env: dict[str, str]) -> list[str]:
+        from pip._internal.configuration import OVERRIDE_ORDER
+        from pip._internal.configuration import Configuration
+
+        with patch.dict(os.environ, env, clear=True):
+            config_files = dict(Configuration(isolated=False).iter_config_files())
+        return [
+            fname
+            for variant in OVERRIDE_ORDER
+            for fname in config_files.get(variant, [])
+        ]
+
+    @parameterized.expand([
+        ({"HOME": "/home/client"},),
+        ({"HOME": "/home/client", "XDG_CONFIG_HOME": "/xdg/config"},),
+        ({"HOME": "/home/client", "XDG_CONFIG_DIRS": "/xdg/a:/xdg/b"},),
+        ({"HOME": "/home/client", "PIP_CONFIG_FILE": "/missing/pip.conf"},),
+    ])
+    def test_same_files_as_pip(self, env):
+        assert get_pip_config_files(env) == self.get_pip_files(env)
+
+    def test_existing_config_file(self):
+        self.config_file.touch()
+        env = {"HOME": "/home/client", "PIP_CONFIG_FILE": str(self.config_file)}
+        assert get_pip_config_files(env) == self.get_pip_files(env)
+        assert get_pip_config_files(env)[-1] == str(self.config_file)
+
+    def test_devnull(self):
+        assert get_pip_config_files({"PIP_CONFIG_FILE": os.devnull}) == []
+
+    def test_environment_of_the_process_unused(self):
+        with patch.dict(os.environ, {"XDG_CONFIG_HOME": "/process/config"}):
+            files = get_pip_config_files({"HOME": "/home/client"})
+        assert "/home/client/.config/pip/pip.conf" in files
+        assert not any(fname.startswith("/process") for fname in files)
+
+
+class TestReadProviderPriority(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.config_file = Path(self._tmpdir.name) / "pip.conf"
+        self.config_cache = PipConfigCache(Path(self._tmpdir.name) / "cache")
+
+        self._env = patch.dict(os.environ, {"PIP_CONFIG_FILE": str(self.config_file)})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        self._tmpdir.cleanup()
+
+    def write_config(self, content):
+        self.config_file.write_text(content)
+        # Make sure the mtime changes even on coarse-grained filesystems.
+        future = time.time() + len(content)
+        os.utime(self.config_file, (future, future))
+
+    @parameterized.expand([
+        "provider_priority",
+        "provider-priority",
+        "Provider_Priority",
+    ])
+    def test_read_provider_priority(self, option):
+        self.write_config(f'[variantlib]\n{option} = ["nvidia", "x86_64"]\n')
+
+        assert read_provider_priority_from_pip_config() == {"nvidia": 0, "x86_64": 1}
+
+    @parameterized.expand([
+        ("", "missing key"),
+        ("[variantlib]\nprovider_priority = nvidia\n", "invalid JSON"),
+        ('[variantlib]\nprovider_priority = {"nvidia": 0}\n', "not a list"),
+    ])
+    def test_no_provider_priority(self, content, reason):
+        self.write_config(content)
+        assert read_provider_priority_from_pip_config() == {}, reason
+
+    def test_invalid_config_file(self):
+        self.write_config("provider_priority = nvidia\n")  # no section
+        assert read_provider_priority_from_pip_config() == {}
+
+    def test_cache_hit_skips_pip(self):
+        self.write_config('[variantlib]\nprovider_priority = ["nvidia"]\n')
+        first = read_provider_priority_from_pip_config(self.config_cache)
+
+        with patch("mockpip.variant_hash.get_pip_config_files") as get_files_mock:
+            second = read_provider_priority_from_pip_config(self.config_cache)
+            get_files_mock.assert_not_called()
+
+        assert first == second == {"nvidia": 0}
+
+    def test_modified_file_invalidates_cache(self):
+        self.write_config('[variantlib]\nprovider_priority = ["nvidia"]\n')
+        read_provider_priority_from_pip_config(self.config_cache)
+
+        self.write_config('[variantlib]\nprovider_priority = ["x86_64", "nvidia"]\n')
+        assert read_provider_priority_from_pip_config(self.config_cache) == {
+            "x86_64": 0,
+            "nvidia": 1,
+        }
+
+    def test_other_config_file_invalidates_cache(self):
+        self.write_config('[variantlib]\nprovider_priority = ["nvidia"]\n')
+        read_provider_priority_from_pip_config(self.config_cache)
+
+        other_config_file = Path(self._tmpdir.name) / "other.conf"
+        other_config_file.write_text('[variantlib]\nprovider_priority = ["arm"]\n')
+        with patch.dict(os.environ, {"PIP_CONFIG_FILE": str(other_config_file)}):
+            assert read_provider_priority_from_pip_config(self.config_cache) == {
+                "arm": 0
+            }
+
+    def test_given_environment(self):
+        self.write_config('[variantlib]\nprovider_priority = ["nvidia"]\n')
+        other_config_file = Path(self._tmpdir.name) / "other.conf"
+        other_config_file.write_text('[variantlib]\nprovider_priority = ["arm"]\n')
+
+        env = {**os.environ, "PIP_CONFIG_FILE": str(other_config_file)}
+        assert read_provider_priority_from_pip_config(self.config_cache, env=env) == {
+            "arm": 0
+        }
+        assert read_provider_priority_from_pip_config(self.config_cache) == {
+            "nvidia": 0
+        }
+
+
+class TestProviderConfigsFingerprint(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.site_dir = Path(self._tmpdir.name) / "site-packages"
+        self.site_dir.mkdir()
+        self.config_file = Path(self._tmpdir.name) / "pip.conf"
+        self.config_cache = PipConfigCache(Path(self._tmpdir.name) / "cache")
+
+        self._env = patch.dict(os.environ, {"PIP_CONFIG_FILE": str(self.config_file)})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        self._tmpdir.cleanup()
+
+    def fingerprint(self, provider_priority_dict=None):
+        return get_provider_configs_fingerprint(
+            provider_priority_dict,
+            pip_config_cache=self.config_cache,
+            paths=[str(self.site_dir)],
+        )
+
+    def test_fingerprint(self):
+        self.config_file.write_text('[variantlib]\nprovider_priority = ["a"]\n')
+        read_provider_priority_from_pip_config(config_cache=self.config_cache)
+        fingerprint = self.fingerprint()
+        assert fingerprint == self.fingerprint()
+        assert fingerprint != self.fingerprint({"a": 0})
+
+        # A plugin installed.
+        (self.site_dir / "plugin-1.0.0.dist-info").mkdir()
+        previous, fingerprint = fingerprint, self.fingerprint()
+        assert fingerprint != previous
+
+        # The pip configuration changed.
+        self.config_file.write_text('[variantlib]\nprovider_priority = ["b"]\n')
+        future = time.time() + 10
+        os.utime(self.config_file, (future, future))
+        assert fingerprint != self.fingerprint()
+
+
+class TestVariantPreferenceOrder(unittest.TestCase):
+    PROVIDER_CFGS = [
+        ProviderConfig(
+            provider="fictional_hw",
+            configs=[
+                KeyConfig(key="architecture", values=["HAL9000", "tars"]),
+                KeyConfig(key="compute_capability", values=["8", "6"]),
+            ],
+        ),
+        ProviderConfig(
+            provider="gcc", configs=[KeyConfig(key="version", values=["1.2.3"])]
+        ),
+    ]
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.order_cache = VariantOrderCache(self._tmpdir.name)
+        variant_hash._variant_orders.clear()  # noqa: SLF001
+
+    def tearDown(self):
+        variant_hash._variant_orders.clear()  # noqa: SLF001
+        self._tmpdir.cleanup()
+
+    def test_matches_enumeration(self):
+        variant_order = get_variant_preference_order(self.PROVIDER_CFGS)
+        expected = [
+            (vdesc.hexdigest, vdesc)
+            for vdesc in get_variant_descriptions(self.PROVIDER_CFGS)
+        ]
+        assert list(variant_order) == expected
+        assert variant_order.hashes == [vhash for vhash, _ in expected]
+
+    def test_memoized_in_memory(self):
+        first = get_variant_preference_order(self.PROVIDER_CFGS)
+        assert get_variant_preference_order(self.PROVIDER_CFGS) is first
+
+    def test_memoized_on_disk(self):
+        first = get_variant_preference_order(
+            self.PROVIDER_CFGS, order_cache=self.order_cache
+        )
+        variant_hash._variant_orders.clear()  # noqa: SLF001
+
+        with patch(
+            "mockpip.variant_hash.get_variant_descriptions"
+        ) as get_variant_descriptions_mock:
+            second = get_variant_preference_order(
+                self.PROVIDER_CFGS, order_cache=self.order_cache
+            )
+            get_variant_descriptions_mock.assert_not_called()
+
+        assert second is not first
+        assert second.hashes == first.hashes
+        # Descriptions are rebuilt from the serialized properties.
+        assert list(second) == list(first)
+
+    def test_memory_bounded(self):
+        def provider_cfgs(version: int) -> list[ProviderConfig]:
+            return [
+                ProviderConfig(
+                    provider="gcc",
+                    configs=[KeyConfig(key="version", values=[str(version)])],
+                )
+            ]
+
+        first = get_variant_preference_order(self.PROVIDER_CFGS)
+        for version in range(variant_hash.VARIANT_ORDERS_MAX_ENTRIES * 2):
+            get_variant_preference_order(provider_cfgs(version))
+            # The most recently used order stays in memory.
+            assert get_variant_preference_order(self.PROVIDER_CFGS) is first
+
+        orders = variant_hash._variant_orders  # noqa: SLF001
+        assert len(orders) == variant_hash.VARIANT_ORDERS_MAX_ENTRIES
+        assert get_provider_configs_key(provider_cfgs(0)) not in orders
+        assert get_provider_configs_key(self.PROVIDER_CFGS) in orders
+
+    def test_configs_key(self):
+        key = get_provider_configs_key(self.PROVIDER_CFGS)
+        assert key == get_provider_configs_key(list(self.PROVIDER_CFGS))
+        assert key != get_provider_configs_key(self.PROVIDER_CFGS[::-1])
+        assert key != get_provider_configs_key(self.PROVIDER_CFGS[:1])
+
+    def test_system_variant_preference_order(self):
+        with patch(
+            "mockpip.variant_hash.get_provider_configs",
+            return_value=self.PROVIDER_CFGS,
+        ):
+            assert get_system_variant_preference_order() == [
+                vdesc.hexdigest
+                for vdesc in get_variant_descriptions(self.PROVIDER_CFGS)
+            ]
+
+
+class TestHostProfile(unittest.TestCase):
+    PROVIDER_CFGS = TestVariantPreferenceOrder.PROVIDER_CFGS
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.profile_path = Path(self._tmpdir.name) / "profiles" / "host.json"
+        self.profile = HostProfile(
+            created_at=time.time(),
+            variantlib_version=variant_hash.get_variantlib_version(),
+            provider_cfgs=self.PROVIDER_CFGS,
+            variant_order=VariantPreferenceOrder.from_descriptions(
+                get_variant_descriptions(self.PROVIDER_CFGS)
+            ),
+        )
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_save_and_load(self):
+        save_host_profile(self.profile, self.profile_path)
+        profile = load_host_profile(self.profile_path)
+
+        assert profile.created_at == self.profile.created_at
+        assert profile.provider_cfgs == self.PROVIDER_CFGS
+        assert profile.variant_order.hashes == self.profile.variant_order.hashes
+        assert list(profile.variant_order) == list(self.profile.variant_order)
+
+    def test_missing_profile(self):
+        assert load_host_profile(self.profile_path) is None
+
+    @parameterized.expand([
+        ("{not json",),
+        ('{"format": 0}',),
+        ('{"format": 1}',),
+    ])
+    def test_invalid_profile(self, content):
+        self.profile_path.parent.mkdir()
+        self.profile_path.write_text(content)
+        assert load_host_profile(self.profile_path) is None
+
+    def test_other_variantlib_version(self):
+        save_host_profile(
+            self.profile._replace(variantlib_version="0.0.0.dev0"), self.profile_path
+        )
+        assert load_host_profile(self.profile_path) is None
+
+    def test_system_variant_preference_order_uses_profile(self):
+        save_host_profile(self.profile, self.profile_path)
+
+        with patch("mockpip.variant_hash.get_provider_configs") as get_configs_mock:
+            hashes = get_system_variant_preference_order(
+                profile_path=self.profile_path
+            )
+            get_configs_mock.assert_not_called()
+
+        assert hashes == self.profile.variant_order.hashes
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+import threading
+import unittest
+
+import pytest
+from parameterized import parameterized
+
+# The ranker must agree with the enumeration of `variantlib` itself.
+get_combinations = pytest.importorskip("variantlib.combination").get_combinations
+
+from variantlib.config import KeyConfig  # noqa: E402
+from variantlib.config import ProviderConfig  # noqa: E402
+from variantlib.meta import VariantDescription  # noqa: E402
+from variantlib.meta import VariantMeta  # noqa: E402
+
+from mockpip.repository import PackageCandidate  # noqa: E402
+from mockpip.variant_selection import VariantRanker  # noqa: E402
+from mockpip.variant_selection import get_published_variants  # noqa: E402
+from mockpip.variant_selection import parse_variant_metadata  # noqa: E402
+from tests.index_server import make_metadata  # noqa: E402
+
+PROVIDER_CFGS = [
+    ProviderConfig(
+        provider="fictional_hw",
+        configs=[
+            KeyConfig(key="architecture", values=["HAL9000", "tars", "mother"]),
+            KeyConfig(key="compute_capability", values=["10", "8", "6"]),
+        ],
+    ),
+    ProviderConfig(
+        provider="gcc",
+        configs=[KeyConfig(key="version", values=["1.2.3"])],
+    ),
+]
+
+
+def make_vdesc(*properties: tuple[str, str, str]) -> VariantDescription:
+    return VariantDescription(
+        data=[
+            VariantMeta(provider=provider, key=key, value=value)
+            for provider, key, value in properties
+        ]
+    )
+
+
+class TestParseVariantMetadata(unittest.TestCase):
+    def test_parse_variant_metadata(self):
+        metadata = (
+            "Metadata-Version: 2.1\n"
+            "Name: dummy-project\n"
+            "Version: 1.0.0\n"
+            "Variant-property: fictional_hw :: architecture :: HAL9000\n"
+            "Variant-property: gcc :: version :: 1.2.3\n"
+            "Variant-property: invalid property\n"
+            "\n"
+            "Variant-property: this is the description, not a header\n"
+        )
+        vdesc = parse_variant_metadata(metadata)
+        assert vdesc == make_vdesc(
+            ("fictional_hw", "architecture", "HAL9000"), ("gcc", "version", "1.2.3")
+        )
+
+    def test_variant_hash(self):
+        vdesc = make_vdesc(
+            ("fictional_hw", "architecture", "HAL9000"), ("gcc", "version", "1.2.3")
+        )
+        assert parse_variant_metadata(make_metadata(variant=vdesc)) == vdesc
+
+    def test_variant_hash_mismatch(self):
+        metadata = (
+            "Variant-property: fictional_hw :: architecture :: HAL9000\n"
+            "Variant-hash: 00000000\n"
+        )
+        assert parse_variant_metadata(metadata) is None
+
+    def test_no_variant(self):
+        assert parse_variant_metadata("Name: dummy-project\nVersion: 1.0.0\n") is None
+
+
+class TestVariantRanker(unittest.TestCase):
+    @parameterized.expand([
+        (PROVIDER_CFGS,),
+        (PROVIDER_CFGS[::-1],),
+        (
+            [
+                *PROVIDER_CFGS,
+                ProviderConfig(
+                    provider="fictional_tech",
+                    configs=[
+                        KeyConfig(key="quantum", values=["SUPERPOSITION", "FOAM"]),
+                        KeyConfig(key="risk_exposure", values=["25", "1000000"]),
+                        KeyConfig(key="technology", values=["auto_chef"]),
+                    ],
+                ),
+            ],
+        ),
+    ])
+    def test_rank_matches_enumeration_order(self, provider_cfgs):
+        ranker = VariantRanker(provider_cfgs)
+        vdescs = list(get_combinations(provider_cfgs))
+
+        assert sorted(vdescs, key=ranker.rank) == vdescs
+        assert len({ranker.rank(vdesc) for vdesc in vdescs}) == len(vdescs)
+
+    @parameterized.expand([
+        (("fictional_hw", "architecture", "deepthought"),),
+        (("fictional_hw", "humor", "10"),),
+        (("unknown_provider", "architecture", "HAL9000"),),
+    ])
+    def test_unsupported_variant(self, unsupported_property):
+        ranker = VariantRanker(PROVIDER_CFGS)
+        vdesc = make_vdesc(("gcc", "version", "1.2.3"), unsupported_property)
+        assert ranker.rank(vdesc) is None
+
+    def test_select(self):
+        published = {
+            vdesc.hexdigest: vdesc
+            for vdesc in [
+                make_vdesc(("fictional_hw", "architecture", "mother")),
+                make_vdesc(
+                    ("fictional_hw", "architecture", "tars"),
+                    ("fictional_hw", "compute_capability", "8"),
+                ),
+                make_vdesc(
+                    ("fictional_hw", "architecture", "HAL9000"),
+                    ("fictional_hw", "compute_capability", "4"),
+                ),
+            ]
+        }
+        vhash, vdesc = VariantRanker(PROVIDER_CFGS).select(published)
+
+        # The first variant of the enumeration published by the package.
+        expected = next(
+            vdesc
+            for vdesc in get_combinations(PROVIDER_CFGS)
+            if vdesc.hexdigest in published
+        )
+        assert vhash == expected.hexdigest
+        assert vdesc == published[vhash]
+
+    def test_select_nothing_supported(self):
+        vdesc = make_vdesc(("fictional_hw", "architecture", "deepthought"))
+        assert VariantRanker(PROVIDER_CFGS).select({vdesc.hexdigest: vdesc}) is None
+
+
+class TestGetPublishedVariants(unittest.TestCase):
+    def setUp(self):
+        self.vdesc = make_vdesc(("fictional_hw", "architecture", "HAL9000"))
+        self.candidates = {
+            None: PackageCandidate(
+                "dummy-1.0.0-py3-none-any.whl", "1.0.0", "whl", None
+            ),
+            self.vdesc.hexdigest: PackageCandidate(
+                f"dummy-1.0.0~{self.vdesc.hexdigest}-py3-none-any.whl",
+                "1.0.0",
+                "whl",
+                None,
+            ),
+        }
+
+    def test_get_published_variants(self):
+        def fetch_metadata(pkg):
+            return make_metadata(variant=self.vdesc)
+
+        assert get_published_variants(self.candidates, fetch_metadata) == {
+            self.vdesc.hexdigest: self.vdesc
+        }
+
+    def test_fetched_concurrently(self):
+        vdescs = [
+            make_vdesc(("fictional_hw", "architecture", value))
+            for value in ("HAL9000", "tars", "mother")
+        ]
+        candidates = {
+            vdesc.hexdigest: PackageCandidate(
+                f"dummy-1.0.0~{vdesc.hexdigest}-py3-none-any.whl", "1.0.0", "whl", None
+            )
+            for vdesc in vdescs
+        }
+        metadata = {
+            candidates[vdesc.hexdigest].filename: make_metadata(variant=vdesc)
+            for vdesc in vdescs
+        }
+        # Every fetch waits for the others: they must all be in flight at once.
+        barrier = threading.Barrier(len(vdescs), timeout=10)
+
+        def fetch_metadata(pkg):
+            barrier.wait()
+            return metadata[pkg.filename]
+
+        published = get_published_variants(candidates, fetch_metadata)
+        assert list(published) == list(candidates)
+        assert list(published.values()) == vdescs
+
+    def test_stops_at_first_undescribed_variant(self):
+        vdescs = [
+            make_vdesc(("fictional_hw", "compute_capability", str(value)))
+            for value in range(10)
+        ]
+        candidates = {
+            vdesc.hexdigest: PackageCandidate(
+                f"dummy-1.0.0~{vdesc.hexdigest}-py3-none-any.whl", "1.0.0", "whl", None
+            )
+            for vdesc in vdescs
+        }
+        calls = []
+
+        def fetch_metadata(pkg):
+            calls.append(pkg)  # and no metadata
+
+        assert get_published_variants(candidates, fetch_metadata, max_workers=1) is None
+        # The fetches not started yet are cancelled.
+        assert len(calls) < len(vdescs)
+
+    @parameterized.expand([
+        (None,),
+        ("Name: dummy\n",),
+        ("Variant-property: fictional_hw :: architecture :: tars\n",),  # hash mismatch
+    ])
+    def test_undescribed_variants(self, metadata):
+        assert get_published_variants(self.candidates, lambda pkg: metadata) is None
+
+
+if __name__ == "__main__":
+    unittest.main()